@@ -26,6 +26,9 @@ from grr_response_core.lib.rdfvalues import flows as rdf_flows
 # Our first response in the session is this:
 INITIAL_RESPONSE_ID = 1
 
+# Batched replies are sent once their serialized size exceeds this.
+MAX_REPLY_BATCH_BYTES = 512 * 1024
+
 
 class Error(Exception):
   pass
@@ -72,6 +75,10 @@ class ActionPlugin(with_metaclass(registry.MetaclassRegistry, object)):
 
   require_fastpoll = True
 
+  # Actions sending many small replies can set this to pack up to
+  # Client.reply_batch_size of them into a single message.
+  batch_replies = False
+
   last_progress_time = 0
 
   def __init__(self, grr_worker=None):
@@ -92,6 +99,11 @@ class ActionPlugin(with_metaclass(registry.MetaclassRegistry, object)):
     self.proc = psutil.Process()
     self.cpu_start = self.proc.cpu_times()
     self.cpu_limit = rdf_flows.GrrMessage().cpu_limit
+    self._reply_batch = []
+    self._reply_batch_bytes = 0
+    self._reply_batch_size = 0
+    if self.batch_replies:
+      self._reply_batch_size = config.CONFIG["Client.reply_batch_size"]
 
   def Execute(self, message):
     """This function parses the RDFValue from the server.
@@ -147,6 +159,8 @@ class ActionPlugin(with_metaclass(registry.MetaclassRegistry, object)):
         used = self.proc.cpu_times()
         self.cpu_used = (used.user - self.cpu_start.user,
                          used.system - self.cpu_start.system)
+        # Replies sent before an error still reach the server.
+        self._FlushReplies()
 
     except NetworkBytesExceededError as e:
       self.SetStatus(rdf_flows.GrrStatus.ReturnedStatus.NETWORK_LIMIT_EXCEEDED,
@@ -236,6 +250,13 @@ class ActionPlugin(with_metaclass(registry.MetaclassRegistry, object)):
     # this if-statement should no longer be relevant (since setting custom
     # session ids would become illegal).
     if session_id is None:
+      if (self._reply_batch_size > 1 and
+          message_type == rdf_flows.GrrMessage.Type.MESSAGE):
+        self._BatchReply(rdf_value)
+        return
+
+      # Replies are numbered in the order they are sent.
+      self._FlushReplies()
       response_id = self.response_id
       request_id = self.message.request_id
       session_id = self.message.session_id
@@ -244,6 +265,11 @@ class ActionPlugin(with_metaclass(registry.MetaclassRegistry, object)):
       response_id = 0
       request_id = 0
 
+    self._SendReply(rdf_value, session_id, response_id, request_id,
+                    message_type)
+
+  def _SendReply(self, rdf_value, session_id, response_id, request_id,
+                 message_type):
     self.grr_worker.SendReply(
         rdf_value,
         # This is not strictly necessary but adds context
@@ -256,6 +282,45 @@ class ActionPlugin(with_metaclass(registry.MetaclassRegistry, object)):
         task_id=self.message.Get("task_id") or None,
         require_fastpoll=self.require_fastpoll)
 
+  def _BatchReply(self, rdf_value):
+    """Adds a reply to the batch of replies to be sent in a single message."""
+    if (self._reply_batch and
+        self._reply_batch[0][0].__class__ is not rdf_value.__class__):
+      self._FlushReplies()
+
+    serialized = rdf_value.SerializeToString()
+    self._reply_batch.append((rdf_value, serialized))
+    self._reply_batch_bytes += len(serialized)
+    # The response ids are reserved now so that the replies are numbered
+    # consecutively once unpacked on the server.
+    self.response_id += 1
+
+    if (len(self._reply_batch) >= self._reply_batch_size or
+        self._reply_batch_bytes >= MAX_REPLY_BATCH_BYTES):
+      self._FlushReplies()
+
+  def _FlushReplies(self):
+    """Sends the batched replies to the server."""
+    if not self._reply_batch:
+      return
+
+    batch = self._reply_batch
+    self._reply_batch = []
+    self._reply_batch_bytes = 0
+
+    first_response_id = self.response_id - len(batch)
+    if len(batch) == 1:
+      # There is no point in packing a single reply.
+      reply = batch[0][0]
+    else:
+      reply = rdf_flows.PackedReplies(
+          rdf_name=batch[0][0].__class__.__name__,
+          replies=[serialized for _, serialized in batch])
+
+    self._SendReply(reply, self.message.session_id, first_response_id,
+                    self.message.request_id,
+                    rdf_flows.GrrMessage.Type.MESSAGE)
+
   def Progress(self):
     """Indicate progress of the client action.
 
@@ -273,6 +338,10 @@ class ActionPlugin(with_metaclass(registry.MetaclassRegistry, object)):
 
     self.last_progress_time = now
 
+    # Batched replies are not held back for longer than between two progress
+    # reports.
+    self._FlushReplies()
+
     # Prevent the machine from sleeping while the action is running.
     client_utils.KeepAlive()
 
@@ -27,6 +27,7 @@ from grr_response_core.lib.rdfvalues import flows as rdf_flows
 from grr_response_core.lib.rdfvalues import paths as rdf_paths
 from grr.test_lib import client_test_lib
 from grr.test_lib import test_lib
+from grr.test_lib import worker_mocks
 
 
 class ProgressAction(actions.ActionPlugin):
@@ -44,6 +45,17 @@ class ProgressAction(actions.ActionPlugin):
         self.Progress()
 
 
+class BatchingAction(actions.ActionPlugin):
+  """A mock action which sends many small replies."""
+  in_rdfvalue = None
+  out_rdfvalues = [rdf_client.LogMessage]
+  batch_replies = True
+
+  def Run(self, unused_args):
+    for i in range(7):
+      self.SendReply(rdf_client.LogMessage(data="%d" % i))
+
+
 class ActionTest(client_test_lib.EmptyActionTest):
   """Test the client Actions."""
 
@@ -209,6 +221,36 @@ class ActionTest(client_test_lib.EmptyActionTest):
       self.assertLen(results, 1)
       self.assertEqual(result.Name(), "/")
 
+  def _ExecuteBatchingAction(self):
+    worker = worker_mocks.FakeClientWorker()
+    message = rdf_flows.GrrMessage(
+        name="BatchingAction",
+        session_id="aff4:/C.1234567890123456/flows/W:1",
+        request_id=1,
+        auth_state="AUTHENTICATED")
+    BatchingAction(grr_worker=worker).Execute(message)
+    return worker.Drain()
+
+  def testRepliesAreBatched(self):
+    with test_lib.ConfigOverrider({"Client.reply_batch_size": 3}):
+      messages = self._ExecuteBatchingAction()
+
+    # Two full batches, a single reply and the status.
+    self.assertEqual([m.response_id for m in messages], [1, 4, 7, 8])
+    self.assertEqual(messages[-1].type, rdf_flows.GrrMessage.Type.STATUS)
+
+    replies = [r for m in messages[:-1] for r in m.UnpackReplies()]
+    self.assertEqual([r.response_id for r in replies], list(range(1, 8)))
+    self.assertEqual([r.payload.data for r in replies],
+                     ["%d" % i for i in range(7)])
+
+  def testRepliesAreNotBatchedByDefault(self):
+    messages = self._ExecuteBatchingAction()
+
+    self.assertEqual([m.response_id for m in messages], list(range(1, 9)))
+    self.assertEqual([m.payload.data for m in messages[:-1]],
+                     ["%d" % i for i in range(7)])
+
   def testProgressThrottling(self):
 
     class MockWorker(object):
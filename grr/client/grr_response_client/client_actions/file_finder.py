@@ -156,10 +156,16 @@ def GetExpandedPaths(
   else:
     raise ValueError("Unsupported path type: ", args.pathtype)
 
+  if args.parallel_traversal:
+    num_threads = globbing.PARALLEL_TRAVERSAL_THREADS
+  else:
+    num_threads = 1
+
   opts = globbing.PathOpts(
       follow_links=args.follow_links,
       recursion_blacklist=_GetMountpointBlacklist(args.xdev),
-      pathtype=pathtype)
+      pathtype=pathtype,
+      num_threads=num_threads)
 
   for path in args.paths:
     for expanded_path in globbing.ExpandPath(str(path), opts):
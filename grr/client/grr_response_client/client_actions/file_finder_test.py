@@ -102,6 +102,15 @@ class FileFinderTest(client_test_lib.EmptyActionTest):
     self.assertIn("a/b/c/helloc.txt", relative_results)
     self.assertIn("a/b/d/hellod.txt", relative_results)
 
+  def testParallelRecursiveGlob(self):
+    paths = [self.base_path + "/**4"]
+    results = self._RunFileFinder(paths, self.stat_action)
+    parallel_results = self._RunFileFinder(
+        paths, self.stat_action, parallel_traversal=True)
+    self.assertCountEqual(
+        self._GetRelativeResults(parallel_results),
+        self._GetRelativeResults(results))
+
   def testRegexGlob(self):
     paths = [self.base_path + "/valid_win_mbr*.gz"]
     results = self._RunFileFinder(paths, self.stat_action)
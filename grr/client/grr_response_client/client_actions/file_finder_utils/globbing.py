@@ -11,7 +11,10 @@ import fnmatch
 import itertools
 import os
 import platform
+import queue
 import re
+import threading
+import time
 
 from future.utils import with_metaclass
 from typing import Iterator, Optional, Text
@@ -20,6 +23,13 @@ from grr_response_client import vfs
 from grr_response_core.lib.rdfvalues import paths as rdf_paths
 from grr_response_core.lib.util import precondition
 
+# Number of threads listing directories when parallel traversal is requested.
+PARALLEL_TRAVERSAL_THREADS = 8
+
+# How long (in seconds) a closed parallel traversal waits for its threads.
+# Threads blocked on a slow listing are left to finish in the background.
+_WORKER_JOIN_TIMEOUT = 1
+
 
 class PathOpts(object):
   """Options used for path expansion.
@@ -32,20 +42,27 @@ class PathOpts(object):
     recursion_blacklist: List of folders that the glob expansion should not
       recur to.
     pathtype: The pathtype to use.
+    num_threads: Number of threads used to list directories concurrently during
+      recursive expansion. Concurrent listing is supported only for the `OS`
+      pathtype, with the default of 1 the tree is walked sequentially.
   """
 
   def __init__(self,
                follow_links=False,
                recursion_blacklist=None,
-               pathtype=None):
+               pathtype=None,
+               num_threads=1):
     self.follow_links = follow_links
     self.recursion_blacklist = set(recursion_blacklist or [])
     self.pathtype = pathtype or rdf_paths.PathSpec.PathType.OS
+    self.num_threads = num_threads
 
   def __repr__(self):
-    raw = "PathOpts(follow_links={}, recursion_blacklist={!r}, pathtype={})"
+    raw = ("PathOpts(follow_links={}, recursion_blacklist={!r}, pathtype={}, "
+           "num_threads={})")
     return raw.format(
-        bool(self.follow_links), self.recursion_blacklist, self.pathtype)
+        bool(self.follow_links), self.recursion_blacklist, self.pathtype,
+        self.num_threads)
 
 
 class PathComponent(with_metaclass(abc.ABCMeta, object)):
@@ -78,6 +95,9 @@ class RecursiveComponent(PathComponent):
     self.opts = opts or PathOpts()
 
   def Generate(self, dirpath):
+    if (self.opts.num_threads > 1 and
+        self.opts.pathtype == rdf_paths.PathSpec.PathType.OS):
+      return _ParallelWalk(dirpath, self.max_depth, self.opts)
     return self._Generate(dirpath, 1)
 
   def _Generate(self, dirpath, depth):
@@ -406,3 +426,123 @@ def _ListDir(dirpath, pathtype):
     pass
 
   return childpaths
+
+
+def _ScanDir(dirpath):
+  """Lists a local directory without issuing a stat call for every child.
+
+  Args:
+    dirpath: A path to the directory.
+
+  Returns:
+    A list of `(name, is_dir, is_link)` tuples, where `is_dir` tells whether
+    the child is a directory after resolving symlinks. The list is empty if
+    the directory cannot be listed.
+  """
+  children = []
+  try:
+    if hasattr(os, "scandir"):
+      for entry in os.scandir(dirpath):
+        # Both might need a stat call, e.g. on filesystems not reporting types
+        # of directory entries. Children that can't be stat-ed are not
+        # recursed into.
+        try:
+          is_dir = entry.is_dir()
+          is_link = entry.is_symlink()
+        except OSError:
+          is_dir, is_link = False, False
+        children.append((entry.name, is_dir, is_link))
+    else:
+      for name in os.listdir(dirpath):
+        path = os.path.join(dirpath, name)
+        children.append((name, os.path.isdir(path), os.path.islink(path)))
+  except (IOError, OSError):
+    pass
+
+  return children
+
+
+def _ParallelWalk(dirpath, max_depth, opts):
+  """Yields paths in a local directory tree, listing directories concurrently.
+
+  This yields the same paths as the sequential `RecursiveComponent` expansion
+  with the `OS` pathtype, but in the order in which directory listings
+  complete. Listings are done by at most `opts.num_threads` threads that are
+  started lazily and stopped once the generator is exhausted or closed.
+
+  The tree is listed directly rather than through the VFS, but the walked
+  directory is opened through the VFS first, so that it is resolved in the
+  virtual root of the `OS` pathtype if there is one. Yielded paths are
+  relative to the virtual root, like the paths yielded by the VFS listing.
+
+  Args:
+    dirpath: A path to the directory to walk.
+    max_depth: Maximum depth of the recursion.
+    opts: A `PathOpts` object.
+
+  Yields:
+    Paths of all files and directories in the tree up to the given depth.
+  """
+  pathspec = rdf_paths.PathSpec(
+      path=dirpath, pathtype=rdf_paths.PathSpec.PathType.OS)
+  try:
+    local_dirpath = vfs.VFSOpen(pathspec).pathspec.last.path
+  except IOError:
+    return
+
+  tasks = queue.Queue()
+  results = queue.Queue()
+  stopped = threading.Event()
+  workers = []
+
+  def Worker():
+    while True:
+      task = tasks.get()
+      if task is None:
+        return
+      if stopped.is_set():
+        continue
+
+      path, local_path, depth = task
+      try:
+        children = _ScanDir(local_path)
+      except Exception as e:  # pylint: disable=broad-except
+        children = e
+      results.put((path, local_path, depth, children))
+
+  def Submit(path, local_path, depth):
+    tasks.put((path, local_path, depth))
+    if len(workers) < opts.num_threads:
+      worker = threading.Thread(target=Worker, name="GlobbingWorker")
+      worker.daemon = True
+      worker.start()
+      workers.append(worker)
+
+  try:
+    Submit(dirpath, local_dirpath, 1)
+    pending = 1
+    while pending:
+      path, local_path, depth, children = results.get()
+      pending -= 1
+      if isinstance(children, Exception):
+        raise children
+
+      for name, is_dir, is_link in children:
+        childpath = os.path.join(path, name)
+        yield childpath
+
+        if depth >= max_depth or childpath in opts.recursion_blacklist:
+          continue
+        if not is_dir or (is_link and not opts.follow_links):
+          continue
+        Submit(childpath, os.path.join(local_path, name), depth + 1)
+        pending += 1
+  finally:
+    stopped.set()
+    for _ in workers:
+      tasks.put(None)
+    # The threads are daemonic, so those still blocked in a listing don't
+    # have to be waited for.
+    deadline = time.time() + _WORKER_JOIN_TIMEOUT
+    for worker in workers:
+      worker.join(max(0, deadline - time.time()))
@@ -7,14 +7,19 @@ from __future__ import unicode_literals
 import io
 import os
 import shutil
+import threading
 import unittest
 
 
 from absl import app
 from absl.testing import absltest
+from future.builtins import range
 from future.builtins import zip
 
+from grr_response_client import vfs
 from grr_response_client.client_actions.file_finder_utils import globbing
+from grr_response_core.lib import utils
+from grr_response_core.lib.rdfvalues import paths as rdf_paths
 from grr_response_core.lib.util import temp
 from grr.test_lib import test_lib
 
@@ -49,6 +54,11 @@ class DirHierarchyTestMixin(object):
 
 class RecursiveComponentTest(DirHierarchyTestMixin, absltest.TestCase):
 
+  NUM_THREADS = 1
+
+  def Opts(self, **kwargs):
+    return globbing.PathOpts(num_threads=self.NUM_THREADS, **kwargs)
+
   def testSimple(self):
     self.Touch("foo", "0")
     self.Touch("foo", "1")
@@ -56,7 +66,7 @@ class RecursiveComponentTest(DirHierarchyTestMixin, absltest.TestCase):
     self.Touch("baz", "0")
     self.Touch("baz", "1")
 
-    component = globbing.RecursiveComponent()
+    component = globbing.RecursiveComponent(opts=self.Opts())
 
     results = list(component.Generate(self.Path()))
     self.assertCountEqual(results, [
@@ -95,7 +105,7 @@ class RecursiveComponentTest(DirHierarchyTestMixin, absltest.TestCase):
     self.Touch("foo", "bar", "0")
     self.Touch("foo", "bar", "baz", "0")
 
-    component = globbing.RecursiveComponent(max_depth=3)
+    component = globbing.RecursiveComponent(max_depth=3, opts=self.Opts())
 
     results = list(component.Generate(self.Path()))
 
@@ -123,7 +133,7 @@ class RecursiveComponentTest(DirHierarchyTestMixin, absltest.TestCase):
     self.Touch("baz", "1")
     self.Touch("baz", "quux", "0")
 
-    opts = globbing.PathOpts(recursion_blacklist=[
+    opts = self.Opts(recursion_blacklist=[
         self.Path("foo"),
         self.Path("bar", "quux"),
     ])
@@ -159,7 +169,7 @@ class RecursiveComponentTest(DirHierarchyTestMixin, absltest.TestCase):
     os.symlink(self.Path("foo", "baz"), self.Path("quux", "baz"))
     os.symlink(self.Path("quux"), self.Path("norf", "quux"))
 
-    opts = globbing.PathOpts(follow_links=True)
+    opts = self.Opts(follow_links=True)
     component = globbing.RecursiveComponent(opts=opts)
 
     # It should resolve two links and recur to linked directories.
@@ -186,7 +196,7 @@ class RecursiveComponentTest(DirHierarchyTestMixin, absltest.TestCase):
         self.Path("norf", "quux", "baz", "1"),
     ])
 
-    opts = globbing.PathOpts(follow_links=False)
+    opts = self.Opts(follow_links=False)
     component = globbing.RecursiveComponent(opts=opts)
 
     # It should list symlinks but should not recur to linked directories.
@@ -209,12 +219,118 @@ class RecursiveComponentTest(DirHierarchyTestMixin, absltest.TestCase):
     ])
 
   def testInvalidDirpath(self):
-    component = globbing.RecursiveComponent()
+    component = globbing.RecursiveComponent(opts=self.Opts())
 
     results = list(component.Generate("/foo/bar/baz"))
     self.assertCountEqual(results, [])
 
 
+class ParallelRecursiveComponentTest(RecursiveComponentTest):
+
+  NUM_THREADS = 4
+
+  def testDeepTree(self):
+    for i in range(10):
+      for j in range(10):
+        self.Touch("foo%d" % i, "bar%d" % j, "baz")
+
+    component = globbing.RecursiveComponent(opts=self.Opts())
+
+    results = list(component.Generate(self.Path()))
+    self.assertLen(results, 10 + 10 * 10 + 10 * 10)
+    self.assertLen(set(results), len(results))
+    self.assertIn(self.Path("foo9", "bar9", "baz"), results)
+
+  def testClosingGeneratorStopsWorkers(self):
+    for i in range(10):
+      self.Touch("foo%d" % i, "bar", "0")
+
+    component = globbing.RecursiveComponent(opts=self.Opts())
+
+    threads_before = threading.active_count()
+    results = component.Generate(self.Path())
+    next(results)
+    results.close()
+    self.assertEqual(threading.active_count(), threads_before)
+
+  def testVirtualRoot(self):
+    self.Touch("root", "foo", "0")
+    self.Touch("root", "foo", "bar", "1")
+    self.Touch("other", "2")
+
+    vroot = rdf_paths.PathSpec(
+        path=self.Path("root"),
+        pathtype=rdf_paths.PathSpec.PathType.OS,
+        is_virtualroot=True)
+    self.addCleanup(vfs._RESOLVED_PATHSPECS.Flush)
+    component = globbing.RecursiveComponent(opts=self.Opts())
+
+    with utils.Stubber(vfs, "_VFS_VIRTUALROOTS",
+                       {rdf_paths.PathSpec.PathType.OS: vroot}):
+      vfs._RESOLVED_PATHSPECS.Flush()
+      results = list(component.Generate("/"))
+
+    self.assertCountEqual(results, ["/foo", "/foo/0", "/foo/bar", "/foo/bar/1"])
+
+  def testClosingDoesNotWaitForBlockedWorkers(self):
+    for i in range(10):
+      self.Touch("foo%d" % i, "0")
+
+    released = threading.Event()
+    scan_dir = globbing._ScanDir
+
+    def BlockingScanDir(dirpath):
+      if os.path.basename(dirpath).startswith("foo"):
+        released.wait()
+      return scan_dir(dirpath)
+
+    component = globbing.RecursiveComponent(opts=self.Opts())
+
+    with utils.MultiStubber((globbing, "_ScanDir", BlockingScanDir),
+                            (globbing, "_WORKER_JOIN_TIMEOUT", 0.1)):
+      results = component.Generate(self.Path())
+      next(results)
+      results.close()
+
+    released.set()
+    for thread in threading.enumerate():
+      if thread.name == "GlobbingWorker":
+        thread.join()
+
+  @unittest.skipIf(not hasattr(os, "scandir"), "os.scandir is not available")
+  def testChildrenThatCannotBeStatedAreNotRecursedInto(self):
+    self.Touch("foo", "0")
+    self.Touch("bar", "1")
+
+    scandir = os.scandir
+
+    class Entry(object):
+
+      def __init__(self, entry):
+        self.name = entry.name
+        self._entry = entry
+
+      def is_dir(self):  # pylint: disable=invalid-name
+        return self._entry.is_dir()
+
+      def is_symlink(self):  # pylint: disable=invalid-name
+        if self.name == "foo":
+          raise OSError("Permission denied")
+        return self._entry.is_symlink()
+
+    def ScanDir(dirpath):
+      return [Entry(entry) for entry in scandir(dirpath)]
+
+    component = globbing.RecursiveComponent(opts=self.Opts())
+    with utils.Stubber(os, "scandir", ScanDir):
+      results = list(component.Generate(self.Path()))
+
+    self.assertCountEqual(
+        results, [self.Path("foo"),
+                  self.Path("bar"),
+                  self.Path("bar", "1")])
+
+
 class GlobComponentTest(DirHierarchyTestMixin, absltest.TestCase):
 
   def testLiterals(self):
@@ -11,7 +11,9 @@ from future.utils import with_metaclass
 
 from grr_response_client import client_utils
 from grr_response_client import client_utils_common
+from grr_response_client import hash_cache
 from grr_response_client.client_actions.file_finder_utils import uploading
+from grr_response_core.lib.rdfvalues import crypto as rdf_crypto
 
 
 class Action(with_metaclass(abc.ABCMeta, object)):
@@ -145,9 +147,20 @@ class DownloadAction(Action):
 
 
 def _HashEntry(stat, flow, max_size=None):
+  """Hashes the file, reusing results cached for unchanged files."""
+  byte_count = max_size or stat.GetSize()
+  kind = "multihash:%d" % byte_count
+
+  cached = hash_cache.Get(stat, kind)
+  if cached is not None:
+    return rdf_crypto.Hash.FromSerializedString(cached)
+
   hasher = client_utils_common.MultiHasher(progress=flow.Progress)
   try:
-    hasher.HashFilePath(stat.GetPath(), max_size or stat.GetSize())
-    return hasher.GetHashObject()
+    hasher.HashFilePath(stat.GetPath(), byte_count)
   except IOError:
     return None
+
+  hash_object = hasher.GetHashObject()
+  hash_cache.Put(stat, kind, hash_object.SerializeToString())
+  return hash_object
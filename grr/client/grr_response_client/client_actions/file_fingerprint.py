@@ -8,9 +8,12 @@ import hashlib
 
 
 from grr_response_core.lib import fingerprint
+from grr_response_client import hash_cache
 from grr_response_client import vfs
 from grr_response_client.client_actions import standard
+from grr_response_client.vfs_handlers import files
 from grr_response_core.lib.rdfvalues import client_action as rdf_client_action
+from grr_response_core.lib.util import filesystem
 
 
 class Fingerprinter(fingerprint.Fingerprinter):
@@ -47,9 +50,6 @@ class FingerprintFile(standard.ReadBuffer):
     """Fingerprint a file."""
     with vfs.VFSOpen(
         args.pathspec, progress_callback=self.Progress) as file_obj:
-      fingerprinter = Fingerprinter(self.Progress, file_obj)
-      response = rdf_client_action.FingerprintResponse()
-      response.pathspec = file_obj.pathspec
       if args.tuples:
         tuples = args.tuples
       else:
@@ -58,40 +58,82 @@ class FingerprintFile(standard.ReadBuffer):
         for k in self._fingerprint_types:
           tuples.append(rdf_client_action.FingerprintTuple(fp_type=k))
 
-      for finger in tuples:
-        hashers = [self._hash_types[h] for h in finger.hashers] or None
-        if finger.fp_type in self._fingerprint_types:
-          invoke = self._fingerprint_types[finger.fp_type]
-          res = invoke(fingerprinter, hashers)
-          if res:
-            response.matching_types.append(finger.fp_type)
-        else:
-          raise RuntimeError(
-              "Encountered unknown fingerprint type. %s" % finger.fp_type)
-
-      # Structure of the results is a list of dicts, each containing the
-      # name of the hashing method, hashes for enabled hash algorithms,
-      # and auxilliary data where present (e.g. signature blobs).
-      # Also see Fingerprint:HashIt()
-      response.results = fingerprinter.HashIt()
-
-      # We now return data in a more structured form.
-      for result in response.results:
-        if result.GetItem("name") == "generic":
-          for hash_type in ["md5", "sha1", "sha256"]:
-            value = result.GetItem(hash_type)
-            if value is not None:
-              setattr(response.hash, hash_type, value)
-
-        if result["name"] == "pecoff":
-          for hash_type in ["md5", "sha1", "sha256"]:
-            value = result.GetItem(hash_type)
-            if value:
-              setattr(response.hash, "pecoff_" + hash_type, value)
-
-          signed_data = result.GetItem("SignedData", [])
-          for data in signed_data:
-            response.hash.signed_data.Append(
-                revision=data[0], cert_type=data[1], certificate=data[2])
+      # Fingerprints of unchanged local files are reused from the hash cache.
+      # The pathspec may limit the fingerprinted size, so it is a part of the
+      # cache key.
+      stat = self._GetCacheableStat(file_obj)
+      kind = "fingerprint:%d:%s" % (file_obj.size, hashlib.sha256(b"".join(
+          finger.SerializeToString() for finger in tuples)).hexdigest())
+
+      cached = hash_cache.Get(stat, kind) if stat else None
+      if cached is not None:
+        response = rdf_client_action.FingerprintResponse.FromSerializedString(
+            cached)
+      else:
+        response = self._Fingerprint(file_obj, tuples)
+        if stat:
+          hash_cache.Put(stat, kind, response.SerializeToString())
 
+      response.pathspec = file_obj.pathspec
       self.SendReply(response)
+
+  def _GetCacheableStat(self, file_obj):
+    """Returns a stat of a regular local file if the hash cache is enabled."""
+    if hash_cache.GetHashCache() is None:
+      return None
+
+    if not isinstance(file_obj, files.File) or file_obj.file_offset:
+      return None
+
+    try:
+      stat = filesystem.Stat.FromPath(file_obj.filename, follow_symlink=True)
+    except (IOError, OSError):
+      return None
+
+    if not stat.IsRegular():
+      return None
+
+    return stat
+
+  def _Fingerprint(self, file_obj, tuples):
+    """Computes the fingerprint response for the given file."""
+    fingerprinter = Fingerprinter(self.Progress, file_obj)
+    response = rdf_client_action.FingerprintResponse()
+
+    for finger in tuples:
+      hashers = [self._hash_types[h] for h in finger.hashers] or None
+      if finger.fp_type in self._fingerprint_types:
+        invoke = self._fingerprint_types[finger.fp_type]
+        res = invoke(fingerprinter, hashers)
+        if res:
+          response.matching_types.append(finger.fp_type)
+      else:
+        raise RuntimeError(
+            "Encountered unknown fingerprint type. %s" % finger.fp_type)
+
+    # Structure of the results is a list of dicts, each containing the
+    # name of the hashing method, hashes for enabled hash algorithms,
+    # and auxilliary data where present (e.g. signature blobs).
+    # Also see Fingerprint:HashIt()
+    response.results = fingerprinter.HashIt()
+
+    # We now return data in a more structured form.
+    for result in response.results:
+      if result.GetItem("name") == "generic":
+        for hash_type in ["md5", "sha1", "sha256"]:
+          value = result.GetItem(hash_type)
+          if value is not None:
+            setattr(response.hash, hash_type, value)
+
+      if result["name"] == "pecoff":
+        for hash_type in ["md5", "sha1", "sha256"]:
+          value = result.GetItem(hash_type)
+          if value:
+            setattr(response.hash, "pecoff_" + hash_type, value)
+
+        signed_data = result.GetItem("SignedData", [])
+        for data in signed_data:
+          response.hash.signed_data.Append(
+              revision=data[0], cert_type=data[1], certificate=data[2])
+
+    return response
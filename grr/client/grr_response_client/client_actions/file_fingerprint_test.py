@@ -8,6 +8,7 @@ from __future__ import division
 from __future__ import unicode_literals
 
 import hashlib
+import io
 import os
 
 
@@ -52,6 +53,30 @@ class FilehashTest(client_test_lib.EmptyActionTest):
 
     self.assertEqual(result[0].pathspec.path, path)
 
+  def testHashCacheRespectsFileSizeOverride(self):
+    path = os.path.join(self.temp_dir, "foo.txt")
+    with io.open(path, "wb") as fd:
+      fd.write(b"foobar")
+    # Files modified very recently are not cached.
+    os.utime(path, (1000000000, 1000000000))
+
+    def Fingerprint(**kwargs):
+      p = rdf_paths.PathSpec(
+          path=path, pathtype=rdf_paths.PathSpec.PathType.OS, **kwargs)
+      result = self.RunAction(
+          file_fingerprint.FingerprintFile,
+          rdf_client_action.FingerprintRequest(pathspec=p))
+      return result[0].hash.sha256
+
+    with test_lib.ConfigOverrider({
+        "Client.hash_cache_path": os.path.join(self.temp_dir, "cache.db")
+    }):
+      self.assertEqual(
+          Fingerprint(file_size_override=3), hashlib.sha256(b"foo").digest())
+      self.assertEqual(Fingerprint(), hashlib.sha256(b"foobar").digest())
+      self.assertEqual(
+          Fingerprint(file_size_override=3), hashlib.sha256(b"foo").digest())
+
   def testMissingFile(self):
     """Fail on missing file?"""
     path = os.path.join(self.base_path, "this file does not exist")
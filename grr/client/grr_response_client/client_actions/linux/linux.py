@@ -259,6 +259,7 @@ class EnumerateUsers(actions.ActionPlugin):
   # Client versions 3.0.7.1 and older used to return KnowledgeBaseUser.
   # KnowledgeBaseUser was renamed to User.
   out_rdfvalues = [rdf_client.User, rdf_client.KnowledgeBaseUser]
+  batch_replies = True
 
   def Run(self, args):
     for res in EnumerateUsersFromClient(args):
@@ -22,4 +22,5 @@ from grr_response_client.client_actions import plist
 from grr_response_client.client_actions import searching
 from grr_response_client.client_actions import standard
 from grr_response_client.client_actions import tempfiles
+from grr_response_client.client_actions import timeline
 from grr_response_client.client_actions import memory
@@ -21,6 +21,7 @@ class Find(actions.ActionPlugin):
   """Recurses through a directory returning files which match conditions."""
   in_rdfvalue = rdf_client_fs.FindSpec
   out_rdfvalues = [rdf_client_fs.FindSpec, rdf_client_fs.StatEntry]
+  batch_replies = True
 
   # The filesystem we are limiting ourselves to, if cross_devs is false.
   filesystem_id = None
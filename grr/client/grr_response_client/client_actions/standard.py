@@ -13,6 +13,7 @@ import logging
 import os
 import platform
 import socket
+import stat
 import sys
 import time
 import zlib
@@ -163,6 +164,7 @@ class ListDirectory(ReadBuffer):
   """Lists all the files in a directory."""
   in_rdfvalue = rdf_client_action.ListDirRequest
   out_rdfvalues = [rdf_client_fs.StatEntry]
+  batch_replies = True
 
   def Run(self, args):
     """Lists a directory."""
@@ -179,6 +181,44 @@ class ListDirectory(ReadBuffer):
       self.SendReply(response)
 
 
+class RecursiveListDirectory(actions.ActionPlugin):
+  """Lists all the files in a directory and its subdirectories."""
+  in_rdfvalue = rdf_client_action.RecursiveListDirRequest
+  out_rdfvalues = [rdf_client_fs.StatEntry]
+  batch_replies = True
+
+  def Run(self, args):
+    """Lists a directory tree down to args.max_depth levels."""
+    # Directories left to list together with their depth below the listed one.
+    pending = [(args.pathspec, 0)]
+
+    while pending:
+      pathspec, depth = pending.pop()
+      try:
+        directory = vfs.VFSOpen(pathspec, progress_callback=self.Progress)
+        files = list(directory.ListFiles())
+      except (IOError, OSError) as e:
+        if depth == 0:
+          self.SetStatus(rdf_flows.GrrStatus.ReturnedStatus.IOERROR, e)
+          return
+        # A subdirectory that can't be listed is skipped.
+        logging.info("Failed to list directory %s: %s", pathspec, e)
+        continue
+
+      files.sort(key=lambda x: x.pathspec.path)
+      for response in files:
+        self.SendReply(response)
+
+      if depth >= args.max_depth:
+        continue
+
+      # Symlinks are not followed. Subdirectories are pushed in reverse so
+      # that they are listed in order.
+      for response in reversed(files):
+        if not response.symlink and stat.S_ISDIR(int(response.st_mode)):
+          pending.append((response.pathspec, depth + 1))
+
+
 def GetFileStatFromClient(args):
   fd = vfs.VFSOpen(args.pathspec)
   stat_entry = fd.Stat(ext_attrs=args.collect_ext_attrs)
@@ -411,6 +451,7 @@ class ListProcesses(actions.ActionPlugin):
   """This action lists all the processes running on a machine."""
   in_rdfvalue = None
   out_rdfvalues = [rdf_client.Process]
+  batch_replies = True
 
   def Run(self, args):
     for res in ListProcessesFromClient(args):
@@ -7,6 +7,7 @@ from __future__ import unicode_literals
 
 import hashlib
 import io
+import os
 import sys
 
 from absl import app
@@ -254,6 +255,62 @@ class GetFileStatTest(client_test_lib.EmptyActionTest):
       self.assertEmpty(results[0].ext_attrs)
 
 
+class RecursiveListDirectoryTest(client_test_lib.EmptyActionTest):
+
+  def _Touch(self, path):
+    with io.open(path, "wb") as fd:
+      fd.write(b"")
+
+  def _ListDirectory(self, path, max_depth):
+    pathspec = rdf_paths.PathSpec(
+        path=path, pathtype=rdf_paths.PathSpec.PathType.OS)
+    request = rdf_client_action.RecursiveListDirRequest(
+        pathspec=pathspec, max_depth=max_depth)
+    results = self.RunAction(standard.RecursiveListDirectory, request)
+    return [os.path.relpath(r.pathspec.path, path) for r in results]
+
+  def testListsTreeDownToMaxDepth(self):
+    with temp.AutoTempDirPath(remove_non_empty=True) as temp_dirpath:
+      os.makedirs(os.path.join(temp_dirpath, "a", "b", "c"))
+      self._Touch(os.path.join(temp_dirpath, "a", "b", "foo"))
+      self._Touch(os.path.join(temp_dirpath, "bar"))
+
+      self.assertEqual(
+          self._ListDirectory(temp_dirpath, max_depth=5),
+          ["a", "bar", "a/b", "a/b/c", "a/b/foo"])
+      self.assertEqual(
+          self._ListDirectory(temp_dirpath, max_depth=1),
+          ["a", "bar", "a/b"])
+      self.assertEqual(
+          self._ListDirectory(temp_dirpath, max_depth=0), ["a", "bar"])
+
+  def testDoesNotFollowSymlinks(self):
+    with temp.AutoTempDirPath(remove_non_empty=True) as temp_dirpath:
+      os.makedirs(os.path.join(temp_dirpath, "a"))
+      self._Touch(os.path.join(temp_dirpath, "a", "foo"))
+      os.symlink(
+          os.path.join(temp_dirpath, "a"), os.path.join(temp_dirpath, "link"))
+
+      self.assertEqual(
+          self._ListDirectory(temp_dirpath, max_depth=5),
+          ["a", "link", "a/foo"])
+
+  def testMissingDirectory(self):
+    with temp.AutoTempDirPath() as temp_dirpath:
+      pathspec = rdf_paths.PathSpec(
+          path=os.path.join(temp_dirpath, "missing"),
+          pathtype=rdf_paths.PathSpec.PathType.OS)
+      request = rdf_client_action.RecursiveListDirRequest(
+          pathspec=pathspec, max_depth=5)
+      action = self._GetActionInstance(standard.RecursiveListDirectory)
+      action.status = rdf_flows.GrrStatus(
+          status=rdf_flows.GrrStatus.ReturnedStatus.OK)
+      action.Run(request)
+
+      self.assertEqual(action.status.status,
+                       rdf_flows.GrrStatus.ReturnedStatus.IOERROR)
+
+
 class TestNetworkByteLimits(client_test_lib.EmptyActionTest):
   """Test TransferBuffer network byte limits."""
 
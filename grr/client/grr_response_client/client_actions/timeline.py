@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""A module with a client action for collecting filesystem timelines."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import hashlib
+import logging
+import os
+import stat
+import zlib
+
+from grr_response_client import actions
+from grr_response_core.lib import rdfvalue
+from grr_response_core.lib.rdfvalues import flows as rdf_flows
+from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
+from grr_response_core.lib.rdfvalues import timeline as rdf_timeline
+
+
+class Timeline(actions.ActionPlugin):
+  """Collects stat information of all files in a directory tree.
+
+  Instead of sending a `StatEntry` for every file, entries are serialized in
+  the compact binary format of `rdf_timeline.SerializeTimelineEntries` and
+  uploaded to the transfer store in compressed blobs. Every reply references
+  blobs of a batch of entries.
+  """
+
+  in_rdfvalue = rdf_timeline.TimelineArgs
+  out_rdfvalues = [rdf_timeline.TimelineResult]
+
+  # A number of (uncompressed) bytes of serialized entries per blob.
+  CHUNK_SIZE = 512 * 1024
+
+  _TRANSFER_STORE_SESSION_ID = rdfvalue.SessionID(flow_name="TransferStore")
+
+  def Run(self, args):
+    """Walks the directory tree and sends its serialized timeline."""
+    root = args.root.encode("utf-8")
+
+    try:
+      root_stat = os.lstat(root)
+    except OSError as e:
+      self.SetStatus(rdf_flows.GrrStatus.ReturnedStatus.IOERROR, e)
+      return
+
+    entries = self._Walk(root, root_stat)
+    for chunk, count in rdf_timeline.SerializeTimelineEntries(
+        entries, chunk_size=self.CHUNK_SIZE):
+      blob = rdf_protodict.DataBlob(
+          data=zlib.compress(chunk),
+          compression=rdf_protodict.DataBlob.CompressionType.ZCOMPRESSION)
+
+      self.ChargeBytesToSession(len(chunk))
+      self.SendReply(blob, session_id=self._TRANSFER_STORE_SESSION_ID)
+
+      self.SendReply(
+          rdf_timeline.TimelineResult(
+              entry_batch_blob_ids=[hashlib.sha256(chunk).digest()],
+              entry_count=count))
+
+  def _Walk(self, root, root_stat):
+    """Yields timeline entries of all files in the tree starting at root.
+
+    Symlinks are not followed. Files that can't be accessed are skipped.
+
+    Args:
+      root: A path (as bytes) to the root directory of the tree.
+      root_stat: A result of the `os.lstat` call on the root.
+
+    Yields:
+      `timeline_pb2.TimelineEntry` protos.
+    """
+    yield rdf_timeline.TimelineEntryProto(root, root_stat)
+
+    stack = [root] if stat.S_ISDIR(root_stat.st_mode) else []
+    while stack:
+      path = stack.pop()
+      self.Progress()
+
+      try:
+        names = os.listdir(path)
+      except OSError as error:
+        logging.warning("Unable to list %r: %s", path, error)
+        continue
+
+      for name in sorted(names):
+        child_path = os.path.join(path, name)
+        try:
+          child_stat = os.lstat(child_path)
+        except OSError as error:
+          logging.warning("Unable to stat %r: %s", child_path, error)
+          continue
+
+        yield rdf_timeline.TimelineEntryProto(child_path, child_stat)
+
+        if stat.S_ISDIR(child_stat.st_mode):
+          stack.append(child_path)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import hashlib
+import io
+import os
+import zlib
+
+from absl import app
+from future.builtins import range
+import mock
+
+from grr_response_client.client_actions import timeline
+from grr_response_core.lib.rdfvalues import flows as rdf_flows
+from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
+from grr_response_core.lib.rdfvalues import timeline as rdf_timeline
+from grr_response_core.lib.util import temp
+from grr.test_lib import client_test_lib
+from grr.test_lib import test_lib
+
+
+class TimelineTest(client_test_lib.EmptyActionTest):
+
+  def _Collect(self, root):
+    args = rdf_timeline.TimelineArgs(root=root)
+    replies = self.ExecuteAction(timeline.Timeline, args)
+
+    blobs = {}
+    results = []
+    for reply in replies:
+      if isinstance(reply, rdf_protodict.DataBlob):
+        data = zlib.decompress(reply.data)
+        blobs[hashlib.sha256(data).digest()] = data
+      elif isinstance(reply, rdf_timeline.TimelineResult):
+        results.append(reply)
+      else:
+        self.assertEqual(reply.status, rdf_flows.GrrStatus.ReturnedStatus.OK)
+
+    chunks = []
+    for result in results:
+      for blob_id in result.entry_batch_blob_ids:
+        chunks.append(blobs[blob_id])
+
+    entries = list(rdf_timeline.DeserializeTimelineEntries(chunks))
+    self.assertEqual(sum(result.entry_count for result in results),
+                     len(entries))
+    return entries
+
+  def testEmptyDirectory(self):
+    with temp.AutoTempDirPath() as dirpath:
+      entries = self._Collect(dirpath)
+      stat_result = os.lstat(dirpath)
+
+    self.assertLen(entries, 1)
+    self.assertEqual(entries[0].path, dirpath.encode("utf-8"))
+    self.assertEqual(entries[0].ino, stat_result.st_ino)
+
+  def testNestedDirectories(self):
+    with temp.AutoTempDirPath(remove_non_empty=True) as dirpath:
+      os.makedirs(os.path.join(dirpath, "foo", "bar"))
+      with io.open(os.path.join(dirpath, "foo", "bar", "baz"), "wb") as fd:
+        fd.write(b"BAZ")
+      with io.open(os.path.join(dirpath, "quux"), "wb") as fd:
+        fd.write(b"QUUX!")
+
+      entries = self._Collect(dirpath)
+
+      stat_result = os.lstat(os.path.join(dirpath, "foo", "bar", "baz"))
+
+    root = dirpath.encode("utf-8")
+    entries_by_path = {entry.path: entry for entry in entries}
+    self.assertCountEqual(entries_by_path, [
+        root,
+        os.path.join(root, b"foo"),
+        os.path.join(root, b"foo", b"bar"),
+        os.path.join(root, b"foo", b"bar", b"baz"),
+        os.path.join(root, b"quux"),
+    ])
+
+    baz_entry = entries_by_path[os.path.join(root, b"foo", b"bar", b"baz")]
+    self.assertEqual(baz_entry.size, 3)
+    self.assertEqual(baz_entry.mode, stat_result.st_mode)
+    self.assertEqual(baz_entry.ino, stat_result.st_ino)
+    self.assertEqual(baz_entry.uid, stat_result.st_uid)
+    self.assertEqual(baz_entry.mtime_ns // 10**9, int(stat_result.st_mtime))
+
+    self.assertEqual(entries_by_path[os.path.join(root, b"quux")].size, 5)
+
+  def testSymlinksAreNotFollowed(self):
+    with temp.AutoTempDirPath(remove_non_empty=True) as dirpath:
+      os.mkdir(os.path.join(dirpath, "foo"))
+      with io.open(os.path.join(dirpath, "foo", "bar"), "wb") as fd:
+        fd.write(b"BAR")
+      os.symlink(os.path.join(dirpath, "foo"), os.path.join(dirpath, "link"))
+
+      entries = self._Collect(dirpath)
+
+    paths = [os.path.basename(entry.path) for entry in entries]
+    self.assertCountEqual(paths[1:], [b"foo", b"bar", b"link"])
+
+  def testManyFilesAreSplitIntoMultipleBlobs(self):
+    with temp.AutoTempDirPath(remove_non_empty=True) as dirpath:
+      for i in range(100):
+        with io.open(os.path.join(dirpath, "file%d" % i), "wb"):
+          pass
+
+      with mock.patch.object(timeline.Timeline, "CHUNK_SIZE", 1024):
+        entries = self._Collect(dirpath)
+
+    self.assertLen(entries, 101)
+    self.assertGreater(len(self.results), 4)
+
+  def testFailsOnNonExistingRoot(self):
+    with temp.AutoTempDirPath() as dirpath:
+      args = rdf_timeline.TimelineArgs(root=os.path.join(dirpath, "foo"))
+      replies = self.ExecuteAction(timeline.Timeline, args)
+
+    self.assertLen(replies, 1)
+    self.assertEqual(replies[0].status,
+                     rdf_flows.GrrStatus.ReturnedStatus.IOERROR)
+
+
+if __name__ == "__main__":
+  app.run(test_lib.main)
@@ -12,6 +12,7 @@ from grr_response_core.lib import communicator
 from grr_response_core.lib import config_lib
 from grr_response_core.lib import registry
 from grr_response_core.lib.parsers import all as all_parsers
+from grr_response_core.lib.util import cache
 from grr_response_core.stats import default_stats_collector
 from grr_response_core.stats import stats_collector_instance
 
@@ -20,6 +21,7 @@ def ClientInit():
   """Run all startup routines for the client."""
   metric_metadata = client_metrics.GetMetadata()
   metric_metadata.extend(communicator.GetMetricMetadata())
+  metric_metadata.extend(cache.GetMetricMetadata())
   stats_collector_instance.Set(
       default_stats_collector.DefaultStatsCollector(metric_metadata))
 
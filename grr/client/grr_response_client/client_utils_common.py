@@ -8,6 +8,8 @@ import hashlib
 import logging
 import os
 import platform
+import queue
+import stat
 import subprocess
 import threading
 import time
@@ -203,6 +205,14 @@ def IsExecutionWhitelisted(cmd, args):
   return False
 
 
+# Files smaller than this are hashed sequentially by `MultiHasher`: below this
+# size the cost of synchronizing the hashing threads outweighs the speedup.
+PARALLEL_HASHING_MIN_SIZE = 8 * 1024 * 1024
+
+# Size of the chunks in which large files are read for parallel hashing.
+PARALLEL_HASHING_CHUNK_SIZE = 2 * constants.CLIENT_MAX_BUFFER_SIZE
+
+
 class MultiHasher(object):
   """An utility class that is able to applies multiple hash algorithms.
 
@@ -211,6 +221,10 @@ class MultiHasher(object):
   boilerplate associated with it and provides a readable API similar to the one
   exposed by Python's `hashlib` module.
 
+  Large regular files hashed with `HashFilePath` are processed by running every
+  algorithm in its own thread (`hashlib` releases the GIL while hashing large
+  buffers) while the next chunk of the file is being read.
+
   Args:
     algorithms: List of names of the algorithms from the `hashlib` module that
       need to be applied.
@@ -237,7 +251,27 @@ class MultiHasher(object):
       byte_count: A maximum numbers of bytes that are going to be processed.
     """
     with open(path, "rb") as fd:
-      self.HashFile(fd, byte_count)
+      if self._ShouldHashInParallel(fd, byte_count):
+        self._HashFileInParallel(fd, byte_count)
+      else:
+        self.HashFile(fd, byte_count)
+
+  def _ShouldHashInParallel(self, fd, byte_count):
+    """Checks whether parallel hashing pays off for the given file."""
+    if len(self._hashers) < 2:
+      return False
+
+    try:
+      st = os.fstat(fd.fileno())
+    except (IOError, OSError):
+      return False
+
+    # Special files (devices, pipes, `/proc` entries) often report sizes that
+    # do not reflect the amount of data that can be read from them.
+    if not stat.S_ISREG(st.st_mode):
+      return False
+
+    return min(st.st_size, byte_count) >= PARALLEL_HASHING_MIN_SIZE
 
   def HashFile(self, fd, byte_count):
     """Updates underlying hashers with a given file.
@@ -255,6 +289,79 @@ class MultiHasher(object):
       self.HashBuffer(buf)
       byte_count -= buf_size
 
+  def _HashFileInParallel(self, fd, byte_count):
+    """Updates underlying hashers with a given file using multiple threads.
+
+    Each hash algorithm is applied by a separate thread. Two buffers are used
+    alternately, so that the next chunk of the file is read while the current
+    one is being hashed, and data is read into them without intermediate
+    copies.
+
+    Args:
+      fd: A file object that is going to be fed to the hashers.
+      byte_count: A maximum number of bytes that are going to be processed.
+    """
+    buffers = [
+        memoryview(bytearray(PARALLEL_HASHING_CHUNK_SIZE)),
+        memoryview(bytearray(PARALLEL_HASHING_CHUNK_SIZE)),
+    ]
+    done = queue.Queue()
+
+    def Worker(hasher, chunks):
+      while True:
+        chunk = chunks.get()
+        if chunk is None:
+          return
+        try:
+          hasher.update(chunk)
+          done.put(None)
+        except Exception as e:  # pylint: disable=broad-except
+          done.put(e)
+        del chunk
+
+    def ReadChunk(buf, byte_count):
+      size = fd.readinto(buf[:min(byte_count, len(buf))])
+      return buf[:size or 0]
+
+    workers = []
+    try:
+      for hasher in itervalues(self._hashers):
+        chunks = queue.Queue()
+        worker = threading.Thread(
+            target=Worker, args=(hasher, chunks), name="MultiHasherWorker")
+        worker.daemon = True
+        worker.start()
+        workers.append((worker, chunks))
+
+      index = 0
+      chunk = ReadChunk(buffers[index], byte_count)
+      while chunk:
+        for _, chunks in workers:
+          chunks.put(chunk)
+
+        byte_count -= len(chunk)
+        index = 1 - index
+        if byte_count > 0:
+          next_chunk = ReadChunk(buffers[index], byte_count)
+        else:
+          next_chunk = buffers[index][:0]
+
+        for _ in workers:
+          error = done.get()
+          if error is not None:
+            raise error
+
+        self._bytes_read += len(chunk)
+        if self._progress:
+          self._progress()
+
+        chunk = next_chunk
+    finally:
+      for _, chunks in workers:
+        chunks.put(None)
+      for worker, _ in workers:
+        worker.join()
+
   def HashBuffer(self, buf):
     """Updates underlying hashers with a given buffer.
 
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""Benchmarks for hashing files with the `MultiHasher`."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import io
+import os
+
+from absl import app
+import mock
+import pytest
+
+from grr_response_client import client_utils_common
+from grr_response_core.lib.util import temp
+from grr.test_lib import benchmark_test_lib
+from grr.test_lib import test_lib
+
+
+@pytest.mark.benchmark
+class MultiHasherBenchmark(benchmark_test_lib.AverageMicroBenchmarks):
+  """Compares sequential and parallel hashing of files of different sizes."""
+
+  REPEATS = 5
+  units = "ms"
+
+  SIZES = [
+      1024 * 1024,
+      8 * 1024 * 1024,
+      64 * 1024 * 1024,
+      256 * 1024 * 1024,
+  ]
+
+  def _HashFile(self, path, size):
+    hasher = client_utils_common.MultiHasher()
+    hasher.HashFilePath(path, size)
+    hasher.GetHashObject()
+
+  def testHashFilePath(self):
+    """How fast are files hashed with md5, sha1 and sha256."""
+    for size in self.SIZES:
+      with temp.AutoTempFilePath() as path:
+        with io.open(path, "wb") as fd:
+          fd.write(os.urandom(size))
+
+        name = "%d MiB" % (size // (1024 * 1024))
+
+        with mock.patch.object(client_utils_common, "PARALLEL_HASHING_MIN_SIZE",
+                               float("inf")):
+          self.TimeIt(
+              self._HashFile, name="%s: sequential" % name, path=path, size=size)
+
+        with mock.patch.object(client_utils_common, "PARALLEL_HASHING_MIN_SIZE",
+                               0):
+          self.TimeIt(
+              self._HashFile, name="%s: parallel" % name, path=path, size=size)
+
+
+def main(argv):
+  test_lib.main(argv)
+
+
+if __name__ == "__main__":
+  app.run(main)
@@ -195,6 +195,55 @@ class MultiHasherTest(absltest.TestCase):
       self.assertEqual(hash_object.sha1, self._GetHash(hashlib.sha1, b"foo"))
       self.assertFalse(hash_object.sha256)
 
+  def testHashFileInParallel(self):
+    data = os.urandom(1024 * 1024 + 123)
+
+    with temp.AutoTempFilePath() as tmp_path:
+      with io.open(tmp_path, "wb") as tmp_file:
+        tmp_file.write(data)
+
+      with mock.patch.object(client_utils_common, "PARALLEL_HASHING_MIN_SIZE",
+                             1024):
+        with mock.patch.object(client_utils_common,
+                               "PARALLEL_HASHING_CHUNK_SIZE", 100 * 1024):
+          hasher = client_utils_common.MultiHasher()
+          with mock.patch.object(
+              hasher, "HashFile", side_effect=AssertionError()):
+            hasher.HashFilePath(tmp_path, len(data) - 100)
+
+    hash_object = hasher.GetHashObject()
+    self.assertEqual(hash_object.num_bytes, len(data) - 100)
+    self.assertEqual(hash_object.md5, self._GetHash(hashlib.md5, data[:-100]))
+    self.assertEqual(hash_object.sha1, self._GetHash(hashlib.sha1, data[:-100]))
+    self.assertEqual(hash_object.sha256,
+                     self._GetHash(hashlib.sha256, data[:-100]))
+
+  def testHashFileInParallelByteCountLargerThanFile(self):
+    data = os.urandom(300 * 1024)
+
+    with temp.AutoTempFilePath() as tmp_path:
+      with io.open(tmp_path, "wb") as tmp_file:
+        tmp_file.write(data)
+
+      with mock.patch.object(client_utils_common, "PARALLEL_HASHING_MIN_SIZE",
+                             1024):
+        with mock.patch.object(client_utils_common,
+                               "PARALLEL_HASHING_CHUNK_SIZE", 100 * 1024):
+          hasher = client_utils_common.MultiHasher(["md5", "sha1"])
+          hasher.HashFilePath(tmp_path, 10 * len(data))
+
+    hash_object = hasher.GetHashObject()
+    self.assertEqual(hash_object.num_bytes, len(data))
+    self.assertEqual(hash_object.md5, self._GetHash(hashlib.md5, data))
+    self.assertEqual(hash_object.sha1, self._GetHash(hashlib.sha1, data))
+
+  def testHashFileSpecialFileIsHashedSequentially(self):
+    hasher = client_utils_common.MultiHasher()
+    with mock.patch.object(client_utils_common, "PARALLEL_HASHING_MIN_SIZE",
+                           0):
+      with io.open(os.devnull, "rb") as fd:
+        self.assertFalse(hasher._ShouldHashInParallel(fd, 1024))
+
   def testHashBufferProgress(self):
     progress = mock.Mock()
 
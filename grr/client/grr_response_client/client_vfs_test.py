@@ -23,10 +23,13 @@ from grr_response_client import client_plugins
 # pylint: enable=unused-import,g-bad-import-order
 
 from grr_response_client import vfs
+from grr_response_client.vfs_handlers import base as vfs_base
 from grr_response_client.vfs_handlers import files
+from grr_response_client.vfs_handlers import sleuthkit
 from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import client as rdf_client
 from grr_response_core.lib.rdfvalues import paths as rdf_paths
+from grr_response_core.lib.util import cache
 from grr_response_core.lib.util import temp
 from grr.test_lib import test_lib
 from grr.test_lib import vfs_test_lib
@@ -37,6 +40,13 @@ from grr.test_lib import vfs_test_lib
 class VFSTest(test_lib.GRRBaseTest):
   """Test the client VFS switch."""
 
+  def setUp(self):
+    super(VFSTest, self).setUp()
+    # Pathspecs and filesystems cached by other tests would skip the code
+    # under test.
+    vfs._RESOLVED_PATHSPECS.Flush()
+    sleuthkit.DEVICE_CACHE.Flush()
+
   def GetNumbers(self):
     """Generate a test string."""
     result = b""
@@ -105,7 +115,7 @@ class VFSTest(test_lib.GRRBaseTest):
   # Consult with somebody what it actually should do and write it properly.
   def testOpenFilehandlesExpire(self):
     """Test that file handles expire from cache."""
-    files.FILE_HANDLE_CACHE = utils.FastStore(max_size=10)
+    files.FILE_HANDLE_CACHE = cache.LRUCache(max_size=10)
 
     current_process = psutil.Process(os.getpid())
     num_open_files = len(current_process.open_files())
@@ -273,6 +283,134 @@ class VFSTest(test_lib.GRRBaseTest):
     # Make sure the size is correct:
     self.assertEqual(fd.Stat().st_size, len(b"I am a real ADS\n"))
 
+  def _NTFSPathSpec(self, path):
+    pathspec = rdf_paths.PathSpec(
+        path=os.path.join(self.base_path, "ntfs_img.dd"),
+        pathtype=rdf_paths.PathSpec.PathType.OS,
+        offset=63 * 512)
+    pathspec.Append(path=path, pathtype=rdf_paths.PathSpec.PathType.TSK)
+    return pathspec
+
+  def testOpenReusesExpandedPathSpec(self):
+    os.mkdir(os.path.join(self.temp_dir, "foo"))
+    with io.open(os.path.join(self.temp_dir, "foo", "bar"), "wb") as filedesc:
+      filedesc.write(b"bar")
+
+    pathspec = rdf_paths.PathSpec(
+        path=os.path.join(self.temp_dir, "foo", "bar"),
+        pathtype=rdf_paths.PathSpec.PathType.OS)
+    fd = vfs.VFSOpen(pathspec)
+
+    # Case correction lists every directory on the path, it should not be
+    # needed when the same pathspec is opened again.
+    with mock.patch.object(
+        vfs_base.VFSHandler,
+        "MatchBestComponentName",
+        side_effect=AssertionError("Pathspec expanded again.")):
+      cached_fd = vfs.VFSOpen(pathspec)
+
+    self.assertEqual(cached_fd.pathspec, fd.pathspec)
+    self.assertEqual(cached_fd.Read(), b"bar")
+
+  def testOpenDoesNotReuseCaseCorrectedPathSpec(self):
+    with io.open(os.path.join(self.temp_dir, "foo"), "wb") as filedesc:
+      filedesc.write(b"foo")
+
+    pathspec = rdf_paths.PathSpec(
+        path=os.path.join(self.temp_dir, "FOO"),
+        pathtype=rdf_paths.PathSpec.PathType.OS)
+    fd = vfs.VFSOpen(pathspec)
+    self.assertEqual(fd.pathspec.Basename(), "foo")
+
+    # A file matching the requested name exactly takes precedence.
+    with io.open(os.path.join(self.temp_dir, "FOO"), "wb") as filedesc:
+      filedesc.write(b"FOO")
+
+    fd = vfs.VFSOpen(pathspec)
+    self.assertEqual(fd.pathspec.Basename(), "FOO")
+    self.assertEqual(fd.Read(), b"FOO")
+
+  def testOpenReusesTSKPathSpecByName(self):
+    pathspec = self._NTFSPathSpec("test directory/NOTES.txt")
+
+    fd = vfs.VFSOpen(pathspec)
+    self.assertEqual(fd.pathspec.last.path, "/Test Directory/notes.txt")
+    self.assertTrue(fd.pathspec.last.HasField("inode"))
+
+    # The inode of a deleted file can be reused by another file, so the cached
+    # expansion opens the file by its name.
+    _, expansion = vfs._RESOLVED_PATHSPECS.Get(
+        vfs._GetWorkingPathSpec(pathspec).SerializeToString())
+    self.assertEqual(expansion.last.path, "/Test Directory/notes.txt")
+    self.assertFalse(expansion.last.HasField("inode"))
+
+    with mock.patch.object(
+        vfs_base.VFSHandler,
+        "MatchBestComponentName",
+        side_effect=AssertionError("Pathspec expanded again.")):
+      cached_fd = vfs.VFSOpen(pathspec)
+
+    self.assertEqual(cached_fd.pathspec, fd.pathspec)
+    self.assertEqual(cached_fd.size, fd.size)
+
+  def testOpenDoesNotReusePathSpecRequestingInode(self):
+    pathspec = self._NTFSPathSpec("test directory/notes.txt")
+    pathspec.last.path = None
+    pathspec.last.inode = 65
+
+    fd = vfs.VFSOpen(pathspec)
+    self.assertEqual(fd.pathspec.last.inode, 65)
+
+    # The file has to be opened by the requested inode, not by its name.
+    key = vfs._GetWorkingPathSpec(pathspec).SerializeToString()
+    self.assertNotIn(key, vfs._RESOLVED_PATHSPECS)
+
+  def testOpenExpandsPathSpecOfRenamedFileAgain(self):
+    with io.open(os.path.join(self.temp_dir, "foo"), "wb") as filedesc:
+      filedesc.write(b"foo")
+
+    pathspec = rdf_paths.PathSpec(
+        path=os.path.join(self.temp_dir, "foo"),
+        pathtype=rdf_paths.PathSpec.PathType.OS)
+    fd = vfs.VFSOpen(pathspec)
+    self.assertEqual(fd.pathspec.Basename(), "foo")
+
+    os.rename(
+        os.path.join(self.temp_dir, "foo"), os.path.join(self.temp_dir, "Foo"))
+    files.FILE_HANDLE_CACHE.Flush()
+
+    fd = vfs.VFSOpen(pathspec)
+    self.assertEqual(fd.pathspec.Basename(), "Foo")
+    self.assertEqual(fd.Read(), b"foo")
+
+  def testMultiOpenSharesParents(self):
+    pathspecs = [
+        self._NTFSPathSpec("test directory/notes.txt"),
+        self._NTFSPathSpec("test directory/入乡随俗 海外春节别样过法.txt"),
+    ]
+    for pathspec in pathspecs:
+      vfs.VFSOpen(pathspec)
+
+    with vfs.VFSMultiOpen(pathspecs) as filedescs:
+      self.assertLen(filedescs, 2)
+      # Both files are read from the same opened image.
+      self.assertIs(filedescs[0].base_fd, filedescs[1].base_fd)
+      self.assertEqual(filedescs[0].pathspec.last.path,
+                       "/Test Directory/notes.txt")
+
+  def testMultiOpenOpensAllFiles(self):
+    pathspecs = [
+        self._NTFSPathSpec("test directory/notes.txt"),
+        self._NTFSPathSpec("test directory/notes.txt:ads"),
+    ]
+
+    with vfs.VFSMultiOpen(pathspecs) as filedescs:
+      self.assertLen(filedescs, 2)
+      self.assertEqual(filedescs[0].pathspec.last.path,
+                       "/Test Directory/notes.txt")
+      self.assertEqual(filedescs[1].pathspec.last.path,
+                       "/Test Directory/notes.txt:ads")
+
   def testTSKNTFSHandling(self):
     """Test that TSK can correctly encode NTFS features."""
     path = os.path.join(self.base_path, "ntfs_img.dd")
@@ -116,6 +116,10 @@ class HTTPObject(object):
     self.code = code
     # Contains the decoded data from the 'control' endpoint.
     self.messages = self.source = self.nonce = None
+    # The delay (in seconds) before the next poll suggested by the server.
+    self.poll_delay = 0
+    # Whether the server held the request open waiting for work for us.
+    self.long_polled = False
     self.duration = duration
 
   def Success(self):
@@ -477,6 +481,10 @@ class Timer(object):
     self.sleep_time = min(self.poll_max,
                           max(self.poll_min, self.sleep_time) * self.poll_slew)
 
+  def Delay(self, delay):
+    """Makes the next wait at least delay seconds long, up to poll_max."""
+    self.sleep_time = min(self.poll_max, max(self.sleep_time, delay))
+
 
 class GRRClientWorker(threading.Thread):
   """This client worker runs the main loop in another thread.
@@ -1054,16 +1062,21 @@ class GRRHTTPClient(object):
 
     # Try to decrypt the message into the http_object.
     try:
+      response_comms = rdf_flows.ClientCommunication.FromSerializedString(
+          http_object.data)
       http_object.messages, http_object.source, http_object.nonce = (
-          self.communicator.DecryptMessage(http_object.data))
-
-      return True
+          self.communicator.DecodeMessages(response_comms))
 
     # Something went wrong - the response seems invalid!
-    except communicator.DecodingError as e:
+    except (communicator.DecodingError, rdfvalue.DecodeError,
+            type_info.TypeValueError, ValueError, AttributeError) as e:
       logging.info("Protobuf decode error: %s.", e)
       return False
 
+    http_object.poll_delay = response_comms.poll_delay
+    http_object.long_polled = response_comms.long_polled
+    return True
+
   def MakeRequest(self, data):
     """Make a HTTP Post request to the server 'control' endpoint."""
     stats_collector_instance.Get().IncrementCounter("grr_client_sent_bytes",
@@ -1130,6 +1143,11 @@ class GRRHTTPClient(object):
       # the input queue.
       payload.queue_size = self.client_worker.InQueueSize()
 
+    # If we are idle, we ask the server to hold the request open until there is
+    # new work for us instead of polling for it.
+    if not message_list.job and not self.client_worker.IsActive():
+      payload.long_poll_timeout = config.CONFIG["Client.long_poll_timeout"]
+
     nonce = self.communicator.EncodeMessages(message_list, payload)
     payload_data = payload.SerializeToString()
     response = self.MakeRequest(payload_data)
@@ -1178,6 +1196,17 @@ class GRRHTTPClient(object):
         self.timer.FastPoll()
         break
 
+    # A busy server may ask us to back off. We only do so if we are idle, work
+    # in progress is always reported as fast as our own schedule allows.
+    if (response.poll_delay and not response.messages and
+        not message_list.job and not self.client_worker.IsActive()):
+      self.timer.Delay(response.poll_delay)
+
+    # The server already waited for new work for us, there is no need to wait
+    # any longer before asking it again.
+    if response.long_polled:
+      self.timer.FastPoll()
+
     # Process all messages. Messages can be processed by clients in
     # any order since clients do not have state.
     self.client_worker.QueueMessages(response.messages)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+"""A persistent client-side cache of results computed from file contents.
+
+Periodic hunts hash and fingerprint the same, mostly unchanged, files over and
+over again. This module keeps a bounded SQLite database mapping the identity of
+a file (device and inode) and its metadata (size, modification and inode change
+times) to results computed from its content, so that unchanged files do not
+have to be read again.
+
+The cache is opt-in: it is used only if `Client.hash_cache_path` is set. All
+entries are dropped whenever the client version changes.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import logging
+import sqlite3
+import threading
+import time
+
+from grr_response_core import config
+
+# Version of the database layout. Bumping it invalidates all existing caches.
+_SCHEMA_VERSION = 1
+
+# Files modified less than this number of seconds ago are never cached. Some
+# filesystems have a coarse timestamp granularity, so a file that is being
+# written to at the moment of hashing could end up with its metadata unchanged
+# after the write.
+_MIN_FILE_AGE = 2
+
+
+class HashCache(object):
+  """A bounded on-disk cache of results computed from file contents.
+
+  Results are stored per kind (e.g. a hash of first N bytes or a fingerprint
+  with a given set of options) as serialized bytes. A cached result is returned
+  only if the file has the same size, modification time and inode change time
+  as when the result was stored.
+  """
+
+  def __init__(self, path, max_entries, version):
+    """Opens the cache, creating it if needed.
+
+    Args:
+      path: A path to the SQLite database file.
+      max_entries: The maximum number of entries held in the cache.
+      version: A version string of the client. If it differs from the one the
+        cache has been created with, all cached entries are dropped.
+
+    Raises:
+      sqlite3.Error: If the database can not be opened.
+    """
+    self._max_entries = max_entries
+    self._lock = threading.RLock()
+    self._conn = sqlite3.connect(path, check_same_thread=False)
+    self._Initialize("%s/%d" % (version, _SCHEMA_VERSION))
+    self._num_entries = self._conn.execute(
+        "SELECT COUNT(*) FROM entries").fetchone()[0]
+
+  def _Initialize(self, version):
+    """Creates the tables and drops entries written by other versions."""
+    with self._conn:
+      self._conn.execute("CREATE TABLE IF NOT EXISTS metadata ("
+                         "  name TEXT PRIMARY KEY,"
+                         "  value TEXT)")
+      row = self._conn.execute(
+          "SELECT value FROM metadata WHERE name = 'version'").fetchone()
+      if row is None or row[0] != version:
+        self._conn.execute("DROP TABLE IF EXISTS entries")
+        self._conn.execute(
+            "INSERT OR REPLACE INTO metadata (name, value) "
+            "VALUES ('version', ?)", (version,))
+
+      self._conn.execute("CREATE TABLE IF NOT EXISTS entries ("
+                         "  device INTEGER,"
+                         "  inode INTEGER,"
+                         "  kind TEXT,"
+                         "  size INTEGER,"
+                         "  mtime INTEGER,"
+                         "  ctime INTEGER,"
+                         "  timestamp REAL,"
+                         "  value BLOB,"
+                         "  PRIMARY KEY (device, inode, kind))")
+      self._conn.execute("CREATE INDEX IF NOT EXISTS entries_by_timestamp "
+                         "ON entries (timestamp)")
+
+  def Get(self, stat, kind):
+    """Returns a cached result for the given file.
+
+    Args:
+      stat: A `filesystem.Stat` of the file.
+      kind: A string identifying the kind of the result.
+
+    Returns:
+      Bytes stored with `Put` or None if there is no valid cached result.
+    """
+    device, inode, size, mtime, ctime = _FileKey(stat)
+    with self._lock:
+      row = self._conn.execute(
+          "SELECT size, mtime, ctime, value FROM entries "
+          "WHERE device = ? AND inode = ? AND kind = ?",
+          (device, inode, kind)).fetchone()
+
+    if row is None or tuple(row[:3]) != (size, mtime, ctime):
+      return None
+
+    return bytes(row[3])
+
+  def Put(self, stat, kind, value):
+    """Stores a result computed from the given file.
+
+    The result is not stored if the file has been changed since `stat` was
+    taken or if it has been modified very recently.
+
+    Args:
+      stat: A `filesystem.Stat` of the file taken before the result was
+        computed.
+      kind: A string identifying the kind of the result.
+      value: Bytes to store.
+    """
+    raw = stat.GetRaw()
+    if raw.st_mtime + _MIN_FILE_AGE > time.time():
+      return
+
+    try:
+      current = stat.FromPath(stat.GetPath(), follow_symlink=True)
+    except (IOError, OSError):
+      return
+
+    key = _FileKey(stat)
+    if _FileKey(current) != key:
+      return
+
+    with self._lock:
+      with self._conn:
+        cursor = self._conn.execute(
+            "INSERT OR REPLACE INTO entries "
+            "(device, inode, kind, size, mtime, ctime, timestamp, value) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            key[:2] + (kind,) + key[2:] + (time.time(), sqlite3.Binary(value)))
+        self._num_entries += cursor.rowcount
+
+        if self._num_entries > self._max_entries:
+          self._Trim()
+
+  def _Trim(self):
+    """Removes the oldest entries so that the cache is below its limit."""
+    # Remove a bit more than needed so that trimming does not happen on every
+    # insertion once the cache is full.
+    target = self._max_entries * 9 // 10
+    self._conn.execute(
+        "DELETE FROM entries WHERE rowid IN ("
+        "  SELECT rowid FROM entries ORDER BY timestamp LIMIT ?)",
+        (self._num_entries - target,))
+    self._num_entries = self._conn.execute(
+        "SELECT COUNT(*) FROM entries").fetchone()[0]
+
+  def Close(self):
+    with self._lock:
+      self._conn.close()
+
+
+def _FileKey(stat):
+  """Returns a tuple identifying the file and its content version."""
+  raw = stat.GetRaw()
+  mtime = getattr(raw, "st_mtime_ns", None)
+  if mtime is None:
+    mtime = int(raw.st_mtime * 1e9)
+  ctime = getattr(raw, "st_ctime_ns", None)
+  if ctime is None:
+    ctime = int(raw.st_ctime * 1e9)
+  return (raw.st_dev, raw.st_ino, raw.st_size, mtime, ctime)
+
+
+_cache = None
+_cache_path = None
+_cache_lock = threading.Lock()
+
+
+def GetHashCache():
+  """Returns the client hash cache or None if it is disabled or unusable."""
+  global _cache, _cache_path
+
+  path = config.CONFIG["Client.hash_cache_path"]
+  if not path:
+    return None
+
+  with _cache_lock:
+    if _cache is not None and _cache_path == path:
+      return _cache
+
+    if _cache is not None:
+      _cache.Close()
+      _cache = None
+
+    try:
+      _cache = HashCache(
+          path,
+          max_entries=config.CONFIG["Client.hash_cache_max_entries"],
+          version=config.CONFIG["Source.version_string"])
+    except sqlite3.Error as e:
+      logging.warning("Unable to open hash cache at %s: %s", path, e)
+      return None
+
+    _cache_path = path
+    return _cache
+
+
+def Get(stat, kind):
+  """Returns a cached result for the given file or None."""
+  cache = GetHashCache()
+  if cache is None:
+    return None
+
+  try:
+    return cache.Get(stat, kind)
+  except sqlite3.Error as e:
+    logging.warning("Unable to read from hash cache: %s", e)
+    return None
+
+
+def Put(stat, kind, value):
+  """Stores a result computed from the given file, if the cache is enabled."""
+  cache = GetHashCache()
+  if cache is None:
+    return
+
+  try:
+    cache.Put(stat, kind, value)
+  except sqlite3.Error as e:
+    logging.warning("Unable to write to hash cache: %s", e)
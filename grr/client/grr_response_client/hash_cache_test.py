@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import io
+import os
+import shutil
+
+from absl import app
+from absl.testing import absltest
+import mock
+
+from grr_response_client import client_utils_common
+from grr_response_client import hash_cache
+from grr_response_client.client_actions.file_finder_utils import subactions
+from grr_response_core.lib.util import filesystem
+from grr_response_core.lib.util import temp
+from grr.test_lib import test_lib
+
+
+def _WriteOldFile(path, content):
+  with io.open(path, "wb") as fd:
+    fd.write(content)
+  # Files modified very recently are not cached.
+  os.utime(path, (1000000000, 1000000000))
+
+
+class HashCacheTest(absltest.TestCase):
+
+  def setUp(self):
+    super(HashCacheTest, self).setUp()
+    self.temp_dir = temp.TempDirPath()
+    self.addCleanup(shutil.rmtree, self.temp_dir)
+    self.db_path = os.path.join(self.temp_dir, "hash_cache.db")
+    self.file_path = os.path.join(self.temp_dir, "foo.txt")
+    _WriteOldFile(self.file_path, b"foobar")
+
+  def _Cache(self, max_entries=100, version="1.0.0"):
+    cache = hash_cache.HashCache(
+        self.db_path, max_entries=max_entries, version=version)
+    self.addCleanup(cache.Close)
+    return cache
+
+  def _Stat(self, path=None):
+    return filesystem.Stat.FromPath(path or self.file_path)
+
+  def testGetReturnsStoredValue(self):
+    cache = self._Cache()
+    cache.Put(self._Stat(), "kind", b"value")
+
+    self.assertEqual(cache.Get(self._Stat(), "kind"), b"value")
+    self.assertIsNone(cache.Get(self._Stat(), "other-kind"))
+
+  def testValuesArePersisted(self):
+    self._Cache().Put(self._Stat(), "kind", b"value")
+
+    self.assertEqual(self._Cache().Get(self._Stat(), "kind"), b"value")
+
+  def testModifiedFileIsNotReturned(self):
+    cache = self._Cache()
+    cache.Put(self._Stat(), "kind", b"value")
+
+    _WriteOldFile(self.file_path, b"quux")
+
+    self.assertIsNone(cache.Get(self._Stat(), "kind"))
+
+  def testRecentlyModifiedFileIsNotStored(self):
+    with io.open(self.file_path, "wb") as fd:
+      fd.write(b"quux")
+
+    cache = self._Cache()
+    cache.Put(self._Stat(), "kind", b"value")
+
+    self.assertIsNone(cache.Get(self._Stat(), "kind"))
+
+  def testFileChangedAfterStatIsNotStored(self):
+    stat = self._Stat()
+    _WriteOldFile(self.file_path, b"quux")
+
+    cache = self._Cache()
+    cache.Put(stat, "kind", b"value")
+
+    self.assertIsNone(cache.Get(self._Stat(), "kind"))
+
+  def testEntriesAreDroppedOnVersionChange(self):
+    self._Cache(version="1.0.0").Put(self._Stat(), "kind", b"value")
+
+    self.assertIsNone(self._Cache(version="1.0.1").Get(self._Stat(), "kind"))
+
+  def testNumberOfEntriesIsBounded(self):
+    cache = self._Cache(max_entries=10)
+
+    paths = [os.path.join(self.temp_dir, "file%d" % i) for i in range(20)]
+    for path in paths:
+      _WriteOldFile(path, b"foo")
+      cache.Put(self._Stat(path), "kind", b"value")
+
+    cached = [
+        path for path in paths
+        if cache.Get(self._Stat(path), "kind") is not None
+    ]
+    self.assertLessEqual(len(cached), 10)
+    self.assertIn(paths[-1], cached)
+
+  def testModuleLevelFunctionsAreNoOpsWhenDisabled(self):
+    with test_lib.ConfigOverrider({"Client.hash_cache_path": ""}):
+      hash_cache.Put(self._Stat(), "kind", b"value")
+      self.assertIsNone(hash_cache.Get(self._Stat(), "kind"))
+
+
+class HashEntryTest(absltest.TestCase):
+
+  def testUnchangedFileIsHashedOnce(self):
+    with temp.AutoTempDirPath(remove_non_empty=True) as temp_dir:
+      file_path = os.path.join(temp_dir, "foo.txt")
+      _WriteOldFile(file_path, b"foobar")
+      flow = mock.Mock()
+
+      with test_lib.ConfigOverrider(
+          {"Client.hash_cache_path": os.path.join(temp_dir, "cache.db")}):
+        with mock.patch.object(
+            client_utils_common.MultiHasher,
+            "HashFilePath",
+            wraps=client_utils_common.MultiHasher.HashFilePath,
+            autospec=True) as hash_file_path:
+          first = subactions._HashEntry(
+              filesystem.Stat.FromPath(file_path), flow)
+          second = subactions._HashEntry(
+              filesystem.Stat.FromPath(file_path), flow)
+
+          self.assertEqual(hash_file_path.call_count, 1)
+          self.assertEqual(first, second)
+
+          _WriteOldFile(file_path, b"quux")
+          third = subactions._HashEntry(
+              filesystem.Stat.FromPath(file_path), flow)
+
+          self.assertEqual(hash_file_path.call_count, 2)
+          self.assertNotEqual(first.sha256, third.sha256)
+
+
+def main(argv):
+  test_lib.main(argv)
+
+
+if __name__ == "__main__":
+  app.run(main)
@@ -26,6 +26,7 @@ from grr_response_core import config
 from grr_response_core.config import contexts
 from grr_response_core.lib.rdfvalues import crypto as rdf_crypto
 from grr_response_core.lib.rdfvalues import paths as rdf_paths
+from grr_response_core.lib.util import statistics
 
 flags.DEFINE_integer("nrclients", 1, "Number of clients to start")
 
@@ -48,6 +49,12 @@ flags.DEFINE_bool(
     "If specified, every client will send a foreman poll request "
     "right after startup. Useful for testing hunts.")
 
+flags.DEFINE_integer(
+    "duration", 0,
+    "If non-zero, the pool is stopped after this number of seconds and a "
+    "summary of server round trips made by all clients is logged. Together "
+    "with --fast_poll this makes it possible to use the pool as a load test.")
+
 
 class PoolGRRClient(threading.Thread):
   """A GRR client for running in pool mode."""
@@ -72,12 +79,19 @@ class PoolGRRClient(threading.Thread):
     self.stop = False
     # Is this client already enrolled?
     self.enrolled = False
+    # Durations (in seconds) of all successful server round trips.
+    self.latencies = []
+    self.errors = 0
 
   def Run(self):
     while not self.stop:
+      start_time = time.time()
       status = self.client.RunOnce()
       if status.code == 200:
         self.enrolled = True
+        self.latencies.append(time.time() - start_time)
+      else:
+        self.errors += 1
       self.client.timer.Wait()
 
   def Stop(self):
@@ -123,7 +137,12 @@ def CreateClientPool(n):
     bits = config.CONFIG["Client.rsa_key_length"]
     key = rdf_crypto.RSAPrivateKey.GenerateKey(bits=bits)
     clients.append(
-        PoolGRRClient(private_key=key, ca_cert=config.CONFIG["CA.certificate"]))
+        PoolGRRClient(
+            private_key=key,
+            ca_cert=config.CONFIG["CA.certificate"],
+            fast_poll=flags.FLAGS.fast_poll,
+            send_foreman_request=flags.FLAGS.send_foreman_request,
+        ))
 
   # Start all the clients now.
   for c in clients:
@@ -143,6 +162,11 @@ def CreateClientPool(n):
         else:
           logging.info("%s: Enrolled %d/%d clients.", int(time.time()),
                        enrolled, n)
+    elif flags.FLAGS.duration:
+      try:
+        time.sleep(flags.FLAGS.duration)
+      except KeyboardInterrupt:
+        pass
     else:
       try:
         while True:
@@ -157,7 +181,9 @@ def CreateClientPool(n):
 
   # Note: code below is going to be executed after SIGTERM is sent to this
   # process.
-  logging.info("Pool done in %s seconds.", time.time() - start_time)
+  elapsed = time.time() - start_time
+  logging.info("Pool done in %s seconds.", elapsed)
+  LogRoundTripStats(clients, elapsed)
 
   # The way benchmarking is supposed to work is that we execute poolclient with
   # --enroll_only flag, it dumps the certificates to the flags.FLAGS.cert_file.
@@ -176,6 +202,20 @@ def CreateClientPool(n):
       fd.write("\n".join(b64_certs))
 
 
+def LogRoundTripStats(clients, elapsed):
+  """Logs the throughput and latency of server round trips made by clients."""
+  latencies = [latency for c in clients for latency in c.latencies]
+  errors = sum(c.errors for c in clients)
+  logging.info("Round trips: %d successful, %d failed, %.1f per second.",
+               len(latencies), errors, len(latencies) / max(elapsed, 1e-6))
+  if latencies:
+    summary = statistics.Summarize(latencies)
+    logging.info(
+        "Round trip latency (ms): mean %.1f, p50 %.1f, p90 %.1f, p99 %.1f, "
+        "max %.1f", summary.mean * 1000, summary.p50 * 1000,
+        summary.p90 * 1000, summary.p99 * 1000, summary.max * 1000)
+
+
 def CheckLocation():
   """Checks that the poolclient is not accidentally ran against production."""
   for url in (config.CONFIG["Client.server_urls"] +
@@ -5,7 +5,7 @@ from __future__ import division
 
 from __future__ import unicode_literals
 
-import functools
+import itertools
 import platform
 
 
@@ -21,6 +21,7 @@ else:
   vfs_registry = None
 from grr_response_core import config
 from grr_response_core.lib.rdfvalues import paths as rdf_paths
+from grr_response_core.lib.util import cache
 from grr_response_core.lib.util import context
 from grr_response_core.lib.util import precondition
 # pylint: enable=g-import-not-at-top
@@ -36,11 +37,20 @@ VFS_HANDLERS = {}  # type: Dict[Any, Type[vfs_base.VFSHandler]]
 # The paths we should use as virtual root for VFS operations.
 _VFS_VIRTUALROOTS = {}
 
+# Expanded pathspecs of recently opened files keyed by the requested pathspecs.
+# Opening an expanded pathspec skips case correction of every path component
+# and the mount point lookup, so repeatedly opening files stays cheap. Entries
+# expire shortly after they are created, so that renamed or replaced files are
+# eventually resolved again. See `_GetReusableExpansion` for what is cached.
+_RESOLVED_PATHSPECS = cache.LRUCache(
+    max_size=1000, max_age=60, refresh_on_access=False, name="vfs_pathspec")
+
 
 def Init():
   """Register all known vfs handlers to open a pathspec types."""
   VFS_HANDLERS.clear()
   _VFS_VIRTUALROOTS.clear()
+  _RESOLVED_PATHSPECS.Flush()
   vfs_virtualroots = config.CONFIG["Client.vfs_virtualroots"]
 
   VFS_HANDLERS[files.File.supported_pathtype] = files.File
@@ -146,6 +156,9 @@ def VFSOpen(pathspec,
     path: "/dev/sda1"
   }
 
+  Expanded pathspecs of recently opened files are cached, so opening the same
+  pathspec again does not need to expand it component by component.
+
   Args:
     pathspec: A Path() protobuf to normalize.
     progress_callback: A callback to indicate that the open call is still
@@ -159,13 +172,107 @@ def VFSOpen(pathspec,
     IOError: if one of the path components can not be opened.
 
   """
+  return _Open(pathspec, progress_callback=progress_callback)
+
+
+def _Open(pathspec, progress_callback=None, parent_fds=None):
+  """Opens a pathspec, reusing its cached expansion if available.
+
+  Args:
+    pathspec: A pathspec to open.
+    progress_callback: A callback to indicate that the open call is still
+      working but needs more time.
+    parent_fds: An optional dictionary of already opened parents of expanded
+      pathspecs (keyed by their serialized pathspecs) that can be shared among
+      sibling files. It is updated with the parents opened by this call.
+
+  Returns:
+    The open filelike object.
+
+  Raises:
+    IOError: if one of the path components can not be opened.
+  """
   # Initialize the dictionary of VFS handlers lazily, if not yet done.
   if not VFS_HANDLERS:
     Init()
 
-  fd = None
+  working_pathspec = _GetWorkingPathSpec(pathspec)
+  key = working_pathspec.SerializeToString()
+
+  try:
+    handlers, resolved_pathspec = _RESOLVED_PATHSPECS.Get(key)
+  except KeyError:
+    handlers, resolved_pathspec = None, None
+
+  # The expansion is only valid for the handlers it was created with.
+  if resolved_pathspec is not None and handlers == VFS_HANDLERS:
+    try:
+      return _OpenComponents(
+          resolved_pathspec.Copy(),
+          progress_callback=progress_callback,
+          parent_fds=parent_fds)
+    except IOError:
+      # The file might have been moved or removed, expand the pathspec again.
+      _RESOLVED_PATHSPECS.Pop(key)
+
+  requested_pathspec = working_pathspec.Copy()
+  fd = _OpenComponents(working_pathspec, progress_callback=progress_callback)
+  if fd.pathspec:
+    expansion = _GetReusableExpansion(requested_pathspec, fd.pathspec)
+    if expansion is not None:
+      _RESOLVED_PATHSPECS.Put(key, (dict(VFS_HANDLERS), expansion))
+  return fd
+
+
+def _GetReusableExpansion(requested_pathspec, resolved_pathspec):
+  """Returns an expanded pathspec that can be reused to open the same request.
+
+  Expanded TSK components carry the inodes of the opened files. Once a file is
+  deleted, its inode can be given to an unrelated file which would then be
+  opened instead, so the inodes are dropped and the file is opened by its case
+  literal path instead. Looking a path up in a TSK filesystem is cheap compared
+  to correcting the case of every component. Requests for files named by an
+  inode or an NTFS attribute are not cached at all.
 
-  # Adjust the pathspec in case we are using a vfs_virtualroot.
+  Expansions that corrected the case of an OS path are not reused either, since
+  a file matching the request exactly may appear.
+
+  Args:
+    requested_pathspec: The requested pathspec (with the virtual root applied).
+    resolved_pathspec: A pathspec the request was expanded to.
+
+  Returns:
+    A pathspec to cache or None if the expansion can't be reused.
+  """
+  for component in itertools.chain(requested_pathspec, resolved_pathspec):
+    if component.HasField("ntfs_type") or component.HasField("ntfs_id"):
+      return None
+  for component in requested_pathspec:
+    if component.HasField("inode"):
+      return None
+
+  expansion = resolved_pathspec.Copy()
+  is_tsk = False
+  for component in expansion:
+    if component.pathtype == rdf_paths.PathSpec.PathType.TSK:
+      component.inode = None
+      is_tsk = True
+
+  requested_path = requested_pathspec.CollapsePath()
+  resolved_path = expansion.CollapsePath()
+  # Case corrections in raw filesystems are reused: these are mostly NTFS
+  # volumes, which are case insensitive.
+  if is_tsk:
+    requested_path = requested_path.lower()
+    resolved_path = resolved_path.lower()
+  if requested_path != resolved_path:
+    return None
+
+  return expansion
+
+
+def _GetWorkingPathSpec(pathspec):
+  """Returns a copy of the pathspec adjusted for the virtual root, if any."""
   vroot = _VFS_VIRTUALROOTS.get(pathspec.pathtype)
 
   # If we have a virtual root for this vfs handler, we need to prepend
@@ -176,12 +283,41 @@ def VFSOpen(pathspec,
       pathspec.CollapsePath().startswith(vroot.CollapsePath())):
     # No virtual root but opening changes the pathspec so we always work on a
     # copy.
-    working_pathspec = pathspec.Copy()
-  else:
-    # We're in a virtual root, put the target pathspec inside the virtual root
-    # as a nested path.
-    working_pathspec = vroot.Copy()
-    working_pathspec.last.nested_path = pathspec.Copy()
+    return pathspec.Copy()
+
+  # We're in a virtual root, put the target pathspec inside the virtual root
+  # as a nested path.
+  working_pathspec = vroot.Copy()
+  working_pathspec.last.nested_path = pathspec.Copy()
+  return working_pathspec
+
+
+def _OpenComponents(working_pathspec, progress_callback=None, parent_fds=None):
+  """Opens all components of the pathspec in turn.
+
+  Args:
+    working_pathspec: A pathspec to open. It is modified by this function.
+    progress_callback: A callback to indicate that the open call is still
+      working but needs more time.
+    parent_fds: An optional dictionary of already opened parents, see `_Open`.
+
+  Returns:
+    The open filelike object.
+
+  Raises:
+    IOError: if one of the path components can not be opened.
+  """
+  fd = None
+
+  if parent_fds is not None and len(working_pathspec) > 1:
+    parent_pathspec = working_pathspec
+    working_pathspec = parent_pathspec.Pop(-1)
+
+    parent_key = parent_pathspec.SerializeToString()
+    fd = parent_fds.get(parent_key)
+    if fd is None:
+      fd = _OpenComponents(parent_pathspec, progress_callback=progress_callback)
+      parent_fds[parent_key] = fd
 
   # For each pathspec step, we get the handler for it and instantiate it with
   # the old object, and the current step.
@@ -209,7 +345,9 @@ def VFSOpen(pathspec,
 def VFSMultiOpen(pathspecs, progress_callback=None):
   """Opens multiple files specified by given path-specs.
 
-  See documentation for `VFSOpen` for more information.
+  See documentation for `VFSOpen` for more information. Files which have been
+  opened recently share already opened parent handlers (e.g. the raw device
+  of the filesystem they reside in) with their siblings.
 
   Args:
     pathspecs: A list of pathspec instances of files to open.
@@ -220,8 +358,12 @@ def VFSMultiOpen(pathspecs, progress_callback=None):
   """
   precondition.AssertIterableType(pathspecs, rdf_paths.PathSpec)
 
-  vfs_open = functools.partial(VFSOpen, progress_callback=progress_callback)
-  return context.MultiContext(map(vfs_open, pathspecs))
+  parent_fds = {}
+  fds = [
+      _Open(pathspec, progress_callback=progress_callback, parent_fds=parent_fds)
+      for pathspec in pathspecs
+  ]
+  return context.MultiContext(fds)
 
 
 def ReadVFS(pathspec, offset, length, progress_callback=None):
@@ -15,6 +15,7 @@ from grr_response_client import client_utils
 from grr_response_client.vfs_handlers import base as vfs_base
 from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import paths as rdf_paths
+from grr_response_core.lib.util import cache
 from grr_response_core.lib.util import filesystem
 
 # File handles are cached here. After expiration, the file handle is garbage
@@ -24,7 +25,7 @@ from grr_response_core.lib.util import filesystem
 # tables. Since VFSHandlers have no de-facto support for context managers, it is
 # hard to determine when the file can be freed again, thus this caching is hard
 # to remove.
-FILE_HANDLE_CACHE = utils.TimeBasedCache(max_age=30)
+FILE_HANDLE_CACHE = cache.LRUCache(max_size=10, max_age=30)
 
 
 class LockedFileHandle(object):
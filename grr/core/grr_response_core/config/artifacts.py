@@ -6,6 +6,7 @@ from __future__ import division
 from __future__ import unicode_literals
 
 from grr_response_core.lib import config_lib
+from grr_response_core.lib import rdfvalue
 
 config_lib.DEFINE_list("Artifacts.artifact_dirs", [
     "%(grr_response_core/artifacts@grr-response-core|resource)",
@@ -67,6 +68,30 @@ config_lib.DEFINE_list(
     " set on interrogate. These artifacts are too expensive"
     " or slow to collect regularly from all machines.")
 
+config_lib.DEFINE_bool(
+    "Artifacts.client_side_collection", False,
+    "If true, artifact collectors collect artifacts with all sources supported "
+    "by the client-side artifact collector using a single client request "
+    "instead of a client request or a flow per source. Parsers are then "
+    "applied on the client and the collected files and registry keys are not "
+    "written to the VFS. Clients not supporting it fall back to the "
+    "server-side collection.")
+
+config_lib.DEFINE_integer(
+    "Artifacts.parser_pool_size", 0,
+    "The number of processes used to run response parsers of artifact "
+    "collectors. If 0, the parsers run in the thread processing the flow.")
+
+config_lib.DEFINE_semantic_value(
+    rdfvalue.Duration, "Artifacts.parser_cpu_budget", "1m",
+    "The maximum CPU time a single parser run can use in the parser pool.")
+
+config_lib.DEFINE_semantic_value(
+    rdfvalue.Duration, "Artifacts.parser_time_budget", "5m",
+    "The maximum time a single parser run can take in the parser pool. A "
+    "pool process not returning in twice this time is considered hung and the "
+    "pool is restarted.")
+
 config_lib.DEFINE_list(
     "Artifacts.netgroup_filter_regexes", [],
     help="Only parse groups that match one of these regexes"
@@ -89,6 +89,13 @@ config_lib.DEFINE_float(
     "Minimum time between polls in seconds if the server "
     "reported an error.")
 
+config_lib.DEFINE_float(
+    "Client.long_poll_timeout", 0,
+    "The longest time (in seconds) an idle client asks the server to hold its "
+    "request open until there is new work for it. This lets the client pick up "
+    "new flows without fast polling. Should be well below "
+    "Client.http_timeout and Nanny.unresponsive_kill_period. Disabled if 0.")
+
 config_lib.DEFINE_list(
     name="Client.proxy_servers",
     help="List of valid proxy servers the client should try.",
@@ -100,6 +107,12 @@ config_lib.DEFINE_integer("Client.max_post_size", 40000000,
 config_lib.DEFINE_integer("Client.max_out_queue", 51200000,
                           "Maximum size of the output queue.")
 
+config_lib.DEFINE_integer(
+    "Client.reply_batch_size", 0,
+    "Maximum number of replies of a client action packed into a single "
+    "message. Only actions that support it batch their replies. Batching is "
+    "disabled if 0. Requires a server able to unpack batched replies.")
+
 config_lib.DEFINE_integer(
     "Client.foreman_check_frequency", 1800,
     "The minimum number of seconds before checking with "
@@ -129,6 +142,17 @@ config_lib.DEFINE_string(
     help="Default subdirectory in the temp directory to use for GRR.",
     default="%(Client.name)")
 
+config_lib.DEFINE_string(
+    name="Client.hash_cache_path",
+    help=("A path to the database caching hashes of unchanged files between "
+          "client actions. If empty, the cache is disabled."),
+    default="")
+
+config_lib.DEFINE_integer(
+    name="Client.hash_cache_max_entries",
+    help="Maximum number of files in the client hash cache.",
+    default=100000)
+
 config_lib.DEFINE_list(
     name="Client.vfs_virtualroots",
     help=("If this is set for a VFS type, client VFS operations will always be"
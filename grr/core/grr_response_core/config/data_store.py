@@ -27,6 +27,23 @@ config_lib.DEFINE_bool(
 config_lib.DEFINE_bool("Database.aff4_enabled", True,
                        "Enables reading/writing to the legacy data store.")
 
+config_lib.DEFINE_integer(
+    "FileStore.hash_cache_size", 100000,
+    "Maximum number of file hashes whose blob references are cached by each "
+    "server process. Set to 0 to disable the cache.")
+
+config_lib.DEFINE_integer(
+    "FileStore.hash_cache_max_blob_refs", 1000000,
+    "Maximum total number of blob references of the file hashes cached by "
+    "each server process. Large files have many blob references, so this "
+    "bounds the memory used by the cache. Set to 0 to disable the cache.")
+
+config_lib.DEFINE_semantic_value(
+    rdfvalue.Duration, "FileStore.missing_hash_cache_age", "10s",
+    "Time for which hashes not found in the file store are remembered as "
+    "missing. Files added by other processes in the meantime may be reported "
+    "as missing for that long. Set to 0 to disable negative caching.")
+
 DATASTORE_PATHING = [
     r"%{(?P<path>files/hash/generic/sha256/...).*}",
     r"%{(?P<path>files/hash/generic/sha1/...).*}",
@@ -41,6 +41,12 @@ config_lib.DEFINE_integer(
     "Worker.queue_shards", 5, "Queue notifications will be sharded across "
     "this number of datastore subjects.")
 
+config_lib.DEFINE_integer(
+    "Worker.flow_cache_size", 1000,
+    "Number of recently processed flows kept in memory by the worker. A "
+    "cached flow is reused if it was not modified since, instead of reading "
+    "and deserializing it again. The cache is disabled if 0.")
+
 config_lib.DEFINE_list(
     "Frontend.well_known_flows", ["TransferStore"],
     "Allow these well known flows to run directly on the "
@@ -116,6 +122,45 @@ config_lib.DEFINE_integer(
     "Frontend.max_queue_size", 500,
     "Maximum number of messages to queue for the client.")
 
+config_lib.DEFINE_float(
+    "Frontend.poll_delay_max", 0,
+    "The longest time (in seconds) idle clients are asked to wait before "
+    "polling again when the frontend is busy. Delays are not suggested to "
+    "clients if 0.")
+
+config_lib.DEFINE_integer(
+    "Frontend.poll_delay_load_threshold", 100,
+    "Number of client requests handled concurrently at which idle clients are "
+    "asked to wait for Frontend.poll_delay_max. Clients are asked to wait "
+    "proportionally less when fewer requests are handled. Must be positive.")
+
+config_lib.DEFINE_float(
+    "Frontend.pending_work_refresh_interval", 0,
+    "Interval (in seconds) between refreshes of the set of clients with "
+    "pending client action requests kept by the frontend. Polls of clients "
+    "not in the set do not query the database. New work may reach clients "
+    "this much later. The set is not used if 0.")
+
+config_lib.DEFINE_integer(
+    "Frontend.long_poll_max_clients", 0,
+    "Maximum number of idle client requests held open at the same time "
+    "waiting for new work for the clients. Each held request occupies one of "
+    "the request handler threads of the frontend HTTP server (a "
+    "ThreadingMixIn server runs one thread per connection) for "
+    "as long as it is held, so this also bounds the threads used by held "
+    "requests. Requests are not held open if 0.")
+
+config_lib.DEFINE_float(
+    "Frontend.long_poll_timeout_max", 30,
+    "The longest time (in seconds) a client request is held open waiting for "
+    "new work for the client, regardless of what the client asks for.")
+
+config_lib.DEFINE_float(
+    "Frontend.long_poll_check_interval", 1,
+    "Interval (in seconds) between checks for new work for clients whose "
+    "requests are held open. All the held clients are checked with a single "
+    "database query.")
+
 config_lib.DEFINE_integer(
     "Frontend.max_retransmission_time", 10,
     "Maximum number of times we are allowed to "
@@ -234,9 +234,9 @@ def CheckCondition(condition, check_object):
     ConditionError: If condition is bad.
   """
   try:
-    of = objectfilter.Parser(condition).Parse()
-    compiled_filter = of.Compile(objectfilter.BaseFilterImplementation)
-    return compiled_filter.Matches(check_object)
+    compiled_filter = objectfilter.CompileFilter(
+        condition, objectfilter.BaseFilterImplementation)
+    return compiled_filter.GetMatcher()(check_object)
   except objectfilter.Error as e:
     raise ConditionError(e)
 
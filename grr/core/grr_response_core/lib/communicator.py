@@ -15,9 +15,9 @@ from future.utils import with_metaclass
 
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import type_info
-from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import crypto as rdf_crypto
 from grr_response_core.lib.rdfvalues import flows as rdf_flows
+from grr_response_core.lib.util import cache
 from grr_response_core.stats import stats_collector_instance
 from grr_response_core.stats import stats_utils
 
@@ -280,7 +280,8 @@ class Communicator(with_metaclass(abc.ABCMeta, object)):
     self._ClearServerCipherCache()
 
     # A cache for encrypted ciphers
-    self.encrypted_cipher_cache = utils.FastStore(max_size=50000)
+    self.encrypted_cipher_cache = cache.LRUCache(
+        max_size=50000, num_shards=16, name="encrypted_cipher")
 
   @abc.abstractmethod
   def _GetRemotePublicKey(self, server_name):
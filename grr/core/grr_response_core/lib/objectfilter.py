@@ -131,7 +131,15 @@ class InvalidNumberOfOperands(Error):
 
 @python_2_unicode_compatible
 class Filter(with_metaclass(abc.ABCMeta, object)):
-  """Base class for every filter."""
+  """Base class for every filter.
+
+  Besides interpreting the filter tree object by object with `Matches`, a
+  filter can be turned into a plain function with `GetMatcher`. The function is
+  built once out of closures specialized for the arguments of every node of the
+  tree, which makes it considerably faster to apply to many objects.
+  """
+
+  _matcher = None
 
   def __init__(self, arguments=None, value_expander=None):
     """Constructor.
@@ -158,9 +166,24 @@ class Filter(with_metaclass(abc.ABCMeta, object)):
   def Matches(self, obj):
     """Whether object obj matches this filter."""
 
+  def GetMatcher(self):
+    """Returns a function telling whether an object matches this filter."""
+    if self._matcher is None:
+      self._matcher = self._BuildMatcher()
+    return self._matcher
+
+  def _BuildMatcher(self):
+    """Builds the function returned by `GetMatcher`.
+
+    Subclasses should override this to return a function equivalent to
+    `Matches` that avoids per-object work which depends only on the filter.
+    """
+    return self.Matches
+
   def Filter(self, objects):
     """Returns a list of objects that pass the filter."""
-    return list(filter(self.Matches, objects))
+    matcher = self.GetMatcher()
+    return [obj for obj in objects if matcher(obj)]
 
   def __str__(self):
     return "%s(%s)" % (self.__class__.__name__, ", ".join(
@@ -179,6 +202,17 @@ class AndFilter(Filter):
         return False
     return True
 
+  def _BuildMatcher(self):
+    matchers = [child_filter.GetMatcher() for child_filter in self.args]
+
+    def AndMatcher(obj):
+      for matcher in matchers:
+        if not matcher(obj):
+          return False
+      return True
+
+    return AndMatcher
+
 
 class OrFilter(Filter):
   """Performs a boolean OR of the given Filter instances as arguments.
@@ -194,6 +228,20 @@ class OrFilter(Filter):
         return True
     return False
 
+  def _BuildMatcher(self):
+    if not self.args:
+      return lambda _: True
+
+    matchers = [child_filter.GetMatcher() for child_filter in self.args]
+
+    def OrMatcher(obj):
+      for matcher in matchers:
+        if matcher(obj):
+          return True
+      return False
+
+    return OrMatcher
+
 
 class Operator(Filter):
   """Base class for all operators."""
@@ -204,6 +252,9 @@ class IdentityFilter(Operator):
   def Matches(self, _):
     return True
 
+  def _BuildMatcher(self):
+    return lambda _: True
+
 
 class UnaryOperator(Operator):
   """Base class for unary operators."""
@@ -237,7 +288,14 @@ class BinaryOperator(Operator):
 
 
 class GenericBinaryOperator(BinaryOperator):
-  """Allows easy implementations of operators."""
+  """Allows easy implementations of operators.
+
+  Attributes:
+    negate: If set, the operator matches when none of the values match the
+      operation instead of when at least one of them does.
+  """
+
+  negate = False
 
   def Operation(self, x, y):
     """Performs the operation between two values."""
@@ -247,12 +305,12 @@ class GenericBinaryOperator(BinaryOperator):
     for val in values:
       try:
         if self.Operation(val, self.right_operand):
-          return True
+          return not self.negate
         else:
           continue
       except (ValueError, TypeError):
         continue
-    return False
+    return self.negate
 
   def Matches(self, obj):
     key = self.left_operand
@@ -261,6 +319,23 @@ class GenericBinaryOperator(BinaryOperator):
       return True
     return False
 
+  def _BuildMatcher(self):
+    expand = self.value_expander.Compile(self.left_operand)
+    operation = self.Operation
+    right_operand = self.right_operand
+    negate = self.negate
+
+    def BinaryOperatorMatcher(obj):
+      for value in expand(obj):
+        try:
+          if operation(value, right_operand):
+            return not negate
+        except (ValueError, TypeError):
+          continue
+      return negate
+
+    return BinaryOperatorMatcher
+
 
 class Equals(GenericBinaryOperator):
   """Matches objects when the right operand equals the expanded value."""
@@ -269,13 +344,10 @@ class Equals(GenericBinaryOperator):
     return x == y
 
 
-class NotEquals(GenericBinaryOperator):
+class NotEquals(Equals):
   """Matches when the right operand isn't equal to the expanded value."""
 
-  def Operate(self, values):
-    return not Equals(
-        arguments=self.args,
-        value_expander=self.value_expander_cls).Operate(values)
+  negate = True
 
 
 class Less(GenericBinaryOperator):
@@ -318,13 +390,10 @@ class Contains(GenericBinaryOperator):
       return y == x
 
 
-class NotContains(GenericBinaryOperator):
+class NotContains(Contains):
   """Whether the right operand is not contained in the values."""
 
-  def Operate(self, values):
-    return not Contains(
-        arguments=self.args,
-        value_expander=self.value_expander_cls).Operate(values)
+  negate = True
 
 
 # TODO(user): Change to an N-ary Operator?
@@ -350,13 +419,10 @@ class InSet(GenericBinaryOperator):
       return False
 
 
-class NotInSet(GenericBinaryOperator):
+class NotInSet(InSet):
   """Whether at least a value is not present in the right operand."""
 
-  def Operate(self, values):
-    return not InSet(
-        arguments=self.args,
-        value_expander=self.value_expander_cls).Operate(values)
+  negate = True
 
 
 class Regexp(GenericBinaryOperator):
@@ -452,6 +518,19 @@ class Context(Operator):
           return True
     return False
 
+  def _BuildMatcher(self):
+    expand = self.value_expander.Compile(self.context)
+    condition = self.condition.GetMatcher()
+
+    def ContextMatcher(obj):
+      for object_list in expand(obj):
+        for sub_object in object_list:
+          if condition(sub_object):
+            return True
+      return False
+
+    return ContextMatcher
+
 
 OP2FN = {
     "equals": Equals,
@@ -559,6 +638,37 @@ class ValueExpander(object):
       for value in self._AtNonLeaf(attr_value, path):
         yield value
 
+  def Compile(self, path):
+    """Returns a function expanding the values for the given path.
+
+    The returned function is equivalent to calling `Expand` with the given path
+    but does the work that depends only on the path once.
+
+    Args:
+      path: A list of strings or a string with fields separated by dots.
+
+    Returns:
+      A function taking an object and returning an iterable of its values.
+    """
+    if isinstance(path, string_types):
+      path = path.split(self.FIELD_SEPARATOR)
+
+    if len(path) != 1:
+      expand = self.Expand
+      return lambda obj: expand(obj, path)
+
+    attr_name = self._GetAttributeName(path)
+    get_value = self._GetValue
+    at_leaf = self._AtLeaf
+
+    def ExpandAttribute(obj):
+      attr_value = get_value(obj, attr_name)
+      if attr_value is None:
+        return ()
+      return at_leaf(attr_value)
+
+    return ExpandAttribute
+
 
 class AttributeValueExpander(ValueExpander):
   """An expander that gives values based on object attribute names."""
@@ -903,3 +1013,35 @@ class DictFilterImplementation(BaseFilterImplementation):
   FILTERS = {}
   FILTERS.update(BaseFilterImplementation.FILTERS)
   FILTERS.update({"ValueExpander": DictValueExpander})
+
+
+# Filters are stateless once compiled, so they can be shared by all users of
+# the same expression. The cache is simply dropped once it grows too large:
+# the set of expressions used in practice (checks, artifact conditions) is
+# small and fixed.
+_MAX_COMPILED_FILTERS = 1000
+_COMPILED_FILTERS = {}
+
+
+def CompileFilter(expression, filter_implementation=BaseFilterImplementation):
+  """Parses and compiles a filter expression, reusing earlier results.
+
+  Args:
+    expression: A filter expression.
+    filter_implementation: A filter implementation class to compile the
+      expression with.
+
+  Returns:
+    A compiled `Filter`.
+
+  Raises:
+    Error: If the expression is invalid.
+  """
+  key = (expression, filter_implementation)
+  compiled_filter = _COMPILED_FILTERS.get(key)
+  if compiled_filter is None:
+    compiled_filter = Parser(expression).Parse().Compile(filter_implementation)
+    if len(_COMPILED_FILTERS) >= _MAX_COMPILED_FILTERS:
+      _COMPILED_FILTERS.clear()
+    _COMPILED_FILTERS[key] = compiled_filter
+  return compiled_filter
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""Micro-benchmarks for interpreted and compiled object filters."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+from absl import app
+from future.builtins import range
+import pytest
+
+from grr_response_core.lib import objectfilter
+from grr_response_core.lib.rdfvalues import client_fs as rdf_client_fs
+from grr_response_core.lib.rdfvalues import paths as rdf_paths
+from grr.test_lib import benchmark_test_lib
+from grr.test_lib import test_lib
+
+# Expressions in the style of the ones used by checks.
+_EXPRESSIONS = [
+    "st_uid == 0",
+    "st_mode inset [33188, 33261] and st_uid != 0",
+    "pathspec.path contains 'passwd' or st_size > 1024",
+    "st_size < 4096 and st_gid notinset [0, 1] and st_mtime > 1000",
+]
+
+
+@pytest.mark.benchmark
+class ObjectFilterBenchmark(benchmark_test_lib.AverageMicroBenchmarks):
+  """Test performance of object filter evaluation."""
+
+  REPEATS = 10
+  units = "ms"
+
+  NUM_OBJECTS = 5000
+
+  def setUp(self):
+    super(ObjectFilterBenchmark, self).setUp()
+    self.objects = [
+        rdf_client_fs.StatEntry(
+            pathspec=rdf_paths.PathSpec(
+                path="/etc/file%d" % i, pathtype=rdf_paths.PathSpec.PathType.OS),
+            st_mode=33188 if i % 2 else 33261,
+            st_uid=i % 3,
+            st_gid=i % 5,
+            st_size=i,
+            st_mtime=i * 10) for i in range(self.NUM_OBJECTS)
+    ]
+
+  def _Filters(self):
+    return [
+        objectfilter.Parser(expression).Parse().Compile(
+            objectfilter.LowercaseAttributeFilterImplementation)
+        for expression in _EXPRESSIONS
+    ]
+
+  def testMatch(self):
+    """How fast are filters applied to many objects."""
+
+    def Interpreted(filters):
+      for f in filters:
+        for obj in self.objects:
+          f.Matches(obj)
+
+    def Compiled(filters):
+      for f in filters:
+        matcher = f.GetMatcher()
+        for obj in self.objects:
+          matcher(obj)
+
+    self.TimeIt(Interpreted, name="Matches", filters=self._Filters())
+    self.TimeIt(Compiled, name="GetMatcher", filters=self._Filters())
+
+  def testCompile(self):
+    """How fast are the same expressions compiled over and over again."""
+
+    def Parse():
+      for _ in range(100):
+        for expression in _EXPRESSIONS:
+          objectfilter.Parser(expression).Parse().Compile(
+              objectfilter.LowercaseAttributeFilterImplementation)
+
+    def CompileFilter():
+      for _ in range(100):
+        for expression in _EXPRESSIONS:
+          objectfilter.CompileFilter(
+              expression, objectfilter.LowercaseAttributeFilterImplementation)
+
+    self.TimeIt(Parse, name="Parse and Compile")
+    self.TimeIt(CompileFilter, name="CompileFilter")
+
+
+def main(argv):
+  test_lib.main(argv)
+
+
+if __name__ == "__main__":
+  app.run(main)
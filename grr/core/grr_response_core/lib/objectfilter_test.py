@@ -223,6 +223,8 @@ class ObjectFilterTest(absltest.TestCase):
             "value_expander": self.value_expander
         }
         self.assertEqual(test_unit[0], operator(**kwargs).Matches(self.file))
+        self.assertEqual(test_unit[0],
+                         operator(**kwargs).GetMatcher()(self.file))
 
   def testExpand(self):
     # Case insensitivity
@@ -296,6 +298,30 @@ class ObjectFilterTest(absltest.TestCase):
     values = self.value_expander().Expand(self.file, "Callable.a")
     self.assertListEqual(list(values), [])
 
+  def testCompiledExpand(self):
+    paths = [
+        "size",
+        "Size",
+        "mapping.string",
+        "mapping.float",
+        "attributes",
+        "hash.md5",
+        "non_callable_repeated.desmond",
+        "mapping.hashes",
+        "mapping.nested.attrs",
+        "nonexistant",
+        "hash.mink.boo",
+        "hash.mink",
+        "non_callable_leaf",
+        "Callable",
+        "Callable.a",
+    ]
+    for path in paths:
+      expander = self.value_expander()
+      self.assertListEqual(
+          list(expander.Compile(path)(self.file)),
+          list(expander.Expand(self.file, path)))
+
   def testGenericBinaryOperator(self):
 
     class TestBinaryOperator(objectfilter.GenericBinaryOperator):
@@ -386,6 +412,7 @@ class ObjectFilterTest(absltest.TestCase):
     filter_ = objectfilter.Parser(query).Parse()
     filter_ = filter_.Compile(self.filter_imp)
     self.assertEqual(True, filter_.Matches(self.file))
+    self.assertEqual(True, filter_.GetMatcher()(self.file))
 
   def testRegexpRaises(self):
     self.assertRaises(
@@ -554,6 +581,32 @@ AND @exported_symbols(name is 'inject')
     filter_ = parser.Compile(self.filter_imp)
     self.assertEqual(filter_.Matches(obj), False)
 
+  def testFilter(self):
+    objs = [DummyObject("size", size) for size in range(10)]
+    filter_ = objectfilter.Parser("size >= 3 and size notinset [5, 7]").Parse()
+    filter_ = filter_.Compile(self.filter_imp)
+
+    self.assertEqual([obj.size for obj in filter_.Filter(objs)],
+                     [3, 4, 6, 8, 9])
+    self.assertEqual(filter_.Filter(objs),
+                     [obj for obj in objs if filter_.Matches(obj)])
+
+  def testCompileFilter(self):
+    query = "something == 'Blue' or size > 3"
+    filter_ = objectfilter.CompileFilter(query, self.filter_imp)
+    self.assertIs(objectfilter.CompileFilter(query, self.filter_imp), filter_)
+    self.assertIsNot(
+        objectfilter.CompileFilter(query,
+                                   objectfilter.BaseFilterImplementation),
+        filter_)
+
+    self.assertTrue(filter_.Matches(DummyObject("something", "Blue")))
+    self.assertTrue(filter_.Matches(DummyObject("size", 4)))
+    self.assertFalse(filter_.Matches(DummyObject("size", 3)))
+
+    with self.assertRaises(objectfilter.ParseError):
+      objectfilter.CompileFilter("something == red", self.filter_imp)
+
 
 if __name__ == "__main__":
   absltest.main()
@@ -96,8 +96,9 @@ class ChromeParser(sqlite_file.SQLiteFile):
     """Iterator returning a list for each entry in history.
 
     We store all the download events in an array (choosing this over visits
-    since there are likely to be less of them). We later interleave them with
-    visit events to get an overall correct time order.
+    since there are likely to be less of them). Visits are streamed from the
+    database in time order and interleaved with the downloads to get an overall
+    correct time order.
 
     Yields:
       a list of attributes for each entry
@@ -106,16 +107,23 @@ class ChromeParser(sqlite_file.SQLiteFile):
     query_iter = itertools.chain(
         self.Query(self.DOWNLOADS_QUERY), self.Query(self.DOWNLOADS_QUERY_2))
 
-    results = []
+    downloads = []
     for timestamp, url, path, received_bytes, total_bytes in query_iter:
       timestamp = self.ConvertTimestamp(timestamp)
-      results.append((timestamp, "CHROME_DOWNLOAD", url, path, received_bytes,
-                      total_bytes))
+      downloads.append((timestamp, "CHROME_DOWNLOAD", url, path,
+                        received_bytes, total_bytes))
+
+    # Reversed after sorting, so that the earliest download can be popped off
+    # the end of the list.
+    downloads.sort(key=lambda it: it[0])
+    downloads.reverse()
 
     for timestamp, url, title, typed_count in self.Query(self.VISITS_QUERY):
       timestamp = self.ConvertTimestamp(timestamp)
-      results.append((timestamp, "CHROME_VISIT", url, title, typed_count, ""))
+      while downloads and downloads[-1][0] <= timestamp:
+        yield downloads.pop()
+
+      yield (timestamp, "CHROME_VISIT", url, title, typed_count, "")
 
-    results.sort(key=lambda it: it[0])
-    for it in results:
+    for it in reversed(downloads):
       yield it
@@ -561,10 +561,7 @@ class SshdConfigParser(parser.FileParser):
     _, _ = stat, knowledge_base
     # Clean out any residual state.
     self._field_parser.Flush()
-    lines = [
-        l.strip()
-        for l in utils.ReadFileBytesAsUnicode(file_object).splitlines()
-    ]
+    lines = (l.strip() for l in utils.ReadFileLinesAsUnicode(file_object))
     for line in lines:
       # Remove comments (will break if it includes a quoted/escaped #)
       line = line.split("#")[0].strip()
@@ -845,9 +842,7 @@ class CronAtAllowDenyParser(parser.FileParser):
   supported_artifacts = ["CronAtAllowDenyFiles"]
 
   def Parse(self, stat, file_obj, unused_knowledge_base):
-    lines = set([
-        l.strip() for l in utils.ReadFileBytesAsUnicode(file_obj).splitlines()
-    ])
+    lines = set(l.strip() for l in utils.ReadFileLinesAsUnicode(file_obj))
 
     users = []
     bad_lines = []
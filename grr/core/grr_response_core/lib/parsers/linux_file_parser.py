@@ -10,6 +10,7 @@ import logging
 import os
 import re
 
+from future.builtins import range
 from future.builtins import zip
 from future.utils import iteritems
 from future.utils import itervalues
@@ -121,10 +122,7 @@ class PasswdParser(parser.FileParser):
   def Parse(self, stat, file_object, knowledge_base):
     """Parse the passwd file."""
     _, _ = stat, knowledge_base
-    lines = [
-        l.strip()
-        for l in utils.ReadFileBytesAsUnicode(file_object).splitlines()
-    ]
+    lines = (l.strip() for l in utils.ReadFileLinesAsUnicode(file_object))
     for index, line in enumerate(lines):
       user = self.ParseLine(index, line)
       if user is not None:
@@ -176,18 +174,40 @@ class LinuxWtmpParser(parser.FileParser):
   output_types = ["User"]
   supported_artifacts = ["LinuxWtmp"]
 
+  # Number of bytes read from the file at once.
+  _CHUNK_SIZE = 1024 * 1024
+
+  def _ReadRecords(self, file_object):
+    """Yields the records of a wtmp file.
+
+    wtmp files of busy hosts can be huge, so they are read in chunks. A record
+    cut by the end of a chunk is completed with the start of the next one.
+
+    Args:
+      file_object: A file-like object to read the records from.
+
+    Yields:
+      UtmpStruct objects.
+    """
+    record_size = UtmpStruct.GetSize()
+    data = b""
+    while True:
+      chunk = file_object.read(self._CHUNK_SIZE)
+      if not chunk:
+        # A truncated record at the end of the file is ignored.
+        return
+
+      data += chunk
+      end = len(data) - len(data) % record_size
+      for offset in range(0, end, record_size):
+        yield UtmpStruct(data[offset:offset + record_size])
+      data = data[end:]
+
   def Parse(self, stat, file_object, knowledge_base):
     """Parse the wtmp file."""
     _, _ = stat, knowledge_base
     users = {}
-    wtmp = file_object.read()
-    while wtmp:
-      try:
-        record = UtmpStruct(wtmp)
-      except utils.ParsingError:
-        break
-
-      wtmp = wtmp[record.size:]
+    for record in self._ReadRecords(file_object):
       # Users only appear for USER_PROCESS events, others are system.
       if record.ut_type != 7:
         continue
@@ -278,10 +298,7 @@ class NetgroupParser(parser.FileParser):
       rdf_client.User
     """
     _, _ = stat, knowledge_base
-    lines = [
-        l.strip()
-        for l in utils.ReadFileBytesAsUnicode(file_object).splitlines()
-    ]
+    lines = (l.strip() for l in utils.ReadFileLinesAsUnicode(file_object))
     return self.ParseLines(lines)
 
 
@@ -369,9 +386,7 @@ class LinuxBaseShadowParser(parser.FileMultiParser):
     Raises:
       parser.ParseError if the parser is unable to process the line.
     """
-    lines = [
-        l.strip() for l in utils.ReadFileBytesAsUnicode(file_obj).splitlines()
-    ]
+    lines = (l.strip() for l in utils.ReadFileLinesAsUnicode(file_obj))
     try:
       for index, line in enumerate(lines):
         if line:
@@ -16,6 +16,7 @@ from future.builtins import zip
 from future.utils import iteritems
 
 from grr_response_core.lib import parser as lib_parser
+from grr_response_core.lib import utils
 from grr_response_core.lib.parsers import linux_file_parser
 from grr_response_core.lib.rdfvalues import anomaly as rdf_anomaly
 from grr_response_core.lib.rdfvalues import client as rdf_client
@@ -261,6 +262,34 @@ super_group2 (-,user7,) super_group
         "user3:1296569997000000"
     ])
 
+  def testWtmpParserReadsChunks(self):
+    parser = linux_file_parser.LinuxWtmpParser()
+    path = os.path.join(self.base_path, "VFSFixture/var/log/wtmp")
+    with open(path, "rb") as wtmp_fd:
+      wtmp = wtmp_fd.read()
+
+    # Chunks do not end at record boundaries.
+    record_size = linux_file_parser.UtmpStruct.GetSize()
+    chunk_size = record_size * 2 + 100
+    reads = []
+
+    class RecordingFile(io.BytesIO):
+
+      def read(self, size=-1):  # pylint: disable=invalid-name
+        reads.append(size)
+        return super(RecordingFile, self).read(size)
+
+    # A truncated record at the end is ignored.
+    with utils.Stubber(parser, "_CHUNK_SIZE", chunk_size):
+      out = list(parser.Parse(None, RecordingFile(wtmp + b"\x07"), None))
+
+    self.assertCountEqual([(x.username, x.last_logon) for x in out],
+                          [("user1", 1296552099000000),
+                           ("user2", 1296552102000000),
+                           ("user3", 1296569997000000)])
+    self.assertEqual(set(reads), set([chunk_size]))
+    self.assertLen(reads, len(wtmp) // chunk_size + 2)
+
 
 class LinuxShadowParserTest(test_lib.GRRBaseTest):
   """Test parsing of linux shadow files."""
@@ -68,16 +68,27 @@ class SQLiteFile(object):
         pass
 
   def Query(self, sql_query):
-    """Query the database file."""
-    results = {}
+    """Query the database file.
 
+    Rows are yielded as they are fetched from the database, so results of a
+    query over a big database are never kept in memory all at once.
+
+    Args:
+      sql_query: An SQL query to run.
+
+    Yields:
+      Tuples with values of the resulting rows.
+    """
+    connection = None
     try:
-      self._connection = sqlite.connect(self.name)
-      self._connection.execute("PRAGMA journal_mode=%s" % self.journal_mode)
-      self._cursor = self._connection.cursor()
-      results = self._cursor.execute(sql_query).fetchall()
+      connection = sqlite.connect(self.name)
+      connection.execute("PRAGMA journal_mode=%s" % self.journal_mode)
+      for row in connection.execute(sql_query):
+        yield row
 
     except sqlite.Error as error_string:
       logging.warning("SQLite error %s", error_string)
 
-    return results
+    finally:
+      if connection is not None:
+        connection.close()
@@ -86,6 +86,13 @@ class ListDirRequest(rdf_structs.RDFProtoStruct):
   ]
 
 
+class RecursiveListDirRequest(rdf_structs.RDFProtoStruct):
+  protobuf = jobs_pb2.RecursiveListDirRequest
+  rdf_deps = [
+      rdf_paths.PathSpec,
+  ]
+
+
 class GetFileStatRequest(rdf_structs.RDFProtoStruct):
 
   protobuf = jobs_pb2.GetFileStatRequest
@@ -125,6 +125,57 @@ class GrrMessage(rdf_structs.RDFProtoStruct):
     self.Set("args", None)
     self.args_age = None
 
+  # Fields of a message with packed replies which are copied to every reply
+  # unpacked from it. Everything else describes the payload.
+  _PACKED_REPLY_HEADER_FIELDS = [
+      "session_id",
+      "request_id",
+      "name",
+      "source",
+      "auth_state",
+      "type",
+      "ttl",
+      "require_fastpoll",
+      "cpu_limit",
+      "args_age",
+      "task_id",
+      "task_ttl",
+      "queue",
+      "leased_until",
+      "leased_by",
+      "network_bytes_limit",
+      "timestamp",
+  ]
+
+  def UnpackReplies(self):
+    """Returns the replies packed into this message as separate messages.
+
+    Returns:
+      A list of GrrMessages, one for every reply in the PackedReplies payload
+      of this message, numbered consecutively starting from the response_id of
+      this message. Messages without such a payload are returned as they are.
+    """
+    if self.args_rdf_name != PackedReplies.__name__:
+      return [self]
+
+    # Copying the whole message would serialize all the packed replies again
+    # for every single one of them, so only the header is copied.
+    header = [(field, self.Get(field))
+              for field in self._PACKED_REPLY_HEADER_FIELDS
+              if self.HasField(field)]
+
+    packed = self.payload
+    result = []
+    for i, reply in enumerate(packed.replies):
+      message = GrrMessage()
+      for field, value in header:
+        message.Set(field, value)
+      message.response_id = self.response_id + i
+      message.Set("args", reply)
+      message.args_rdf_name = packed.rdf_name
+      result.append(message)
+    return result
+
 
 class GrrStatus(rdf_structs.RDFProtoStruct):
   """The client status message.
@@ -199,6 +250,11 @@ class PackedMessageList(rdf_structs.RDFProtoStruct):
   ]
 
 
+class PackedReplies(rdf_structs.RDFProtoStruct):
+  """Replies of a client action sent to the server in a single message."""
+  protobuf = jobs_pb2.PackedReplies
+
+
 class MessageList(rdf_structs.RDFProtoStruct):
   protobuf = jobs_pb2.MessageList
   rdf_deps = [
@@ -9,6 +9,8 @@ from __future__ import unicode_literals
 from absl import app
 
 from grr_response_core.lib import rdfvalue
+from grr_response_core.lib.rdfvalues import flows as rdf_flows
+from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
 from grr_response_core.lib.rdfvalues import test_base as rdf_test_base
 from grr.test_lib import test_lib
 
@@ -63,6 +65,39 @@ class SessionIDTest(rdf_test_base.RDFValueTestMixin, test_lib.GRRBaseTest):
                       rdfvalue.RDFURN("aff4:/flows/A:1234567G%sdf"))
 
 
+class GrrMessageTest(test_lib.GRRBaseTest):
+
+  def testUnpackReplies(self):
+    replies = [rdf_protodict.DataBlob(string="foo%d" % i) for i in range(3)]
+    message = rdf_flows.GrrMessage(
+        session_id="aff4:/C.1234567890123456/flows/W:1",
+        request_id=2,
+        response_id=5,
+        name="Foo",
+        auth_state="AUTHENTICATED",
+        task_id=42)
+    message.payload = rdf_flows.PackedReplies(
+        rdf_name="DataBlob",
+        replies=[reply.SerializeToString() for reply in replies])
+
+    unpacked = message.UnpackReplies()
+
+    self.assertEqual([m.response_id for m in unpacked], [5, 6, 7])
+    self.assertEqual([m.payload for m in unpacked], replies)
+    for m in unpacked:
+      self.assertEqual(m.session_id, message.session_id)
+      self.assertEqual(m.request_id, 2)
+      self.assertEqual(m.name, "Foo")
+      self.assertEqual(m.auth_state, message.auth_state)
+      self.assertEqual(m.task_id, 42)
+
+  def testUnpackRepliesReturnsOtherMessagesAsTheyAre(self):
+    message = rdf_flows.GrrMessage(request_id=1, response_id=1)
+    message.payload = rdf_protodict.DataBlob(string="foo")
+
+    self.assertEqual(message.UnpackReplies(), [message])
+
+
 def main(argv):
   # Run the full test suite
   test_lib.main(argv)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""A module with RDF values wrapping timeline protobufs."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+from grr_response_core.lib.rdfvalues import structs as rdf_structs
+from grr_response_proto import timeline_pb2
+
+
+class TimelineArgs(rdf_structs.RDFProtoStruct):
+  """An RDF wrapper class for the `TimelineArgs` proto."""
+
+  protobuf = timeline_pb2.TimelineArgs
+  rdf_deps = []
+
+
+class TimelineResult(rdf_structs.RDFProtoStruct):
+  """An RDF wrapper class for the `TimelineResult` proto."""
+
+  protobuf = timeline_pb2.TimelineResult
+  rdf_deps = []
+
+
+class TimelineEntry(rdf_structs.RDFProtoStruct):
+  """An RDF wrapper class for the `TimelineEntry` proto."""
+
+  protobuf = timeline_pb2.TimelineEntry
+  rdf_deps = []
+
+
+def _NanosecondTimestamp(stat_result, name):
+  try:
+    return getattr(stat_result, "st_{}_ns".format(name))
+  except AttributeError:
+    # Python 2 has only (less precise) floating point timestamps.
+    return int(getattr(stat_result, "st_{}".format(name)) * 1e9)
+
+
+def TimelineEntryProto(path, stat_result):
+  """Creates a raw `TimelineEntry` proto for the given path.
+
+  Timelines can have millions of entries, so this creates the raw proto instead
+  of the (much slower) RDF wrapper.
+
+  Args:
+    path: A path (as bytes) of the file the entry is created for.
+    stat_result: A result of the `os.lstat` call on the path.
+
+  Returns:
+    A `timeline_pb2.TimelineEntry` instance.
+  """
+  entry = timeline_pb2.TimelineEntry()
+  entry.path = path
+  entry.mode = stat_result.st_mode
+  entry.size = stat_result.st_size
+  entry.dev = stat_result.st_dev
+  entry.ino = stat_result.st_ino
+  entry.uid = stat_result.st_uid
+  entry.gid = stat_result.st_gid
+  entry.atime_ns = _NanosecondTimestamp(stat_result, "atime")
+  entry.mtime_ns = _NanosecondTimestamp(stat_result, "mtime")
+  entry.ctime_ns = _NanosecondTimestamp(stat_result, "ctime")
+  return entry
+
+
+def SerializeTimelineEntries(entries, chunk_size):
+  """Serializes timeline entries into chunks of the compact binary format.
+
+  Every entry is written as its serialized proto preceded by a varint with its
+  length. Entries are never split between chunks, so every chunk can be
+  decoded independently.
+
+  Args:
+    entries: An iterator over `timeline_pb2.TimelineEntry` protos.
+    chunk_size: A (soft) limit on the size of a single chunk in bytes.
+
+  Yields:
+    Tuples with a chunk (as bytes) and a number of entries serialized in it.
+  """
+  chunk = []
+  size = 0
+
+  for entry in entries:
+    data = entry.SerializeToString()
+    chunk.append(rdf_structs.VarintEncode(len(data)))
+    chunk.append(data)
+    size += len(chunk[-2]) + len(data)
+
+    if size >= chunk_size:
+      yield b"".join(chunk), len(chunk) // 2
+      chunk = []
+      size = 0
+
+  if chunk:
+    yield b"".join(chunk), len(chunk) // 2
+
+
+def DeserializeTimelineEntries(chunks):
+  """Deserializes timeline entries from chunks of the compact binary format.
+
+  Args:
+    chunks: An iterator over chunks created by `SerializeTimelineEntries`.
+
+  Yields:
+    `timeline_pb2.TimelineEntry` protos.
+  """
+  for chunk in chunks:
+    pos = 0
+    while pos < len(chunk):
+      length, pos = rdf_structs.VarintReader(chunk, pos)
+      entry = timeline_pb2.TimelineEntry()
+      entry.ParseFromString(chunk[pos:pos + length])
+      pos += length
+
+      yield entry
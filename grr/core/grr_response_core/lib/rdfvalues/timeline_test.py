@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import io
+import os
+
+from absl.testing import absltest
+from future.builtins import range
+
+from grr_response_core.lib.rdfvalues import timeline as rdf_timeline
+from grr_response_core.lib.util import temp
+from grr_response_proto import timeline_pb2
+
+
+class SerializeTimelineEntriesTest(absltest.TestCase):
+
+  def _Entries(self, count):
+    for i in range(count):
+      entry = timeline_pb2.TimelineEntry()
+      entry.path = "/foo/bar/baz{}".format(i).encode("utf-8")
+      entry.size = i
+      entry.mtime_ns = i * 10**9
+      yield entry
+
+  def testEmpty(self):
+    chunks = list(rdf_timeline.SerializeTimelineEntries([], chunk_size=1024))
+    self.assertEmpty(chunks)
+
+  def testRoundTrip(self):
+    entries = list(self._Entries(100))
+
+    chunks = list(
+        rdf_timeline.SerializeTimelineEntries(entries, chunk_size=1024))
+    self.assertGreater(len(chunks), 1)
+    self.assertEqual(sum(count for _, count in chunks), 100)
+
+    results = list(
+        rdf_timeline.DeserializeTimelineEntries(chunk for chunk, _ in chunks))
+    self.assertEqual(results, entries)
+
+  def testChunksAreDecodableIndependently(self):
+    entries = list(self._Entries(100))
+
+    chunks = list(
+        rdf_timeline.SerializeTimelineEntries(entries, chunk_size=512))
+
+    results = []
+    for chunk, count in chunks:
+      chunk_results = list(rdf_timeline.DeserializeTimelineEntries([chunk]))
+      self.assertLen(chunk_results, count)
+      results.extend(chunk_results)
+    self.assertEqual(results, entries)
+
+
+class TimelineEntryProtoTest(absltest.TestCase):
+
+  def testFromStat(self):
+    with temp.AutoTempFilePath() as filepath:
+      with io.open(filepath, "wb") as filedesc:
+        filedesc.write(b"foobar")
+
+      stat_result = os.lstat(filepath)
+      entry = rdf_timeline.TimelineEntryProto(
+          filepath.encode("utf-8"), stat_result)
+
+    self.assertEqual(entry.path, filepath.encode("utf-8"))
+    self.assertEqual(entry.size, 6)
+    self.assertEqual(entry.mode, stat_result.st_mode)
+    self.assertEqual(entry.ino, stat_result.st_ino)
+    self.assertEqual(entry.dev, stat_result.st_dev)
+    self.assertEqual(entry.atime_ns // 10**9, int(stat_result.st_atime))
+    self.assertEqual(entry.mtime_ns // 10**9, int(stat_result.st_mtime))
+    self.assertEqual(entry.ctime_ns // 10**9, int(stat_result.st_ctime))
+
+
+if __name__ == "__main__":
+  absltest.main()
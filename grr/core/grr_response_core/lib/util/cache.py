@@ -6,10 +6,19 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import collections
 import functools
 import threading
+import time
+import weakref
+
+from future.builtins import str
+from future.utils import itervalues
 
 from grr_response_core.lib import rdfvalue
+from grr_response_core.lib import utils
+from grr_response_core.stats import stats_collector_instance
+from grr_response_core.stats import stats_utils
 
 WITH_LIMITED_CALL_FREQUENCY_PASS_THROUGH = False
 
@@ -115,3 +124,327 @@ def WithLimitedCallFrequency(min_time_between_calls):
     return Fn
 
   return Decorated
+
+
+def GetMetricMetadata():
+  """Returns a list of MetricMetadata for cache-related metrics."""
+  return [
+      stats_utils.CreateCounterMetadata(
+          "grr_cache_hits", fields=[("cache", str)]),
+      stats_utils.CreateCounterMetadata(
+          "grr_cache_misses", fields=[("cache", str)]),
+      stats_utils.CreateCounterMetadata(
+          "grr_cache_evictions", fields=[("cache", str)]),
+  ]
+
+
+class _CacheEntry(object):
+  """A single value stored in the cache together with its bookkeeping data."""
+
+  __slots__ = ("value", "size", "timestamp")
+
+  def __init__(self, value, size, timestamp):
+    self.value = value
+    self.size = size
+    self.timestamp = timestamp
+
+
+class _CacheShard(object):
+  """A part of the cache guarded by its own lock.
+
+  Entries are kept in an ordered dict in least-recently-used first order, so
+  eviction always pops from the front.
+  """
+
+  def __init__(self, max_size, max_bytes):
+    self.lock = threading.RLock()
+    self.entries = collections.OrderedDict()
+    self.max_size = max_size
+    self.max_bytes = max_bytes
+    self.total_bytes = 0
+
+  def Pop(self, key):
+    entry = self.entries.pop(key, None)
+    if entry is not None:
+      self.total_bytes -= entry.size
+    return entry
+
+  def Touch(self, key, entry):
+    # `OrderedDict.move_to_end` is not available on Python 2.
+    del self.entries[key]
+    self.entries[key] = entry
+
+  def Insert(self, key, entry):
+    """Inserts an entry.
+
+    Args:
+      key: The key of the entry.
+      entry: A `_CacheEntry` to insert.
+
+    Returns:
+      A tuple (replaced, evicted) with the entry previously stored under the
+      key (or None) and a list of entries evicted to fit the new one.
+    """
+    evicted = []
+
+    replaced = self.Pop(key)
+
+    if self.max_bytes is not None and entry.size > self.max_bytes:
+      # The value would not fit even into an empty shard, so it is not cached
+      # at all.
+      evicted.append(entry)
+      return replaced, evicted
+
+    self.entries[key] = entry
+    self.total_bytes += entry.size
+
+    while (len(self.entries) > self.max_size or
+           (self.max_bytes is not None and self.total_bytes > self.max_bytes)):
+      _, old_entry = self.entries.popitem(last=False)
+      self.total_bytes -= old_entry.size
+      evicted.append(old_entry)
+
+    return replaced, evicted
+
+
+class LRUCache(object):
+  """A thread-safe least-recently-used cache.
+
+  The cache can be bounded by the number of objects, by the total size of the
+  stored objects (as computed by `size_fn`) and by the age of the objects.
+  Entries are split between a number of independently locked shards (lock
+  striping), so that concurrent threads accessing different keys do not
+  contend on a single lock. Limits are enforced per shard.
+
+  If a name is given, hits, misses and evictions are reported to the stats
+  collector using the `grr_cache_*` metrics with the name as a field value.
+
+  Callers must always handle the possibility of KeyError raised from `Get`,
+  since objects may be evicted from the cache at any time.
+  """
+
+  active_caches = None
+  house_keeper_thread = None
+
+  def __init__(self,
+               max_size=10,
+               max_bytes=None,
+               size_fn=None,
+               max_age=None,
+               refresh_on_access=True,
+               num_shards=1,
+               name=None):
+    """Constructor.
+
+    Args:
+      max_size: The maximum number of objects held in the cache.
+      max_bytes: The maximum total size of objects held in the cache. If None,
+        the cache is not bounded by size.
+      size_fn: A function returning the size of a cached object. Defaults to
+        `len` when `max_bytes` is set.
+      max_age: The maximum number of seconds an object is considered alive. If
+        None, objects never expire.
+      refresh_on_access: If True, the age of an object is reset every time it
+        is accessed, so objects are kept alive as long as they are used. If
+        False, objects expire `max_age` seconds after they were put into the
+        cache.
+      num_shards: A number of independently locked parts of the cache.
+      name: An optional name used to report cache metrics.
+
+    Raises:
+      ValueError: If the arguments are out of range.
+    """
+    if max_size < 1:
+      raise ValueError("Invalid cache size: %s" % max_size)
+    if num_shards < 1 or num_shards > max_size:
+      raise ValueError("Invalid number of cache shards: %s" % num_shards)
+
+    if max_bytes is not None and size_fn is None:
+      size_fn = len
+
+    self.max_size = max_size
+    self.max_bytes = max_bytes
+    self.max_age = max_age
+    self.refresh_on_access = refresh_on_access
+    self.name = name
+    self._size_fn = size_fn
+
+    shard_max_size = -(-max_size // num_shards)
+    if max_bytes is None:
+      shard_max_bytes = None
+    else:
+      shard_max_bytes = -(-max_bytes // num_shards)
+    self._shards = [
+        _CacheShard(shard_max_size, shard_max_bytes) for _ in range(num_shards)
+    ]
+
+    if max_age is not None:
+      self._RegisterForHouseKeeping()
+
+  def _RegisterForHouseKeeping(self):
+    """Makes sure that expired objects are periodically removed."""
+
+    def HouseKeeper():
+      """A housekeeper thread which expunges old objects."""
+      if not time:
+        # This might happen when the main thread exits, we don't want to raise.
+        return
+
+      for cache in list(LRUCache.active_caches):
+        cache.ExpireOld()
+
+    if not LRUCache.house_keeper_thread:
+      LRUCache.active_caches = weakref.WeakSet()
+      # This thread is designed to never finish.
+      LRUCache.house_keeper_thread = utils.InterruptableThread(
+          name="CacheHouseKeeperThread", target=HouseKeeper)
+      LRUCache.house_keeper_thread.start()
+    LRUCache.active_caches.add(self)
+
+  def _GetShard(self, key):
+    if len(self._shards) == 1:
+      return self._shards[0]
+    return self._shards[hash(key) % len(self._shards)]
+
+  def _IsExpired(self, entry, now):
+    return self.max_age is not None and entry.timestamp + self.max_age < now
+
+  def _IncrementCounter(self, metric_name, delta=1):
+    if self.name is not None and delta:
+      stats_collector_instance.Get().IncrementCounter(
+          metric_name, delta=delta, fields=[self.name])
+
+  def _Evict(self, entries):
+    """Performs cleanup of entries that have been removed from the cache."""
+    for entry in entries:
+      self.KillObject(entry.value)
+    self._IncrementCounter("grr_cache_evictions", len(entries))
+
+  def KillObject(self, obj):
+    """Perform cleanup on objects when they expire.
+
+    Should be overridden by classes which need to perform special cleanup.
+    The method is called without holding any of the cache locks.
+
+    Args:
+      obj: The object which was stored in the cache and is now expired.
+    """
+
+  def Put(self, key, obj):
+    """Adds the object to the cache, evicting old objects if needed."""
+    size = self._size_fn(obj) if self._size_fn is not None else 0
+    entry = _CacheEntry(obj, size, time.time())
+
+    shard = self._GetShard(key)
+    with shard.lock:
+      replaced, evicted = shard.Insert(key, entry)
+
+    # Replacing a value is not an eviction. Callers often put the same object
+    # again, in which case it must not be cleaned up.
+    if replaced is not None and replaced.value is not obj:
+      self.KillObject(replaced.value)
+    self._Evict(evicted)
+    return key
+
+  def Get(self, key):
+    """Fetches the object from the cache.
+
+    Args:
+      key: The key used to access the object.
+
+    Returns:
+      Cached object.
+
+    Raises:
+      KeyError: If the object is not present in the cache or has expired.
+    """
+    now = time.time()
+    expired = None
+
+    shard = self._GetShard(key)
+    with shard.lock:
+      entry = shard.entries.get(key)
+      if entry is not None:
+        if self._IsExpired(entry, now):
+          expired = shard.Pop(key)
+          entry = None
+        else:
+          shard.Touch(key, entry)
+          if self.refresh_on_access:
+            entry.timestamp = now
+
+    if entry is None:
+      if expired is not None:
+        self._Evict([expired])
+      self._IncrementCounter("grr_cache_misses")
+      raise KeyError(key)
+
+    self._IncrementCounter("grr_cache_hits")
+    return entry.value
+
+  def Pop(self, key):
+    """Removes the object from the cache without cleaning it up."""
+    shard = self._GetShard(key)
+    with shard.lock:
+      entry = shard.Pop(key)
+
+    if entry is not None:
+      return entry.value
+
+  def ExpireObject(self, key):
+    """Expires a specific object from the cache."""
+    shard = self._GetShard(key)
+    with shard.lock:
+      entry = shard.Pop(key)
+
+    if entry is not None:
+      self.KillObject(entry.value)
+      return entry.value
+
+  def ExpireOld(self):
+    """Expires all objects older than `max_age`."""
+    if self.max_age is None:
+      return
+
+    now = time.time()
+    for shard in self._shards:
+      with shard.lock:
+        expired = [
+            key for key, entry in shard.entries.items()
+            if self._IsExpired(entry, now)
+        ]
+        evicted = [shard.Pop(key) for key in expired]
+
+      self._Evict(evicted)
+
+  def Flush(self):
+    """Flushes all objects from the cache."""
+    for shard in self._shards:
+      with shard.lock:
+        evicted = list(itervalues(shard.entries))
+        shard.entries = collections.OrderedDict()
+        shard.total_bytes = 0
+
+      for entry in evicted:
+        self.KillObject(entry.value)
+
+  @property
+  def total_bytes(self):
+    """The total size of all objects held in the cache."""
+    return sum(shard.total_bytes for shard in self._shards)
+
+  def __contains__(self, key):
+    shard = self._GetShard(key)
+    with shard.lock:
+      entry = shard.entries.get(key)
+      return entry is not None and not self._IsExpired(entry, time.time())
+
+  def __len__(self):
+    return sum(len(shard.entries) for shard in self._shards)
+
+  def __iter__(self):
+    result = []
+    for shard in self._shards:
+      with shard.lock:
+        result.extend((k, e.value) for k, e in shard.entries.items())
+    return iter(result)
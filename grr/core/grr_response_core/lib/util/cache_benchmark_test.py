@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""Micro-benchmarks comparing the LRU cache with the legacy FastStore."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import threading
+
+from absl import app
+from future.builtins import range
+import pytest
+
+from grr_response_core.lib import utils
+from grr_response_core.lib.util import cache
+from grr.test_lib import benchmark_test_lib
+from grr.test_lib import test_lib
+
+
+@pytest.mark.benchmark
+class CacheBenchmark(benchmark_test_lib.AverageMicroBenchmarks):
+  """Test performance of the cache implementations."""
+
+  REPEATS = 10
+  units = "ms"
+
+  NUM_KEYS = 10000
+  NUM_THREADS = 8
+
+  def _Caches(self):
+    return [
+        ("FastStore", utils.FastStore(max_size=self.NUM_KEYS // 2)),
+        ("LRUCache", cache.LRUCache(max_size=self.NUM_KEYS // 2)),
+        ("LRUCache (16 shards)",
+         cache.LRUCache(max_size=self.NUM_KEYS // 2, num_shards=16)),
+    ]
+
+  def testPut(self):
+    """How fast can objects be added to a full cache."""
+
+    def Put(c):
+      for i in range(self.NUM_KEYS):
+        c.Put(i, i)
+
+    for name, c in self._Caches():
+      self.TimeIt(Put, name="%s: Put" % name, c=c)
+
+  def testGet(self):
+    """How fast can objects be read from the cache, hits and misses."""
+
+    def Get(c):
+      for i in range(self.NUM_KEYS):
+        try:
+          c.Get(i)
+        except KeyError:
+          pass
+
+    for name, c in self._Caches():
+      for i in range(self.NUM_KEYS // 2):
+        c.Put(i, i)
+      self.TimeIt(Get, name="%s: Get" % name, c=c)
+
+  def testConcurrentGetAndPut(self):
+    """How well does the cache scale when used from many threads."""
+
+    def Work(c, offset):
+      for i in range(self.NUM_KEYS // self.NUM_THREADS):
+        key = (offset + i * self.NUM_THREADS) % self.NUM_KEYS
+        try:
+          c.Get(key)
+        except KeyError:
+          c.Put(key, key)
+
+    def ConcurrentGetAndPut(c):
+      threads = [
+          threading.Thread(target=Work, args=(c, i))
+          for i in range(self.NUM_THREADS)
+      ]
+      for t in threads:
+        t.start()
+      for t in threads:
+        t.join()
+
+    for name, c in self._Caches():
+      self.TimeIt(
+          ConcurrentGetAndPut, name="%s: concurrent Get/Put" % name, c=c)
+
+  def testByteBoundedPut(self):
+    """How expensive is size accounting for variable sized objects."""
+    data = [b"x" * (i % 4096) for i in range(self.NUM_KEYS)]
+
+    def Put(c):
+      for i, value in enumerate(data):
+        c.Put(i, value)
+
+    c = cache.LRUCache(max_size=self.NUM_KEYS, max_bytes=1024 * 1024)
+    self.TimeIt(Put, name="LRUCache (1 MiB): Put", c=c)
+
+
+def main(argv):
+  test_lib.main(argv)
+
+
+if __name__ == "__main__":
+  app.run(main)
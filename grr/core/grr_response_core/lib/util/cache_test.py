@@ -12,6 +12,7 @@ import mock
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib.util import cache
 from grr_response_core.lib.util import compatibility
+from grr.test_lib import stats_test_lib
 from grr.test_lib import test_lib
 
 
@@ -169,5 +170,233 @@ class WithLimitedCallFrequencyTest(absltest.TestCase):
   # passed.
 
 
+class LRUCacheTest(stats_test_lib.StatsTestMixin, absltest.TestCase):
+
+  def testGetReturnsStoredObject(self):
+    c = cache.LRUCache(max_size=10)
+    c.Put("foo", 42)
+
+    self.assertEqual(c.Get("foo"), 42)
+    self.assertIn("foo", c)
+    self.assertLen(c, 1)
+
+  def testGetRaisesOnMissingObject(self):
+    c = cache.LRUCache(max_size=10)
+
+    with self.assertRaises(KeyError):
+      c.Get("foo")
+
+  def testLeastRecentlyUsedObjectIsEvicted(self):
+    c = cache.LRUCache(max_size=3)
+    for key in ["a", "b", "c"]:
+      c.Put(key, key)
+
+    c.Get("a")
+    c.Put("d", "d")
+
+    self.assertCountEqual(list(c), [("a", "a"), ("c", "c"), ("d", "d")])
+
+  def testReplacingObjectDoesNotGrowCache(self):
+    c = cache.LRUCache(max_size=2)
+    c.Put("a", 1)
+    c.Put("a", 2)
+    c.Put("b", 3)
+
+    self.assertLen(c, 2)
+    self.assertEqual(c.Get("a"), 2)
+
+  def testByteLimitIsEnforced(self):
+    c = cache.LRUCache(max_size=100, max_bytes=10)
+    c.Put("a", b"12345")
+    c.Put("b", b"12345")
+    self.assertEqual(c.total_bytes, 10)
+
+    c.Put("c", b"123")
+
+    self.assertNotIn("a", c)
+    self.assertIn("b", c)
+    self.assertIn("c", c)
+    self.assertEqual(c.total_bytes, 8)
+
+  def testObjectLargerThanByteLimitIsNotCached(self):
+    c = cache.LRUCache(max_size=100, max_bytes=10)
+    c.Put("a", b"123")
+    c.Put("b", b"12345678901")
+
+    self.assertIn("a", c)
+    self.assertNotIn("b", c)
+    self.assertEqual(c.total_bytes, 3)
+
+  def testCustomSizeFunctionIsUsed(self):
+    c = cache.LRUCache(max_size=100, max_bytes=10, size_fn=lambda obj: obj)
+    c.Put("a", 4)
+    c.Put("b", 4)
+    c.Put("c", 4)
+
+    self.assertNotIn("a", c)
+    self.assertEqual(c.total_bytes, 8)
+
+  def testObjectsExpireAfterMaxAge(self):
+    c = cache.LRUCache(max_size=10, max_age=10)
+
+    with test_lib.FakeTime(100):
+      c.Put("foo", 42)
+
+    with test_lib.FakeTime(105):
+      self.assertEqual(c.Get("foo"), 42)
+
+    with test_lib.FakeTime(120):
+      self.assertNotIn("foo", c)
+      with self.assertRaises(KeyError):
+        c.Get("foo")
+
+  def testAccessRefreshesAgeByDefault(self):
+    c = cache.LRUCache(max_size=10, max_age=10)
+
+    with test_lib.FakeTime(100):
+      c.Put("foo", 42)
+
+    for t in [108, 116, 124]:
+      with test_lib.FakeTime(t):
+        self.assertEqual(c.Get("foo"), 42)
+
+  def testAccessDoesNotRefreshAgeIfDisabled(self):
+    c = cache.LRUCache(max_size=10, max_age=10, refresh_on_access=False)
+
+    with test_lib.FakeTime(100):
+      c.Put("foo", 42)
+
+    with test_lib.FakeTime(108):
+      self.assertEqual(c.Get("foo"), 42)
+
+    with test_lib.FakeTime(116):
+      with self.assertRaises(KeyError):
+        c.Get("foo")
+
+  def testExpireOldRemovesOnlyExpiredObjects(self):
+    killed = []
+
+    class Cache(cache.LRUCache):
+
+      def KillObject(self, obj):
+        killed.append(obj)
+
+    c = Cache(max_size=10, max_age=10)
+    with test_lib.FakeTime(100):
+      c.Put("a", 1)
+    with test_lib.FakeTime(105):
+      c.Put("b", 2)
+
+    with test_lib.FakeTime(112):
+      c.ExpireOld()
+
+    self.assertEqual(killed, [1])
+    self.assertCountEqual(list(c), [("b", 2)])
+
+  def testKillObjectIsCalledOnEvictionAndExpiry(self):
+    killed = []
+
+    class Cache(cache.LRUCache):
+
+      def KillObject(self, obj):
+        killed.append(obj)
+
+    c = Cache(max_size=2)
+    c.Put("a", 1)
+    c.Put("b", 2)
+    c.Put("c", 3)
+    c.ExpireObject("b")
+    self.assertEqual(c.Pop("c"), 3)
+    c.Put("d", 4)
+    c.Flush()
+
+    self.assertEqual(killed, [1, 2, 4])
+    self.assertEmpty(c)
+
+  def testReplacingObjectKillsOnlyDifferentObjects(self):
+    killed = []
+
+    class Cache(cache.LRUCache):
+
+      def KillObject(self, obj):
+        killed.append(obj)
+
+    foo = object()
+    bar = object()
+
+    c = Cache(max_size=10, name="test")
+    with self.assertStatsCounterDelta(
+        0, "grr_cache_evictions", fields=["test"]):
+      c.Put("a", foo)
+      c.Put("a", foo)
+      self.assertEqual(killed, [])
+
+      c.Put("a", bar)
+      self.assertEqual(killed, [foo])
+
+    self.assertIs(c.Get("a"), bar)
+
+  def testShardedCacheKeepsAllObjectsWithinLimit(self):
+    c = cache.LRUCache(max_size=1000, num_shards=8)
+    for i in range(100):
+      c.Put(i, i)
+
+    self.assertLen(c, 100)
+    for i in range(100):
+      self.assertEqual(c.Get(i), i)
+
+  def testShardedCacheIsBounded(self):
+    c = cache.LRUCache(max_size=64, num_shards=8)
+    for i in range(1000):
+      c.Put(i, i)
+
+    self.assertLessEqual(len(c), 64)
+
+  def testRaisesOnInvalidArguments(self):
+    with self.assertRaises(ValueError):
+      cache.LRUCache(max_size=0)
+
+    with self.assertRaises(ValueError):
+      cache.LRUCache(max_size=4, num_shards=8)
+
+  def testConcurrentAccess(self):
+    c = cache.LRUCache(max_size=100, num_shards=4)
+
+    def Worker(offset):
+      for i in range(1000):
+        key = (offset + i) % 150
+        c.Put(key, key)
+        try:
+          self.assertEqual(c.Get(key), key)
+        except KeyError:
+          pass
+
+    threads = [threading.Thread(target=Worker, args=(i,)) for i in range(8)]
+    for t in threads:
+      t.start()
+    for t in threads:
+      t.join()
+
+    self.assertLessEqual(len(c), 100)
+    for key, value in c:
+      self.assertEqual(key, value)
+
+  def testReportsMetrics(self):
+    c = cache.LRUCache(max_size=1, name="test")
+
+    with self.assertStatsCounterDelta(1, "grr_cache_hits", fields=["test"]):
+      with self.assertStatsCounterDelta(
+          2, "grr_cache_misses", fields=["test"]):
+        with self.assertStatsCounterDelta(
+            1, "grr_cache_evictions", fields=["test"]):
+          c.Put("a", 1)
+          c.Get("a")
+          c.Put("b", 2)
+          with self.assertRaises(KeyError):
+            c.Get("a")
+          with self.assertRaises(KeyError):
+            c.Get("c")
+
+
 if __name__ == "__main__":
   absltest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""A module with utilities for summarizing measurements."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import collections
+import math
+
+Summary = collections.namedtuple("Summary",
+                                 ["count", "mean", "p50", "p90", "p99", "max"])
+
+
+def Percentile(values, percent):
+  """Computes a percentile of given values using the nearest-rank method.
+
+  Examples:
+    >>> Percentile([4, 1, 3, 2], 50)
+    2
+
+    >>> Percentile([4, 1, 3, 2], 100)
+    4
+
+  Args:
+    values: A non-empty iterable of numbers.
+    percent: A percentile to compute, a number between 0 and 100.
+
+  Returns:
+    The smallest of the values such that at least `percent` percent of all the
+    values are less or equal to it.
+
+  Raises:
+    ValueError: If there are no values or the percentile is out of range.
+  """
+  return _Percentile(_Sorted(values), percent)
+
+
+def Summarize(values):
+  """Summarizes measurements, e.g. latencies of a series of requests.
+
+  Args:
+    values: A non-empty iterable of numbers.
+
+  Returns:
+    A `Summary` with the number of values, their mean, median, 90th and 99th
+    percentiles and maximum.
+
+  Raises:
+    ValueError: If there are no values.
+  """
+  values = _Sorted(values)
+  return Summary(
+      count=len(values),
+      mean=sum(values) / len(values),
+      p50=_Percentile(values, 50),
+      p90=_Percentile(values, 90),
+      p99=_Percentile(values, 99),
+      max=values[-1])
+
+
+def _Sorted(values):
+  """Returns a sorted list of given values, raising if there are none."""
+  values = sorted(values)
+  if not values:
+    raise ValueError("No values to summarize.")
+  return values
+
+
+def _Percentile(sorted_values, percent):
+  if not 0 <= percent <= 100:
+    raise ValueError("Invalid percentile: %s" % percent)
+  rank = int(math.ceil(percent / 100 * len(sorted_values)))
+  return sorted_values[max(rank, 1) - 1]
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+from absl.testing import absltest
+from future.builtins import range
+
+from grr_response_core.lib.util import statistics
+
+
+class PercentileTest(absltest.TestCase):
+
+  def testSingleValue(self):
+    self.assertEqual(statistics.Percentile([42], 0), 42)
+    self.assertEqual(statistics.Percentile([42], 50), 42)
+    self.assertEqual(statistics.Percentile([42], 100), 42)
+
+  def testUnsortedValues(self):
+    values = [4, 1, 3, 2]
+    self.assertEqual(statistics.Percentile(values, 25), 1)
+    self.assertEqual(statistics.Percentile(values, 50), 2)
+    self.assertEqual(statistics.Percentile(values, 51), 3)
+    self.assertEqual(statistics.Percentile(values, 100), 4)
+
+  def testIterator(self):
+    self.assertEqual(statistics.Percentile(iter(range(1, 101)), 90), 90)
+
+  def testEmpty(self):
+    with self.assertRaises(ValueError):
+      statistics.Percentile([], 50)
+
+  def testOutOfRange(self):
+    with self.assertRaises(ValueError):
+      statistics.Percentile([1, 2, 3], 101)
+
+
+class SummarizeTest(absltest.TestCase):
+
+  def testSummary(self):
+    summary = statistics.Summarize(list(range(100, 0, -1)))
+    self.assertEqual(summary.count, 100)
+    self.assertAlmostEqual(summary.mean, 50.5)
+    self.assertEqual(summary.p50, 50)
+    self.assertEqual(summary.p90, 90)
+    self.assertEqual(summary.p99, 99)
+    self.assertEqual(summary.max, 100)
+
+  def testEmpty(self):
+    with self.assertRaises(ValueError):
+      statistics.Summarize([])
+
+
+if __name__ == "__main__":
+  absltest.main()
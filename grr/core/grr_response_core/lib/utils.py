@@ -1290,3 +1290,39 @@ def ReadFileBytesAsUnicode(file_obj):
   precondition.AssertType(data, bytes)
 
   return data.decode("utf-8")
+
+
+def ReadFileLinesAsUnicode(file_obj, chunk_size=1024 * 1024):
+  """Reads lines of a file incrementally, without loading it into memory.
+
+  Lines are split on the same line endings as with `bytes.splitlines` (LF, CR
+  and CRLF) and returned without them.
+
+  Args:
+    file_obj: A file-like object to read the lines from.
+    chunk_size: A number of bytes read from the file at once.
+
+  Yields:
+    Lines of the file (as unicode strings).
+  """
+  buf = b""
+  while True:
+    data = file_obj.read(chunk_size)
+    precondition.AssertType(data, bytes)
+
+    if not data:
+      break
+
+    lines = (buf + data).splitlines(True)
+    # The last line may continue in the next chunk. The same goes for a line
+    # ending with CR, as it may be followed by LF.
+    buf = lines.pop()
+    if buf.endswith(b"\n"):
+      lines.append(buf)
+      buf = b""
+
+    for line in lines:
+      yield line.rstrip(b"\r\n").decode("utf-8")
+
+  if buf:
+    yield buf.rstrip(b"\r\n").decode("utf-8")
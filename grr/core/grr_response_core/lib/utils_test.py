@@ -5,6 +5,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import io
 import threading
 
 
@@ -305,6 +306,33 @@ class RollingMemoryStreamTest(test_lib.GRRBaseTest):
       self.stream.write(b"blah")
 
 
+class ReadFileLinesAsUnicodeTest(test_lib.GRRBaseTest):
+  """Tests for ReadFileLinesAsUnicode."""
+
+  def testEmpty(self):
+    self.assertEqual(list(utils.ReadFileLinesAsUnicode(io.BytesIO(b""))), [])
+
+  def testMatchesSplitlines(self):
+    data = b"foo\nbar\r\n\nbaz\rquux\r\nzo\xc5\xbc\xc5\x82\xc4\x85\nnorf"
+    expected = data.decode("utf-8").splitlines()
+
+    for chunk_size in range(1, len(data) + 2):
+      lines = utils.ReadFileLinesAsUnicode(
+          io.BytesIO(data), chunk_size=chunk_size)
+      self.assertEqual(list(lines), expected)
+
+  def testTrailingLineEnding(self):
+    lines = utils.ReadFileLinesAsUnicode(io.BytesIO(b"foo\r\nbar\r"))
+    self.assertEqual(list(lines), ["foo", "bar"])
+
+  def testReadsIncrementally(self):
+    filedesc = io.BytesIO(b"foo\n" * 1000)
+
+    lines = utils.ReadFileLinesAsUnicode(filedesc, chunk_size=8)
+    self.assertEqual(next(lines), "foo")
+    self.assertLess(filedesc.tell(), 16)
+
+
 def main(argv):
   test_lib.main(argv)
 
@@ -50,11 +50,13 @@ ACTION_STUB_BY_ID = {
     "Osquery": server_stubs.Osquery,
     "PlistQuery": server_stubs.PlistQuery,
     "ReadBuffer": server_stubs.ReadBuffer,
+    "RecursiveListDirectory": server_stubs.RecursiveListDirectory,
     "Segfault": server_stubs.Segfault,
     "SendFile": server_stubs.SendFile,
     "SendStartupInfo": server_stubs.SendStartupInfo,
     "StatFS": server_stubs.StatFS,
     "StatFile": server_stubs.StatFile,
+    "Timeline": server_stubs.Timeline,
     "TransferBuffer": server_stubs.TransferBuffer,
     "Uninstall": server_stubs.Uninstall,
     "UpdateAgent": server_stubs.UpdateAgent,
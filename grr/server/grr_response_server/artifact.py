@@ -26,7 +26,9 @@ from grr_response_server import data_store
 from grr_response_server import file_store
 from grr_response_server import flow
 from grr_response_server import flow_base
+from grr_response_server import parser_pool
 from grr_response_server.databases import db
+from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
 
 
 def GetKnowledgeBase(rdf_client_obj, allow_uninitialized=False):
@@ -401,31 +403,20 @@ class KnowledgeBaseInitializationFlowMixin(object):
           pass
 
 
-def ApplyParsersToResponses(parser_factory, responses, flow_obj):
-  """Parse responses with applicable parsers.
-
-  Args:
-    parser_factory: A parser factory for specific artifact.
-    responses: A list of responses from the client.
-    flow_obj: An artifact collection flow.
-
-  Returns:
-    A list of (possibly parsed) responses.
-  """
-  # We have some processors to run.
+def _ParserJob(parser_factory, responses, flow_obj):
+  """Creates a job running the parsers of an artifact on its responses."""
   knowledge_base = flow_obj.state.knowledge_base
 
-  parsed_responses = []
+  job = parser_pool.ParserJob()
 
   if parser_factory.HasSingleResponseParsers():
     for response in responses:
       for parser in parser_factory.SingleResponseParsers():
-        parsed_responses.extend(
-            parser.ParseResponse(knowledge_base, response,
-                                 flow_obj.args.path_type))
+        job.AddResponse(parser, knowledge_base, response,
+                        flow_obj.args.path_type)
 
   for parser in parser_factory.MultiResponseParsers():
-    parsed_responses.extend(parser.ParseResponses(knowledge_base, responses))
+    job.AddResponses(parser, knowledge_base, responses)
 
   has_single_file_parsers = parser_factory.HasSingleFileParsers()
   has_multi_file_parsers = parser_factory.HasMultiFileParsers()
@@ -447,15 +438,94 @@ def ApplyParsersToResponses(parser_factory, responses, flow_obj):
   if has_single_file_parsers:
     for response, filedesc in zip(responses, filedescs):
       for parser in parser_factory.SingleFileParsers():
-        parsed_responses.extend(
-            parser.ParseFile(knowledge_base, response.pathspec, filedesc))
+        job.AddFile(parser, knowledge_base, response.pathspec, filedesc)
 
   if has_multi_file_parsers:
     for parser in parser_factory.MultiFileParsers():
-      parsed_responses.extend(
-          parser.ParseFiles(knowledge_base, pathspecs, filedescs))
+      job.AddFiles(parser, knowledge_base, pathspecs, filedescs)
+
+  return job
+
 
-  return parsed_responses or responses
+def ApplyParsersToResponses(parser_factory, responses, flow_obj):
+  """Parse responses with applicable parsers.
+
+  Args:
+    parser_factory: A parser factory for specific artifact.
+    responses: A list of responses from the client.
+    flow_obj: An artifact collection flow.
+
+  Returns:
+    A list of (possibly parsed) responses.
+  """
+  job = _ParserJob(parser_factory, responses, flow_obj)
+  return parser_pool.RunJob(job) or responses
+
+
+def StartApplyingParsersToResponses(parser_factory,
+                                    responses,
+                                    flow_obj,
+                                    next_state,
+                                    request_data=None):
+  """Parses responses in the parser pool, without waiting for the results.
+
+  The (possibly parsed) responses are passed to a state of the flow, as if they
+  came from a client. Parsing fails the state if a parser fails.
+
+  Args:
+    parser_factory: A parser factory for specific artifact.
+    responses: A list of responses from the client.
+    flow_obj: A relational artifact collection flow.
+    next_state: The state of the flow to pass the responses to.
+    request_data: A dict passed to the state as `responses.request_data`.
+  """
+  job = _ParserJob(parser_factory, responses, flow_obj)
+
+  client_id = flow_obj.rdf_flow.client_id
+  flow_id = flow_obj.rdf_flow.flow_id
+  request_id = flow_obj.GetNextOutboundId()
+
+  # Responses are written from a thread of the pool, possibly before the flow
+  # is done processing, so the request can't be queued with the flow messages.
+  data_store.REL_DB.WriteFlowRequests([
+      rdf_flow_objects.FlowRequest(
+          client_id=client_id,
+          flow_id=flow_id,
+          request_id=request_id,
+          next_state=next_state,
+          request_data=request_data)
+  ])
+
+  def WriteResponses(results, error):
+    """Writes parsed responses and the status of the request."""
+    if error is None:
+      payloads = results or responses
+    else:
+      payloads = []
+
+    messages = []
+    for response_id, payload in enumerate(payloads, 1):
+      messages.append(
+          rdf_flow_objects.FlowResponse(
+              client_id=client_id,
+              flow_id=flow_id,
+              request_id=request_id,
+              response_id=response_id,
+              payload=payload))
+
+    status = rdf_flow_objects.FlowStatus(
+        client_id=client_id,
+        flow_id=flow_id,
+        request_id=request_id,
+        response_id=len(messages) + 1)
+    if error is not None:
+      status.status = rdf_flow_objects.FlowStatus.Status.ERROR
+      status.error_message = utils.SmartUnicode(error)
+    messages.append(status)
+
+    data_store.REL_DB.WriteFlowResponses(messages)
+
+  parser_pool.StartJob(job, WriteResponses)
 
 
 ARTIFACT_STORE_ROOT_URN = aff4.ROOT_URN.Add("artifact_store")
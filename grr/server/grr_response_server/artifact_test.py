@@ -9,6 +9,7 @@ import io
 import logging
 import os
 import subprocess
+import threading
 
 from absl import app
 from future.builtins import str
@@ -35,6 +36,7 @@ from grr_response_server import artifact
 from grr_response_server import artifact_registry
 from grr_response_server import data_store
 from grr_response_server import file_store
+from grr_response_server import parser_pool
 from grr_response_server import server_stubs
 from grr_response_server.aff4_objects import aff4_grr
 from grr_response_server.databases import db
@@ -126,6 +128,16 @@ class CmdProcessor(parser.CommandParser):
         type="PARSER_ANOMALY", symptom="could not parse gremlins.")
 
 
+class AuthLogParser(parser.FileParser):
+
+  output_types = ["DataBlob"]
+  supported_artifacts = ["TestFilesArtifact"]
+
+  def Parse(self, stat, file_object, knowledge_base):
+    _ = stat, knowledge_base
+    yield rdf_protodict.DataBlob(integer=len(file_object.read().splitlines()))
+
+
 class MultiProvideParser(parser.RegistryValueParser):
 
   output_types = ["Dict"]
@@ -460,6 +472,77 @@ class ArtifactFlowLinuxTest(ArtifactTest):
           self.assertEqual(user.shell, u"/bin/sh")
           self.assertEqual(user.uid, 46)
 
+  def _RunCollectorWithParserPool(self, artifact_list, client_mock):
+    """Runs the collector with parsers run in the parser pool."""
+    client_id = test_lib.TEST_CLIENT_ID
+    jobs_done = []
+    start_job = parser_pool.StartJob
+
+    def StartJob(job, callback):
+      done = threading.Event()
+
+      def Callback(results, error):
+        callback(results, error)
+        done.set()
+
+      start_job(job, Callback)
+      jobs_done.append(done)
+
+    with test_lib.ConfigOverrider({"Artifacts.parser_pool_size": 1}):
+      with utils.MultiStubber((parser_pool, "_POOL", None),
+                              (parser_pool, "StartJob", StartJob)):
+        try:
+          session_id = flow_test_lib.TestFlowHelper(
+              collectors.ArtifactCollectorFlow.__name__,
+              client_mock,
+              client_id=client_id,
+              artifact_list=artifact_list,
+              check_flow_errors=False,
+              token=self.token)
+
+          # Relational flows get parsed responses asynchronously.
+          for done in jobs_done:
+            done.wait()
+        finally:
+          parser_pool._GetPool().Stop()
+
+    if data_store.RelationalDBEnabled():
+      self.assertLen(jobs_done, 1)
+      with flow_test_lib.TestWorker(token=True) as worker:
+        flow_test_lib.ProcessDueFlowProcessingRequests(worker)
+
+      rdf_flow = data_store.REL_DB.ReadFlowObject(client_id.Basename(),
+                                                  session_id)
+      self.assertEqual(rdf_flow.flow_state, rdf_flow.FlowState.FINISHED)
+    else:
+      self.assertEmpty(jobs_done)
+
+    return flow_test_lib.GetFlowResults(client_id, session_id)
+
+  @parser_test_lib.WithParser("Cmd", CmdProcessor)
+  def testCmdArtifactWithParserPool(self):
+    client_mock = self.MockClient(
+        standard.ExecuteCommand, client_id=test_lib.TEST_CLIENT_ID)
+    with utils.Stubber(subprocess, "Popen", client_test_lib.Popen):
+      results = self._RunCollectorWithParserPool(["TestCmdArtifact"],
+                                                 client_mock)
+
+    self.assertLen(results, 2)
+    packages = [
+        p for p in results if isinstance(p, rdf_client.SoftwarePackages)
+    ]
+    self.assertLen(packages, 1)
+
+  @parser_test_lib.WithParser("AuthLog", AuthLogParser)
+  def testFilesArtifactWithParserPool(self):
+    with vfs_test_lib.VFSOverrider(rdf_paths.PathSpec.PathType.OS,
+                                   vfs_test_lib.FakeTestDataVFSHandler):
+      results = self._RunCollectorWithParserPool(["TestFilesArtifact"],
+                                                 self.client_mock)
+
+    self.assertLen(results, 1)
+    self.assertGreater(results[0].integer, 0)
+
   def testArtifactOutput(self):
     """Check we can run command based artifacts."""
     client_id = test_lib.TEST_CLIENT_ID
@@ -301,7 +301,16 @@ class GRRHTTPServer(socketserver.ThreadingMixIn, http_server.HTTPServer):
           max_queue_size=config.CONFIG["Frontend.max_queue_size"],
           message_expiry_time=config.CONFIG["Frontend.message_expiry_time"],
           max_retransmission_time=config
-          .CONFIG["Frontend.max_retransmission_time"])
+          .CONFIG["Frontend.max_retransmission_time"],
+          poll_delay_max=config.CONFIG["Frontend.poll_delay_max"],
+          poll_delay_load_threshold=config
+          .CONFIG["Frontend.poll_delay_load_threshold"],
+          long_poll_max_clients=config.CONFIG["Frontend.long_poll_max_clients"],
+          long_poll_timeout_max=config.CONFIG["Frontend.long_poll_timeout_max"],
+          long_poll_check_interval=config
+          .CONFIG["Frontend.long_poll_check_interval"],
+          pending_work_refresh_interval=config
+          .CONFIG["Frontend.pending_work_refresh_interval"])
     self.server_cert = config.CONFIG["Frontend.certificate"]
 
     (address, _) = server_address
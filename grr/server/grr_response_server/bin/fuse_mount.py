@@ -11,11 +11,13 @@ import getpass
 import logging
 import stat
 import sys
+import threading
 
 
 from absl import app
 from absl import flags
 from future.builtins import range
+from future.moves import queue
 from future.utils import iteritems
 
 # pylint: disable=unused-import,g-bad-import-order
@@ -30,6 +32,7 @@ from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import type_info
 from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import client as rdf_client
+from grr_response_core.lib.util import cache
 
 from grr_response_server import access_control
 from grr_response_server import aff4
@@ -90,6 +93,26 @@ flags.DEFINE_integer(
     "If a client side file that's not in the datastore yet"
     " is >= than this size, then store it as a sparse image.")
 
+flags.DEFINE_float(
+    "metadata_cache_ttl", 10,
+    "How long (in seconds) file attributes and directory listings read from "
+    "the datastore are cached for. 0 disables the cache.")
+
+flags.DEFINE_integer(
+    "block_cache_size", 256 * 1024 * 1024,
+    "Maximum size (in bytes) of file contents cached in memory. 0 disables "
+    "the cache.")
+
+flags.DEFINE_integer(
+    "readahead_blocks", 0,
+    "How many blocks following a sequential read are read from the datastore "
+    "along with it. Only used with the block cache. 0 disables readahead.")
+
+flags.DEFINE_integer(
+    "background_fetch_chunks", 0,
+    "How many chunks following a read of a sparse image are fetched from the "
+    "client in the background. 0 disables background fetching.")
+
 flags.DEFINE_string("username", None,
                     "Username to use for client authorization check.")
 
@@ -109,6 +132,9 @@ _DEFAULT_MODE_FILE = 33188
 # Taken from /etc/passwd
 _DEFAULT_MODE_DIRECTORY = 16877
 
+# Block size used for caching contents of objects without a chunk size.
+_DEFAULT_BLOCK_SIZE = 64 * 1024
+
 
 class GRRFuseDatastoreOnly(object):
   """We implement the FUSE methods in this class."""
@@ -119,11 +145,68 @@ class GRRFuseDatastoreOnly(object):
       "/index/client"
   ]
 
-  def __init__(self, root="/", token=None):
+  def __init__(self,
+               root="/",
+               token=None,
+               metadata_cache_ttl=0,
+               block_cache_size=0,
+               readahead_blocks=0):
+    """Create a new FUSE layer at the specified aff4 path.
+
+    Args:
+      root: String aff4 path for where we'd like to mount the FUSE layer.
+
+      token: Datastore access token.
+
+      metadata_cache_ttl: How long (in seconds) results of getattr and readdir
+      are cached for. If 0, nothing is cached.
+
+      block_cache_size: Maximum number of bytes of file contents to cache. If
+      0, contents are always read from the datastore.
+
+      readahead_blocks: How many blocks past the requested range to read from
+      the datastore when reads of a file are sequential.
+
+    """
     self.root = rdfvalue.RDFURN(root)
     self.token = token
     self.default_file_mode = _DEFAULT_MODE_FILE
     self.default_dir_mode = _DEFAULT_MODE_DIRECTORY
+    self.readahead_blocks = readahead_blocks
+
+    if metadata_cache_ttl:
+      self._stat_cache = cache.LRUCache(
+          max_size=100000,
+          max_age=metadata_cache_ttl,
+          refresh_on_access=False,
+          name="fuse_stat")
+      self._listing_cache = cache.LRUCache(
+          max_size=10000,
+          max_age=metadata_cache_ttl,
+          refresh_on_access=False,
+          name="fuse_listing")
+    else:
+      self._stat_cache = None
+      self._listing_cache = None
+
+    if block_cache_size:
+      self._block_cache = cache.LRUCache(
+          max_size=block_cache_size,
+          max_bytes=block_cache_size,
+          name="fuse_block")
+    else:
+      self._block_cache = None
+
+    # Cached blocks are keyed by a per-object generation number, which is
+    # bumped whenever all the contents of the object are refreshed from the
+    # client. Refreshes of some chunks of a sparse image (possibly by the
+    # background fetch thread) drop just the affected blocks, and are counted
+    # so that blocks read while they happen are not cached.
+    self._generations = {}
+    self._block_refreshes = {}
+    self._generations_lock = threading.Lock()
+    # End offsets of the last reads, used to detect sequential reads.
+    self._read_ends = cache.LRUCache(max_size=1000)
 
     try:
       logging.info("Making sure supplied aff4path actually exists....")
@@ -188,20 +271,34 @@ class GRRFuseDatastoreOnly(object):
     if not self._IsDir(path):
       raise fuse.FuseOSError(errno.ENOTDIR)
 
-    fd = aff4.FACTORY.Open(self.root.Add(path), token=self.token)
-
-    children = fd.ListChildren()
-
     # Make these special directories unicode to be consistent with the rest of
     # aff4.
     for directory in [u".", u".."]:
       yield directory
 
-    # ListChildren returns a generator, so we do the same.
-    for child in children:
-      # Filter out any directories we've chosen to ignore.
-      if child.Path() not in self.ignored_dirs:
-        yield child.Basename()
+    for name in self._ListChildren(path):
+      yield name
+
+  def _ListChildren(self, path):
+    """Returns names of the children of a directory, using the cache."""
+    urn = self.root.Add(path)
+    if self._listing_cache is not None:
+      try:
+        return self._listing_cache.Get(urn)
+      except KeyError:
+        pass
+
+    fd = aff4.FACTORY.Open(urn, token=self.token)
+    # Filter out any directories we've chosen to ignore.
+    names = [
+        child.Basename()
+        for child in fd.ListChildren()
+        if child.Path() not in self.ignored_dirs
+    ]
+
+    if self._listing_cache is not None:
+      self._listing_cache.Put(urn, names)
+    return names
 
   def Getattr(self, path, fh=None):
     """Performs a stat on a file or directory.
@@ -225,6 +322,23 @@ class GRRFuseDatastoreOnly(object):
     if not path:
       raise fuse.FuseOSError(errno.ENOENT)
 
+    if self._stat_cache is None:
+      return self._Getattr(path)
+
+    # Cached metadata is keyed by URNs, so that it can be invalidated when
+    # objects are refreshed from the client.
+    urn = self.root.Add(path)
+    try:
+      return dict(self._stat_cache.Get(urn))
+    except KeyError:
+      pass
+
+    result = self._Getattr(path)
+    self._stat_cache.Put(urn, result)
+    return dict(result)
+
+  def _Getattr(self, path):
+    """Performs a stat on a file or directory in the datastore."""
     if path != self.root:
       full_path = self.root.Add(path)
     else:
@@ -297,12 +411,125 @@ class GRRFuseDatastoreOnly(object):
       if length is None:
         length = fd.Get(fd.Schema.SIZE)
 
-      fd.Seek(offset)
-      return fd.Read(length)
+      if self._block_cache is None:
+        fd.Seek(offset)
+        return fd.Read(length)
+
+      return self._ReadBlocks(fd, length, offset)
     else:
       # If we don't have Read/Seek methods, we probably can't read this object.
       raise fuse.FuseOSError(errno.EIO)
 
+  def _ReadBlocks(self, fd, length, offset):
+    """Reads data from a file through the block cache.
+
+    Args:
+      fd: The AFF4 stream to read blocks missing from the cache from.
+      length: How many bytes to read.
+      offset: Offset in bytes from which reading should start.
+
+    Returns:
+      The data read.
+    """
+    length = int(length)
+    if length <= 0:
+      return b""
+
+    block_size = getattr(fd, "chunksize", _DEFAULT_BLOCK_SIZE)
+    first = offset // block_size
+    last = (offset + length - 1) // block_size
+
+    with self._generations_lock:
+      version = self._BlockVersion(fd)
+      refreshes = self._block_refreshes.get(fd.urn, 0)
+
+    blocks = {}
+    missing = []
+    for idx in range(first, last + 1):
+      try:
+        blocks[idx] = self._block_cache.Get((version, idx))
+      except KeyError:
+        missing.append(idx)
+
+    if missing:
+      end = missing[-1]
+      # If the file is read sequentially, read the following blocks as well so
+      # that subsequent reads are served from the cache.
+      try:
+        if self._read_ends.Get(fd.urn) == offset:
+          end += self.readahead_blocks
+      except KeyError:
+        pass
+
+      fd.Seek(missing[0] * block_size)
+      data = fd.Read((end - missing[0] + 1) * block_size)
+      with self._generations_lock:
+        # Blocks might be outdated if chunks were refreshed during the read.
+        cacheable = self._block_refreshes.get(fd.urn, 0) == refreshes
+        for i in range(0, len(data), block_size):
+          idx = missing[0] + i // block_size
+          block = data[i:i + block_size]
+          if cacheable:
+            self._block_cache.Put((version, idx), block)
+          # Blocks in between missing ones might have been cached already, but
+          # the ones just read are just as good.
+          if idx <= last:
+            blocks[idx] = block
+
+    self._read_ends.Put(fd.urn, offset + length)
+
+    data = b"".join(blocks.get(idx, b"") for idx in range(first, last + 1))
+    start = offset - first * block_size
+    return data[start:start + length]
+
+  def _BlockVersion(self, fd):
+    """Returns the version of an object's contents cached blocks belong to.
+
+    Must be called with the generations lock held.
+
+    Args:
+      fd: The AFF4 stream the blocks are read from.
+
+    Returns:
+      A hashable version of the contents.
+    """
+    content_last = None
+    if hasattr(fd.Schema, "CONTENT_LAST"):
+      content_last = fd.Get(fd.Schema.CONTENT_LAST)
+    return (fd.urn, content_last, self._generations.get(fd.urn, 0))
+
+  def _InvalidateContents(self, urn):
+    """Drops cached blocks of an object whose contents were refreshed."""
+    with self._generations_lock:
+      self._generations[urn] = self._generations.get(urn, 0) + 1
+
+  def _InvalidateBlocks(self, fd, length, offset):
+    """Drops cached blocks of a refreshed range of an object's contents."""
+    with self._generations_lock:
+      self._block_refreshes[fd.urn] = self._block_refreshes.get(fd.urn, 0) + 1
+      if self._block_cache is None:
+        return
+
+      block_size = getattr(fd, "chunksize", _DEFAULT_BLOCK_SIZE)
+      version = self._BlockVersion(fd)
+      for idx in range(offset // block_size,
+                       (offset + length - 1) // block_size + 1):
+        self._block_cache.Pop((version, idx))
+
+  def _InvalidateObject(self, urn):
+    """Drops cached metadata of an object refreshed from the client."""
+    children = None
+    if self._listing_cache is not None:
+      children = self._listing_cache.Pop(urn)
+      # The object might have just appeared in its directory.
+      self._listing_cache.Pop(rdfvalue.RDFURN(urn.Dirname()))
+
+    if self._stat_cache is not None:
+      self._stat_cache.Pop(urn)
+      # A refresh of a directory updates attributes of its children as well.
+      for name in children or []:
+        self._stat_cache.Pop(urn.Add(name))
+
   def RaiseReadOnlyError(self):
     """Raise an error complaining that the file system is read-only."""
     raise fuse.FuseOSError(errno.EROFS)
@@ -356,7 +583,11 @@ class GRRFuse(GRRFuseDatastoreOnly):
                ignore_cache=False,
                force_sparse_image=False,
                sparse_image_threshold=1024**3,
-               timeout=flow_utils.DEFAULT_TIMEOUT):
+               timeout=flow_utils.DEFAULT_TIMEOUT,
+               metadata_cache_ttl=0,
+               block_cache_size=0,
+               readahead_blocks=0,
+               background_fetch_chunks=0):
     """Create a new FUSE layer at the specified aff4 path.
 
     Args:
@@ -380,14 +611,32 @@ class GRRFuse(GRRFuseDatastoreOnly):
 
       timeout: How long to wait for a client to finish running a flow, maximum.
 
+      metadata_cache_ttl: How long (in seconds) results of getattr and readdir
+      are cached for. Ignored if ignore_cache is set.
+
+      block_cache_size: Maximum number of bytes of file contents to cache.
+
+      readahead_blocks: How many blocks past the requested range to read from
+      the datastore when reads of a file are sequential.
+
+      background_fetch_chunks: How many chunks following a read of a sparse
+      image to fetch from the client in the background, so that subsequent
+      sequential reads don't have to wait for the client.
+
     """
 
     self.size_threshold = sparse_image_threshold
     self.force_sparse_image = force_sparse_image
     self.timeout = timeout
+    self.background_fetch_chunks = background_fetch_chunks
+    self._fetch_queue = None
+    self._fetch_thread = None
+    self._fetching = set()
+    self._fetching_lock = threading.Lock()
 
     if ignore_cache:
       max_age_before_refresh = datetime.timedelta(0)
+      metadata_cache_ttl = 0
 
     # Cache expiry can be given as a datetime.timedelta object, but if
     # it is not we'll use the seconds specified as a flag.
@@ -397,7 +646,12 @@ class GRRFuse(GRRFuseDatastoreOnly):
     else:
       self.max_age_before_refresh = max_age_before_refresh
 
-    super(GRRFuse, self).__init__(root, token)
+    super(GRRFuse, self).__init__(
+        root,
+        token,
+        metadata_cache_ttl=metadata_cache_ttl,
+        block_cache_size=block_cache_size,
+        readahead_blocks=readahead_blocks)
 
   def DataRefreshRequired(self, path=None, last=None):
     """True if we need to update this path from the client.
@@ -471,6 +725,7 @@ class GRRFuse(GRRFuseDatastoreOnly):
     """
     if self.DataRefreshRequired(path):
       self._RunAndWaitForVFSFileUpdate(path)
+      self._InvalidateObject(self.root.Add(path))
 
     return super(GRRFuse, self).Readdir(path, fh=None)
 
@@ -512,6 +767,69 @@ class GRRFuse(GRRFuseDatastoreOnly):
         flow_name=filesystem.UpdateSparseImageChunks.__name__,
         file_urn=fd.urn,
         chunks_to_fetch=missing_chunks)
+    self._InvalidateObject(fd.urn)
+    self._InvalidateBlocks(
+        fd, (missing_chunks[-1] - missing_chunks[0] + 1) * fd.chunksize,
+        missing_chunks[0] * fd.chunksize)
+
+  def _ScheduleBackgroundFetch(self, fd, length, offset):
+    """Fetches chunks following a read of a sparse image in the background."""
+    if not self.background_fetch_chunks or length is None:
+      return
+
+    start_chunk = (offset + length) // fd.chunksize
+    key = (fd.urn, start_chunk)
+    with self._fetching_lock:
+      if key in self._fetching:
+        return
+      self._fetching.add(key)
+
+      if self._fetch_queue is None:
+        self._fetch_queue = queue.Queue()
+        self._fetch_thread = threading.Thread(
+            name="FuseBackgroundFetch",
+            target=self._BackgroundFetchLoop,
+            args=(self._fetch_queue,))
+        self._fetch_thread.daemon = True
+        self._fetch_thread.start()
+
+      self._fetch_queue.put(
+          (key, fd.urn, start_chunk * fd.chunksize,
+           self.background_fetch_chunks * fd.chunksize))
+
+  def StopBackgroundFetch(self):
+    """Stops the background fetch thread, if it is running."""
+    with self._fetching_lock:
+      fetch_queue, self._fetch_queue = self._fetch_queue, None
+      fetch_thread, self._fetch_thread = self._fetch_thread, None
+
+    if fetch_queue is not None:
+      fetch_queue.put(None)
+      fetch_thread.join()
+
+  def _BackgroundFetchLoop(self, fetch_queue):
+    while True:
+      item = fetch_queue.get()
+      if item is None:
+        return
+
+      key, urn, offset, length = item
+      try:
+        fd = aff4.FACTORY.Open(urn, token=self.token)
+        if isinstance(fd, standard.AFF4SparseImage):
+          # Sizes of sparse images are only known from the client-side stat,
+          # the stream size covers just the chunks fetched so far.
+          stat_entry = fd.Get(fd.Schema.STAT)
+          if stat_entry:
+            length = min(length, int(stat_entry.st_size) - offset)
+          if length > 0:
+            self.UpdateSparseImageIfNeeded(fd, length, offset)
+      except Exception as e:  # pylint: disable=broad-except
+        logging.warning("Background fetch of %s failed: %s", urn, e)
+      finally:
+        with self._fetching_lock:
+          self._fetching.discard(key)
+        fetch_queue.task_done()
 
   def Read(self, path, length=None, offset=0, fh=None):
     fd = aff4.FACTORY.Open(self.root.Add(path), token=self.token)
@@ -524,6 +842,7 @@ class GRRFuse(GRRFuseDatastoreOnly):
     if isinstance(fd, standard.AFF4SparseImage):
       # If we have a sparse image, update just a part of it.
       self.UpdateSparseImageIfNeeded(fd, length, offset)
+      self._ScheduleBackgroundFetch(fd, length, offset)
       # Read the file from the datastore as usual.
       return super(GRRFuse, self).Read(path, length, offset, fh)
 
@@ -558,6 +877,9 @@ class GRRFuse(GRRFuseDatastoreOnly):
       # it the usual way.
       self._RunAndWaitForVFSFileUpdate(path)
 
+    self._InvalidateObject(self.root.Add(path))
+    self._InvalidateContents(self.root.Add(path))
+
     # Read the file from the datastore as usual.
     return super(GRRFuse, self).Read(path, length, offset, fh)
 
@@ -635,7 +957,11 @@ inside your virtualenv.
       ignore_cache=flags.FLAGS.ignore_cache,
       force_sparse_image=flags.FLAGS.force_sparse_image,
       sparse_image_threshold=flags.FLAGS.sparse_image_threshold,
-      timeout=flags.FLAGS.timeout)
+      timeout=flags.FLAGS.timeout,
+      metadata_cache_ttl=flags.FLAGS.metadata_cache_ttl,
+      block_cache_size=flags.FLAGS.block_cache_size,
+      readahead_blocks=flags.FLAGS.readahead_blocks,
+      background_fetch_chunks=flags.FLAGS.background_fetch_chunks)
 
   fuse.FUSE(
       fuse_operation,
@@ -22,6 +22,7 @@ from grr_response_core.config import contexts
 from grr_response_core.config import server as config_server
 from grr_response_server import access_control
 from grr_response_server import fleetspeak_connector
+from grr_response_server import parser_pool
 from grr_response_server import server_startup
 from grr_response_server import worker_lib
 
@@ -50,6 +51,7 @@ def main(argv):
 
   fleetspeak_connector.Init()
 
+  parser_pool.Init()
 
   token = access_control.ACLToken(username="GRRWorker").SetUID()
   worker_obj = worker_lib.GRRWorker(token=token)
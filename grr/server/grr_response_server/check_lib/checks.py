@@ -8,6 +8,7 @@ import collections
 import glob
 import itertools
 import logging
+import multiprocessing
 import os
 
 
@@ -22,6 +23,7 @@ from grr_response_core.lib.rdfvalues import anomaly as rdf_anomaly
 from grr_response_core.lib.rdfvalues import client as rdf_client
 from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
 from grr_response_core.lib.rdfvalues import structs as rdf_structs
+from grr_response_core.lib.util import collection
 from grr_response_core.lib.util.compat import yaml
 from grr_response_proto import anomaly_pb2
 from grr_response_proto import checks_pb2
@@ -29,6 +31,14 @@ from grr_response_server.check_lib import filters
 from grr_response_server.check_lib import hints
 from grr_response_server.check_lib import triggers
 
+# Worker processes checking hosts are spawned rather than forked: forking a
+# multithreaded server process can leave locks held in the child. Python 2
+# can only fork.
+try:
+  _CONTEXT = multiprocessing.get_context("spawn")
+except AttributeError:
+  _CONTEXT = multiprocessing
+
 
 class Error(Exception):
   """Base error class."""
@@ -135,6 +145,17 @@ class Filter(rdf_structs.RDFProtoStruct):
     filter_name = self.type or "Filter"
     self._filter = filters.Filter.GetFilter(filter_name)
 
+  def __getstate__(self):
+    # Filter implementations keep state of the last expression they parsed,
+    # which can't always be pickled, so a new one is made when unpickling.
+    state = self.__dict__.copy()
+    del state["_filter"]
+    return state
+
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    self._filter = filters.Filter.GetFilter(self.type or "Filter")
+
   def Parse(self, rdf_data):
     """Process rdf data through the filter.
 
@@ -670,6 +691,48 @@ class CheckRegistry(object):
         results.update(chk.triggers.Artifacts(*trigger))
     return results
 
+  @classmethod
+  def _SelectChecks(cls,
+                    artifacts,
+                    os_name=None,
+                    cpe=None,
+                    labels=None,
+                    exclude_checks=None,
+                    restrict_checks=None):
+    """Identifies the checks to run on a host and the conditions they get.
+
+    Args:
+      artifacts: Names of the artifacts collected from the host.
+      os_name: 0+ OS names.
+      cpe: 0+ CPE identifiers.
+      labels: 0+ GRR labels.
+      exclude_checks: A list of check ids not to run.
+      restrict_checks: A list of check ids that may be run, if appropriate.
+
+    Returns:
+      A tuple of the host conditions and a list of (check_id, check) tuples.
+    """
+    check_ids = cls.FindChecks(artifacts, os_name, cpe, labels)
+    conditions = list(cls.Conditions(artifacts, os_name, cpe, labels))
+    selected = []
+    for check_id in check_ids:
+      # skip if check in list of excluded checks
+      if exclude_checks and check_id in exclude_checks:
+        continue
+      if restrict_checks and check_id not in restrict_checks:
+        continue
+      selected.append((check_id, cls.checks[check_id]))
+    return conditions, selected
+
+  @staticmethod
+  def _RunChecks(selected, conditions, host_data):
+    """Runs the selected checks over the host data, yielding results."""
+    for check_id, chk in selected:
+      try:
+        yield chk.Parse(conditions, host_data)
+      except ProcessingError as e:
+        logging.warning("Check ID %s raised: %s", check_id, e)
+
   @classmethod
   def Process(cls,
               host_data,
@@ -694,19 +757,59 @@ class CheckRegistry(object):
     """
     # All the conditions that apply to this host.
     artifacts = list(iterkeys(host_data))
-    check_ids = cls.FindChecks(artifacts, os_name, cpe, labels)
-    conditions = list(cls.Conditions(artifacts, os_name, cpe, labels))
-    for check_id in check_ids:
-      # skip if check in list of excluded checks
-      if exclude_checks and check_id in exclude_checks:
-        continue
-      if restrict_checks and check_id not in restrict_checks:
-        continue
-      try:
-        chk = cls.checks[check_id]
-        yield chk.Parse(conditions, host_data)
-      except ProcessingError as e:
-        logging.warning("Check ID %s raised: %s", check_id, e)
+    conditions, selected = cls._SelectChecks(
+        artifacts,
+        os_name=os_name,
+        cpe=cpe,
+        labels=labels,
+        exclude_checks=exclude_checks,
+        restrict_checks=restrict_checks)
+    for result in cls._RunChecks(selected, conditions, host_data):
+      yield result
+
+  @classmethod
+  def ProcessHosts(cls, hosts, exclude_checks=None, restrict_checks=None):
+    """Runs checks over the data of many hosts.
+
+    Hosts that have the same set of artifacts, OS, CPE and labels get the same
+    checks, so checks are selected only once for every such group of hosts.
+
+    Args:
+      hosts: An iterable of (host_id, host_data, os_name, cpe, labels) tuples.
+      exclude_checks: A list of check ids not to run. A check id in this list
+                      will not get run even if included in restrict_checks.
+      restrict_checks: A list of check ids that may be run, if appropriate.
+
+    Yields:
+      A (host_id, CheckResult) tuple for each check that was performed.
+    """
+    selections = {}
+    for host_id, host_data, os_name, cpe, labels in hosts:
+      artifacts = list(iterkeys(host_data))
+      key = (frozenset(artifacts), _Hashable(os_name), _Hashable(cpe),
+             _Hashable(labels))
+      selection = selections.get(key)
+      if selection is None:
+        selection = cls._SelectChecks(
+            artifacts,
+            os_name=os_name,
+            cpe=cpe,
+            labels=labels,
+            exclude_checks=exclude_checks,
+            restrict_checks=restrict_checks)
+        selections[key] = selection
+
+      conditions, selected = selection
+      for result in cls._RunChecks(selected, conditions, host_data):
+        yield host_id, result
+
+
+def _Hashable(arg):
+  """Converts a targeting argument into a value usable as a dict key."""
+  if (isinstance(arg, string_types) or
+      not isinstance(arg, collections.Iterable)):
+    return arg
+  return frozenset(arg)
 
 
 def CheckHost(host_data,
@@ -763,6 +866,99 @@ def CheckHost(host_data,
       exclude_checks=exclude_checks)
 
 
+def _InitCheckWorker(server_config, registered_checks):
+  """Initializes a worker process checking hosts."""
+  # Spawned processes don't inherit the configuration and the checks loaded
+  # in the parent process.
+  config.CONFIG = server_config
+  CheckRegistry.Clear()
+  for check in registered_checks:
+    CheckRegistry.RegisterCheck(
+        check, source=check.loaded_from, overwrite_if_exists=True)
+
+
+def _CheckHostBatch(args):
+  """Runs checks over a batch of hosts in a worker process."""
+  hosts, exclude_checks, restrict_checks = args
+  return list(
+      CheckRegistry.ProcessHosts(
+          hosts,
+          exclude_checks=exclude_checks,
+          restrict_checks=restrict_checks))
+
+
+def _HostTuples(hosts):
+  """Converts (host_id, host_data, labels) tuples for ProcessHosts."""
+  for host_id, host_data, labels in hosts:
+    yield host_id, host_data, host_data.get("KnowledgeBase").os, None, labels
+
+
+def CheckHosts(hosts,
+               exclude_checks=None,
+               restrict_checks=None,
+               num_processes=1,
+               batch_size=1000):
+  """Perform all checks on many hosts using acquired artifacts.
+
+  This is the fleet-wide equivalent of CheckHost: checks are selected once for
+  every group of hosts with the same artifacts and attributes, and results are
+  streamed as they are produced instead of being collected per host. Filters
+  of the selected checks are still evaluated over the data of one host at a
+  time; evaluating them over the data of a whole group at once is not done.
+
+  With more than one process, hosts are checked in batches by a pool of worker
+  processes. The workers are spawned with the configuration and the checks
+  registered in this process when the pool is created. Results of a batch are
+  yielded only once the whole batch has been checked, but batches keep the
+  order of the input.
+
+  Args:
+    hosts: An iterable of (host_id, host_data, labels) tuples. host_data is a
+      dictionary with artifact names as keys, and rdf data as values. It has to
+      contain a KnowledgeBase artifact, which is used to get the host OS.
+    exclude_checks: A list of check ids not to run. A check id in this list
+                    will not get run even if included in restrict_checks.
+    restrict_checks: A list of check ids that may be run, if appropriate.
+    num_processes: The number of worker processes to use.
+    batch_size: The number of hosts handed to a worker process at once.
+
+  Yields:
+    A (host_id, CheckResult) tuple for each check that was performed.
+  """
+  hosts = _HostTuples(hosts)
+
+  if num_processes <= 1:
+    for result in CheckRegistry.ProcessHosts(
+        hosts, exclude_checks=exclude_checks, restrict_checks=restrict_checks):
+      yield result
+    return
+
+  pool = _CONTEXT.Pool(
+      processes=num_processes,
+      initializer=_InitCheckWorker,
+      initargs=(config.CONFIG.CopyConfig(),
+                list(itervalues(CheckRegistry.checks))))
+  try:
+    # Pool.imap would consume all the hosts upfront, so only a few batches per
+    # worker are kept in flight to bound the memory used.
+    pending = collections.deque()
+    for batch in collection.Batch(hosts, batch_size):
+      pending.append(
+          pool.apply_async(_CheckHostBatch,
+                           ((batch, exclude_checks, restrict_checks),)))
+      if len(pending) >= 2 * num_processes:
+        for result in pending.popleft().get():
+          yield result
+
+    while pending:
+      for result in pending.popleft().get():
+        yield result
+    pool.close()
+  finally:
+    pool.terminate()
+    pool.join()
+
+
 def LoadConfigsFromFile(file_path):
   """Loads check definitions from a file."""
   return {d["check_id"]: d for d in yaml.ReadManyFromPath(file_path)}
@@ -5,12 +5,16 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import collections
 import os
+import pickle
 
 
 from absl import app
+from future.builtins import range
 from future.builtins import str
 from future.utils import iterkeys
+import mock
 
 from grr_response_core import config
 from grr_response_core.lib.parsers import config_file as config_file_parsers
@@ -18,6 +22,7 @@ from grr_response_core.lib.parsers import linux_cmd_parser
 from grr_response_core.lib.parsers import wmi_parser
 from grr_response_core.lib.rdfvalues import anomaly as rdf_anomaly
 from grr_response_core.lib.rdfvalues import client as rdf_client
+from grr_response_core.lib.rdfvalues import client_fs as rdf_client_fs
 from grr_response_core.lib.util.compat import yaml
 from grr_response_server.check_lib import checks
 from grr_response_server.check_lib import checks_test_lib
@@ -362,6 +367,56 @@ class ProcessHostDataTests(checks_test_lib.HostCheckTest):
     self.assertRanChecks(["SSHD-CHECK"], results)
     self.assertResultEqual(self.sshd, results["SSHD-CHECK"])
 
+  def _CheckHosts(self, **kwargs):
+    hosts = []
+    for i, host_os in enumerate(["Linux", "Windows", "Darwin"] * 4):
+      host_data = self.SetKnowledgeBase("host%d.example.org" % i, host_os,
+                                        dict(self.data))
+      hosts.append(("C.%016x" % i, host_data, None))
+
+    results = collections.defaultdict(dict)
+    for host_id, result in checks.CheckHosts(hosts, **kwargs):
+      results[host_id][result.check_id] = result
+    return results
+
+  def _AssertHostResults(self, results):
+    self.assertLen(results, 12)
+    for i in range(12):
+      host_results = results["C.%016x" % i]
+      if i % 3 == 0:
+        self.assertRanChecks(["SW-CHECK", "SSHD-CHECK"], host_results)
+        self.assertResultEqual(self.netcat, host_results["SW-CHECK"])
+        self.assertResultEqual(self.sshd, host_results["SSHD-CHECK"])
+      elif i % 3 == 1:
+        self.assertRanChecks(["SW-CHECK"], host_results)
+        self.assertResultEqual(self.windows, host_results["SW-CHECK"])
+      else:
+        self.assertRanChecks(["SSHD-CHECK"], host_results)
+        self.assertResultEqual(self.sshd, host_results["SSHD-CHECK"])
+
+  def testProcessManyHosts(self):
+    with mock.patch.object(
+        checks.CheckRegistry,
+        "FindChecks",
+        wraps=checks.CheckRegistry.FindChecks) as find_checks:
+      results = self._CheckHosts()
+
+    self._AssertHostResults(results)
+    # Checks are selected once per OS, not once per host.
+    self.assertEqual(find_checks.call_count, 3)
+
+  def testProcessManyHostsRestrictChecks(self):
+    results = self._CheckHosts(restrict_checks=["SW-CHECK"])
+
+    for host_results in results.values():
+      self.assertRanChecks(["SW-CHECK"], host_results)
+      self.assertChecksNotRun(["SSHD-CHECK"], host_results)
+
+  def testProcessManyHostsInWorkerProcesses(self):
+    results = self._CheckHosts(num_processes=2, batch_size=5)
+
+    self._AssertHostResults(results)
+
 
 class ChecksTestBase(test_lib.GRRBaseTest):
   pass
@@ -390,6 +445,19 @@ class FilterTests(ChecksTestBase):
         type="RDFFilter", expression="AttributedDict,SSHConfig")
     self.assertIsInstance(rdf_filt._filter, filters.RDFFilter)
 
+  def testUsedFiltersCanBePickled(self):
+    filt = checks.Filter(type="StatFilter", expression="uid:>0")
+    stat_entries = [
+        rdf_client_fs.StatEntry(st_uid=0),
+        rdf_client_fs.StatEntry(st_uid=1000)
+    ]
+    self.assertEqual(filt.Parse(stat_entries), stat_entries[1:])
+
+    unpickled = pickle.loads(pickle.dumps(filt))
+
+    self.assertIsInstance(unpickled._filter, filters.StatFilter)
+    self.assertEqual(unpickled.Parse(stat_entries), stat_entries[1:])
+
 
 class ProbeTest(ChecksTestBase):
   """Test 'Probe' operations."""
@@ -14,11 +14,11 @@ from future.utils import with_metaclass
 from grr_response_core.lib import objectfilter
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import registry
-from grr_response_core.lib import utils
 from grr_response_core.lib.parsers import config_file
 from grr_response_core.lib.rdfvalues import client_fs as rdf_client_fs
 from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
 from grr_response_core.lib.rdfvalues import structs as rdf_structs
+from grr_response_core.lib.util import compatibility
 
 
 class Error(Exception):
@@ -210,7 +210,7 @@ class AttrFilter(Filter):
   def ParseObjs(self, objs, expression):
     for key in self._Attrs(expression):
       # Key needs to be a string for rdfvalue.KeyValue
-      key = utils.SmartStr(key)
+      key = compatibility.NativeStr(key)
       for obj in objs:
         val = self._GetVal(obj, key)
         if val:
@@ -228,8 +228,8 @@ class ObjectFilter(Filter):
 
   def _Compile(self, expression):
     try:
-      of = objectfilter.Parser(expression).Parse()
-      return of.Compile(objectfilter.LowercaseAttributeFilterImplementation)
+      return objectfilter.CompileFilter(
+          expression, objectfilter.LowercaseAttributeFilterImplementation)
     except objectfilter.Error as e:
       raise DefinitionError(e)
 
@@ -11,7 +11,6 @@ from __future__ import unicode_literals
 from future.builtins import map
 from future.builtins import range
 from future.utils import iteritems
-from future.utils import itervalues
 from future.utils import string_types
 
 from typing import Text
@@ -24,6 +23,7 @@ from grr_response_server import aff4
 from grr_response_server import data_store
 from grr_response_server import keyword_index
 from grr_response_server.aff4_objects import aff4_grr
+from grr_response_server.databases import db
 
 
 def CreateClientIndex(token=None):
@@ -372,14 +372,16 @@ class ClientIndex(object):
 
     return start_time, filtered_keywords
 
-  def LookupClients(self, keywords):
-    """Returns a list of client URNs associated with keywords.
+  def LookupClients(self, keywords, offset=0, count=db.MAX_COUNT):
+    """Returns a list of client ids associated with keywords.
 
     Args:
       keywords: The list of keywords to search by.
+      offset: The number of matching clients to skip.
+      count: The maximum number of clients to return.
 
     Returns:
-      A list of client URNs.
+      A sorted list of client ids.
 
     Raises:
       ValueError: A string (single keyword) was passed instead of an iterable.
@@ -390,20 +392,11 @@ class ClientIndex(object):
 
     start_time, filtered_keywords = self._AnalyzeKeywords(keywords)
 
-    keyword_map = data_store.REL_DB.ListClientsForKeywords(
+    return data_store.REL_DB.ListClientsForAllKeywords(
         list(map(self._NormalizeKeyword, filtered_keywords)),
-        start_time=start_time)
-
-    results = itervalues(keyword_map)
-    relevant_set = set(next(results))
-
-    for hits in results:
-      relevant_set &= set(hits)
-
-      if not relevant_set:
-        return []
-
-    return sorted(relevant_set)
+        start_time=start_time,
+        offset=offset,
+        count=count)
 
   def ReadClientPostingLists(self, keywords):
     """Looks up all clients associated with any of the given keywords.
@@ -1322,7 +1322,8 @@ class DataStore(with_metaclass(registry.MetaclassRegistry, object)):
           self.CollectionMakeURN(
               collection_id,
               after_timestamp,
-              suffix=after_suffix or self.COLLECTION_MAX_SUFFIX)[0])
+              suffix=(self.COLLECTION_MAX_SUFFIX
+                      if after_suffix is None else after_suffix))[0])
 
     for subject, timestamp, serialized_rdf_value in self.ScanAttribute(
         str(collection_id.Add("Results")),
@@ -1389,6 +1390,30 @@ class DataStore(with_metaclass(registry.MetaclassRegistry, object)):
 
     return all_tasks[:limit]
 
+  def MultiQueueQueryTasks(self, queues):
+    """Retrieves tasks from many queues without leasing them.
+
+    Args:
+      queues: A list of task queues, usually client.Queue() for the clients
+        whose tasks are wanted.
+
+    Returns:
+      A dict mapping queues to lists of Task() objects. Queues without tasks
+      are left out.
+    """
+    result = {}
+    for queue, values in self.MultiResolvePrefix(
+        queues,
+        DataStore.QUEUE_TASK_PREDICATE_PREFIX,
+        timestamp=DataStore.ALL_TIMESTAMPS):
+      tasks = result.setdefault(queue, [])
+      for _, serialized, ts in values:
+        task = rdf_flows.GrrMessage.FromSerializedString(serialized)
+        task.leased_until = ts
+        tasks.append(task)
+
+    return result
+
   def LabelFetchAll(self, subject):
     result = []
     for attribute, _, _ in self.ResolvePrefix(subject,
@@ -888,6 +888,29 @@ class Database(with_metaclass(abc.ABCMeta, object)):
         ids.
     """
 
+  @abc.abstractmethod
+  def ListClientsForAllKeywords(self,
+                                keywords,
+                                start_time = None,
+                                offset = 0,
+                                count = MAX_COUNT):
+    """Lists the clients associated with all of the given keywords.
+
+    Unlike ListClientsForKeywords, the intersection of the keywords' client
+    lists and the pagination are done by the database, so only the requested
+    page of client ids is returned.
+
+    Args:
+      keywords: A non-empty iterable container of keyword strings to look for.
+      start_time: If set, should be an rdfvalue.RDFDatime and the function will
+        only consider keywords associated after this time.
+      offset: The number of matching client ids to skip.
+      count: The maximum number of client ids to return.
+
+    Returns:
+      A sorted list of ids of clients associated with every keyword.
+    """
+
   @abc.abstractmethod
   def RemoveClientKeyword(self, client_id, keyword):
     """Removes the association of a particular client to a keyword.
@@ -1878,6 +1901,21 @@ class Database(with_metaclass(abc.ABCMeta, object)):
       A list of ClientActionRequest objects.
     """
 
+  @abc.abstractmethod
+  def ReadClientIdsWithPendingClientActionRequests(self, min_timestamp=None):
+    """Reads ids of clients that have client action requests to lease.
+
+    A request can be leased if it is not leased or its lease has expired.
+
+    Args:
+      min_timestamp: If set, only requests that became available for leasing
+        at or after this rdfvalue.RDFDatetime, i.e. were written or had their
+        lease expire since, are considered.
+
+    Returns:
+      A set of client ids.
+    """
+
   @abc.abstractmethod
   def DeleteClientActionRequests(self, requests):
     """Deletes a list of client action requests from the db.
@@ -1943,7 +1981,11 @@ class Database(with_metaclass(abc.ABCMeta, object)):
     """
 
   @abc.abstractmethod
-  def LeaseFlowForProcessing(self, client_id, flow_id, processing_time):
+  def LeaseFlowForProcessing(self,
+                             client_id,
+                             flow_id,
+                             processing_time,
+                             cached_flow=None):
     """Marks a flow as being processed on this worker and returns it.
 
     Args:
@@ -1951,6 +1993,10 @@ class Database(with_metaclass(abc.ABCMeta, object)):
       flow_id: The id of the flow to read.
       processing_time: Duration that the worker has to finish processing before
         the flow is considered stuck.
+      cached_flow: An optional rdf_flow_objects.Flow object of this flow that
+        was released by the caller before. If the flow was not modified since
+        (its last_update_time did not change), implementations may update and
+        return this object instead of reading the stored flow.
 
     Raises:
       ValueError: The flow is already marked as being processed.
@@ -1969,6 +2015,9 @@ class Database(with_metaclass(abc.ABCMeta, object)):
     processing. If there are, the flow will not be written to the database and
     the method will return false.
 
+    If the flow is written, its last_update_time is set to the time of the
+    write.
+
     Args:
       flow_obj: The rdf_flow_objects.Flow object to return.
 
@@ -2669,6 +2718,39 @@ class Database(with_metaclass(abc.ABCMeta, object)):
       sorting order).
     """
 
+  @abc.abstractmethod
+  def ClaimHuntFileDownload(self, hunt_id, sha256_hash_id, client_id,
+                            lease_time):
+    """Claims a download of a file with a given hash within a hunt.
+
+    Only one client of a hunt at a time can hold the claim for a given hash,
+    so that clients of a hunt don't upload the same file concurrently. Claims
+    expire after the lease time, so that downloads by clients that went
+    offline are eventually taken over by other clients.
+
+    Args:
+      hunt_id: The id of the hunt.
+      sha256_hash_id: An rdf_objects.SHA256HashID of the file content.
+      client_id: The id of the client about to download the file.
+      lease_time: An rdfvalue.Duration for which the claim is held.
+
+    Returns:
+      The id of the client holding the claim. It's equal to `client_id` if
+      the claim was made (or renewed) by this call.
+    """
+
+  @abc.abstractmethod
+  def ReleaseHuntFileDownload(self, hunt_id, sha256_hash_id, client_id):
+    """Releases a claim made with `ClaimHuntFileDownload`.
+
+    Does nothing if the claim is not held by the given client.
+
+    Args:
+      hunt_id: The id of the hunt.
+      sha256_hash_id: An rdf_objects.SHA256HashID of the file content.
+      client_id: The id of the client holding the claim.
+    """
+
   @abc.abstractmethod
   def WriteSignedBinaryReferences(self, binary_id, references):
     """Writes blob references for a signed binary to the DB.
@@ -2928,6 +3010,26 @@ class DatabaseValidationWrapper(Database):
       precondition.AssertIterableType(value, Text)
     return result
 
+  def ListClientsForAllKeywords(self,
+                                keywords,
+                                start_time = None,
+                                offset = 0,
+                                count = MAX_COUNT):
+    precondition.AssertIterableType(keywords, Text)
+    keywords = set(keywords)
+    if not keywords:
+      raise ValueError("At least one keyword is required.")
+
+    if start_time:
+      _ValidateTimestamp(start_time)
+    precondition.AssertType(offset, int)
+    precondition.AssertType(count, int)
+
+    result = self.delegate.ListClientsForAllKeywords(
+        keywords, start_time=start_time, offset=offset, count=count)
+    precondition.AssertIterableType(result, Text)
+    return result
+
   def RemoveClientKeyword(self, client_id, keyword):
     _ValidateClientId(client_id)
     precondition.AssertType(keyword, Text)
@@ -3438,6 +3540,12 @@ class DatabaseValidationWrapper(Database):
     _ValidateClientId(client_id)
     return self.delegate.ReadAllClientActionRequests(client_id)
 
+  def ReadClientIdsWithPendingClientActionRequests(self, min_timestamp=None):
+    if min_timestamp is not None:
+      _ValidateTimestamp(min_timestamp)
+    return self.delegate.ReadClientIdsWithPendingClientActionRequests(
+        min_timestamp=min_timestamp)
+
   def DeleteClientActionRequests(self, requests):
     for request in requests:
       precondition.AssertType(request, rdf_flows.ClientActionRequest)
@@ -3475,12 +3583,18 @@ class DatabaseValidationWrapper(Database):
     _ValidateFlowId(flow_id)
     return self.delegate.ReadChildFlowObjects(client_id, flow_id)
 
-  def LeaseFlowForProcessing(self, client_id, flow_id, processing_time):
+  def LeaseFlowForProcessing(self,
+                             client_id,
+                             flow_id,
+                             processing_time,
+                             cached_flow=None):
     _ValidateClientId(client_id)
     _ValidateFlowId(flow_id)
     _ValidateDuration(processing_time)
-    return self.delegate.LeaseFlowForProcessing(client_id, flow_id,
-                                                processing_time)
+    if cached_flow is not None:
+      precondition.AssertType(cached_flow, rdf_flow_objects.Flow)
+    return self.delegate.LeaseFlowForProcessing(
+        client_id, flow_id, processing_time, cached_flow=cached_flow)
 
   def ReleaseProcessedFlow(self, flow_obj):
     precondition.AssertType(flow_obj, rdf_flow_objects.Flow)
@@ -3916,6 +4030,22 @@ class DatabaseValidationWrapper(Database):
     _ValidateHuntId(hunt_id)
     return self.delegate.ReadHuntFlowsStatesAndTimestamps(hunt_id)
 
+  def ClaimHuntFileDownload(self, hunt_id, sha256_hash_id, client_id,
+                            lease_time):
+    _ValidateHuntId(hunt_id)
+    _ValidateSHA256HashID(sha256_hash_id)
+    _ValidateClientId(client_id)
+    _ValidateDuration(lease_time)
+    return self.delegate.ClaimHuntFileDownload(hunt_id, sha256_hash_id,
+                                               client_id, lease_time)
+
+  def ReleaseHuntFileDownload(self, hunt_id, sha256_hash_id, client_id):
+    _ValidateHuntId(hunt_id)
+    _ValidateSHA256HashID(sha256_hash_id)
+    _ValidateClientId(client_id)
+    return self.delegate.ReleaseHuntFileDownload(hunt_id, sha256_hash_id,
+                                                 client_id)
+
   def WriteSignedBinaryReferences(self, binary_id, references):
     precondition.AssertType(binary_id, rdf_objects.SignedBinaryID)
     precondition.AssertType(references, rdf_objects.BlobReferences)
@@ -747,6 +747,60 @@ class DatabaseTestClientsMixin(object):
     self.assertEqual(res["hostname1"], [])
     self.assertEqual(res["hostname2"], [client_id])
 
+  def testListClientsForAllKeywords(self):
+    d = self.db
+    client_ids = [
+        db_test_utils.InitializeClient(self.db, "C.%016x" % i)
+        for i in range(1, 6)
+    ]
+    for i, client_id in enumerate(client_ids):
+      d.AddClientKeywords(client_id, ["machine", "group-%d" % (i % 2)])
+    d.AddClientKeywords(client_ids[4], ["🚀"])
+
+    self.assertEqual(d.ListClientsForAllKeywords(["machine"]), client_ids)
+    self.assertEqual(
+        d.ListClientsForAllKeywords(["machine", "group-0"]),
+        client_ids[0::2])
+    self.assertEqual(
+        d.ListClientsForAllKeywords(["group-0", "🚀"]), [client_ids[4]])
+    self.assertEqual(d.ListClientsForAllKeywords(["group-1", "🚀"]), [])
+    self.assertEqual(d.ListClientsForAllKeywords(["machine", "missing"]), [])
+
+  def testListClientsForAllKeywordsPagination(self):
+    d = self.db
+    client_ids = [
+        db_test_utils.InitializeClient(self.db, "C.%016x" % i)
+        for i in range(1, 6)
+    ]
+    for client_id in client_ids:
+      d.AddClientKeywords(client_id, ["machine", "joe"])
+
+    self.assertEqual(
+        d.ListClientsForAllKeywords(["machine", "joe"], offset=1, count=2),
+        client_ids[1:3])
+    self.assertEqual(
+        d.ListClientsForAllKeywords(["machine", "joe"], offset=4, count=2),
+        client_ids[4:])
+    self.assertEqual(
+        d.ListClientsForAllKeywords(["machine", "joe"], offset=5), [])
+
+  def testListClientsForAllKeywordsTimeRanges(self):
+    d = self.db
+    client_id = db_test_utils.InitializeClient(self.db)
+
+    d.AddClientKeywords(client_id, ["hostname1"])
+    change_time = rdfvalue.RDFDatetime.Now()
+    d.AddClientKeywords(client_id, ["hostname2"])
+
+    self.assertEqual(
+        d.ListClientsForAllKeywords(["hostname2"], start_time=change_time),
+        [client_id])
+    self.assertEqual(
+        d.ListClientsForAllKeywords(["hostname1", "hostname2"],
+                                    start_time=change_time), [])
+    self.assertEqual(
+        d.ListClientsForAllKeywords(["hostname1", "hostname2"]), [client_id])
+
   def testRemoveClientKeyword(self):
     d = self.db
     client_id = db_test_utils.InitializeClient(self.db)
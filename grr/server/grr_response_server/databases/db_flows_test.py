@@ -18,6 +18,7 @@ from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import client as rdf_client
 from grr_response_core.lib.rdfvalues import flows as rdf_flows
+from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
 from grr_response_core.lib.util import compatibility
 from grr_response_server import flow
 from grr_response_server.databases import db
@@ -170,6 +171,47 @@ class DatabaseTestFlowMixin(object):
 
       self.assertLen(leased, 10)
 
+  def testReadClientIdsWithPendingClientActionRequests(self):
+    client_id_1, flow_id_1 = self._SetupClientAndFlow(u"C.1234567890123456")
+    client_id_2, flow_id_2 = self._SetupClientAndFlow(u"C.1234567890123457")
+    self.assertEmpty(self.db.ReadClientIdsWithPendingClientActionRequests())
+
+    t0 = rdfvalue.RDFDatetime.FromSecondsSinceEpoch(100000)
+    with test_lib.FakeTime(t0):
+      for client_id, flow_id in [(client_id_1, flow_id_1),
+                                 (client_id_2, flow_id_2)]:
+        self.db.WriteFlowRequests([
+            rdf_flow_objects.FlowRequest(
+                client_id=client_id, flow_id=flow_id, request_id=1)
+        ])
+        self.db.WriteClientActionRequests([
+            rdf_flows.ClientActionRequest(
+                client_id=client_id, flow_id=flow_id, request_id=1)
+        ])
+
+    t1 = rdfvalue.RDFDatetime.FromSecondsSinceEpoch(100000 + 100)
+    with test_lib.FakeTime(t1):
+      self.assertEqual(self.db.ReadClientIdsWithPendingClientActionRequests(),
+                       {client_id_1, client_id_2})
+      self.assertEqual(
+          self.db.ReadClientIdsWithPendingClientActionRequests(
+              min_timestamp=t0), {client_id_1, client_id_2})
+      self.assertEmpty(
+          self.db.ReadClientIdsWithPendingClientActionRequests(
+              min_timestamp=t1))
+
+      self.db.LeaseClientActionRequests(
+          client_id_1, lease_time=rdfvalue.Duration("100s"))
+      self.assertEqual(self.db.ReadClientIdsWithPendingClientActionRequests(),
+                       {client_id_2})
+
+    # The lease expired after t1, so the request is available again.
+    t2 = rdfvalue.RDFDatetime.FromSecondsSinceEpoch(100000 + 300)
+    with test_lib.FakeTime(t2):
+      self.assertEqual(
+          self.db.ReadClientIdsWithPendingClientActionRequests(
+              min_timestamp=t1), {client_id_1})
+
   def testClientActionRequestsTTL(self):
     client_id, flow_id = self._SetupClientAndFlow()
     flow_requests = []
@@ -1310,6 +1352,54 @@ class DatabaseTestFlowMixin(object):
 
     self.assertFalse(self.db.ReleaseProcessedFlow(processed_flow))
 
+  def testReleaseProcessedFlowSetsLastUpdateTime(self):
+    client_id, flow_id = self._SetupClientAndFlow()
+    processing_time = rdfvalue.Duration("60s")
+
+    processed_flow = self.db.LeaseFlowForProcessing(client_id, flow_id,
+                                                    processing_time)
+    self.assertTrue(self.db.ReleaseProcessedFlow(processed_flow))
+
+    read_flow = self.db.ReadFlowObject(client_id, flow_id)
+    self.assertEqual(processed_flow.last_update_time,
+                     read_flow.last_update_time)
+
+  def testLeaseFlowForProcessingWithCachedFlow(self):
+    client_id, flow_id = self._SetupClientAndFlow()
+    processing_time = rdfvalue.Duration("60s")
+
+    processed_flow = self.db.LeaseFlowForProcessing(client_id, flow_id,
+                                                    processing_time)
+    processed_flow.next_request_to_process = 2
+    processed_flow.persistent_data = rdf_protodict.AttributedDict(foo="bar")
+    self.assertTrue(self.db.ReleaseProcessedFlow(processed_flow))
+
+    leased_flow = self.db.LeaseFlowForProcessing(
+        client_id, flow_id, processing_time, cached_flow=processed_flow)
+    self.assertEqual(leased_flow.next_request_to_process, 2)
+    self.assertEqual(leased_flow.persistent_data.foo, "bar")
+    self.assertEqual(leased_flow.processing_on, utils.ProcessIdString())
+    self.assertTrue(self.db.ReleaseProcessedFlow(leased_flow))
+
+  def testLeaseFlowForProcessingWithOutdatedCachedFlow(self):
+    client_id, flow_id = self._SetupClientAndFlow()
+    processing_time = rdfvalue.Duration("60s")
+
+    processed_flow = self.db.LeaseFlowForProcessing(client_id, flow_id,
+                                                    processing_time)
+    self.assertTrue(self.db.ReleaseProcessedFlow(processed_flow))
+    cached_flow = processed_flow.Copy()
+
+    # The flow is modified by someone else after it was released.
+    processed_flow = self.db.LeaseFlowForProcessing(client_id, flow_id,
+                                                    processing_time)
+    processed_flow.persistent_data = rdf_protodict.AttributedDict(foo="bar")
+    self.assertTrue(self.db.ReleaseProcessedFlow(processed_flow))
+
+    leased_flow = self.db.LeaseFlowForProcessing(
+        client_id, flow_id, processing_time, cached_flow=cached_flow)
+    self.assertEqual(leased_flow.persistent_data.foo, "bar")
+
   def testReadChildFlows(self):
     client_id = u"C.1234567890123456"
     self.db.WriteClientMetadata(client_id, fleetspeak_enabled=False)
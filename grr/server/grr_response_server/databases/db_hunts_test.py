@@ -24,6 +24,7 @@ from grr_response_server.rdfvalues import flow_runner as rdf_flow_runner
 from grr_response_server.rdfvalues import hunt_objects as rdf_hunt_objects
 from grr_response_server.rdfvalues import objects as rdf_objects
 from grr_response_server.rdfvalues import output_plugin as rdf_output_plugin
+from grr.test_lib import test_lib
 
 
 class DatabaseTestHuntMixin(object):
@@ -1521,4 +1522,112 @@ class DatabaseTestHuntMixin(object):
     self.assertLen(results, 1)
 
 
+  def testClaimHuntFileDownloadReturnsClaimingClient(self):
+    hunt_obj = rdf_hunt_objects.Hunt(description="foo")
+    self.db.WriteHuntObject(hunt_obj)
+    hash_id = rdf_objects.SHA256HashID.FromData(b"foo")
+
+    result = self.db.ClaimHuntFileDownload(hunt_obj.hunt_id, hash_id,
+                                           "C.0000000000000001",
+                                           rdfvalue.Duration("1h"))
+    self.assertEqual(result, "C.0000000000000001")
+
+    # Claiming again by the same client renews the claim.
+    result = self.db.ClaimHuntFileDownload(hunt_obj.hunt_id, hash_id,
+                                           "C.0000000000000001",
+                                           rdfvalue.Duration("1h"))
+    self.assertEqual(result, "C.0000000000000001")
+
+    result = self.db.ClaimHuntFileDownload(hunt_obj.hunt_id, hash_id,
+                                           "C.0000000000000002",
+                                           rdfvalue.Duration("1h"))
+    self.assertEqual(result, "C.0000000000000001")
+
+  def testClaimHuntFileDownloadIsPerHuntAndHash(self):
+    hunt_obj_1 = rdf_hunt_objects.Hunt(description="foo")
+    self.db.WriteHuntObject(hunt_obj_1)
+    hunt_obj_2 = rdf_hunt_objects.Hunt(description="bar")
+    self.db.WriteHuntObject(hunt_obj_2)
+
+    hash_id_1 = rdf_objects.SHA256HashID.FromData(b"foo")
+    hash_id_2 = rdf_objects.SHA256HashID.FromData(b"bar")
+
+    self.db.ClaimHuntFileDownload(hunt_obj_1.hunt_id, hash_id_1,
+                                  "C.0000000000000001", rdfvalue.Duration("1h"))
+
+    result = self.db.ClaimHuntFileDownload(hunt_obj_1.hunt_id, hash_id_2,
+                                           "C.0000000000000002",
+                                           rdfvalue.Duration("1h"))
+    self.assertEqual(result, "C.0000000000000002")
+
+    result = self.db.ClaimHuntFileDownload(hunt_obj_2.hunt_id, hash_id_1,
+                                           "C.0000000000000002",
+                                           rdfvalue.Duration("1h"))
+    self.assertEqual(result, "C.0000000000000002")
+
+  def testClaimHuntFileDownloadTakesOverExpiredClaims(self):
+    hunt_obj = rdf_hunt_objects.Hunt(description="foo")
+    self.db.WriteHuntObject(hunt_obj)
+    hash_id = rdf_objects.SHA256HashID.FromData(b"foo")
+
+    with test_lib.FakeTime(rdfvalue.RDFDatetime.FromSecondsSinceEpoch(1000)):
+      self.db.ClaimHuntFileDownload(hunt_obj.hunt_id, hash_id,
+                                    "C.0000000000000001",
+                                    rdfvalue.Duration("1h"))
+
+    with test_lib.FakeTime(rdfvalue.RDFDatetime.FromSecondsSinceEpoch(2000)):
+      result = self.db.ClaimHuntFileDownload(hunt_obj.hunt_id, hash_id,
+                                             "C.0000000000000002",
+                                             rdfvalue.Duration("1h"))
+      self.assertEqual(result, "C.0000000000000001")
+
+    with test_lib.FakeTime(rdfvalue.RDFDatetime.FromSecondsSinceEpoch(5000)):
+      result = self.db.ClaimHuntFileDownload(hunt_obj.hunt_id, hash_id,
+                                             "C.0000000000000002",
+                                             rdfvalue.Duration("1h"))
+      self.assertEqual(result, "C.0000000000000002")
+
+      result = self.db.ClaimHuntFileDownload(hunt_obj.hunt_id, hash_id,
+                                             "C.0000000000000001",
+                                             rdfvalue.Duration("1h"))
+      self.assertEqual(result, "C.0000000000000002")
+
+  def testReleaseHuntFileDownload(self):
+    hunt_obj = rdf_hunt_objects.Hunt(description="foo")
+    self.db.WriteHuntObject(hunt_obj)
+    hash_id = rdf_objects.SHA256HashID.FromData(b"foo")
+
+    self.db.ClaimHuntFileDownload(hunt_obj.hunt_id, hash_id,
+                                  "C.0000000000000001", rdfvalue.Duration("1h"))
+
+    # Releasing a claim held by another client does nothing.
+    self.db.ReleaseHuntFileDownload(hunt_obj.hunt_id, hash_id,
+                                    "C.0000000000000002")
+    result = self.db.ClaimHuntFileDownload(hunt_obj.hunt_id, hash_id,
+                                           "C.0000000000000002",
+                                           rdfvalue.Duration("1h"))
+    self.assertEqual(result, "C.0000000000000001")
+
+    self.db.ReleaseHuntFileDownload(hunt_obj.hunt_id, hash_id,
+                                    "C.0000000000000001")
+    result = self.db.ClaimHuntFileDownload(hunt_obj.hunt_id, hash_id,
+                                           "C.0000000000000002",
+                                           rdfvalue.Duration("1h"))
+    self.assertEqual(result, "C.0000000000000002")
+
+  def testDeleteHuntObjectDeletesFileDownloadClaims(self):
+    hunt_obj = rdf_hunt_objects.Hunt(description="foo")
+    self.db.WriteHuntObject(hunt_obj)
+    hash_id = rdf_objects.SHA256HashID.FromData(b"foo")
+
+    self.db.ClaimHuntFileDownload(hunt_obj.hunt_id, hash_id,
+                                  "C.0000000000000001", rdfvalue.Duration("1h"))
+    self.db.DeleteHuntObject(hunt_obj.hunt_id)
+
+    self.db.WriteHuntObject(hunt_obj)
+    result = self.db.ClaimHuntFileDownload(hunt_obj.hunt_id, hash_id,
+                                           "C.0000000000000002",
+                                           rdfvalue.Duration("1h"))
+    self.assertEqual(result, "C.0000000000000002")
+
 # This file is a test library and thus does not require a __main__ block.
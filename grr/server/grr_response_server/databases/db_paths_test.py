@@ -6,6 +6,7 @@ from __future__ import unicode_literals
 
 import hashlib
 
+from future.builtins import range
 from future.utils import itervalues
 
 from grr_response_core.lib import rdfvalue
@@ -342,6 +343,26 @@ class DatabaseTestPathsMixin(object):
     self.assertEqual(foobarbaz.components, ["foo", "bar", "baz"])
     self.assertFalse(foobarbaz.directory)
 
+  def testWritePathInfosManySharedAncestors(self):
+    client_id = db_test_utils.InitializeClient(self.db)
+
+    path_infos = []
+    for i in range(10):
+      for j in range(10):
+        components = ["foo", "bar%d" % i, "baz%d" % j]
+        path_infos.append(rdf_objects.PathInfo.OS(components=components))
+    self.db.WritePathInfos(client_id, path_infos)
+
+    results = self.db.ListDescendentPathInfos(
+        client_id, rdf_objects.PathInfo.PathType.OS, components=())
+    self.assertLen(results, 1 + 10 + 100)
+
+    directories = [tuple(result.components) for result in results
+                   if result.directory]
+    self.assertCountEqual(directories, [("foo",)] + [
+        ("foo", "bar%d" % i) for i in range(10)
+    ])
+
   def testWritePathInfosTypeSeparated(self):
     client_id = db_test_utils.InitializeClient(self.db)
 
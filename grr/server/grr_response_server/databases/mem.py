@@ -56,6 +56,7 @@ class InMemoryDB(mem_artifacts.InMemoryDBArtifactsMixin,
     self.clients = {}
     self.client_action_requests = {}
     self.client_action_request_leases = {}
+    self.client_action_request_timestamps = {}
     self.client_stats = collections.defaultdict(collections.OrderedDict)
     self.crash_history = {}
     self.cronjob_leases = {}
@@ -105,6 +106,7 @@ class InMemoryDB(mem_artifacts.InMemoryDBArtifactsMixin,
     self.api_audit_entries = []
     self.hunts = {}
     self.hunt_output_plugins_states = {}
+    self.hunt_file_download_claims = {}
     self.signed_binary_references = {}
     self.client_graph_series = {}
 
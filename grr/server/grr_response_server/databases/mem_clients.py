@@ -227,6 +227,33 @@ class InMemoryDBClientMixin(object):
         res[kw].append(client_id)
     return res
 
+  @utils.Synchronized
+  def ListClientsForAllKeywords(self,
+                                keywords,
+                                start_time=None,
+                                offset=0,
+                                count=db.MAX_COUNT):
+    """Lists the clients associated with all of the given keywords."""
+    # Intersecting the shortest posting lists first keeps the candidate set
+    # small and lets us stop as soon as it gets empty.
+    postings = sorted((self.keywords.get(kw, {}) for kw in keywords), key=len)
+
+    result = set()
+    for client_id, timestamp in iteritems(postings[0]):
+      if start_time is None or timestamp >= start_time:
+        result.add(client_id)
+
+    for posting in postings[1:]:
+      if not result:
+        break
+      result = {
+          client_id for client_id in result
+          if client_id in posting and
+          (start_time is None or posting[client_id] >= start_time)
+      }
+
+    return sorted(result)[offset:offset + count]
+
   @utils.Synchronized
   def RemoveClientKeyword(self, client_id, keyword):
     """Removes the association of a particular client to a keyword."""
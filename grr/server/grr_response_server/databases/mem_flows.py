@@ -152,6 +152,26 @@ class InMemoryDBFlowMixin(object):
     key = (client_id, flow_id, request_id)
     self.client_action_requests.pop(key, None)
     self.client_action_request_leases.pop(key, None)
+    self.client_action_request_timestamps.pop(key, None)
+
+  @utils.Synchronized
+  def ReadClientIdsWithPendingClientActionRequests(self, min_timestamp=None):
+    """Reads ids of clients that have client action requests to lease."""
+    now = rdfvalue.RDFDatetime.Now()
+
+    res = set()
+    for key in self.client_action_requests:
+      available_since = self.client_action_request_timestamps[key]
+      lease = self.client_action_request_leases.get(key)
+      if lease is not None:
+        if lease[0] >= now:
+          continue
+        available_since = max(available_since, lease[0])
+
+      if min_timestamp is None or available_since >= min_timestamp:
+        res.add(key[0])
+
+    return res
 
   @utils.Synchronized
   def DeleteClientActionRequests(self, requests):
@@ -217,9 +237,11 @@ class InMemoryDBFlowMixin(object):
                        ]
         raise db.AtLeastOneUnknownRequestError(request_keys)
 
+    now = rdfvalue.RDFDatetime.Now()
     for r in requests:
       request_key = (r.client_id, r.flow_id, r.request_id)
       self.client_action_requests[request_key] = r
+      self.client_action_request_timestamps[request_key] = now
 
   @utils.Synchronized
   def WriteFlowObject(self, flow_obj):
@@ -266,8 +288,15 @@ class InMemoryDBFlowMixin(object):
     return res
 
   @utils.Synchronized
-  def LeaseFlowForProcessing(self, client_id, flow_id, processing_time):
+  def LeaseFlowForProcessing(self,
+                             client_id,
+                             flow_id,
+                             processing_time,
+                             cached_flow=None):
     """Marks a flow as being processed on this worker and returns it."""
+    # Copying stored flows is cheap, so cached flows are not reused here.
+    del cached_flow  # Unused.
+
     rdf_flow = self.ReadFlowObject(client_id, flow_id)
     # TODO(user): remove the check for a legacy hunt prefix as soon as
     # AFF4 is gone.
@@ -505,6 +534,7 @@ class InMemoryDBFlowMixin(object):
     """Reads all requests for a flow that can be processed by the worker."""
     request_dict = self.flow_requests.get((client_id, flow_id), {})
     response_dict = self.flow_responses.get((client_id, flow_id), {})
+    now = rdfvalue.RDFDatetime.Now()
 
     res = {}
     for request_id in sorted(request_dict):
@@ -515,7 +545,10 @@ class InMemoryDBFlowMixin(object):
       if request_id != next_needed_request:
         break
       request = request_dict[request_id]
-      if not request.needs_processing:
+      # Delayed requests (see `FlowBase.CallState`) don't wait for responses,
+      # they are ready once their start time has passed.
+      if not request.needs_processing and not (request.start_time and
+                                               request.start_time <= now):
         break
 
       responses = sorted(
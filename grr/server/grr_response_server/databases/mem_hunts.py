@@ -110,6 +110,10 @@ class InMemoryDBHuntMixin(object):
     except KeyError:
       raise db.UnknownHuntError(hunt_id)
 
+    for key in list(self.hunt_file_download_claims):
+      if key[0] == hunt_id:
+        del self.hunt_file_download_claims[key]
+
   @utils.Synchronized
   def ReadHuntObject(self, hunt_id):
     """Reads a hunt object from the database."""
@@ -322,6 +326,31 @@ class InMemoryDBHuntMixin(object):
 
     return result
 
+  @utils.Synchronized
+  def ClaimHuntFileDownload(self, hunt_id, sha256_hash_id, client_id,
+                            lease_time):
+    """Claims a download of a file with a given hash within a hunt."""
+    key = (hunt_id, sha256_hash_id.AsBytes())
+    now = rdfvalue.RDFDatetime.Now()
+
+    claim = self.hunt_file_download_claims.get(key)
+    if claim is not None:
+      claimed_by, expiry_time = claim
+      if claimed_by != client_id and expiry_time > now:
+        return claimed_by
+
+    self.hunt_file_download_claims[key] = (client_id, now + lease_time)
+    return client_id
+
+  @utils.Synchronized
+  def ReleaseHuntFileDownload(self, hunt_id, sha256_hash_id, client_id):
+    """Releases a claim made with `ClaimHuntFileDownload`."""
+    key = (hunt_id, sha256_hash_id.AsBytes())
+
+    claim = self.hunt_file_download_claims.get(key)
+    if claim is not None and claim[0] == client_id:
+      del self.hunt_file_download_claims[key]
+
   @utils.Synchronized
   def ReadHuntOutputPluginLogEntries(self,
                                      hunt_id,
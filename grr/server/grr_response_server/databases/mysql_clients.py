@@ -568,6 +568,39 @@ class MySQLDBClientMixin(object):
       result[hash_to_kw[kw_hash]].append(db_utils.IntToClientID(cid))
     return result
 
+  @mysql_utils.WithTransaction(readonly=True)
+  def ListClientsForAllKeywords(self,
+                                keywords,
+                                start_time=None,
+                                offset=0,
+                                count=db.MAX_COUNT,
+                                cursor=None):
+    """Lists the clients associated with all of the given keywords."""
+    keyword_hashes = set(mysql_utils.Hash(kw) for kw in keywords)
+
+    # Every (client_id, keyword_hash) pair is unique, so a client matches all
+    # the keywords iff it has a row for each of them.
+    query = """
+      SELECT client_id
+      FROM client_keywords
+      FORCE INDEX (client_index_by_keyword_hash)
+      WHERE keyword_hash IN ({})
+    """.format(", ".join(["%s"] * len(keyword_hashes)))
+    args = list(keyword_hashes)
+    if start_time:
+      query += " AND timestamp >= FROM_UNIXTIME(%s)"
+      args.append(mysql_utils.RDFDatetimeToTimestamp(start_time))
+    query += """
+      GROUP BY client_id
+      HAVING COUNT(*) = %s
+      ORDER BY client_id
+      LIMIT %s OFFSET %s
+    """
+    args.extend([len(keyword_hashes), count, offset])
+    cursor.execute(query, args)
+
+    return [db_utils.IntToClientID(cid) for cid, in cursor.fetchall()]
+
   @mysql_utils.WithTransaction()
   def AddClientLabels(self, client_id, owner, labels, cursor=None):
     """Attaches a list of user labels to a client."""
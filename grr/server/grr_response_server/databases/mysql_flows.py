@@ -171,6 +171,25 @@ class MySQLDBFlowMixin(object):
 
     return sorted(ret, key=lambda req: (req.flow_id, req.request_id))
 
+  @mysql_utils.WithTransaction(readonly=True)
+  def ReadClientIdsWithPendingClientActionRequests(self,
+                                                   min_timestamp=None,
+                                                   cursor=None):
+    """Reads ids of clients that have client action requests to lease."""
+    now_str = mysql_utils.RDFDatetimeToTimestamp(rdfvalue.RDFDatetime.Now())
+
+    query = ("SELECT DISTINCT client_id FROM client_action_requests "
+             "WHERE (leased_until IS NULL OR leased_until < FROM_UNIXTIME(%s))")
+    args = [now_str]
+    if min_timestamp is not None:
+      query += (" AND (timestamp >= FROM_UNIXTIME(%s) OR "
+                "leased_until >= FROM_UNIXTIME(%s))")
+      min_timestamp_str = mysql_utils.RDFDatetimeToTimestamp(min_timestamp)
+      args.extend([min_timestamp_str, min_timestamp_str])
+
+    cursor.execute(query, args)
+    return set(db_utils.IntToClientID(row[0]) for row in cursor.fetchall())
+
   def DeleteClientActionRequests(self, requests):
     """Deletes a list of client messages from the db."""
     if not requests:
@@ -327,12 +346,30 @@ class MySQLDBFlowMixin(object):
     except MySQLdb.IntegrityError as e:
       raise db.UnknownClientError(flow_obj.client_id, cause=e)
 
-  def _FlowObjectFromRow(self, row):
-    """Generates a flow object from a database row."""
+  def _FlowObjectFromRow(self, row, cached_flow=None):
+    """Generates a flow object from a database row.
+
+    Args:
+      row: A row with FLOW_DB_FIELDS.
+      cached_flow: A flow object to update if the row has no serialized flow.
+
+    Returns:
+      An rdf_flow_objects.Flow object.
+    """
 
     flow, fs, cci, pt, nr, pd, po, ps, uct, sct, nbs, nrs, ts, lut = row
 
-    flow_obj = rdf_flow_objects.Flow.FromSerializedString(flow)
+    if flow is None:
+      flow_obj = cached_flow
+      # Columns which are NULL in the row must not keep the values of the
+      # cached flow, e.g. the processing fields of its last lease.
+      flow_obj.client_crash_info = None
+      flow_obj.pending_termination = None
+      flow_obj.processing_deadline = None
+      flow_obj.processing_on = None
+      flow_obj.processing_since = None
+    else:
+      flow_obj = rdf_flow_objects.Flow.FromSerializedString(flow)
     if fs not in [None, rdf_flow_objects.Flow.FlowState.UNSET]:
       flow_obj.flow_state = fs
     if cci is not None:
@@ -359,20 +396,21 @@ class MySQLDBFlowMixin(object):
 
     return flow_obj
 
-  FLOW_DB_FIELDS = ("flow, "
-                    "flow_state, "
-                    "client_crash_info, "
-                    "pending_termination, "
-                    "next_request_to_process, "
-                    "UNIX_TIMESTAMP(processing_deadline), "
-                    "processing_on, "
-                    "UNIX_TIMESTAMP(processing_since), "
-                    "user_cpu_time_used_micros, "
-                    "system_cpu_time_used_micros, "
-                    "network_bytes_sent, "
-                    "num_replies_sent, "
-                    "UNIX_TIMESTAMP(timestamp), "
-                    "UNIX_TIMESTAMP(last_update) ")
+  _FLOW_DB_FIELDS_WITHOUT_FLOW = ("flow_state, "
+                                  "client_crash_info, "
+                                  "pending_termination, "
+                                  "next_request_to_process, "
+                                  "UNIX_TIMESTAMP(processing_deadline), "
+                                  "processing_on, "
+                                  "UNIX_TIMESTAMP(processing_since), "
+                                  "user_cpu_time_used_micros, "
+                                  "system_cpu_time_used_micros, "
+                                  "network_bytes_sent, "
+                                  "num_replies_sent, "
+                                  "UNIX_TIMESTAMP(timestamp), "
+                                  "UNIX_TIMESTAMP(last_update) ")
+
+  FLOW_DB_FIELDS = "flow, " + _FLOW_DB_FIELDS_WITHOUT_FLOW
 
   @mysql_utils.WithTransaction(readonly=True)
   def ReadFlowObject(self, client_id, flow_id, cursor=None):
@@ -438,20 +476,30 @@ class MySQLDBFlowMixin(object):
                              client_id,
                              flow_id,
                              processing_time,
+                             cached_flow=None,
                              cursor=None):
     """Marks a flow as being processed on this worker and returns it."""
-    query = ("SELECT " + self.FLOW_DB_FIELDS +
-             "FROM flows WHERE client_id=%s AND flow_id=%s")
-    cursor.execute(
-        query,
+    args = []
+    if cached_flow is not None and cached_flow.last_update_time is not None:
+      # The serialized flow is only read if the cached one is out of date.
+      fields = ("IF(last_update=FROM_UNIXTIME(%s), NULL, flow), " +
+                self._FLOW_DB_FIELDS_WITHOUT_FLOW)
+      args.append(
+          mysql_utils.RDFDatetimeToTimestamp(cached_flow.last_update_time))
+    else:
+      fields = self.FLOW_DB_FIELDS
+
+    query = "SELECT " + fields + "FROM flows WHERE client_id=%s AND flow_id=%s"
+    args.extend(
         [db_utils.ClientIDToInt(client_id),
          db_utils.FlowIDToInt(flow_id)])
+    cursor.execute(query, args)
     response = cursor.fetchall()
     if not response:
       raise db.UnknownFlowError(client_id, flow_id)
 
     row, = response
-    rdf_flow = self._FlowObjectFromRow(row)
+    rdf_flow = self._FlowObjectFromRow(row, cached_flow=cached_flow)
 
     now = rdfvalue.RDFDatetime.Now()
     if rdf_flow.processing_on and rdf_flow.processing_deadline > now:
@@ -994,12 +1042,16 @@ class MySQLDBFlowMixin(object):
     args = [db_utils.ClientIDToInt(client_id), db_utils.FlowIDToInt(flow_id)]
     cursor.execute(query, args)
 
+    now = rdfvalue.RDFDatetime.Now()
     requests = {}
     for req, needs_processing, responses_expected, ts in cursor.fetchall():
-      if not needs_processing:
+      request = rdf_flow_objects.FlowRequest.FromSerializedString(req)
+      # Delayed requests (see `FlowBase.CallState`) don't wait for responses,
+      # they are ready once their start time has passed.
+      if not needs_processing and not (request.start_time and
+                                       request.start_time <= now):
         continue
 
-      request = rdf_flow_objects.FlowRequest.FromSerializedString(req)
       request.needs_processing = needs_processing
       request.nr_responses_expected = responses_expected
       request.timestamp = mysql_utils.TimestampToRDFDatetime(ts)
@@ -1060,7 +1112,7 @@ class MySQLDBFlowMixin(object):
       flows.system_cpu_time_used_micros = %(system_cpu_time_used_micros)s,
       flows.network_bytes_sent = %(network_bytes_sent)s,
       flows.num_replies_sent = %(num_replies_sent)s,
-      flows.last_update = NOW(6)
+      flows.last_update = FROM_UNIXTIME(%(last_update)s)
     WHERE
       flows.client_id = %(client_id)s AND
       flows.flow_id = %(flow_id)s AND (
@@ -1068,6 +1120,7 @@ class MySQLDBFlowMixin(object):
         needs_processing.needs_processing IS NULL)
     """
 
+    now = rdfvalue.RDFDatetime.Now()
     clone = flow_obj.Copy()
     clone.processing_on = None
     clone.processing_since = None
@@ -1081,6 +1134,8 @@ class MySQLDBFlowMixin(object):
             db_utils.FlowIDToInt(flow_obj.flow_id),
         "flow_state":
             int(clone.flow_state),
+        "last_update":
+            mysql_utils.RDFDatetimeToTimestamp(now),
         "network_bytes_sent":
             flow_obj.network_bytes_sent,
         "next_request_to_process":
@@ -1093,7 +1148,14 @@ class MySQLDBFlowMixin(object):
             db_utils.SecondsToMicros(flow_obj.cpu_time_used.user_cpu_time),
     }
     rows_updated = cursor.execute(update_query, args)
-    return rows_updated == 1
+    if rows_updated != 1:
+      return False
+
+    flow_obj.processing_on = None
+    flow_obj.processing_since = None
+    flow_obj.processing_deadline = None
+    flow_obj.last_update_time = now
+    return True
 
   @mysql_utils.WithTransaction()
   def WriteFlowProcessingRequests(self, requests, cursor=None):
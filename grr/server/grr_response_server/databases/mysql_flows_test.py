@@ -6,14 +6,45 @@ from __future__ import unicode_literals
 from absl import app
 from absl.testing import absltest
 
+from grr_response_core.lib import rdfvalue
+from grr_response_core.lib import utils
 from grr_response_server.databases import db_flows_test
 from grr_response_server.databases import mysql_test
+from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
 from grr.test_lib import test_lib
 
 
 class MysqlFlowTest(db_flows_test.DatabaseTestFlowMixin,
                     mysql_test.MysqlTestBase, absltest.TestCase):
-  pass
+
+  def testLeaseFlowForProcessingUpdatesUpToDateCachedFlow(self):
+    client_id, flow_id = self._SetupClientAndFlow()
+    processing_time = rdfvalue.Duration("60s")
+
+    cached_flow = self.db.LeaseFlowForProcessing(client_id, flow_id,
+                                                 processing_time)
+    self.assertTrue(self.db.ReleaseProcessedFlow(cached_flow))
+
+    # Values of columns that are NULL in the database are not kept.
+    cached_flow.processing_on = "another-worker"
+    cached_flow.processing_deadline = (
+        rdfvalue.RDFDatetime.Now() + rdfvalue.Duration("1h"))
+    cached_flow.pending_termination = (
+        rdf_flow_objects.PendingFlowTermination(reason="stale"))
+
+    leased_flow = self.db.LeaseFlowForProcessing(
+        client_id, flow_id, processing_time, cached_flow=cached_flow)
+    # The serialized flow is not read again, the cached one is updated.
+    self.assertIs(leased_flow, cached_flow)
+    self.assertEqual(leased_flow.processing_on, utils.ProcessIdString())
+    self.assertFalse(leased_flow.HasField("pending_termination"))
+    self.assertTrue(self.db.ReleaseProcessedFlow(leased_flow))
+    self.assertIsNone(leased_flow.processing_on)
+
+    # The released flow is leased from the cache again.
+    leased_flow = self.db.LeaseFlowForProcessing(
+        client_id, flow_id, processing_time, cached_flow=leased_flow)
+    self.assertIs(leased_flow, cached_flow)
 
 
 if __name__ == "__main__":
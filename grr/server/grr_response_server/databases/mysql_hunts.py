@@ -149,6 +149,9 @@ class MySQLDBHuntMixin(object):
     query = "DELETE FROM hunt_output_plugins_states WHERE hunt_id = %s"
     cursor.execute(query, [hunt_id_int])
 
+    query = "DELETE FROM hunt_file_download_claims WHERE hunt_id = %s"
+    cursor.execute(query, [hunt_id_int])
+
   def _HuntObjectFromRow(self, row):
     """Generates a flow object from a database row."""
     (
@@ -792,6 +795,66 @@ class MySQLDBHuntMixin(object):
 
     return result
 
+  @mysql_utils.WithTransaction()
+  def ClaimHuntFileDownload(self,
+                            hunt_id,
+                            sha256_hash_id,
+                            client_id,
+                            lease_time,
+                            cursor=None):
+    """Claims a download of a file with a given hash within a hunt."""
+    hunt_id_int = db_utils.HuntIDToInt(hunt_id)
+    client_id_int = db_utils.ClientIDToInt(client_id)
+    now = rdfvalue.RDFDatetime.Now()
+
+    # An existing claim is only taken over if it belongs to the same client or
+    # it has expired. Assignments are evaluated left to right, so once
+    # client_id is updated, the expiry time is updated as well.
+    query = """
+      INSERT INTO hunt_file_download_claims
+        (hunt_id, sha256, client_id, expiry_time)
+      VALUES (%(hunt_id)s, %(sha256)s, %(client_id)s, FROM_UNIXTIME(%(expiry)s))
+      ON DUPLICATE KEY UPDATE
+        client_id = IF(
+          client_id = %(client_id)s OR expiry_time < FROM_UNIXTIME(%(now)s),
+          %(client_id)s, client_id),
+        expiry_time = IF(
+          client_id = %(client_id)s, FROM_UNIXTIME(%(expiry)s), expiry_time)
+    """
+    args = {
+        "hunt_id": hunt_id_int,
+        "sha256": sha256_hash_id.AsBytes(),
+        "client_id": client_id_int,
+        "now": mysql_utils.RDFDatetimeToTimestamp(now),
+        "expiry": mysql_utils.RDFDatetimeToTimestamp(now + lease_time),
+    }
+    cursor.execute(query, args)
+
+    query = """
+      SELECT client_id FROM hunt_file_download_claims
+      WHERE hunt_id = %s AND sha256 = %s
+    """
+    cursor.execute(query, [hunt_id_int, sha256_hash_id.AsBytes()])
+    claimed_by, = cursor.fetchone()
+    return db_utils.IntToClientID(claimed_by)
+
+  @mysql_utils.WithTransaction()
+  def ReleaseHuntFileDownload(self,
+                              hunt_id,
+                              sha256_hash_id,
+                              client_id,
+                              cursor=None):
+    """Releases a claim made with `ClaimHuntFileDownload`."""
+    query = """
+      DELETE FROM hunt_file_download_claims
+      WHERE hunt_id = %s AND sha256 = %s AND client_id = %s
+    """
+    cursor.execute(query, [
+        db_utils.HuntIDToInt(hunt_id),
+        sha256_hash_id.AsBytes(),
+        db_utils.ClientIDToInt(client_id),
+    ])
+
   @mysql_utils.WithTransaction(readonly=True)
   def ReadHuntOutputPluginLogEntries(self,
                                      hunt_id,
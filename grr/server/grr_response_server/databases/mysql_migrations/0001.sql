@@ -0,0 +1,7 @@
+CREATE TABLE hunt_file_download_claims(
+    hunt_id BIGINT UNSIGNED NOT NULL,
+    sha256 BINARY(32) NOT NULL,
+    client_id BIGINT UNSIGNED NOT NULL,
+    expiry_time TIMESTAMP(6) NOT NULL,
+    PRIMARY KEY (hunt_id, sha256)
+);
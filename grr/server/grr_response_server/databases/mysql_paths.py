@@ -5,6 +5,7 @@ from __future__ import division
 from __future__ import unicode_literals
 
 import contextlib
+import itertools
 
 from future.utils import iteritems
 from future.utils import iterkeys
@@ -13,11 +14,15 @@ import MySQLdb
 
 from grr_response_core.lib.rdfvalues import client_fs as rdf_client_fs
 from grr_response_core.lib.rdfvalues import crypto as rdf_crypto
+from grr_response_core.lib.util import collection
 from grr_response_server.databases import db
 from grr_response_server.databases import db_utils
 from grr_response_server.databases import mysql_utils
 from grr_response_server.rdfvalues import objects as rdf_objects
 
+# Maximum number of rows inserted with a single multi-row INSERT statement.
+_PATH_INFO_BATCH_SIZE = 5000
+
 
 class MySQLDBPathMixin(object):
   """MySQLDB mixin for path related functions."""
@@ -201,53 +206,52 @@ class MySQLDBPathMixin(object):
   @mysql_utils.WithTransaction()
   def _MultiWritePathInfos(self, path_infos, connection=None):
     """Writes a collection of path info records for specified clients."""
-    path_info_count = 0
-    path_info_values = []
-
-    parent_path_info_count = 0
-    parent_path_info_values = []
+    path_info_rows = []
+    parent_path_info_rows = []
+    parent_path_ids = set()
 
     has_stat_entries = False
     has_hash_entries = False
 
     for client_id, client_path_infos in iteritems(path_infos):
+      int_client_id = db_utils.ClientIDToInt(client_id)
+
       for path_info in client_path_infos:
         path = mysql_utils.ComponentsToPath(path_info.components)
 
-        path_info_values.append(db_utils.ClientIDToInt(client_id))
-        path_info_values.append(int(path_info.path_type))
-        path_info_values.append(path_info.GetPathID().AsBytes())
-        path_info_values.append(path)
-        path_info_values.append(bool(path_info.directory))
-        path_info_values.append(len(path_info.components))
-
         if path_info.HasField("stat_entry"):
-          path_info_values.append(path_info.stat_entry.SerializeToString())
+          stat_entry = path_info.stat_entry.SerializeToString()
           has_stat_entries = True
         else:
-          path_info_values.append(None)
+          stat_entry = None
         if path_info.HasField("hash_entry"):
-          path_info_values.append(path_info.hash_entry.SerializeToString())
-          path_info_values.append(path_info.hash_entry.sha256.AsBytes())
+          hash_entry = path_info.hash_entry.SerializeToString()
+          sha256 = path_info.hash_entry.sha256.AsBytes()
           has_hash_entries = True
         else:
-          path_info_values.append(None)
-          path_info_values.append(None)
+          hash_entry = None
+          sha256 = None
 
-        path_info_count += 1
+        path_info_rows.append(
+            (int_client_id, int(path_info.path_type),
+             path_info.GetPathID().AsBytes(), path, bool(path_info.directory),
+             len(path_info.components), stat_entry, hash_entry, sha256))
 
-        # TODO(hanuszczak): Implement a trie in order to avoid inserting
-        # duplicated records.
+        # Siblings share all of their ancestors, so without deduplication a
+        # listing of a large directory would upsert its parents once per file.
         for parent_path_info in path_info.GetAncestors():
-          path = mysql_utils.ComponentsToPath(parent_path_info.components)
+          path_type = int(parent_path_info.path_type)
+          path_id = parent_path_info.GetPathID().AsBytes()
 
-          parent_path_info_values.append(db_utils.ClientIDToInt(client_id))
-          parent_path_info_values.append(int(parent_path_info.path_type))
-          parent_path_info_values.append(parent_path_info.GetPathID().AsBytes())
-          parent_path_info_values.append(path)
-          parent_path_info_values.append(len(parent_path_info.components))
+          key = (int_client_id, path_type, path_id)
+          if key in parent_path_ids:
+            # Ancestors of an already processed ancestor were processed too.
+            break
+          parent_path_ids.add(key)
 
-          parent_path_info_count += 1
+          path = mysql_utils.ComponentsToPath(parent_path_info.components)
+          parent_path_info_rows.append((int_client_id, path_type, path_id, path,
+                                        len(parent_path_info.components)))
 
     try:
       with contextlib.closing(connection.cursor()) as cursor:
@@ -265,16 +269,19 @@ class MySQLDBPathMixin(object):
           timestamp TIMESTAMP(6) NOT NULL DEFAULT now(6)
         )""")
 
-        if path_info_count > 0:
+        # Rows are inserted in batches to keep the size of a single statement
+        # within the `max_allowed_packet` limit for large writes.
+        for batch in collection.Batch(path_info_rows, _PATH_INFO_BATCH_SIZE):
           cursor.execute(
               """
           INSERT INTO client_path_infos(client_id, path_type, path_id,
                                         path, directory, depth,
                                         stat_entry, hash_entry, sha256)
           VALUES {}
-          """.format(mysql_utils.Placeholders(num=9, values=path_info_count)),
-              path_info_values)
+          """.format(mysql_utils.Placeholders(num=9, values=len(batch))),
+              list(itertools.chain.from_iterable(batch)))
 
+        if path_info_rows:
           cursor.execute("""
           INSERT INTO client_paths(client_id, path_type, path_id, path,
                                    directory, depth)
@@ -285,8 +292,9 @@ class MySQLDBPathMixin(object):
             client_paths.timestamp = now(6)
           """)
 
-        if parent_path_info_count > 0:
-          placeholders = ["(%s, %s, %s, %s, TRUE, %s)"] * parent_path_info_count
+        for batch in collection.Batch(parent_path_info_rows,
+                                      _PATH_INFO_BATCH_SIZE):
+          placeholders = ["(%s, %s, %s, %s, TRUE, %s)"] * len(batch)
 
           cursor.execute(
               """
@@ -296,7 +304,8 @@ class MySQLDBPathMixin(object):
           ON DUPLICATE KEY UPDATE
             directory = TRUE,
             timestamp = now()
-          """.format(", ".join(placeholders)), parent_path_info_values)
+          """.format(", ".join(placeholders)),
+              list(itertools.chain.from_iterable(batch)))
 
         if has_stat_entries:
           cursor.execute("""
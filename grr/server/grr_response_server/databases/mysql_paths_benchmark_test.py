@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""Benchmarks for writing large numbers of path infos to MySQL."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import time
+
+from absl import app
+from future.builtins import range
+import pytest
+
+from grr_response_core.lib.rdfvalues import client_fs as rdf_client_fs
+from grr_response_core.lib.util import collection
+from grr_response_server.databases import db_test_utils
+from grr_response_server.databases import mysql_test
+from grr_response_server.rdfvalues import objects as rdf_objects
+from grr.test_lib import benchmark_test_lib
+from grr.test_lib import test_lib
+
+
+@pytest.mark.benchmark
+class MysqlPathsBenchmark(mysql_test.MysqlTestBase,
+                          benchmark_test_lib.MicroBenchmarks):
+  """Test performance of path info writes to the MySQL database."""
+
+  units = "s"
+
+  NUM_ENTRIES = 10**6
+  FILES_PER_DIRECTORY = 1000
+  # Same as the number of entries a `RecursiveListDirectory` flow stores at
+  # once.
+  WRITE_BATCH_SIZE = 1000
+
+  def _PathInfos(self, with_hashes=False):
+    """Yields path infos of a synthetic directory tree."""
+    for i in range(self.NUM_ENTRIES):
+      directory = i // self.FILES_PER_DIRECTORY
+      components = [
+          "usr",
+          "share",
+          "dir%d" % (directory // 100),
+          "dir%d" % directory,
+          "file%d" % i,
+      ]
+      path_info = rdf_objects.PathInfo.OS(components=components)
+      path_info.stat_entry = rdf_client_fs.StatEntry(
+          st_mode=0o100644, st_size=i, st_mtime=1500000000)
+      if with_hashes:
+        path_info.hash_entry.sha256 = b"%032d" % i
+        path_info.hash_entry.num_bytes = i
+      yield path_info
+
+  def _WritePathInfos(self, client_id, path_infos):
+    start = time.time()
+    for batch in collection.Batch(path_infos, self.WRITE_BATCH_SIZE):
+      self.db.WritePathInfos(client_id, batch)
+    return time.time() - start
+
+  def testWriteStatEntries(self):
+    """How fast can stat entries of a large directory tree be written."""
+    client_id = db_test_utils.InitializeClient(self.db)
+
+    elapsed = self._WritePathInfos(client_id, self._PathInfos())
+    self.AddResult("WritePathInfos: stat entries", elapsed, self.NUM_ENTRIES)
+
+    elapsed = self._WritePathInfos(client_id, self._PathInfos())
+    self.AddResult("WritePathInfos: stat entries (existing paths)", elapsed,
+                   self.NUM_ENTRIES)
+
+  def testWriteStatAndHashEntries(self):
+    """How fast can stat and hash entries of a large tree be written."""
+    client_id = db_test_utils.InitializeClient(self.db)
+
+    elapsed = self._WritePathInfos(client_id,
+                                   self._PathInfos(with_hashes=True))
+    self.AddResult("WritePathInfos: stat and hash entries", elapsed,
+                   self.NUM_ENTRIES)
+
+
+if __name__ == "__main__":
+  app.run(test_lib.main)
@@ -7,11 +7,13 @@ import contextlib
 
 from absl import app
 from absl.testing import absltest
-
+from future.builtins import range
+import mock
 import MySQLdb
 
 from grr_response_server.databases import db_paths_test
 from grr_response_server.databases import db_test_utils
+from grr_response_server.databases import mysql_paths
 from grr_response_server.databases import mysql_test
 from grr_response_server.rdfvalues import objects as rdf_objects
 from grr.test_lib import test_lib
@@ -39,6 +41,26 @@ class MysqlPathsTest(db_paths_test.DatabaseTestPathsMixin,
       self.db.delegate._MultiWritePathInfos({client_id: [path_info]},
                                             connection=connection)
 
+  @mock.patch.object(mysql_paths, "_PATH_INFO_BATCH_SIZE", 3)
+  def testMultiWritePathInfosWritesRowsInBatches(self):
+    client_id = db_test_utils.InitializeClient(self.db)
+
+    path_infos = []
+    for i in range(10):
+      path_info = rdf_objects.PathInfo.OS(components=["foo%d" % i, "bar"])
+      path_info.stat_entry.st_size = i
+      path_infos.append(path_info)
+    self.db.WritePathInfos(client_id, path_infos)
+
+    results = self.db.ReadPathInfos(
+        client_id, rdf_objects.PathInfo.PathType.OS,
+        [("foo%d" % i,) for i in range(10)] + [
+            ("foo%d" % i, "bar") for i in range(10)
+        ])
+    for i in range(10):
+      self.assertTrue(results[("foo%d" % i,)].directory)
+      self.assertEqual(results[("foo%d" % i, "bar")].stat_entry.st_size, i)
+
   # Tests that we don't expect to pass yet.
 
   # TODO(user): Finish implementation and enable these tests.
@@ -10,6 +10,7 @@ import collections
 import hashlib
 import io
 import os
+import threading
 
 from future.utils import iteritems
 from future.utils import iterkeys
@@ -21,6 +22,7 @@ from typing import NamedTuple
 
 from grr_response_core import config
 from grr_response_core.lib import utils
+from grr_response_core.lib.util import cache
 from grr_response_core.lib.util import collection
 from grr_response_core.lib.util import precondition
 from grr_response_server import data_store
@@ -165,10 +167,13 @@ class BlobStream(object):
       if not part:
         break
 
+      # Reads spanning multiple blobs must not move the cursor past the end of
+      # the requested range, so that subsequent reads continue where they left.
+      part = part[:length - result.tell()]
       result.write(part)
-      self._offset += min(length, len(part))
+      self._offset += len(part)
 
-    return result.getvalue()[:length]
+    return result.getvalue()
 
   def Tell(self):
     """Returns current reading cursor position."""
@@ -207,6 +212,54 @@ class BlobStream(object):
 
 _BLOBS_READ_BATCH_SIZE = 200
 
+_HASH_CACHES = None
+_HASH_CACHES_LOCK = threading.Lock()
+
+
+def _GetHashCaches():
+  """Returns caches of known and missing hashes of this process.
+
+  Blob references of a hash never change once they are written, so known
+  hashes are cached until evicted. Hashes that are missing may be added by
+  other processes at any time, so they are only cached for a short while.
+
+  Returns:
+    A tuple (known, missing). The known hashes cache maps hash ids (as bytes)
+    to lists of blob references. Either of the caches is None if disabled.
+  """
+  global _HASH_CACHES
+
+  size = config.CONFIG["FileStore.hash_cache_size"]
+  max_blob_refs = config.CONFIG["FileStore.hash_cache_max_blob_refs"]
+  if size <= 0 or max_blob_refs <= 0:
+    return None, None
+
+  with _HASH_CACHES_LOCK:
+    if _HASH_CACHES is None:
+      num_shards = min(16, size)
+      # Lists of blob references of large files can be long, so the cache is
+      # bounded by their total length as well.
+      known = cache.LRUCache(
+          max_size=size,
+          max_bytes=max_blob_refs,
+          size_fn=len,
+          num_shards=num_shards,
+          name="file_store_hashes")
+
+      max_age = config.CONFIG["FileStore.missing_hash_cache_age"].seconds
+      if max_age > 0:
+        missing = cache.LRUCache(
+            max_size=size,
+            max_age=max_age,
+            refresh_on_access=False,
+            num_shards=num_shards,
+            name="file_store_missing_hashes")
+      else:
+        missing = None
+
+      _HASH_CACHES = (known, missing)
+    return _HASH_CACHES
+
 
 def AddFilesWithUnknownHashes(
     client_path_blob_refs,
@@ -291,7 +344,24 @@ def AddFilesWithUnknownHashes(
     client_path_hash_id[client_path] = hash_id
     hash_id_blob_refs[hash_id] = verified_client_path_blob_refs[client_path]
 
-  data_store.REL_DB.WriteHashBlobReferences(hash_id_blob_refs)
+  known_hashes, missing_hashes = _GetHashCaches()
+  if known_hashes is not None:
+    # Files with known hashes are already in the file store, there is no need
+    # to write their blob references again.
+    hash_id_blob_refs = {
+        hash_id: blob_refs
+        for hash_id, blob_refs in iteritems(hash_id_blob_refs)
+        if hash_id.AsBytes() not in known_hashes
+    }
+
+  if hash_id_blob_refs:
+    data_store.REL_DB.WriteHashBlobReferences(hash_id_blob_refs)
+
+  if known_hashes is not None:
+    for hash_id, blob_refs in iteritems(hash_id_blob_refs):
+      known_hashes.Put(hash_id.AsBytes(), list(blob_refs))
+      if missing_hashes is not None:
+        missing_hashes.Pop(hash_id.AsBytes())
 
   if use_external_stores:
     for client_path in iterkeys(verified_client_path_blob_refs):
@@ -313,9 +383,51 @@ def AddFileWithUnknownHash(client_path, blob_refs, use_external_stores=True):
       use_external_stores=use_external_stores)[client_path]
 
 
+def ReadHashBlobReferences(hash_ids):
+  """Reads blob references of given hashes, using the hash cache.
+
+  Args:
+    hash_ids: An iterable of SHA256HashID objects.
+
+  Returns:
+    A dict where SHA256HashID objects are keys. Corresponding values are
+    lists of BlobReference objects or None if the hash is not present in the
+    file store.
+  """
+  known_hashes, missing_hashes = _GetHashCaches()
+  if known_hashes is None:
+    return data_store.REL_DB.ReadHashBlobReferences(hash_ids)
+
+  result = {}
+  hash_ids_to_read = []
+  for hash_id in hash_ids:
+    try:
+      result[hash_id] = list(known_hashes.Get(hash_id.AsBytes()))
+    except KeyError:
+      hash_ids_to_read.append(hash_id)
+
+  if not hash_ids_to_read:
+    return result
+
+  blob_refs_by_hash_id = data_store.REL_DB.ReadHashBlobReferences(
+      hash_ids_to_read)
+  for hash_id, blob_refs in iteritems(blob_refs_by_hash_id):
+    result[hash_id] = blob_refs
+    if blob_refs is not None:
+      known_hashes.Put(hash_id.AsBytes(), list(blob_refs))
+      if missing_hashes is not None:
+        missing_hashes.Pop(hash_id.AsBytes())
+
+  return result
+
+
 def CheckHashes(hash_ids):
   """Checks if files with given hashes are present in the file store.
 
+  Hashes found to be missing are remembered for
+  `FileStore.missing_hash_cache_age`, so a file added by another process in
+  the meantime may still be reported as missing.
+
   Args:
     hash_ids: A list of SHA256HashID objects.
 
@@ -323,10 +435,28 @@ def CheckHashes(hash_ids):
     A dict where SHA256HashID objects are keys. Corresponding values
     may be False (if hash id is not present) or True if it is not present.
   """
-  return {
-      k: bool(v)
-      for k, v in data_store.REL_DB.ReadHashBlobReferences(hash_ids).items()
-  }
+  _, missing_hashes = _GetHashCaches()
+
+  result = {}
+  hash_ids_to_check = []
+  for hash_id in hash_ids:
+    if missing_hashes is None:
+      hash_ids_to_check.append(hash_id)
+      continue
+
+    try:
+      missing_hashes.Get(hash_id.AsBytes())
+      result[hash_id] = False
+    except KeyError:
+      hash_ids_to_check.append(hash_id)
+
+  blob_refs_by_hash_id = ReadHashBlobReferences(hash_ids_to_check)
+  for hash_id, blob_refs in iteritems(blob_refs_by_hash_id):
+    result[hash_id] = bool(blob_refs)
+    if blob_refs is None and missing_hashes is not None:
+      missing_hashes.Put(hash_id.AsBytes(), True)
+
+  return result
 
 
 def GetLastCollectionPathInfos(client_paths, max_timestamp=None):
@@ -391,7 +521,7 @@ def OpenFile(client_path, max_timestamp=None):
 
   hash_id = rdf_objects.SHA256HashID.FromBytes(
       path_info.hash_entry.sha256.AsBytes())
-  blob_references = data_store.REL_DB.ReadHashBlobReferences([hash_id])[hash_id]
+  blob_references = ReadHashBlobReferences([hash_id])[hash_id]
 
   if blob_references is None:
     raise MissingBlobReferencesError(
@@ -456,8 +586,7 @@ def StreamFilesChunks(client_paths, max_timestamp=None, max_size=None):
       if pi
   }
 
-  blob_refs_by_hash_id = data_store.REL_DB.ReadHashBlobReferences(
-      hash_ids_by_cp.values())
+  blob_refs_by_hash_id = ReadHashBlobReferences(hash_ids_by_cp.values())
 
   all_chunks = []
   for cp in client_paths:
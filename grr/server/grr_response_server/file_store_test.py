@@ -16,6 +16,7 @@ from grr_response_server import file_store
 from grr_response_server.databases import db
 from grr_response_server.rdfvalues import objects as rdf_objects
 from grr.test_lib import db_test_lib
+from grr.test_lib import stats_test_lib
 from grr.test_lib import test_lib
 
 
@@ -62,6 +63,23 @@ class BlobStreamTest(test_lib.GRRBaseTest):
     self.assertEqual(
         self.blob_stream.read(self.blob_size + 1), b"4" + b"5" * self.blob_size)
 
+  def testReadsConsecutiveChunksAcrossBlobBoundaries(self):
+    self.assertEqual(
+        self.blob_stream.read(self.blob_size + 1), b"a" * self.blob_size + b"b")
+    self.assertEqual(self.blob_stream.tell(), self.blob_size + 1)
+    self.assertEqual(
+        self.blob_stream.read(self.blob_size), b"b" * (self.blob_size - 1) + b"c")
+
+  def testReadsWholeFileInSmallChunks(self):
+    chunks = []
+    while True:
+      chunk = self.blob_stream.read(3)
+      if not chunk:
+        break
+      chunks.append(chunk)
+
+    self.assertEqual(b"".join(chunks), b"".join(self.blob_data))
+
   def testReadsWholeFile(self):
     self.assertEqual(self.blob_stream.read(), b"".join(self.blob_data))
 
@@ -305,6 +323,102 @@ class AddFilesWithUnknownHashesTest(test_lib.GRRBaseTest):
     self.assertEqual(hash_ids[bar_path], bar_hash_id)
 
 
+class HashCacheTest(stats_test_lib.StatsTestMixin, test_lib.GRRBaseTest):
+  """Tests for caching of hash blob references."""
+
+  def setUp(self):
+    super(HashCacheTest, self).setUp()
+
+    self.blob_data, self.blob_refs = _GenerateBlobRefs(10, b"ab")
+    blob_ids = [ref.blob_id for ref in self.blob_refs]
+    data_store.BLOBS.WriteBlobs(dict(zip(blob_ids, self.blob_data)))
+
+    self.client_path = db.ClientPath.OS("C.0000111122223333", ["foo", "bar"])
+    self.hash_id = rdf_objects.SHA256HashID.FromData(b"".join(self.blob_data))
+
+  def _PatchRead(self):
+    return mock.patch.object(
+        data_store.REL_DB,
+        "ReadHashBlobReferences",
+        wraps=data_store.REL_DB.ReadHashBlobReferences)
+
+  def testReadsKnownHashesFromCache(self):
+    file_store.AddFileWithUnknownHash(self.client_path, self.blob_refs)
+
+    with self._PatchRead() as read_mock:
+      with self.assertStatsCounterDelta(
+          2, "grr_cache_hits", fields=["file_store_hashes"]):
+        self.assertEqual(
+            file_store.CheckHashes([self.hash_id]), {self.hash_id: True})
+        blob_refs = file_store.ReadHashBlobReferences([self.hash_id])
+
+    self.assertFalse(read_mock.called)
+    self.assertEqual(blob_refs, {self.hash_id: self.blob_refs})
+
+  def testDoesNotRewriteKnownHashes(self):
+    file_store.AddFileWithUnknownHash(self.client_path, self.blob_refs)
+
+    with mock.patch.object(data_store.REL_DB,
+                           "WriteHashBlobReferences") as write_mock:
+      file_store.AddFileWithUnknownHash(self.client_path, self.blob_refs)
+
+    self.assertFalse(write_mock.called)
+
+  def testCachesMissingHashes(self):
+    with self._PatchRead() as read_mock:
+      with self.assertStatsCounterDelta(
+          1, "grr_cache_hits", fields=["file_store_missing_hashes"]):
+        for _ in range(2):
+          self.assertEqual(
+              file_store.CheckHashes([self.hash_id]), {self.hash_id: False})
+
+    self.assertEqual(read_mock.call_count, 1)
+
+  def testMissingHashesExpire(self):
+    with test_lib.FakeTime(rdfvalue.RDFDatetime.FromSecondsSinceEpoch(1000)):
+      file_store.CheckHashes([self.hash_id])
+
+    # Another process adds the file.
+    data_store.REL_DB.WriteHashBlobReferences({self.hash_id: self.blob_refs})
+
+    with test_lib.FakeTime(rdfvalue.RDFDatetime.FromSecondsSinceEpoch(1005)):
+      self.assertEqual(
+          file_store.CheckHashes([self.hash_id]), {self.hash_id: False})
+
+    with test_lib.FakeTime(rdfvalue.RDFDatetime.FromSecondsSinceEpoch(1011)):
+      self.assertEqual(
+          file_store.CheckHashes([self.hash_id]), {self.hash_id: True})
+
+  def testAddingFileClearsMissingHash(self):
+    file_store.CheckHashes([self.hash_id])
+    file_store.AddFileWithUnknownHash(self.client_path, self.blob_refs)
+
+    self.assertEqual(
+        file_store.CheckHashes([self.hash_id]), {self.hash_id: True})
+
+  def testLargeFilesAreNotCached(self):
+    with test_lib.ConfigOverrider({"FileStore.hash_cache_max_blob_refs": 1}):
+      file_store.AddFileWithUnknownHash(self.client_path, self.blob_refs)
+
+      with self._PatchRead() as read_mock:
+        for _ in range(2):
+          self.assertEqual(
+              file_store.CheckHashes([self.hash_id]), {self.hash_id: True})
+
+    self.assertEqual(read_mock.call_count, 2)
+
+  def testCacheCanBeDisabled(self):
+    with test_lib.ConfigOverrider({"FileStore.hash_cache_size": 0}):
+      file_store.AddFileWithUnknownHash(self.client_path, self.blob_refs)
+
+      with self._PatchRead() as read_mock:
+        for _ in range(2):
+          self.assertEqual(
+              file_store.CheckHashes([self.hash_id]), {self.hash_id: True})
+
+    self.assertEqual(read_mock.call_count, 2)
+
+
 class OpenFileTest(db_test_lib.RelationalDBEnabledMixin, test_lib.GRRBaseTest):
   """Tests for OpenFile."""
 
@@ -106,6 +106,7 @@ class FlowBase(with_metaclass(registry.FlowRegistry, object)):
     self.rdf_flow = rdf_flow
     self.flow_requests = []
     self.flow_responses = []
+    self.flow_processing_requests = []
     self.client_action_requests = []
     self.completed_requests = []
     self.replies_to_process = []
@@ -160,10 +161,19 @@ class FlowBase(with_metaclass(registry.FlowRegistry, object)):
         request_id=self.GetNextOutboundId(),
         next_state=next_state,
         start_time=start_time,
-        needs_processing=True)
+        needs_processing=start_time is None)
 
     self.flow_requests.append(flow_request)
 
+    # Delayed requests only become ready for processing at their start time,
+    # so the flow has to be woken up then.
+    if start_time is not None:
+      self.flow_processing_requests.append(
+          rdf_flows.FlowProcessingRequest(
+              client_id=self.rdf_flow.client_id,
+              flow_id=self.rdf_flow.flow_id,
+              delivery_time=start_time))
+
   def CallStateInline(self,
                       messages=None,
                       next_state="",
@@ -650,6 +660,11 @@ class FlowBase(with_metaclass(registry.FlowRegistry, object)):
       data_store.REL_DB.WriteFlowResponses(self.flow_responses)
       self.flow_responses = []
 
+    if self.flow_processing_requests:
+      data_store.REL_DB.WriteFlowProcessingRequests(
+          self.flow_processing_requests)
+      self.flow_processing_requests = []
+
     if self.client_action_requests:
       client_id = self.rdf_flow.client_id
       if fleetspeak_utils.IsFleetspeakEnabledClient(client_id):
@@ -779,6 +794,8 @@ class FlowBase(with_metaclass(registry.FlowRegistry, object)):
     flow_obj.flow_requests = []
     self.flow_responses.extend(flow_obj.flow_responses)
     flow_obj.flow_responses = []
+    self.flow_processing_requests.extend(flow_obj.flow_processing_requests)
+    flow_obj.flow_processing_requests = []
     self.client_action_requests.extend(flow_obj.client_action_requests)
     flow_obj.client_action_requests = []
     self.completed_requests.extend(flow_obj.completed_requests)
@@ -65,6 +65,26 @@ class CallStateFlow(flow_base.FlowBase):
     CallStateFlow.success = True
 
 
+class DelayedCallStateFlow(flow_base.FlowBase):
+  """A flow that calls one of its own states with a delay."""
+
+  # This is a global flag which will be set when the delayed state runs.
+  success = False
+
+  def Start(self):
+    self.CallState(next_state="ScheduleDelayedState")
+
+  def ScheduleDelayedState(self, responses):
+    del responses  # Unused.
+    self.CallState(
+        next_state="ReceiveHello",
+        start_time=rdfvalue.RDFDatetime.Now() + rdfvalue.Duration("1m"))
+
+  def ReceiveHello(self, responses):
+    del responses  # Unused.
+    DelayedCallStateFlow.success = True
+
+
 class BasicFlowTest(db_test_lib.RelationalDBEnabledMixin,
                     flow_test_lib.FlowTestsBaseclass):
 
@@ -159,6 +179,20 @@ class CallClientChildFlow(flow_base.FlowBase):
     self.CallClient(server_stubs.GetClientStats, next_state="End")
 
 
+class TwoClientCallsFlow(flow_base.FlowBase):
+  """A flow calling the client twice in a row."""
+
+  def Start(self):
+    self.CallClient(ReturnHello, next_state="ReceiveFirst")
+
+  def ReceiveFirst(self, responses):
+    del responses  # Unused.
+    self.CallClient(ReturnHello, next_state="ReceiveSecond")
+
+  def ReceiveSecond(self, responses):
+    del responses  # Unused.
+
+
 class FlowCreationTest(BasicFlowTest):
   """Test flow creation."""
 
@@ -235,6 +269,29 @@ class GeneralFlowsTest(notification_test_lib.NotificationTestMixin,
 
     self.assertEqual(CallStateFlow.success, True)
 
+  def testDelayedCallState(self):
+    DelayedCallStateFlow.success = False
+
+    with test_lib.FakeTime(rdfvalue.RDFDatetime.FromSecondsSinceEpoch(1000)):
+      flow_id = flow_test_lib.StartAndRunFlow(
+          DelayedCallStateFlow,
+          client_id=self.client_id,
+          check_flow_errors=False)
+
+    # The delayed state is not run before its start time.
+    self.assertFalse(DelayedCallStateFlow.success)
+    flow_obj = data_store.REL_DB.ReadFlowObject(self.client_id, flow_id)
+    self.assertEqual(flow_obj.flow_state, "RUNNING")
+
+    with test_lib.FakeTime(rdfvalue.RDFDatetime.FromSecondsSinceEpoch(1100)):
+      with flow_test_lib.TestWorker(token=True) as worker:
+        self.assertEqual(
+            flow_test_lib.ProcessDueFlowProcessingRequests(worker), 1)
+
+    self.assertTrue(DelayedCallStateFlow.success)
+    flow_obj = data_store.REL_DB.ReadFlowObject(self.client_id, flow_id)
+    self.assertEqual(flow_obj.flow_state, "FINISHED")
+
   def testChainedFlow(self):
     """Test the ability to chain flows."""
     ParentFlow.success = False
@@ -245,6 +302,20 @@ class GeneralFlowsTest(notification_test_lib.NotificationTestMixin,
 
     self.assertEqual(ParentFlow.success, True)
 
+  def testWorkerReusesProcessedFlows(self):
+    with mock.patch.object(
+        data_store.REL_DB,
+        "LeaseFlowForProcessing",
+        wraps=data_store.REL_DB.LeaseFlowForProcessing) as lease:
+      flow_test_lib.StartAndRunFlow(
+          TwoClientCallsFlow, client_mock=ClientMock(), client_id=self.client_id)
+
+    cached_flows = [kwargs["cached_flow"] for _, kwargs in lease.call_args_list]
+    self.assertLen(cached_flows, 2)
+    self.assertIsNone(cached_flows[0])
+    self.assertEqual(cached_flows[1].flow_class_name,
+                     TwoClientCallsFlow.__name__)
+
   def testBrokenChainedFlow(self):
     BrokenParentFlow.success = False
 
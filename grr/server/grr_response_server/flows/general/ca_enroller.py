@@ -8,10 +8,10 @@ import logging
 
 from grr_response_core.lib import queues
 from grr_response_core.lib import rdfvalue
-from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import client as rdf_client
 from grr_response_core.lib.rdfvalues import crypto as rdf_crypto
 from grr_response_core.lib.rdfvalues import structs as rdf_structs
+from grr_response_core.lib.util import cache
 from grr_response_proto import flows_pb2
 from grr_response_server import aff4
 from grr_response_server import client_index
@@ -95,7 +95,7 @@ class CAEnrolerMixin(object):
     self.Log("Enrolled %s successfully", self.client_id)
 
 
-enrolment_cache = utils.FastStore(5000)
+enrolment_cache = cache.LRUCache(max_size=5000, name="enrolment")
 
 
 class Enroler(flow.WellKnownFlow):
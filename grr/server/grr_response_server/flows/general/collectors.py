@@ -37,6 +37,7 @@ from grr_response_server import artifact_registry
 from grr_response_server import data_store
 from grr_response_server import flow
 from grr_response_server import flow_base
+from grr_response_server import parser_pool
 from grr_response_server import sequential_collection
 from grr_response_server import server_stubs
 from grr_response_server.flows.general import artifact_fallbacks
@@ -94,6 +95,8 @@ class ArtifactCollectorFlowMixin(object):
     self.state.artifacts_failed = []
     self.state.artifacts_skipped_due_to_condition = []
     self.state.called_fallbacks = set()
+    self.state.client_side_collection_failed = False
+    self.state.client_side_return_types = {}
     self.state.failed_count = 0
     self.state.knowledge_base = self.args.knowledge_base
     self.state.response_count = 0
@@ -141,6 +144,7 @@ class ArtifactCollectorFlowMixin(object):
       self.state.knowledge_base = _ReadClientKnowledgeBase(
           self.client_id, allow_uninitialized=True, token=self.token)
 
+    artifact_objs = []
     for artifact_name in self.args.artifact_list:
       artifact_obj = self._GetArtifactFromName(artifact_name)
 
@@ -148,7 +152,27 @@ class ArtifactCollectorFlowMixin(object):
       # removed if it turns out to be expensive. Artifact tests should catch
       # these.
       artifact_registry.Validate(artifact_obj)
+      artifact_objs.append(artifact_obj)
+
+    if (config.CONFIG["Artifacts.client_side_collection"] and
+        not self.state.client_side_collection_failed):
+      request = GetArtifactCollectorArgs(self.args, self.state.knowledge_base)
+      if request.artifacts and all(
+          IsCollectableOnClient(expanded_artifact, request.apply_parsers)
+          for expanded_artifact in request.artifacts):
+        # All the sources of all the (expanded) artifacts are collected with a
+        # single client request instead of a client call or a flow per source.
+        self.state.client_side_return_types = {
+            expanded_artifact.name: _GetExpandedArtifactReturnTypes(
+                expanded_artifact) for expanded_artifact in request.artifacts
+        }
+        self.CallClient(
+            server_stubs.ArtifactCollector,
+            request=request,
+            next_state="ProcessClientSideCollection")
+        return
 
+    for artifact_obj in artifact_objs:
       self.Collect(artifact_obj)
 
   def Collect(self, artifact_obj):
@@ -595,6 +619,25 @@ class ArtifactCollectorFlowMixin(object):
     # Now process the responses.
     self._ParseResponses(list(responses), artifact_name, source)
 
+  def ProcessClientSideCollection(self, responses):
+    """Processes artifacts collected by the client-side artifact collector."""
+    if not responses.success:
+      # Older clients don't support the client-side artifact collector and some
+      # sources can't be collected by it, so we retry collecting on the server.
+      self.Log("Client-side artifact collection failed, falling back to the "
+               "server-side collection. Status: %s.", responses.status)
+      self.state.client_side_collection_failed = True
+      self.CallStateInline(next_state="StartCollection")
+      return
+
+    for response in responses:
+      for collected_artifact in response.collected_artifacts:
+        # Parsers (if requested) were already applied on the client.
+        results = [result.value for result in collected_artifact.action_results]
+        return_types = self.state.client_side_return_types.get(
+            collected_artifact.name)
+        self._SendResults(results, collected_artifact.name, return_types)
+
   def ProcessCollectedRegistryStatEntry(self, responses):
     """Create AFF4 objects for registry statentries.
 
@@ -698,13 +741,48 @@ class ArtifactCollectorFlowMixin(object):
     """
     artifact_return_types = self._GetArtifactReturnTypes(source)
 
-    if self.args.apply_parsers:
-      parser_factory = parsers.ArtifactParserFactory(artifact_name)
-      results = artifact.ApplyParsersToResponses(parser_factory, responses,
-                                                 self)
-    else:
-      results = responses
+    if not self.args.apply_parsers:
+      self._SendResults(responses, artifact_name, artifact_return_types)
+      return
+
+    parser_factory = parsers.ArtifactParserFactory(artifact_name)
+
+    # Relational flows don't wait for parsers run in the pool: the results are
+    # sent when the flow gets them back.
+    if isinstance(self, flow_base.FlowBase) and parser_pool.IsEnabled():
+      artifact.StartApplyingParsersToResponses(
+          parser_factory,
+          responses,
+          self,
+          next_state="ProcessParsedResponses",
+          request_data={
+              "artifact_name": artifact_name,
+              "source": source
+          })
+      return
+
+    results = artifact.ApplyParsersToResponses(parser_factory, responses, self)
+    self._SendResults(results, artifact_name, artifact_return_types)
+
+  def ProcessParsedResponses(self, responses):
+    """Sends responses parsed in the parser pool.
+
+    Args:
+      responses: Parsed responses of an artifact.
 
+    Raises:
+      flow.FlowError: On failure to parse the responses.
+    """
+    if not responses.success:
+      raise flow.FlowError(responses.status.error_message)
+
+    artifact_name = str(responses.request_data["artifact_name"])
+    source = responses.request_data.GetItem("source", None)
+    self._SendResults(responses, artifact_name,
+                      self._GetArtifactReturnTypes(source))
+
+  def _SendResults(self, results, artifact_name, artifact_return_types):
+    """Sends results of an artifact, filtered by their expected types."""
     for result in results:
       result_type = result.__class__.__name__
       if result_type == "Anomaly":
@@ -987,16 +1065,90 @@ def GetArtifactCollectorArgs(flow_args, knowledge_base):
 def MeetsConditions(knowledge_base, source):
   """Check conditions on the source."""
   source_conditions_met = True
+  # The source may come from the artifact registry, so it must not be modified.
+  conditions = list(source.conditions)
   os_conditions = ConvertSupportedOSToConditions(source)
   if os_conditions:
-    source.conditions.append(os_conditions)
-  for condition in source.conditions:
+    conditions.append(os_conditions)
+  for condition in conditions:
     source_conditions_met &= artifact_utils.CheckCondition(
         condition, knowledge_base)
 
   return source_conditions_met
 
 
+# Client actions that the client-side artifact collector is able to run.
+_CLIENT_SIDE_COLLECTOR_ACTIONS = frozenset([
+    "EnumerateFilesystems",
+    "EnumerateInterfaces",
+    "EnumerateUsers",
+    "GetHostname",
+    "ListNetworkConnections",
+    "ListProcesses",
+    "OSXEnumerateRunningServices",
+    "StatFS",
+])
+
+
+def _IsSourceCollectableOnClient(source, apply_parsers):
+  """Checks whether an expanded source yields the same results on the client."""
+  source_type = rdf_artifacts.ArtifactSource.SourceType
+  attributes = source.base_source.attributes
+  type_name = source.base_source.type
+
+  if type_name in [source_type.COMMAND, source_type.WMI]:
+    return True
+
+  if type_name == source_type.GRR_CLIENT_ACTION:
+    return attributes["client_action"] in _CLIENT_SIDE_COLLECTOR_ACTIONS
+
+  if type_name == source_type.REGISTRY_KEY:
+    return True
+
+  if type_name == source_type.REGISTRY_VALUE:
+    # The client-side collector skips values with globbed keys.
+    return not any(
+        "*" in kvdict["key"] or rdf_paths.GROUPING_PATTERN.search(kvdict["key"])
+        for kvdict in attributes["key_value_pairs"])
+
+  if type_name in [source_type.DIRECTORY, source_type.GREP]:
+    return source.path_type == rdf_paths.PathSpec.PathType.OS
+
+  if type_name == source_type.FILE:
+    # Unlike the server-side collection, the client-side one doesn't download
+    # the files, so they can only be used by parsers running on the client.
+    return (apply_parsers and
+            source.path_type == rdf_paths.PathSpec.PathType.OS)
+
+  return False
+
+
+def _GetExpandedArtifactReturnTypes(expanded_artifact):
+  """Returns types expected from any of the sources of an expanded artifact."""
+  return_types = set()
+  for source in expanded_artifact.sources:
+    if not source.base_source.returned_types:
+      # Responses of sources without declared types are never filtered.
+      return None
+    return_types.update(source.base_source.returned_types)
+  return sorted(return_types)
+
+
+def IsCollectableOnClient(expanded_artifact, apply_parsers):
+  """Checks whether the client-side artifact collector can collect an artifact.
+
+  Args:
+    expanded_artifact: An `ExpandedArtifact` instance.
+    apply_parsers: Whether parsers are applied to the collected responses.
+
+  Returns:
+    True if all the sources of the artifact can be collected on the client.
+  """
+  return all(
+      _IsSourceCollectableOnClient(source, apply_parsers)
+      for source in expanded_artifact.sources)
+
+
 class ArtifactExpander(object):
   """Expands a given artifact and keeps track of processed artifacts."""
 
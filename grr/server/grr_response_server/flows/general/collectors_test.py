@@ -14,6 +14,7 @@ import shutil
 
 from absl import app
 from future.builtins import filter
+from future.builtins import range
 import mock
 import psutil
 
@@ -499,6 +500,73 @@ class MeetsConditionsTest(test_lib.GRRBaseTest):
         conditions=["os == 'Linux' or os == 'Windows'"])
     self.assertTrue(collectors.MeetsConditions(knowledge_base, source))
 
+  def testSourceConditionsAreNotModified(self):
+    knowledge_base = rdf_client.KnowledgeBase()
+    knowledge_base.os = "Windows"
+
+    source = rdf_artifacts.ArtifactSource(
+        type=rdf_artifacts.ArtifactSource.SourceType.REGISTRY_KEY,
+        attributes={"keys": ["HKEY_LOCAL_MACHINE\\SOFTWARE\\foo"]},
+        conditions=["os == 'Windows'"],
+        supported_os=["Windows"])
+
+    for _ in range(3):
+      self.assertTrue(collectors.MeetsConditions(knowledge_base, source))
+    self.assertEqual(list(source.conditions), ["os == 'Windows'"])
+
+
+class IsCollectableOnClientTest(test_lib.GRRBaseTest):
+  """Test the module-level method `IsCollectableOnClient`."""
+
+  def _ExpandedArtifact(self, *sources):
+    return rdf_artifacts.ExpandedArtifact(
+        name="Foo",
+        sources=[
+            rdf_artifacts.ExpandedSource(
+                base_source=source, path_type=rdf_paths.PathSpec.PathType.OS)
+            for source in sources
+        ])
+
+  def testCommandAndSupportedClientAction(self):
+    artifact_obj = self._ExpandedArtifact(
+        rdf_artifacts.ArtifactSource(
+            type=rdf_artifacts.ArtifactSource.SourceType.COMMAND,
+            attributes={
+                "cmd": "/usr/bin/dpkg",
+                "args": ["--list"]
+            }),
+        rdf_artifacts.ArtifactSource(
+            type=rdf_artifacts.ArtifactSource.SourceType.GRR_CLIENT_ACTION,
+            attributes={"client_action": standard.ListProcesses.__name__}))
+    self.assertTrue(collectors.IsCollectableOnClient(artifact_obj, False))
+
+  def testUnsupportedClientAction(self):
+    artifact_obj = self._ExpandedArtifact(
+        rdf_artifacts.ArtifactSource(
+            type=rdf_artifacts.ArtifactSource.SourceType.GRR_CLIENT_ACTION,
+            attributes={"client_action": "GetMemoryInformation"}))
+    self.assertFalse(collectors.IsCollectableOnClient(artifact_obj, False))
+
+  def testFileRequiresParsing(self):
+    artifact_obj = self._ExpandedArtifact(
+        rdf_artifacts.ArtifactSource(
+            type=rdf_artifacts.ArtifactSource.SourceType.FILE,
+            attributes={"paths": ["/etc/passwd"]}))
+    self.assertFalse(collectors.IsCollectableOnClient(artifact_obj, False))
+    self.assertTrue(collectors.IsCollectableOnClient(artifact_obj, True))
+
+  def testRegistryValueWithGlob(self):
+    artifact_obj = self._ExpandedArtifact(
+        rdf_artifacts.ArtifactSource(
+            type=rdf_artifacts.ArtifactSource.SourceType.REGISTRY_VALUE,
+            attributes={
+                "key_value_pairs": [{
+                    "key": "HKEY_LOCAL_MACHINE\\SOFTWARE\\*",
+                    "value": "foo"
+                }]
+            }))
+    self.assertFalse(collectors.IsCollectableOnClient(artifact_obj, False))
+
 
 class GetArtifactCollectorArgsTest(test_lib.GRRBaseTest):
   """Test the preparation of the input object for the client action."""
@@ -858,6 +926,71 @@ class ClientArtifactCollectorFlowTest(flow_test_lib.FlowTestsBaseclass):
     artifact_response = results[1]
     self.assertTrue(artifact_response.string)
 
+  @mock.patch.object(parsers, "SINGLE_RESPONSE_PARSER_FACTORY",
+                     factory.Factory(parser.SingleResponseParser))
+  def testArtifactCollectorFlowCollectsOnClient(self):
+    """Test that the whole collection is delegated to the client if enabled."""
+
+    filesystem_test_lib.Command("/bin/echo", args=["1"])
+
+    parsers.SINGLE_RESPONSE_PARSER_FACTORY.Register("TestCmd", TestCmdParser)
+    try:
+      artifact_list = ["TestEchoArtifact"]
+
+      expected = self._RunFlow(
+          aff4_flows.ArtifactCollectorFlow,
+          standard.ExecuteCommand,
+          artifact_list,
+          apply_parsers=True)
+      self.assertLen(expected, 1)
+
+      # The mock only supports the client-side artifact collector, so results
+      # are only returned if the flow doesn't call any other client actions.
+      with test_lib.ConfigOverrider({"Artifacts.client_side_collection": True}):
+        results = self._RunFlow(
+            aff4_flows.ArtifactCollectorFlow,
+            artifact_collector.ArtifactCollector,
+            artifact_list,
+            apply_parsers=True)
+      self.assertEqual(results, expected)
+    finally:
+      parsers.SINGLE_RESPONSE_PARSER_FACTORY.Unregister("TestCmd")
+
+  @mock.patch.object(parsers, "SINGLE_RESPONSE_PARSER_FACTORY",
+                     factory.Factory(parser.SingleResponseParser))
+  def testArtifactCollectorFlowFallsBackToServerSideCollection(self):
+    """Test that a failed client-side collection is redone on the server."""
+
+    filesystem_test_lib.Command("/bin/echo", args=["1"])
+
+    parsers.SINGLE_RESPONSE_PARSER_FACTORY.Register("TestCmd", TestCmdParser)
+    try:
+      # The mock doesn't support the client-side artifact collector.
+      with test_lib.ConfigOverrider({"Artifacts.client_side_collection": True}):
+        results = self._RunFlow(
+            aff4_flows.ArtifactCollectorFlow,
+            standard.ExecuteCommand, ["TestEchoArtifact"],
+            apply_parsers=True)
+      self.assertLen(results, 1)
+      self.assertIsInstance(results[0], rdf_client.SoftwarePackages)
+    finally:
+      parsers.SINGLE_RESPONSE_PARSER_FACTORY.Unregister("TestCmd")
+
+  def testArtifactCollectorFlowFiltersClientSideResultsByType(self):
+    """Test that unparsed client-side results are filtered like on server."""
+
+    filesystem_test_lib.Command(
+        "/usr/bin/dpkg", args=["--list"], system="Linux")
+
+    # `TestCmdArtifact` declares `SoftwarePackages` as its only returned type,
+    # so raw `ExecuteResponse` values are not returned without parsing.
+    with test_lib.ConfigOverrider({"Artifacts.client_side_collection": True}):
+      results = self._RunFlow(
+          aff4_flows.ArtifactCollectorFlow,
+          artifact_collector.ArtifactCollector, ["TestCmdArtifact"],
+          apply_parsers=False)
+    self.assertEmpty(results)
+
   def testLinuxMountCmdArtifact(self):
     """Test that LinuxMountCmd artifact can be collected."""
 
@@ -18,8 +18,10 @@ from grr_response_core.lib.rdfvalues import artifacts as rdf_artifacts
 from grr_response_core.lib.rdfvalues import client as rdf_client
 from grr_response_core.lib.rdfvalues import client_action as rdf_client_action
 from grr_response_core.lib.rdfvalues import client_fs as rdf_client_fs
+from grr_response_core.lib.rdfvalues import file_finder as rdf_file_finder
 from grr_response_core.lib.rdfvalues import paths as rdf_paths
 from grr_response_core.lib.rdfvalues import structs as rdf_structs
+from grr_response_core.lib.util import collection
 from grr_response_proto import flows_pb2
 from grr_response_server import aff4
 from grr_response_server import data_store
@@ -258,6 +260,9 @@ class RecursiveListDirectoryMixin(object):
 
   args_type = RecursiveListDirectoryArgs
 
+  # Number of stat entries of a recursive listing written at once.
+  _STORE_BATCH_SIZE = 1000
+
   def Start(self):
     """List the initial directory."""
     # The first directory we listed.
@@ -266,11 +271,53 @@ class RecursiveListDirectoryMixin(object):
     self.state.dir_count = 0
     self.state.file_count = 0
 
+    if self.client_version >= 3250:
+      # The client walks the tree itself, which saves a round trip per
+      # directory. A max_depth of 0 still lists the immediate subdirectories.
+      self.state.client_max_depth = max(self.args.max_depth, 1)
+      self.CallClient(
+          server_stubs.RecursiveListDirectory,
+          pathspec=self.args.pathspec,
+          max_depth=self.state.client_max_depth,
+          next_state="ProcessRecursiveListing")
+      return
+
     self.CallClient(
         server_stubs.ListDirectory,
         pathspec=self.args.pathspec,
         next_state="ProcessDirectory")
 
+  def ProcessRecursiveListing(self, responses):
+    """Stores the stat entries of a whole directory tree."""
+    if not responses.success:
+      self.Log("Failed to list %s: %s", self.args.pathspec.CollapsePath(),
+               responses.status)
+      return
+
+    response = responses.First()
+    if response is None:
+      return
+
+    self.state.first_directory = response.pathspec.Dirname().AFF4Path(
+        self.client_urn)
+
+    for batch in collection.Batch(responses, self._STORE_BATCH_SIZE):
+      self.StoreDirectory(batch)
+
+      for stat_response in batch:
+        # Directories at the maximum depth are returned but not listed.
+        if (not stat_response.symlink and
+            stat.S_ISDIR(stat_response.st_mode) and
+            self._RecursiveListingDepth(stat_response) <=
+            self.state.client_max_depth):
+          self.state.dir_count += 1
+      self.state.file_count += len(batch)
+
+  def _RecursiveListingDepth(self, stat_response):
+    """Returns the depth of an entry below the listed directory."""
+    urn = stat_response.pathspec.AFF4Path(self.client_urn)
+    return len((urn.RelativeName(self.state.first_directory) or "").split("/"))
+
   def ProcessDirectory(self, responses):
     """Recursively list the directory, and add to the timeline."""
     if responses.success:
@@ -698,6 +745,40 @@ class GlobLogic(object):
       patterns.extend(
           path.Interpolate(knowledge_base=self.client_knowledge_base))
 
+    # The client can expand whole OS patterns itself, which saves a round trip
+    # per path component. Matching on the server is the fallback for paths
+    # relative to a root pathspec and for clients failing to do so.
+    if pathtype == rdf_paths.PathSpec.PathType.OS and not root_path:
+      # Non-regular files are processed because the server side glob reports
+      # all kinds of files matching the last component.
+      request = rdf_file_finder.FileFinderArgs(
+          paths=patterns,
+          pathtype=pathtype,
+          process_non_regular_files=True,
+          action=rdf_file_finder.FileFinderAction.Stat(
+              collect_ext_attrs=collect_ext_attrs))
+      self.CallClient(
+          server_stubs.FileFinderOS,
+          request,
+          next_state="ProcessClientGlob",
+          request_data=dict(patterns=patterns))
+      return
+
+    self._GlobOnServer(patterns)
+
+  def ProcessClientGlob(self, responses):
+    """Reports matches of patterns expanded on the client."""
+    if not responses.success:
+      self.Log("Client side glob failed, matching on the server: %s",
+               responses.status)
+      self._GlobOnServer(list(responses.request_data["patterns"]))
+      return
+
+    for response in responses:
+      self.GlobReportMatch(response.stat_entry)
+
+  def _GlobOnServer(self, patterns):
+    """Expands patterns by matching client listings path component-wise."""
     # Sort the patterns so that if there are files whose paths conflict with
     # directory paths, the files get handled after the conflicting directories
     # have been added to the component tree.
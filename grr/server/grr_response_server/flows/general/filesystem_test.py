@@ -23,8 +23,10 @@ from grr_response_core.lib.rdfvalues import client as rdf_client
 from grr_response_core.lib.rdfvalues import file_finder as rdf_file_finder
 from grr_response_core.lib.rdfvalues import paths as rdf_paths
 from grr_response_core.lib.util import compatibility
+from grr_response_core.lib.util import temp
 from grr_response_server import aff4
 from grr_response_server import data_store
+from grr_response_server import data_store_utils
 from grr_response_server import file_store
 from grr_response_server import flow
 from grr_response_server import flow_base
@@ -290,6 +292,75 @@ class TestFilesystem(flow_test_lib.FlowTestsBaseclass):
             pathspec=pb,
             token=self.token)
 
+  def testRecursiveListDirectory(self):
+    """Test that the RecursiveListDirectory flow works."""
+    client_mock = action_mocks.ListDirectoryClientMock()
+    with temp.AutoTempDirPath(remove_non_empty=True) as temp_dirpath:
+      os.makedirs(os.path.join(temp_dirpath, "a", "b", "c", "d"))
+      with io.open(os.path.join(temp_dirpath, "a", "b", "foo"), "wb") as fd:
+        fd.write(b"foo")
+
+      pb = rdf_paths.PathSpec(
+          path=temp_dirpath, pathtype=rdf_paths.PathSpec.PathType.OS)
+      session_id = flow_test_lib.TestFlowHelper(
+          compatibility.GetName(filesystem.RecursiveListDirectory),
+          client_mock,
+          client_id=self.client_id,
+          pathspec=pb,
+          max_depth=2,
+          token=self.token)
+
+    # The whole tree is listed by a single client action.
+    self.assertEqual(client_mock.action_counts["RecursiveListDirectory"], 1)
+    self.assertEqual(client_mock.action_counts["ListDirectory"], 0)
+
+    results = flow_test_lib.GetFlowResults(self.client_id, session_id)
+    self.assertCountEqual(
+        [os.path.relpath(r.pathspec.path, temp_dirpath) for r in results],
+        ["a", "a/b", "a/b/c", "a/b/foo"])
+
+    # a/b/c is returned, but it is too deep to be listed.
+    state = flow_test_lib.GetFlowState(
+        self.client_id, session_id, token=self.token)
+    self.assertEqual(state.dir_count, 2)
+
+    if data_store.RelationalDBEnabled():
+      components = temp_dirpath.strip("/").split("/") + ["a", "b"]
+      children = data_store.REL_DB.ListChildPathInfos(
+          self.client_id.Basename(), rdf_objects.PathInfo.PathType.OS,
+          components)
+      self.assertCountEqual([child.components[-1] for child in children],
+                            ["c", "foo"])
+
+  def testRecursiveListDirectoryOnOldClient(self):
+    """Test that directories are listed one by one on old clients."""
+    client_mock = action_mocks.ListDirectoryClientMock()
+    with temp.AutoTempDirPath(remove_non_empty=True) as temp_dirpath:
+      os.makedirs(os.path.join(temp_dirpath, "a", "b", "c", "d"))
+      with io.open(os.path.join(temp_dirpath, "a", "b", "foo"), "wb") as fd:
+        fd.write(b"foo")
+
+      pb = rdf_paths.PathSpec(
+          path=temp_dirpath, pathtype=rdf_paths.PathSpec.PathType.OS)
+      # Clients older than 3250 do not know RecursiveListDirectory.
+      with mock.patch.object(
+          data_store_utils, "GetClientVersion", return_value=3249):
+        session_id = flow_test_lib.TestFlowHelper(
+            compatibility.GetName(filesystem.RecursiveListDirectory),
+            client_mock,
+            client_id=self.client_id,
+            pathspec=pb,
+            max_depth=2,
+            token=self.token)
+
+    self.assertEqual(client_mock.action_counts["RecursiveListDirectory"], 0)
+    self.assertGreater(client_mock.action_counts["ListDirectory"], 1)
+
+    results = flow_test_lib.GetFlowResults(self.client_id, session_id)
+    self.assertCountEqual(
+        [os.path.relpath(r.pathspec.path, temp_dirpath) for r in results],
+        ["a", "a/b", "a/b/c", "a/b/foo"])
+
   def _ListTestChildPathInfos(self,
                               path_components,
                               path_type=rdf_objects.PathInfo.PathType.TSK):
@@ -834,6 +905,30 @@ class TestFilesystem(flow_test_lib.FlowTestsBaseclass):
           stat_paths = [c.pathspec.CollapsePath() for c in stat_args]
           self.assertListEqual(sorted(stat_paths), sorted(set(stat_paths)))
 
+  def testGlobIsExpandedOnClient(self):
+    """Tests that whole patterns are expanded by a single client action."""
+    for pattern, expected in [
+        ("numbers.txt", ["numbers.txt"]),
+        ("A/b/*", ["a/b/c", "a/b/d"]),
+        ("a/**/hello*.txt", ["a/b/c/helloc.txt", "a/b/d/hellod.txt"]),
+        ("{numbers,morenumbers}.txt", ["numbers.txt", "morenumbers.txt"]),
+    ]:
+      client_mock = action_mocks.ClientFileFinderClientMock()
+      session_id = flow_test_lib.TestFlowHelper(
+          compatibility.GetName(filesystem.Glob),
+          client_mock,
+          client_id=self.client_id,
+          paths=[os.path.join(self.base_path, pattern)],
+          token=self.token)
+
+      self.assertEqual(client_mock.action_counts["FileFinderOS"], 1)
+      self.assertEqual(list(client_mock.recorded_args), ["FileFinderOS"])
+
+      results = flow_test_lib.GetFlowResults(self.client_id, session_id)
+      self.assertCountEqual(
+          [os.path.relpath(st.pathspec.path, self.base_path) for st in results],
+          expected)
+
   def _CheckCasing(self, path, filename):
     if data_store.AFF4Enabled():
       output_path = self.client_id.Add("fs/os").Add(
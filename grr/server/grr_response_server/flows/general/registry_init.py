@@ -25,6 +25,7 @@ from grr_response_server.flows.general import network
 from grr_response_server.flows.general import osquery
 from grr_response_server.flows.general import processes
 from grr_response_server.flows.general import registry
+from grr_response_server.flows.general import timeline
 from grr_response_server.flows.general import transfer
 from grr_response_server.flows.general import webhistory
 from grr_response_server.flows.general import windows_vsc
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+"""A module with a flow collecting filesystem timelines and its decoders."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+from grr_response_core.lib.rdfvalues import client_fs as rdf_client_fs
+from grr_response_core.lib.rdfvalues import timeline as rdf_timeline
+from grr_response_core.lib.util.compat import csv
+from grr_response_server import data_store
+from grr_response_server import flow
+from grr_response_server import flow_base
+from grr_response_server import server_stubs
+from grr_response_server.rdfvalues import objects as rdf_objects
+
+
+class BlobNotFoundError(Exception):
+  """An exception raised when a blob with timeline entries is missing."""
+
+  def __init__(self, blob_id):
+    super(BlobNotFoundError, self).__init__(
+        "Timeline blob '{}' not found".format(blob_id))
+    self.blob_id = blob_id
+
+
+@flow_base.DualDBFlow
+class TimelineFlowMixin(object):
+  """A flow mixin collecting a timeline of a directory tree on the client.
+
+  Results of the flow only reference blobs with the collected entries. Use
+  `ProtoEntries`, `BodyFileChunks` or `CsvChunks` to decode them.
+  """
+
+  friendly_name = "Timeline"
+  category = "/Collectors/"
+  behaviours = flow.GRRFlow.behaviours + "ADVANCED"
+
+  args_type = rdf_timeline.TimelineArgs
+
+  def Start(self):
+    super(TimelineFlowMixin, self).Start()
+
+    if not self.args.root:
+      raise ValueError("The timeline root directory not specified")
+
+    self.CallClient(
+        server_stubs.Timeline, request=self.args, next_state="Process")
+
+  def Process(self, responses):
+    if not responses.success:
+      raise flow.FlowError(responses.status)
+
+    for response in responses:
+      self.SendReply(response)
+
+
+def _ReadChunks(results):
+  """Reads blobs with serialized entries referenced by timeline results."""
+  for result in results:
+    blob_ids = [
+        rdf_objects.BlobID.FromBytes(blob_id)
+        for blob_id in result.entry_batch_blob_ids
+    ]
+    blobs = data_store.BLOBS.ReadBlobs(blob_ids)
+
+    for blob_id in blob_ids:
+      blob = blobs[blob_id]
+      if blob is None:
+        raise BlobNotFoundError(blob_id)
+      yield blob
+
+
+def ProtoEntries(results):
+  """Decodes timeline entries referenced by results of the timeline flow.
+
+  Args:
+    results: An iterable of `rdf_timeline.TimelineResult` instances.
+
+  Returns:
+    An iterator over `timeline_pb2.TimelineEntry` protos.
+  """
+  return rdf_timeline.DeserializeTimelineEntries(_ReadChunks(results))
+
+
+def _Path(entry):
+  return entry.path.decode("utf-8", "replace")
+
+
+def BodyFileChunks(results):
+  """Exports timeline entries in the body file format (as used by mactime).
+
+  Args:
+    results: An iterable of `rdf_timeline.TimelineResult` instances.
+
+  Yields:
+    Chunks of the body file content (as unicode strings).
+  """
+  for chunk in _ReadChunks(results):
+    writer = csv.Writer(delimiter="|")
+
+    for entry in rdf_timeline.DeserializeTimelineEntries([chunk]):
+      writer.WriteRow([
+          "0",  # MD5 hashes are not collected.
+          _Path(entry),
+          "%d" % entry.ino,
+          "%s" % rdf_client_fs.StatMode(entry.mode),
+          "%d" % entry.uid,
+          "%d" % entry.gid,
+          "%d" % entry.size,
+          "%d" % (entry.atime_ns // 10**9),
+          "%d" % (entry.mtime_ns // 10**9),
+          "%d" % (entry.ctime_ns // 10**9),
+          "0",  # Creation time is not collected.
+      ])
+
+    yield writer.Content()
+
+
+CSV_COLUMNS = [
+    "path",
+    "mode",
+    "size",
+    "dev",
+    "ino",
+    "uid",
+    "gid",
+    "atime_ns",
+    "mtime_ns",
+    "ctime_ns",
+]
+
+
+def CsvChunks(results):
+  """Exports timeline entries in the CSV format.
+
+  Args:
+    results: An iterable of `rdf_timeline.TimelineResult` instances.
+
+  Yields:
+    Chunks of the CSV content (as unicode strings), starting with a header.
+  """
+  writer = csv.Writer()
+  writer.WriteRow(CSV_COLUMNS)
+  yield writer.Content()
+
+  for chunk in _ReadChunks(results):
+    writer = csv.Writer()
+
+    for entry in rdf_timeline.DeserializeTimelineEntries([chunk]):
+      row = [_Path(entry)]
+      row.extend("%d" % getattr(entry, column) for column in CSV_COLUMNS[1:])
+      writer.WriteRow(row)
+
+    yield writer.Content()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import io
+import os
+
+from absl import app
+
+from grr_response_client.client_actions import timeline as timeline_action
+from grr_response_core.lib.util import temp
+from grr_response_core.lib.util.compat import csv
+from grr_response_server.flows.general import timeline as timeline_flow
+from grr.test_lib import action_mocks
+from grr.test_lib import db_test_lib
+from grr.test_lib import flow_test_lib
+from grr.test_lib import test_lib
+
+
+@db_test_lib.DualDBTest
+class TimelineFlowTest(flow_test_lib.FlowTestsBaseclass):
+
+  def setUp(self):
+    super(TimelineFlowTest, self).setUp()
+    self.client_id = self.SetupClient(0)
+
+  def _Collect(self, root):
+    session_id = flow_test_lib.TestFlowHelper(
+        timeline_flow.TimelineFlow.__name__,
+        action_mocks.ActionMock(timeline_action.Timeline),
+        client_id=self.client_id,
+        token=self.token,
+        root=root)
+    return flow_test_lib.GetFlowResults(self.client_id, session_id)
+
+  def testProtoEntries(self):
+    with temp.AutoTempDirPath(remove_non_empty=True) as dirpath:
+      os.mkdir(os.path.join(dirpath, "foo"))
+      with io.open(os.path.join(dirpath, "foo", "bar"), "wb") as filedesc:
+        filedesc.write(b"BAR")
+
+      results = self._Collect(dirpath)
+      bar_stat = os.lstat(os.path.join(dirpath, "foo", "bar"))
+
+    self.assertNotEmpty(results)
+
+    root = dirpath.encode("utf-8")
+    entries = {
+        entry.path: entry for entry in timeline_flow.ProtoEntries(results)
+    }
+    self.assertCountEqual(entries, [
+        root,
+        os.path.join(root, b"foo"),
+        os.path.join(root, b"foo", b"bar"),
+    ])
+
+    bar_entry = entries[os.path.join(root, b"foo", b"bar")]
+    self.assertEqual(bar_entry.size, 3)
+    self.assertEqual(bar_entry.ino, bar_stat.st_ino)
+
+  def testBodyFileChunks(self):
+    with temp.AutoTempDirPath(remove_non_empty=True) as dirpath:
+      bar_path = os.path.join(dirpath, "bar")
+      with io.open(bar_path, "wb") as filedesc:
+        filedesc.write(b"BAR")
+      os.chmod(bar_path, 0o640)
+
+      results = self._Collect(dirpath)
+      bar_stat = os.lstat(bar_path)
+
+    content = "".join(timeline_flow.BodyFileChunks(results))
+    rows = list(csv.Reader(content, delimiter="|"))
+    self.assertLen(rows, 2)
+
+    rows_by_path = {row[1]: row for row in rows}
+    self.assertEqual(rows_by_path[bar_path], [
+        "0",
+        bar_path,
+        "%d" % bar_stat.st_ino,
+        "-rw-r-----",
+        "%d" % bar_stat.st_uid,
+        "%d" % bar_stat.st_gid,
+        "3",
+        "%d" % bar_stat.st_atime,
+        "%d" % bar_stat.st_mtime,
+        "%d" % bar_stat.st_ctime,
+        "0",
+    ])
+
+  def testCsvChunks(self):
+    with temp.AutoTempDirPath(remove_non_empty=True) as dirpath:
+      bar_path = os.path.join(dirpath, "bar")
+      with io.open(bar_path, "wb") as filedesc:
+        filedesc.write(b"BAR")
+
+      results = self._Collect(dirpath)
+
+    content = "".join(timeline_flow.CsvChunks(results))
+    rows = list(csv.Reader(content))
+    self.assertLen(rows, 3)
+    self.assertEqual(rows[0], timeline_flow.CSV_COLUMNS)
+
+    rows_by_path = {row[0]: row for row in rows[1:]}
+    self.assertCountEqual(rows_by_path, [dirpath, bar_path])
+    self.assertEqual(rows_by_path[bar_path][2], "3")
+
+
+if __name__ == "__main__":
+  app.run(test_lib.main)
@@ -34,6 +34,7 @@ from grr_response_server import server_stubs
 from grr_response_server.aff4_objects import aff4_grr
 from grr_response_server.aff4_objects import filestore as legacy_filestore
 from grr_response_server.databases import db
+from grr_response_server.databases import db_compat
 from grr_response_server.rdfvalues import objects as rdf_objects
 
 
@@ -267,6 +268,15 @@ class MultiGetFileLogic(object):
   # allows us to amortize file store round trips and increases throughput.
   MIN_CALL_TO_FILE_STORE = 200
 
+  # Clients of a hunt often have identical files. Only one of them at a time
+  # downloads a file with a given hash, the others wait for the download to
+  # finish and then just reference the file in the file store. The download
+  # claim expires after HUNT_FILE_DOWNLOAD_LEASE_TIME so that files claimed by
+  # clients that went away are eventually downloaded by other clients.
+  HUNT_FILE_DOWNLOAD_LEASE_TIME = rdfvalue.Duration("1h")
+  # How long to wait before rechecking downloads claimed by other clients.
+  HUNT_FILE_DOWNLOAD_WAIT_TIME = rdfvalue.Duration("1m")
+
   def Start(self,
             file_size=0,
             maximum_pending_files=1000,
@@ -293,6 +303,11 @@ class MultiGetFileLogic(object):
     # values are FileTracker instances.
     self.state.pending_files = {}
 
+    # A dict of file trackers which are not in the file store, but are being
+    # downloaded by another client of the same hunt. Keys are indexes of
+    # pathspecs and values are FileTracker instances.
+    self.state.pending_hunt_downloads = {}
+
     # The maximum number of files we are allowed to download concurrently.
     self.state.maximum_pending_files = maximum_pending_files
 
@@ -326,7 +341,8 @@ class MultiGetFileLogic(object):
     if self.state.maximum_pending_files <= len(self.state.pending_files):
       return
 
-    if self.state.maximum_pending_files <= len(self.state.pending_hashes):
+    if self.state.maximum_pending_files <= (
+        len(self.state.pending_hashes) + len(self.state.pending_hunt_downloads)):
       return
 
     try:
@@ -385,6 +401,7 @@ class MultiGetFileLogic(object):
     self.state.request_data_list[index] = None
     self.state.pending_hashes.pop(index, None)
     self.state.pending_files.pop(index, None)
+    self.state.pending_hunt_downloads.pop(index, None)
 
     # We have a bit more room in the pending_hashes so we try to schedule
     # another pathspec.
@@ -413,6 +430,10 @@ class MultiGetFileLogic(object):
 
   def _FileFetchFailed(self, index, request_name):
     """Remove pathspec for this index and call the FileFetchFailed method."""
+    tracker = self.state.pending_files.get(index)
+    if tracker is not None:
+      # Let other clients of the hunt download the file.
+      self._ReleaseHuntFileDownload(tracker)
 
     pathspec, request_data = self._RemoveCompletedPathspec(index)
 
@@ -634,6 +655,11 @@ class MultiGetFileLogic(object):
     if not data_store.RelationalDBEnabled():
       return self._LegacyCheckHashesWithFileStore()
 
+    # Files downloaded by other clients of the hunt might be in the file store
+    # by now, so they are checked again.
+    self.state.pending_hashes.update(self.state.pending_hunt_downloads)
+    self.state.pending_hunt_downloads = {}
+
     if not self.state.pending_hashes:
       return
 
@@ -696,9 +722,14 @@ class MultiGetFileLogic(object):
     # for them to be copied.
     for index in file_hashes:
 
+      file_tracker = self.state.pending_hashes.pop(index)
+      if not self._ClaimHuntFileDownload(file_tracker):
+        # Another client of the hunt is downloading this file.
+        self.state.pending_hunt_downloads[index] = file_tracker
+        continue
+
       # Move the tracker from the pending hashes store to the pending files
       # store - it will now be downloaded.
-      file_tracker = self.state.pending_hashes.pop(index)
       self.state.pending_files[index] = file_tracker
 
       # If we already know how big the file is we use that, otherwise fall back
@@ -736,6 +767,58 @@ class MultiGetFileLogic(object):
       self.Log("Hashed %d files, skipped %s already stored.",
                self.state.files_hashed, self.state.files_skipped)
 
+  def _GetHuntId(self):
+    """Returns the id of the relational hunt this flow belongs to (or None)."""
+    if not isinstance(self, flow_base.FlowBase):
+      return None
+
+    hunt_id = self.rdf_flow.parent_hunt_id
+    if not hunt_id or db_compat.IsLegacyHunt(hunt_id):
+      return None
+
+    return hunt_id
+
+  def _ClaimHuntFileDownload(self, file_tracker):
+    """Claims the download of the tracked file within the flow's hunt.
+
+    Args:
+      file_tracker: A tracker of a file that is not in the file store.
+
+    Returns:
+      False if another client of the hunt is downloading the file, True if the
+      file should be downloaded by this flow.
+    """
+    hunt_id = self._GetHuntId()
+    if hunt_id is None:
+      return True
+
+    hash_id = rdf_objects.SHA256HashID.FromBytes(
+        file_tracker["hash_obj"].sha256.AsBytes())
+    claimed_by = data_store.REL_DB.ClaimHuntFileDownload(
+        hunt_id, hash_id, self.client_id, self.HUNT_FILE_DOWNLOAD_LEASE_TIME)
+    if claimed_by != self.client_id:
+      return False
+
+    file_tracker["hunt_download_claimed"] = True
+    return True
+
+  def _ReleaseHuntFileDownload(self, file_tracker):
+    """Releases the hunt download claim of the tracked file (if any)."""
+    if not file_tracker.pop("hunt_download_claimed", False):
+      return
+
+    hash_id = rdf_objects.SHA256HashID.FromBytes(
+        file_tracker["hash_obj"].sha256.AsBytes())
+    data_store.REL_DB.ReleaseHuntFileDownload(self._GetHuntId(), hash_id,
+                                              self.client_id)
+
+  def CheckHuntFileDownloads(self, responses):
+    """Checks files waiting for downloads by other clients of the hunt."""
+    del responses  # Unused.
+
+    self._CheckHashesWithFileStore()
+    self.FetchFileContent()
+
   def CheckHash(self, responses):
     """Adds the block hash to the file tracker responsible for this vfs URN."""
     index = responses.request_data["index"]
@@ -873,6 +956,10 @@ class MultiGetFileLogic(object):
 
           data_store.REL_DB.WritePathInfos(self.client_id, [path_info])
 
+          # The file is in the file store now, other clients of the hunt can
+          # just reference it.
+          self._ReleaseHuntFileDownload(file_tracker)
+
         if (not data_store.RelationalDBEnabled() and
             self.state.use_external_stores):
           # Publish the new file event to cause the file to be added to the
@@ -899,6 +986,14 @@ class MultiGetFileLogic(object):
       self._CheckHashesWithFileStore()
       self.FetchFileContent()
 
+    # Flow requests are processed in order, so waiting for other clients of the
+    # hunt is only scheduled when there is nothing else left to do.
+    if not self.outstanding_requests and self.state.pending_hunt_downloads:
+      self.CallState(
+          next_state="CheckHuntFileDownloads",
+          start_time=rdfvalue.RDFDatetime.Now() +
+          self.HUNT_FILE_DOWNLOAD_WAIT_TIME)
+
     if not self.outstanding_requests:
       super(MultiGetFileLogic, self).End(responses)
 
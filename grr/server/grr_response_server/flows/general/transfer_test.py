@@ -5,6 +5,7 @@ from __future__ import division
 from __future__ import unicode_literals
 
 import hashlib
+import io
 import os
 import platform
 import unittest
@@ -15,6 +16,7 @@ from future.utils import iterkeys
 import mock
 
 from grr_response_core.lib import constants
+from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import client as rdf_client
 from grr_response_core.lib.rdfvalues import paths as rdf_paths
@@ -23,9 +25,11 @@ from grr_response_server import aff4
 from grr_response_server import data_store
 from grr_response_server import data_store_utils
 from grr_response_server import file_store
+from grr_response_server import flow
 from grr_response_server.aff4_objects import aff4_grr
 from grr_response_server.databases import db
 from grr_response_server.flows.general import transfer
+from grr_response_server.rdfvalues import hunt_objects as rdf_hunt_objects
 from grr_response_server.rdfvalues import objects as rdf_objects
 from grr.test_lib import action_mocks
 from grr.test_lib import db_test_lib
@@ -660,6 +664,127 @@ class MultiGetFileFlowTest(CompareFDsMixin, flow_test_lib.FlowTestsBaseclass):
       self.assertIsInstance(blob_ref, rdf_objects.BlobReference)
 
 
+class MultiGetFileHuntDownloadsTest(db_test_lib.RelationalDBEnabledMixin,
+                                    flow_test_lib.FlowTestsBaseclass):
+  """Test deduplication of file downloads within a hunt."""
+
+  def setUp(self):
+    super(MultiGetFileHuntDownloadsTest, self).setUp()
+    self.client_id = self.SetupClient(0).Basename()
+    self.other_client_id = self.SetupClient(1).Basename()
+
+    hunt_obj = rdf_hunt_objects.Hunt(description="foo")
+    data_store.REL_DB.WriteHuntObject(hunt_obj)
+    self.hunt_id = hunt_obj.hunt_id
+
+    self.path = os.path.join(self.temp_dir, "foo.txt")
+    with io.open(self.path, "wb") as fd:
+      fd.write(b"Hello")
+    self.hash_id = rdf_objects.SHA256HashID.FromData(b"Hello")
+
+  def _StartFlow(self, client_id):
+    pathspec = rdf_paths.PathSpec(
+        pathtype=rdf_paths.PathSpec.PathType.OS, path=self.path)
+    return flow.StartFlow(
+        flow_cls=transfer.MultiGetFile,
+        client_id=client_id,
+        flow_args=transfer.MultiGetFileArgs(pathspecs=[pathspec]),
+        parent_hunt_id=self.hunt_id)
+
+  def _RunWaitingFlow(self, client_mock):
+    """Starts a flow waiting for a download claimed by the other client."""
+    data_store.REL_DB.ClaimHuntFileDownload(
+        self.hunt_id, self.hash_id, self.other_client_id,
+        transfer.MultiGetFile.HUNT_FILE_DOWNLOAD_LEASE_TIME)
+
+    flow_id = self._StartFlow(self.client_id)
+    flow_test_lib.RunFlow(
+        self.client_id,
+        flow_id,
+        client_mock=client_mock,
+        check_flow_errors=False)
+
+    self.assertEqual(client_mock.action_counts["HashBuffer"], 0)
+    rdf_flow = data_store.REL_DB.ReadFlowObject(self.client_id, flow_id)
+    self.assertEqual(rdf_flow.flow_state, rdf_flow.FlowState.RUNNING)
+
+    return flow_id
+
+  def _RunDelayedStates(self, flow_id, client_mock):
+    with flow_test_lib.TestWorker(token=True) as worker:
+      self.assertEqual(
+          flow_test_lib.ProcessDueFlowProcessingRequests(worker), 1)
+      flow_test_lib.RunFlow(
+          self.client_id, flow_id, client_mock=client_mock, worker=worker)
+
+  def _CheckFile(self, client_id):
+    pathspec = rdf_paths.PathSpec(
+        pathtype=rdf_paths.PathSpec.PathType.OS, path=self.path)
+    cp = db.ClientPath.FromPathSpec(client_id, pathspec)
+    self.assertEqual(file_store.OpenFile(cp).read(), b"Hello")
+
+  def testReferencesFileDownloadedByAnotherClient(self):
+    client_mock = action_mocks.MultiGetFileClientMock()
+
+    with test_lib.FakeTime(rdfvalue.RDFDatetime.FromSecondsSinceEpoch(1000)):
+      flow_id = self._RunWaitingFlow(client_mock)
+
+      flow_test_lib.StartAndRunFlow(
+          transfer.MultiGetFile,
+          client_mock=action_mocks.MultiGetFileClientMock(),
+          client_id=self.other_client_id,
+          flow_args=transfer.MultiGetFileArgs(pathspecs=[
+              rdf_paths.PathSpec(
+                  pathtype=rdf_paths.PathSpec.PathType.OS, path=self.path)
+          ]),
+          parent_hunt_id=self.hunt_id)
+      self._CheckFile(self.other_client_id)
+
+    with test_lib.FakeTime(rdfvalue.RDFDatetime.FromSecondsSinceEpoch(1100)):
+      self._RunDelayedStates(flow_id, client_mock)
+
+    # The file was not downloaded again.
+    self.assertEqual(client_mock.action_counts["HashBuffer"], 0)
+    self.assertEqual(client_mock.action_counts["TransferBuffer"], 0)
+    self._CheckFile(self.client_id)
+
+  def testDownloadsFileReleasedByAnotherClient(self):
+    client_mock = action_mocks.MultiGetFileClientMock()
+
+    with test_lib.FakeTime(rdfvalue.RDFDatetime.FromSecondsSinceEpoch(1000)):
+      flow_id = self._RunWaitingFlow(client_mock)
+
+      data_store.REL_DB.ReleaseHuntFileDownload(self.hunt_id, self.hash_id,
+                                                self.other_client_id)
+
+    with test_lib.FakeTime(rdfvalue.RDFDatetime.FromSecondsSinceEpoch(1100)):
+      self._RunDelayedStates(flow_id, client_mock)
+
+    self.assertEqual(client_mock.action_counts["TransferBuffer"], 1)
+    self._CheckFile(self.client_id)
+
+    # The claim is released once the file is in the file store.
+    claimed_by = data_store.REL_DB.ClaimHuntFileDownload(
+        self.hunt_id, self.hash_id, self.other_client_id,
+        transfer.MultiGetFile.HUNT_FILE_DOWNLOAD_LEASE_TIME)
+    self.assertEqual(claimed_by, self.other_client_id)
+
+  def testFlowsOutsideOfHuntsDoNotWait(self):
+    data_store.REL_DB.ClaimHuntFileDownload(
+        self.hunt_id, self.hash_id, self.other_client_id,
+        transfer.MultiGetFile.HUNT_FILE_DOWNLOAD_LEASE_TIME)
+
+    pathspec = rdf_paths.PathSpec(
+        pathtype=rdf_paths.PathSpec.PathType.OS, path=self.path)
+    flow_test_lib.StartAndRunFlow(
+        transfer.MultiGetFile,
+        client_mock=action_mocks.MultiGetFileClientMock(),
+        client_id=self.client_id,
+        flow_args=transfer.MultiGetFileArgs(pathspecs=[pathspec]))
+
+    self._CheckFile(self.client_id)
+
+
 def main(argv):
   # Run the full test suite
   test_lib.main(argv)
@@ -6,19 +6,21 @@ from __future__ import unicode_literals
 
 import logging
 import operator
+import threading
 import time
 
 
 from future.utils import iteritems
+from future.utils import itervalues
 
 from grr_response_core import config
 from grr_response_core.lib import communicator
 from grr_response_core.lib import queues
 from grr_response_core.lib import rdfvalue
-from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import client as rdf_client
 from grr_response_core.lib.rdfvalues import client_network as rdf_client_network
 from grr_response_core.lib.rdfvalues import flows as rdf_flows
+from grr_response_core.lib.util import cache
 from grr_response_core.lib.util import collection
 from grr_response_core.lib.util import random
 from grr_response_core.stats import stats_collector_instance
@@ -36,15 +38,24 @@ from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
 from grr_response_server.rdfvalues import objects as rdf_objects
 
 
+def _UnpackReplies(messages):
+  """Splits messages with batched client action replies into single replies."""
+  result = []
+  for message in messages:
+    result.extend(message.UnpackReplies())
+  return result
+
+
 class ServerCommunicator(communicator.Communicator):
   """A communicator which stores certificates using AFF4."""
 
   def __init__(self, certificate, private_key, token=None):
-    self.client_cache = utils.FastStore(1000)
+    self.client_cache = cache.LRUCache(max_size=1000, name="frontend_client")
     self.token = token
     super(ServerCommunicator, self).__init__(
         certificate=certificate, private_key=private_key)
-    self.pub_key_cache = utils.FastStore(max_size=50000)
+    self.pub_key_cache = cache.LRUCache(
+        max_size=50000, num_shards=16, name="pub_key")
     # Our common name as an RDFURN.
     self.common_name = rdfvalue.RDFURN(self.certificate.GetCN())
 
@@ -197,7 +208,8 @@ class RelationalServerCommunicator(communicator.Communicator):
   def __init__(self, certificate, private_key):
     super(RelationalServerCommunicator, self).__init__(
         certificate=certificate, private_key=private_key)
-    self.pub_key_cache = utils.FastStore(max_size=50000)
+    self.pub_key_cache = cache.LRUCache(
+        max_size=50000, num_shards=16, name="pub_key")
     self.common_name = self.certificate.GetCN()
 
   def _GetRemotePublicKey(self, common_name):
@@ -316,6 +328,176 @@ class RelationalServerCommunicator(communicator.Communicator):
     return rdf_flows.GrrMessage.AuthorizationState.AUTHENTICATED
 
 
+class ClientWorkWatcher(object):
+  """Waits for new work for clients whose requests are held open.
+
+  All the waiting requests share a single thread which periodically checks
+  which of the clients waited for have work, so the cost of all held requests
+  is a single check per interval. The thread exits once nobody waits.
+  """
+
+  def __init__(self, clients_with_work, check_interval=1):
+    """Constructor.
+
+    Args:
+      clients_with_work: A callable taking a list of client urns and the
+        rdfvalue.RDFDatetime at which the earliest of the waits for them
+        started, and returning the ones which have work.
+      check_interval: Interval (in seconds) between checks for work.
+    """
+    self._clients_with_work = clients_with_work
+    self._check_interval = check_interval
+    # Client urn -> (event, start time) of the requests waiting for work for
+    # the client.
+    self._waiters = {}
+    self._lock = threading.Lock()
+    self._thread = None
+    # Set when nobody waits anymore so the thread does not linger.
+    self._idle = threading.Event()
+
+  def Wait(self, client, timeout):
+    """Waits until there is work for a client or the timeout elapses.
+
+    Args:
+      client: The ClientURN of the client to wait for.
+      timeout: The longest time (in seconds) to wait.
+
+    Returns:
+      True if there is work for the client, False if the timeout elapsed.
+    """
+    waiter = (threading.Event(), rdfvalue.RDFDatetime.Now())
+    with self._lock:
+      self._waiters.setdefault(client, []).append(waiter)
+      if self._thread is None:
+        self._thread = threading.Thread(
+            name="ClientWorkWatcher", target=self._Run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    try:
+      return waiter[0].wait(timeout)
+    finally:
+      with self._lock:
+        waiters = self._waiters.get(client)
+        if waiters and waiter in waiters:
+          waiters.remove(waiter)
+          if not waiters:
+            del self._waiters[client]
+        if not self._waiters:
+          self._idle.set()
+
+  def _Run(self):
+    """Wakes up waiting requests of clients that have work."""
+    while True:
+      self._idle.wait(self._check_interval)
+
+      with self._lock:
+        self._idle.clear()
+        if not self._waiters:
+          self._thread = None
+          return
+        clients = list(self._waiters)
+        since = min(start_time for waiters in itervalues(self._waiters)
+                    for _, start_time in waiters)
+
+      try:
+        clients_with_work = self._clients_with_work(clients, since)
+      except Exception as e:  # pylint: disable=broad-except
+        logging.warning("Unable to check for work for %d clients: %s",
+                        len(clients), e)
+        continue
+
+      with self._lock:
+        for client in clients_with_work:
+          for event, _ in self._waiters.pop(client, []):
+            event.set()
+
+
+class PendingWorkFilter(object):
+  """Keeps track of clients which may have client action requests to lease.
+
+  The set of clients is refreshed incrementally from the relational database,
+  every refresh only reads clients with requests that became available since
+  the previous one. Clients are dropped from the set once a lease of their
+  requests shows that there is nothing left.
+  """
+
+  # Requests written by transactions that started before a refresh but were
+  # committed after it are picked up by the next refresh.
+  REFRESH_OVERLAP = rdfvalue.Duration("10s")
+
+  def __init__(self, refresh_interval):
+    """Constructor.
+
+    Args:
+      refresh_interval: rdfvalue.Duration between refreshes of the set.
+    """
+    self.refresh_interval = refresh_interval
+    # Client id -> start time of the refresh that found work for the client.
+    self._clients = {}
+    self._last_refresh = None
+    self._lock = threading.Lock()
+    self._refresh_lock = threading.Lock()
+
+  def MayHaveWork(self, client_id):
+    """Returns False if the client is known to have no work, True otherwise."""
+    self._MaybeRefresh()
+
+    with self._lock:
+      if self._last_refresh is None:
+        return True
+      return client_id in self._clients
+
+  def NoWork(self, client_id, checked_at):
+    """Records that a client had no work left.
+
+    Args:
+      client_id: The id of the client.
+      checked_at: rdfvalue.RDFDatetime at which the check that found no work
+        left for the client started. Work found by refreshes that started later
+        is kept.
+    """
+    with self._lock:
+      found_at = self._clients.get(client_id)
+      if found_at is not None and found_at <= checked_at:
+        del self._clients[client_id]
+
+  def _MaybeRefresh(self):
+    """Refreshes the set of clients if it is due and nobody else does it."""
+    now = rdfvalue.RDFDatetime.Now()
+    with self._lock:
+      last_refresh = self._last_refresh
+    if (last_refresh is not None and
+        now - last_refresh < self.refresh_interval):
+      return
+
+    if not self._refresh_lock.acquire(False):
+      return
+
+    try:
+      min_timestamp = None
+      if last_refresh is not None:
+        min_timestamp = last_refresh - self.REFRESH_OVERLAP
+      client_ids = (
+          data_store.REL_DB.ReadClientIdsWithPendingClientActionRequests(
+              min_timestamp=min_timestamp))
+    except Exception as e:  # pylint: disable=broad-except
+      # Until the next successful (full) refresh all clients are assumed to
+      # have work.
+      logging.warning("Unable to refresh clients with pending work: %s", e)
+      with self._lock:
+        self._clients = {}
+        self._last_refresh = None
+      return
+    finally:
+      self._refresh_lock.release()
+
+    with self._lock:
+      for client_id in client_ids:
+        self._clients[client_id] = now
+      self._last_refresh = now
+
+
 class FrontEndServer(object):
   """This is the front end server.
 
@@ -335,7 +517,13 @@ class FrontEndServer(object):
                private_key,
                max_queue_size=50,
                message_expiry_time=120,
-               max_retransmission_time=10):
+               max_retransmission_time=10,
+               poll_delay_max=0,
+               poll_delay_load_threshold=100,
+               long_poll_max_clients=0,
+               long_poll_timeout_max=30,
+               long_poll_check_interval=1,
+               pending_work_refresh_interval=0):
     # Identify ourselves as the server.
     self.token = access_control.ACLToken(
         username="GRRFrontEnd", reason="Implied.")
@@ -351,6 +539,31 @@ class FrontEndServer(object):
     self.message_expiry_time = message_expiry_time
     self.max_retransmission_time = max_retransmission_time
     self.max_queue_size = max_queue_size
+    if poll_delay_max and poll_delay_load_threshold <= 0:
+      raise ValueError("Frontend.poll_delay_load_threshold must be positive, "
+                       "got %s." % poll_delay_load_threshold)
+    self.poll_delay_max = poll_delay_max
+    self.poll_delay_load_threshold = poll_delay_load_threshold
+
+    # The number of message bundles currently being handled, a measure of the
+    # load of this frontend.
+    self._active_bundles = 0
+    self._active_bundles_lock = threading.Lock()
+
+    # Idle clients may ask us to hold their requests open until there is new
+    # work for them. Every held request occupies a handler thread so their
+    # number is bounded.
+    self.long_poll_timeout_max = long_poll_timeout_max
+    self._long_poll_slots = None
+    if long_poll_max_clients:
+      self._long_poll_slots = threading.BoundedSemaphore(long_poll_max_clients)
+    self._work_watcher = ClientWorkWatcher(
+        self._ClientsWithWork, check_interval=long_poll_check_interval)
+
+    self._pending_work = None
+    if pending_work_refresh_interval and data_store.RelationalDBEnabled():
+      self._pending_work = PendingWorkFilter(
+          rdfvalue.Duration.FromSeconds(pending_work_refresh_interval))
 
     # There is only a single session id that we accept unauthenticated
     # messages for, the one to enroll new clients.
@@ -391,6 +604,16 @@ class FrontEndServer(object):
        tuple of (source, message_count) where message_count is the number of
        messages received from the client with common name source.
     """
+    with self._active_bundles_lock:
+      self._active_bundles += 1
+    try:
+      return self._HandleMessageBundles(request_comms, response_comms)
+    finally:
+      with self._active_bundles_lock:
+        self._active_bundles -= 1
+
+  def _HandleMessageBundles(self, request_comms, response_comms):
+    """Processes a queue of messages, see HandleMessageBundles."""
     messages, source, timestamp = self._communicator.DecodeMessages(
         request_comms)
 
@@ -402,6 +625,7 @@ class FrontEndServer(object):
     # We send the client a maximum of self.max_queue_size messages
     required_count = max(0, self.max_queue_size - request_comms.queue_size)
     tasks = []
+    may_have_work = True
 
     message_list = rdf_flows.MessageList()
     # Only give the client messages if we are able to receive them in a
@@ -409,6 +633,16 @@ class FrontEndServer(object):
     if time.time() - now < 10:
       tasks = self.DrainTaskSchedulerQueueForClient(source, required_count)
       message_list.job = tasks
+      # If fewer tasks than allowed were drained, the queue is now empty.
+      may_have_work = bool(tasks) or not required_count
+
+    if not messages and not may_have_work:
+      if self._LongPoll(source, request_comms.long_poll_timeout):
+        response_comms.long_polled = True
+        tasks = self.DrainTaskSchedulerQueueForClient(source, required_count)
+        message_list.job = tasks
+      else:
+        response_comms.poll_delay = self.SuggestPollDelay()
 
     # Encode the message_list in the response_comms using the same API version
     # the client used.
@@ -421,6 +655,84 @@ class FrontEndServer(object):
 
     return source, len(messages)
 
+  def SuggestPollDelay(self):
+    """Suggests how long an idle client should wait before polling again.
+
+    The delay grows with the number of message bundles handled concurrently
+    and is randomized so that clients which polled at the same time, e.g.
+    after an outage of the frontend, do not all come back at the same time.
+
+    Returns:
+      The delay in seconds, 0 if the client should follow its own schedule.
+    """
+    if not self.poll_delay_max:
+      return 0
+
+    with self._active_bundles_lock:
+      load = min(1.0, self._active_bundles / self.poll_delay_load_threshold)
+
+    delay = self.poll_delay_max * load
+    # Pick a delay between half and the whole of the computed one.
+    return delay * (0.5 + 0.5 * random.UInt32() / 0xFFFFFFFF)
+
+  def _LongPoll(self, client, timeout):
+    """Holds an idle client request open until there is work for the client.
+
+    Args:
+      client: The ClientURN of the client.
+      timeout: The longest time (in seconds) the client asked us to wait.
+
+    Returns:
+      True if the request was held open, False if the client did not ask for
+      it or too many requests are already held open.
+    """
+    if not timeout or self._long_poll_slots is None:
+      return False
+
+    if not self._long_poll_slots.acquire(False):
+      return False
+
+    # Held requests are idle and don't count towards the load of the frontend
+    # used to suggest poll delays.
+    with self._active_bundles_lock:
+      self._active_bundles -= 1
+    try:
+      self._work_watcher.Wait(client, min(timeout, self.long_poll_timeout_max))
+    finally:
+      with self._active_bundles_lock:
+        self._active_bundles += 1
+      self._long_poll_slots.release()
+
+    return True
+
+  def _ClientsWithWork(self, clients, since):
+    """Returns the clients which got messages that are not leased.
+
+    Args:
+      clients: A list of ClientURNs.
+      since: rdfvalue.RDFDatetime at which the clients were known to have no
+        messages left.
+
+    Returns:
+      A set of ClientURNs.
+    """
+    clients = [rdf_client.ClientURN(client) for client in clients]
+
+    if data_store.RelationalDBEnabled():
+      # Messages that became available before the clients were found to have
+      # none are already leased, so only recent ones have to be read.
+      client_ids = (
+          data_store.REL_DB.ReadClientIdsWithPendingClientActionRequests(
+              min_timestamp=since - PendingWorkFilter.REFRESH_OVERLAP))
+      return set(client for client in clients
+                 if client.Basename() in client_ids)
+
+    now = rdfvalue.RDFDatetime.Now()
+    tasks_by_queue = queue_manager.QueueManager(token=self.token).MultiQuery(
+        [client.Queue() for client in clients])
+    return set(client for client in clients if any(
+        t.leased_until < now for t in tasks_by_queue.get(client.Queue(), [])))
+
   def DrainTaskSchedulerQueueForClient(self, client, max_count=None):
     """Drains the client's Task Scheduler queue.
 
@@ -448,14 +760,24 @@ class FrontEndServer(object):
     start_time = time.time()
     # Drain the queue for this client
     if data_store.RelationalDBEnabled():
+      client_id = client.Basename()
+      if (self._pending_work is not None and
+          not self._pending_work.MayHaveWork(client_id)):
+        return []
+
+      checked_at = rdfvalue.RDFDatetime.Now()
       action_requests = data_store.REL_DB.LeaseClientActionRequests(
-          client.Basename(),
+          client_id,
           lease_time=rdfvalue.Duration.FromSeconds(self.message_expiry_time),
           limit=max_count)
       result = [
           rdf_flow_objects.GRRMessageFromClientActionRequest(r)
           for r in action_requests
       ]
+
+      # If we leased fewer requests than we could, there are none left.
+      if self._pending_work is not None and len(action_requests) < max_count:
+        self._pending_work.NoWork(client_id, checked_at)
     else:
       new_tasks = queue_manager.QueueManager(token=self.token).QueryAndOwn(
           queue=client.Queue(),
@@ -561,6 +883,7 @@ class FrontEndServer(object):
       messages: A list of GrrMessage RDFValues.
     """
     now = time.time()
+    messages = _UnpackReplies(messages)
     unprocessed_msgs = []
     message_handler_requests = []
     dropped_count = 0
@@ -638,6 +961,7 @@ class FrontEndServer(object):
       return self.ReceiveMessagesRelationalFlows(client_id, messages)
 
     now = time.time()
+    messages = _UnpackReplies(messages)
     with queue_manager.QueueManager(token=self.token) as manager:
       for session_id, msgs in iteritems(
           collection.Group(messages, operator.attrgetter("session_id"))):
@@ -5,12 +5,15 @@ from __future__ import division
 from __future__ import unicode_literals
 
 import array
+import functools
 import logging
 import pdb
+import threading
 import time
 
 from absl import app
 from absl import flags
+from absl.testing import absltest
 from future.builtins import chr
 from future.builtins import map
 from future.builtins import range
@@ -79,6 +82,12 @@ def TestServer():
       message_expiry_time=MESSAGE_EXPIRY_TIME)
 
 
+def _JoinClientWorkWatchers():
+  for thread in threading.enumerate():
+    if thread.name == "ClientWorkWatcher":
+      thread.join()
+
+
 class GRRFEServerTest(frontend_test_lib.FrontEndServerTest):
   """Tests the GRRFEServer."""
 
@@ -344,6 +353,35 @@ class GRRFEServerTest(frontend_test_lib.FrontEndServerTest):
     self.assertIn(session_id2,
                   [notification.session_id for notification in notifications])
 
+  def testSuggestPollDelay(self):
+    server = frontend_lib.FrontEndServer(
+        certificate=config.CONFIG["Frontend.certificate"],
+        private_key=config.CONFIG["PrivateKeys.server_key"],
+        poll_delay_max=100,
+        poll_delay_load_threshold=10)
+
+    with utils.Stubber(server, "_active_bundles", 5):
+      for _ in range(10):
+        self.assertBetween(server.SuggestPollDelay(), 25, 50)
+
+    with utils.Stubber(server, "_active_bundles", 50):
+      for _ in range(10):
+        self.assertBetween(server.SuggestPollDelay(), 50, 100)
+
+  def testInvalidPollDelayLoadThresholdIsRejected(self):
+    with self.assertRaises(ValueError):
+      frontend_lib.FrontEndServer(
+          certificate=config.CONFIG["Frontend.certificate"],
+          private_key=config.CONFIG["PrivateKeys.server_key"],
+          poll_delay_max=100,
+          poll_delay_load_threshold=0)
+
+  def testNoPollDelayIsSuggestedByDefault(self):
+    server = TestServer()
+
+    with utils.Stubber(server, "_active_bundles", 50):
+      self.assertEqual(server.SuggestPollDelay(), 0)
+
   def testDrainUpdateSessionRequestStates(self):
     """Draining the flow requests and preparing messages."""
     client_id = test_lib.TEST_CLIENT_ID
@@ -554,6 +592,38 @@ class GRRFEServerTestRelational(db_test_lib.RelationalDBEnabledMixin,
     self.assertEqual(received[0][0], req)
     self.assertLen(received[0][1], 9)
 
+  def testReceiveBatchedReplies(self):
+    client_id = "C.1234567890123456"
+    flow_id = "12345678"
+    data_store.REL_DB.WriteClientMetadata(client_id, fleetspeak_enabled=False)
+    self._FlowSetup(client_id, flow_id)
+
+    session_id = "%s/%s" % (client_id, flow_id)
+    packed = rdf_flows.PackedReplies(
+        rdf_name=rdfvalue.RDFInteger.__name__,
+        replies=[rdfvalue.RDFInteger(i).SerializeToString() for i in range(3)])
+    messages = [
+        rdf_flows.GrrMessage(
+            request_id=1,
+            response_id=1,
+            session_id=session_id,
+            auth_state="AUTHENTICATED",
+            payload=packed),
+        rdf_flows.GrrMessage(
+            request_id=1,
+            response_id=4,
+            session_id=session_id,
+            auth_state="AUTHENTICATED",
+            payload=rdfvalue.RDFInteger(3)),
+    ]
+
+    ReceiveMessages(client_id, messages)
+    received = data_store.REL_DB.ReadAllFlowRequestsAndResponses(
+        client_id, flow_id)
+    responses = sorted(received[0][1].values(), key=lambda r: r.response_id)
+    self.assertEqual([r.response_id for r in responses], [1, 2, 3, 4])
+    self.assertEqual([r.payload for r in responses], [0, 1, 2, 3])
+
   def testCrashReport(self):
     client_id = "C.1234567890123456"
     flow_id = "12345678"
@@ -640,6 +710,240 @@ class GRRFEServerTestRelational(db_test_lib.RelationalDBEnabledMixin,
 
     self.assertItemsEqual(res, msgs)
 
+  def testClientsWithWork(self):
+    client_id = u"C.1234567890123456"
+    flow_id = flow.RandomFlowId()
+    data_store.REL_DB.WriteClientMetadata(client_id, fleetspeak_enabled=False)
+    data_store.REL_DB.WriteFlowObject(
+        rdf_flow_objects.Flow(
+            client_id=client_id,
+            flow_id=flow_id,
+            create_time=rdfvalue.RDFDatetime.Now()))
+    server = TestServer()
+    client = rdf_client.ClientURN(client_id)
+    other_client = rdf_client.ClientURN(u"C.1234567890123457")
+    since = rdfvalue.RDFDatetime.Now()
+
+    self.assertEmpty(server._ClientsWithWork([client, other_client], since))
+
+    data_store.REL_DB.WriteFlowRequests([
+        rdf_flow_objects.FlowRequest(
+            client_id=client_id, flow_id=flow_id, request_id=1)
+    ])
+    data_store.REL_DB.WriteClientActionRequests([
+        rdf_flows.ClientActionRequest(
+            client_id=client_id,
+            flow_id=flow_id,
+            request_id=1,
+            action_identifier="WmiQuery")
+    ])
+
+    with mock.patch.object(
+        data_store.REL_DB,
+        "ReadClientIdsWithPendingClientActionRequests",
+        wraps=data_store.REL_DB.ReadClientIdsWithPendingClientActionRequests
+    ) as read:
+      self.assertEqual(
+          server._ClientsWithWork([client, other_client], since),
+          set([client]))
+      # All the clients are checked at once.
+      self.assertEqual(read.call_count, 1)
+
+    # Leased requests were already sent to the client.
+    server.DrainTaskSchedulerQueueForClient(client)
+
+    self.assertEmpty(server._ClientsWithWork([client, other_client], since))
+
+  def testPendingWorkFilter(self):
+    client_id = u"C.1234567890123456"
+    flow_id = flow.RandomFlowId()
+    data_store.REL_DB.WriteClientMetadata(client_id, fleetspeak_enabled=False)
+    data_store.REL_DB.WriteFlowObject(
+        rdf_flow_objects.Flow(
+            client_id=client_id,
+            flow_id=flow_id,
+            create_time=rdfvalue.RDFDatetime.Now()))
+
+    def WriteRequest(request_id):
+      data_store.REL_DB.WriteFlowRequests([
+          rdf_flow_objects.FlowRequest(
+              client_id=client_id, flow_id=flow_id, request_id=request_id)
+      ])
+      data_store.REL_DB.WriteClientActionRequests([
+          rdf_flows.ClientActionRequest(
+              client_id=client_id,
+              flow_id=flow_id,
+              request_id=request_id,
+              action_identifier="WmiQuery")
+      ])
+
+    server = frontend_lib.FrontEndServer(
+        certificate=config.CONFIG["Frontend.certificate"],
+        private_key=config.CONFIG["PrivateKeys.server_key"],
+        pending_work_refresh_interval=60)
+    client = rdf_client.ClientURN(client_id)
+
+    with mock.patch.object(
+        data_store.REL_DB,
+        "LeaseClientActionRequests",
+        wraps=data_store.REL_DB.LeaseClientActionRequests) as lease:
+      with test_lib.FakeTime(1000):
+        WriteRequest(1)
+
+      with test_lib.FakeTime(1010):
+        self.assertLen(server.DrainTaskSchedulerQueueForClient(client), 1)
+        self.assertEqual(lease.call_count, 1)
+
+      # The client has no work left, there is no need to ask the database.
+      with test_lib.FakeTime(1020):
+        WriteRequest(2)
+        self.assertEmpty(server.DrainTaskSchedulerQueueForClient(client))
+        self.assertEqual(lease.call_count, 1)
+
+      # New work is found by the next refresh.
+      with test_lib.FakeTime(1080):
+        self.assertLen(server.DrainTaskSchedulerQueueForClient(client), 1)
+        self.assertEqual(lease.call_count, 2)
+
+  def testLongPoll(self):
+    client = rdf_client.ClientURN(u"C.1234567890123456")
+    server = frontend_lib.FrontEndServer(
+        certificate=config.CONFIG["Frontend.certificate"],
+        private_key=config.CONFIG["PrivateKeys.server_key"],
+        long_poll_max_clients=1,
+        long_poll_check_interval=0.01)
+
+    with mock.patch.object(
+        server._work_watcher,
+        "_clients_with_work",
+        side_effect=lambda clients, _: clients):
+      self.assertTrue(server._LongPoll(client, 10))
+      # Clients which do not ask for it are not held.
+      self.assertFalse(server._LongPoll(client, 0))
+
+    _JoinClientWorkWatchers()
+
+  def testLongPolledRequestsDoNotCountTowardsLoad(self):
+    client = rdf_client.ClientURN(u"C.1234567890123456")
+    server = frontend_lib.FrontEndServer(
+        certificate=config.CONFIG["Frontend.certificate"],
+        private_key=config.CONFIG["PrivateKeys.server_key"],
+        long_poll_max_clients=1,
+        long_poll_check_interval=0.01)
+
+    active_bundles = []
+
+    def ClientsWithWork(clients, unused_since):
+      active_bundles.append(server._active_bundles)
+      return clients
+
+    # The request being held is the only one handled by the frontend.
+    with utils.Stubber(server, "_active_bundles", 1):
+      with utils.Stubber(server._work_watcher, "_clients_with_work",
+                         ClientsWithWork):
+        self.assertTrue(server._LongPoll(client, 10))
+      self.assertEqual(server._active_bundles, 1)
+
+    self.assertNotEmpty(active_bundles)
+    self.assertEqual(set(active_bundles), set([0]))
+
+    _JoinClientWorkWatchers()
+
+  def testNoLongPollByDefault(self):
+    server = TestServer()
+
+    with mock.patch.object(
+        server, "_ClientsWithWork", side_effect=lambda clients, _: clients):
+      self.assertFalse(
+          server._LongPoll(rdf_client.ClientURN(u"C.1234567890123456"), 10))
+
+
+class ClientWorkWatcherTest(absltest.TestCase):
+
+  def tearDown(self):
+    _JoinClientWorkWatchers()
+    super(ClientWorkWatcherTest, self).tearDown()
+
+  def testWaitReturnsWhenThereIsWork(self):
+    watcher = frontend_lib.ClientWorkWatcher(
+        lambda clients, _: [c for c in clients if c == "C.1"],
+        check_interval=0.01)
+
+    self.assertTrue(watcher.Wait("C.1", 10))
+
+  def testWaitTimesOut(self):
+    watcher = frontend_lib.ClientWorkWatcher(
+        lambda clients, _: [c for c in clients if c == "C.1"],
+        check_interval=0.01)
+
+    self.assertFalse(watcher.Wait("C.2", 0.1))
+
+  def testWaitersOfTheSameClientAreWokenUp(self):
+    work = threading.Event()
+    watcher = frontend_lib.ClientWorkWatcher(
+        lambda clients, _: clients if work.is_set() else [],
+        check_interval=0.01)
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(watcher.Wait("C.1", 10)))
+        for _ in range(3)
+    ]
+    for thread in threads:
+      thread.start()
+
+    work.set()
+    for thread in threads:
+      thread.join()
+
+    self.assertEqual(results, [True, True, True])
+
+  def testErrorsAreIgnored(self):
+    clients_with_work = mock.Mock(side_effect=[IOError("Boom!"), ["C.1"]])
+    watcher = frontend_lib.ClientWorkWatcher(
+        clients_with_work, check_interval=0.01)
+
+    self.assertTrue(watcher.Wait("C.1", 10))
+
+  def testClientsAreCheckedTogether(self):
+    checked = []
+
+    def ClientsWithWork(clients, unused_since):
+      checked.append(sorted(clients))
+      return clients if len(clients) == 3 else []
+
+    watcher = frontend_lib.ClientWorkWatcher(
+        ClientsWithWork, check_interval=0.01)
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda c=c: results.append(watcher.Wait(c, 10)))
+        for c in ["C.1", "C.2", "C.3"]
+    ]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+
+    self.assertEqual(results, [True, True, True])
+    self.assertEqual(checked[-1], ["C.1", "C.2", "C.3"])
+
+  def testCheckStartsFromTheEarliestWait(self):
+    since = []
+
+    def ClientsWithWork(clients, start_time):
+      since.append(start_time)
+      return clients
+
+    watcher = frontend_lib.ClientWorkWatcher(
+        ClientsWithWork, check_interval=0.01)
+
+    with test_lib.FakeTime(1000):
+      self.assertTrue(watcher.Wait("C.1", 10))
+
+    self.assertEqual(since, [rdfvalue.RDFDatetime.FromSecondsSinceEpoch(1000)])
+
 
 class FleetspeakFrontendTests(frontend_test_lib.FrontEndServerTest):
 
@@ -1031,6 +1335,7 @@ class HTTPClientTests(test_lib.GRRBaseTest):
     # Response to send back to clients.
     self.server_response = dict(
         session_id="aff4:/W:session", name="Echo", response_id=2)
+    self.server_poll_delay = 0
 
   def _MakeClient(self):
     if data_store.AFF4Enabled():
@@ -1133,6 +1438,8 @@ class HTTPClientTests(test_lib.GRRBaseTest):
           destination=source,
           timestamp=ts,
           api_version=self.client_communication.api_version)
+      if self.server_poll_delay:
+        response_comms.poll_delay = self.server_poll_delay
 
       return MakeResponse(200, response_comms.SerializeToString())
     except communicator.UnknownClientCertError:
@@ -1344,6 +1651,27 @@ class HTTPClientTests(test_lib.GRRBaseTest):
     """
     self._CheckFastPoll(True, config.CONFIG["Client.poll_min"])
 
+  def testServerSuggestedPollDelay(self):
+    poll_max = config.CONFIG["Client.poll_max"]
+    timer = self.client_communicator.timer
+    timer.FastPoll()
+    self.server_poll_delay = poll_max / 2
+
+    with utils.Stubber(requests, "request",
+                       functools.partial(self.UrlMock, num_messages=0)):
+      self.client_communicator.RunOnce()
+      self.assertEqual(timer.sleep_time, poll_max / 2)
+
+      # Clients never wait longer than their maximum poll interval.
+      self.server_poll_delay = poll_max * 10
+      self.client_communicator.RunOnce()
+      self.assertEqual(timer.sleep_time, poll_max)
+
+  def testServerSuggestedPollDelayIsIgnoredWhenThereIsWork(self):
+    self.server_poll_delay = config.CONFIG["Client.poll_max"]
+
+    self._CheckFastPoll(True, config.CONFIG["Client.poll_min"])
+
   def testCorruption(self):
     """Simulate corruption of the http payload."""
 
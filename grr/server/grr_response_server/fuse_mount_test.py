@@ -10,6 +10,8 @@ import os
 
 
 from absl import app
+from future.builtins import range
+import mock
 from typing import Text
 
 from grr_response_client.client_actions import admin
@@ -193,6 +195,162 @@ class GRRFuseDatastoreOnlyTest(GRRFuseTestBase):
       self.passthrough.Read(existing_dir)
 
 
+class GRRFuseCachingTest(GRRFuseTestBase):
+
+  def setUp(self):
+    super(GRRFuseCachingTest, self).setUp()
+
+    self.client_name = "C." + "1" * 16
+    fixture_test_lib.ClientFixture(self.client_name, token=self.token)
+
+    self.file_path = "/%s/fs/os/c/bin/blob" % self.client_name
+    self.content = b"".join(b"%04d" % i for i in range(100))
+    with aff4.FACTORY.Create(
+        self.file_path, aff4_type=aff4.AFF4Image, token=self.token) as fd:
+      fd.SetChunksize(10)
+      fd.Write(self.content)
+
+    self.passthrough = fuse_mount.GRRFuseDatastoreOnly(
+        "/",
+        token=self.token,
+        metadata_cache_ttl=60,
+        block_cache_size=1024,
+        readahead_blocks=3)
+
+  def testGetAttrIsCached(self):
+    expected = self.passthrough.getattr(self.file_path)
+
+    with mock.patch.object(
+        aff4.FACTORY, "Open", wraps=aff4.FACTORY.Open) as open_mock:
+      self.assertEqual(self.passthrough.getattr(self.file_path), expected)
+      self.assertEqual(open_mock.call_count, 0)
+
+  def testReadDirIsCached(self):
+    directory = "/%s/fs/os/c/bin" % self.client_name
+    expected = list(self.passthrough.readdir(directory))
+    self.assertIn("blob", expected)
+
+    with mock.patch.object(
+        aff4.FACTORY, "Open", wraps=aff4.FACTORY.Open) as open_mock:
+      self.assertEqual(list(self.passthrough.readdir(directory)), expected)
+      self.assertEqual(open_mock.call_count, 0)
+
+  def testReadThroughBlockCache(self):
+    for offset, length in [(0, 400), (0, 1), (5, 10), (9, 2), (390, 10),
+                           (395, 100), (400, 10), (17, 233)]:
+      self.assertEqual(
+          self.passthrough.Read(self.file_path, length=length, offset=offset),
+          self.content[offset:offset + length])
+
+  def testCachedBlocksAreNotReadAgain(self):
+    self.passthrough.Read(self.file_path, length=30, offset=5)
+
+    with mock.patch.object(
+        aff4.AFF4Image, "Read", wraps=aff4.AFF4Image.Read,
+        autospec=True) as read_mock:
+      self.assertEqual(
+          self.passthrough.Read(self.file_path, length=20, offset=10),
+          self.content[10:30])
+      self.assertEqual(read_mock.call_count, 0)
+
+  def testSequentialReadsAreReadAhead(self):
+    self.passthrough.Read(self.file_path, length=10, offset=0)
+    # This read is sequential, so 3 following blocks are read with it.
+    self.passthrough.Read(self.file_path, length=10, offset=10)
+
+    with mock.patch.object(
+        aff4.AFF4Image, "Read", wraps=aff4.AFF4Image.Read,
+        autospec=True) as read_mock:
+      self.assertEqual(
+          self.passthrough.Read(self.file_path, length=30, offset=20),
+          self.content[20:50])
+      self.assertEqual(read_mock.call_count, 0)
+
+      self.passthrough.Read(self.file_path, length=10, offset=50)
+      self.assertEqual(read_mock.call_count, 1)
+
+  def testInvalidatedContentsAreReadAgain(self):
+    self.passthrough.Read(self.file_path, length=10, offset=0)
+
+    with aff4.FACTORY.Create(
+        self.file_path, aff4_type=aff4.AFF4Image, token=self.token) as fd:
+      fd.SetChunksize(10)
+      fd.Write(b"x" * 400)
+
+    self.passthrough._InvalidateContents(rdfvalue.RDFURN(self.file_path))
+    self.assertEqual(
+        self.passthrough.Read(self.file_path, length=10, offset=0), b"x" * 10)
+
+  def testInvalidatedBlocksAreReadAgain(self):
+    self.passthrough.Read(self.file_path, length=100, offset=0)
+
+    fd = aff4.FACTORY.Open(self.file_path, token=self.token)
+    self.passthrough._InvalidateBlocks(fd, length=10, offset=25)
+
+    with mock.patch.object(
+        aff4.AFF4Image, "Read", wraps=aff4.AFF4Image.Read,
+        autospec=True) as read_mock:
+      # Other blocks are still cached.
+      self.passthrough.Read(self.file_path, length=20, offset=0)
+      self.passthrough.Read(self.file_path, length=60, offset=40)
+      self.assertEqual(read_mock.call_count, 0)
+
+      self.assertEqual(
+          self.passthrough.Read(self.file_path, length=20, offset=20),
+          self.content[20:40])
+      self.assertEqual(read_mock.call_count, 1)
+
+  def testBlocksReadDuringRefreshAreNotCached(self):
+    fd = aff4.FACTORY.Open(self.file_path, token=self.token)
+    original_read = aff4.AFF4Image.Read
+
+    def ReadDuringRefresh(image, length):
+      data = original_read(image, length)
+      self.passthrough._InvalidateBlocks(fd, length=10, offset=0)
+      return data
+
+    with mock.patch.object(aff4.AFF4Image, "Read", ReadDuringRefresh):
+      self.passthrough.Read(self.file_path, length=10, offset=0)
+
+    with mock.patch.object(
+        aff4.AFF4Image, "Read", wraps=aff4.AFF4Image.Read,
+        autospec=True) as read_mock:
+      self.passthrough.Read(self.file_path, length=10, offset=0)
+      self.assertEqual(read_mock.call_count, 1)
+
+  def testInvalidationKeepsUnrelatedMetadata(self):
+    directory = "/%s/fs/os/c/bin" % self.client_name
+    other_path = "/%s/fs/os/c" % self.client_name
+    self.passthrough.getattr(self.file_path)
+    self.passthrough.getattr(other_path)
+    list(self.passthrough.readdir(directory))
+
+    self.passthrough._InvalidateObject(rdfvalue.RDFURN(self.file_path))
+
+    with mock.patch.object(
+        aff4.FACTORY, "Open", wraps=aff4.FACTORY.Open) as open_mock:
+      self.passthrough.getattr(other_path)
+      self.assertEqual(open_mock.call_count, 0)
+
+      # The refreshed object and its directory listing are read again.
+      self.passthrough.getattr(self.file_path)
+      self.assertEqual(open_mock.call_count, 2)
+      list(self.passthrough.readdir(directory))
+      self.assertEqual(open_mock.call_count, 3)
+
+  def testDirectoryInvalidationDropsMetadataOfChildren(self):
+    directory = "/%s/fs/os/c/bin" % self.client_name
+    list(self.passthrough.readdir(directory))
+    self.passthrough.getattr(self.file_path)
+
+    self.passthrough._InvalidateObject(rdfvalue.RDFURN(directory))
+
+    with mock.patch.object(
+        aff4.FACTORY, "Open", wraps=aff4.FACTORY.Open) as open_mock:
+      self.passthrough.getattr(self.file_path)
+      self.assertGreater(open_mock.call_count, 0)
+
+
 class GRRFuseTest(GRRFuseTestBase):
 
   # Whether the tests are done and the fake server can stop running.
@@ -377,6 +535,49 @@ class GRRFuseTest(GRRFuseTestBase):
 
     self.assertEqual(missing_chunks, [])
 
+  def _CreateSparseImage(self, size):
+    urn = self.client_id.Add("fs/os/sparse")
+    with aff4.FACTORY.Create(
+        urn, aff4_standard.AFF4SparseImage, mode="rw",
+        token=self.token) as fd:
+      fd.Set(fd.Schema.STAT(st_size=size))
+    return aff4.FACTORY.Open(urn, token=self.token)
+
+  def testBackgroundFetchUpdatesFollowingChunks(self):
+    chunksize = aff4_standard.AFF4SparseImage.chunksize
+    fd = self._CreateSparseImage(10 * chunksize)
+
+    self.grr_fuse.background_fetch_chunks = 3
+    self.addCleanup(self.grr_fuse.StopBackgroundFetch)
+    with mock.patch.object(self.grr_fuse,
+                           "UpdateSparseImageIfNeeded") as update_mock:
+      self.grr_fuse._ScheduleBackgroundFetch(fd, length=chunksize, offset=0)
+      self.grr_fuse._fetch_queue.join()
+
+      update_mock.assert_called_once_with(mock.ANY, 3 * chunksize, chunksize)
+      self.assertEqual(update_mock.call_args[0][0].urn, fd.urn)
+
+      # Fetches don't go past the end of the file.
+      self.grr_fuse._ScheduleBackgroundFetch(
+          fd, length=chunksize, offset=8 * chunksize)
+      self.grr_fuse._fetch_queue.join()
+
+      self.assertEqual(update_mock.call_count, 2)
+      update_mock.assert_called_with(mock.ANY, chunksize, 9 * chunksize)
+
+    self.assertEmpty(self.grr_fuse._fetching)
+
+  def testBackgroundFetchIsDisabledByDefault(self):
+    chunksize = aff4_standard.AFF4SparseImage.chunksize
+    fd = self._CreateSparseImage(10 * chunksize)
+
+    with mock.patch.object(self.grr_fuse,
+                           "UpdateSparseImageIfNeeded") as update_mock:
+      self.grr_fuse._ScheduleBackgroundFetch(fd, length=chunksize, offset=0)
+
+    self.assertIsNone(self.grr_fuse._fetch_queue)
+    self.assertFalse(update_mock.called)
+
   def testCacheExpiry(self):
     with test_lib.FakeDateTimeUTC(1000):
       with test_lib.FakeTime(1000):
@@ -8,6 +8,7 @@ from future.builtins import str
 from typing import Text
 
 from grr_response_core.lib import utils
+from grr_response_core.lib.util import cache
 from grr_response_core.lib.util import precondition
 from grr_response_core.stats import stats_collector_instance
 from grr_response_server import access_control
@@ -58,8 +59,11 @@ class RelDBChecker(object):
 
   def __init__(self):
     self.approval_cache_time = 60
-    self.acl_cache = utils.AgeBasedCache(
-        max_size=10000, max_age=self.approval_cache_time)
+    self.acl_cache = cache.LRUCache(
+        max_size=10000,
+        max_age=self.approval_cache_time,
+        refresh_on_access=False,
+        name="acl")
 
   def _CheckAccess(self, username, subject_id, approval_type):
     """Checks access to a given subject by a given user."""
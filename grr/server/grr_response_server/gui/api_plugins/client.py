@@ -310,8 +310,8 @@ class ApiSearchClientsHandler(api_call_handler_base.ApiCallHandler):
     if data_store.RelationalDBEnabled():
       index = client_index.ClientIndex()
 
-      # LookupClients returns a sorted list of client ids.
-      clients = index.LookupClients(keywords)[args.offset:args.offset + end]
+      # LookupClients returns a sorted page of client ids.
+      clients = index.LookupClients(keywords, offset=args.offset, count=end)
 
       client_infos = data_store.REL_DB.MultiReadClientFullInfo(clients)
       for client_info in itervalues(client_infos):
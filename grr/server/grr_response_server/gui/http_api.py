@@ -25,6 +25,7 @@ from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import registry
 from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import structs as rdf_structs
+from grr_response_core.lib.util import cache
 from grr_response_core.lib.util import precondition
 from grr_response_core.lib.util.compat import json
 from grr_response_core.stats import stats_collector_instance
@@ -65,7 +66,7 @@ class RouterMatcher(object):
   """Matches requests to routers (and caches them)."""
 
   def __init__(self):
-    self._routing_maps_cache = utils.FastStore()
+    self._routing_maps_cache = cache.LRUCache()
 
   def _BuildHttpRoutingMap(self, router_cls):
     """Builds a werkzeug routing map out of a given router class."""
@@ -14,6 +14,7 @@ import ipaddress
 from grr_response_core import config
 from grr_response_core.lib import registry
 from grr_response_core.lib import utils
+from grr_response_core.lib.util import cache
 from grr_response_core.lib.util import precondition
 
 
@@ -35,7 +36,7 @@ class IPResolver(IPResolverBase):
 
   def __init__(self):
     super(IPResolver, self).__init__()
-    self.cache = utils.FastStore(max_size=100)
+    self.cache = cache.LRUCache(max_size=100, name="ip_resolver")
 
   def RetrieveIPInfo(self, ip):
     precondition.AssertOptionalType(
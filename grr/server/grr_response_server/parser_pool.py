@@ -0,0 +1,642 @@
+#!/usr/bin/env python
+"""A process pool running artifact response parsers outside of flows."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import functools
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import shutil
+import signal
+import tempfile
+import threading
+import time
+import traceback
+
+from grr_response_core import config
+from grr_response_core.lib.util import compatibility
+from grr_response_core.stats import stats_collector_instance
+
+
+class Error(Exception):
+  """Base class for parser pool errors."""
+
+
+class ParserError(Error):
+  """Raised when a parser run in the pool fails."""
+
+
+class ParserBudgetExceededError(Error):
+  """Raised when a parser exceeds its CPU or time budget."""
+
+
+class ParserPoolStoppedError(Error):
+  """Raised for parser runs pending when the pool is stopped."""
+
+
+# Pool processes are spawned rather than forked: the pool is (re)started from
+# multi-threaded server processes and a forked child could inherit locks held
+# by other threads. Python 2 can only fork, so there the pool should be started
+# with `Init` before the process starts its threads.
+try:
+  _CONTEXT = multiprocessing.get_context("spawn")
+except AttributeError:
+  _CONTEXT = multiprocessing
+
+# The size of chunks in which files are copied for pool processes.
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+# How often the pool checks for processes which stopped making progress.
+_WATCHDOG_INTERVAL = 0.5
+
+# Outcomes of parser runs in pool processes.
+_OK = "OK"
+_ERROR = "ERROR"
+_CPU_BUDGET_EXCEEDED = "CPU_BUDGET_EXCEEDED"
+_TIME_BUDGET_EXCEEDED = "TIME_BUDGET_EXCEEDED"
+
+# A queue the pool processes report the parser runs they start to.
+_PROGRESS_QUEUE = None
+
+
+def _RaiseCpuBudgetExceeded(signum, frame):
+  del signum, frame  # Unused.
+  raise ParserBudgetExceededError(_CPU_BUDGET_EXCEEDED)
+
+
+def _RaiseTimeBudgetExceeded(signum, frame):
+  del signum, frame  # Unused.
+  raise ParserBudgetExceededError(_TIME_BUDGET_EXCEEDED)
+
+
+def _CpuTime():
+  times = os.times()
+  return times[0] + times[1]
+
+
+class _FileContent(object):
+  """A file passed to pool processes as a path of its temporary copy."""
+
+  def __init__(self, path):
+    self.path = path
+
+
+def _InitProcess(progress_queue, server_config):
+  """Initializes a pool process."""
+  global _PROGRESS_QUEUE
+  _PROGRESS_QUEUE = progress_queue
+
+  # Spawned processes don't inherit the configuration some parsers use.
+  config.CONFIG = server_config
+
+
+def _OpenFiles(args, files):
+  """Replaces file contents in parser arguments with open files."""
+  opened_args = []
+  for arg in args:
+    if isinstance(arg, _FileContent):
+      arg = open(arg.path, "rb")
+      files.append(arg)
+    elif isinstance(arg, list) and arg and isinstance(arg[0], _FileContent):
+      arg = _OpenFiles(arg, files)
+    opened_args.append(arg)
+  return opened_args
+
+
+def _RunParser(parser, method_name, args, cpu_budget, time_budget):
+  """Runs a parser method in a pool process.
+
+  Args:
+    parser: A parser instance.
+    method_name: A name of the parser method to call.
+    args: A tuple of arguments of the parser method.
+    cpu_budget: The maximum CPU time (in seconds) the parser can use.
+    time_budget: The maximum time (in seconds) the parser can take.
+
+  Returns:
+    A tuple (outcome, results, cpu_time, latency). Exceptions raised by parsers
+    may not be picklable, so in case of an error the results are its traceback.
+  """
+  start_time = time.time()
+  start_cpu_time = _CpuTime()
+
+  # Pool processes run tasks in their main thread, so timers can interrupt a
+  # runaway parser. A profiling timer only counts CPU time of this process.
+  signal.signal(signal.SIGPROF, _RaiseCpuBudgetExceeded)
+  signal.signal(signal.SIGALRM, _RaiseTimeBudgetExceeded)
+  signal.setitimer(signal.ITIMER_PROF, cpu_budget)
+  signal.setitimer(signal.ITIMER_REAL, time_budget)
+  files = []
+  try:
+    outcome = _OK
+    results = list(getattr(parser, method_name)(*_OpenFiles(args, files)))
+  except ParserBudgetExceededError as e:
+    outcome = e.args[0]
+    results = None
+  except Exception:  # pylint: disable=broad-except
+    outcome = _ERROR
+    results = traceback.format_exc()
+  finally:
+    signal.setitimer(signal.ITIMER_PROF, 0)
+    signal.setitimer(signal.ITIMER_REAL, 0)
+    for f in files:
+      f.close()
+
+  return outcome, results, _CpuTime() - start_cpu_time, time.time() - start_time
+
+
+def _RunJob(job_id, calls, cpu_budget, time_budget):
+  """Runs parser calls of a job in a pool process, up to the first failure."""
+  runs = []
+  for index, (parser, method_name, args) in enumerate(calls):
+    _PROGRESS_QUEUE.put((job_id, index))
+    run = _RunParser(parser, method_name, args, cpu_budget, time_budget)
+    runs.append(run)
+    if run[0] != _OK:
+      break
+  return runs
+
+
+class ParserJob(object):
+  """A batch of parser runs, sent to a pool process in a single task."""
+
+  def __init__(self):
+    self.calls = []
+
+  def AddResponse(self, parser, knowledge_base, response, path_type):
+    """Adds a `SingleResponseParser.ParseResponse` run."""
+    self.calls.append(
+        (parser, "ParseResponse", (knowledge_base, response, path_type)))
+
+  def AddResponses(self, parser, knowledge_base, responses):
+    """Adds a `MultiResponseParser.ParseResponses` run."""
+    self.calls.append(
+        (parser, "ParseResponses", (knowledge_base, list(responses))))
+
+  def AddFile(self, parser, knowledge_base, pathspec, filedesc):
+    """Adds a `SingleFileParser.ParseFile` run."""
+    self.calls.append(
+        (parser, "ParseFile", (knowledge_base, pathspec, filedesc)))
+
+  def AddFiles(self, parser, knowledge_base, pathspecs, filedescs):
+    """Adds a `MultiFileParser.ParseFiles` run."""
+    self.calls.append((parser, "ParseFiles",
+                       (knowledge_base, list(pathspecs), list(filedescs))))
+
+
+class _PendingJob(object):
+  """A job submitted to the pool, with temporary copies of its files."""
+
+  def __init__(self, job_id, calls, callback):
+    self.id = job_id
+    self.calls = calls
+    self.callback = callback
+    self.temp_paths = []
+    self.copies = {}
+
+    # The index of the call run by a pool process and the time it started.
+    self.index = None
+    self.progress_time = None
+
+
+class ParserPool(object):
+  """A bounded pool of processes running response parsers.
+
+  Parsing is CPU-bound, so running it in worker threads blocks other flows
+  processed by the same worker (and holds their leases). Parsers run in the
+  pool get their own processes and are stopped when they exceed the budgets.
+  """
+
+  def __init__(self, size, cpu_budget, time_budget):
+    """Initializes the pool.
+
+    Args:
+      size: The number of processes in the pool.
+      cpu_budget: The maximum CPU time (in seconds) of a single parser run.
+      time_budget: The maximum time (in seconds) of a single parser run.
+    """
+    self._size = size
+    self._cpu_budget = cpu_budget
+    self._time_budget = time_budget
+
+    self._lock = threading.Lock()
+    self._jobs = {}
+    self._job_ids = itertools.count()
+    self._pool, self._progress_queue = self._StartPool()
+
+    self._stopped = threading.Event()
+    self._watchdog = threading.Thread(
+        target=self._Watch, name="ParserPoolWatchdog")
+    self._watchdog.daemon = True
+    self._watchdog.start()
+
+  def _StartPool(self):
+    progress_queue = _CONTEXT.Queue()
+    pool = _CONTEXT.Pool(
+        processes=self._size,
+        initializer=_InitProcess,
+        initargs=(progress_queue, config.CONFIG.CopyConfig()))
+    return pool, progress_queue
+
+  def Stop(self):
+    """Stops the pool, failing parser runs which are still pending."""
+    self._stopped.set()
+    self._watchdog.join()
+
+    with self._lock:
+      jobs = list(self._jobs.values())
+      self._jobs.clear()
+
+    # Pool threads call back into the pool, so it can't be stopped under the
+    # lock.
+    self._pool.terminate()
+    self._pool.join()
+
+    for job in jobs:
+      self._Finish(job, None, ParserPoolStoppedError("Parser pool stopped."))
+
+  def _Submit(self, job):
+    """Sends a job to the pool processes (must be called under the lock)."""
+    job.index = None
+    job.progress_time = None
+
+    kwargs = {}
+    # Python 2 pools have no error callbacks.
+    if not compatibility.PY2:
+      kwargs["error_callback"] = functools.partial(self._JobFailed, job)
+
+    self._pool.apply_async(
+        _RunJob, (job.id, job.calls, self._cpu_budget, self._time_budget),
+        callback=functools.partial(self._JobDone, job),
+        **kwargs)
+
+  def _PopJob(self, job):
+    with self._lock:
+      # The job may already have been failed, or resubmitted and completed by
+      # a replaced pool.
+      return self._jobs.pop(job.id, None) is job
+
+  def _JobDone(self, job, runs):
+    if not self._PopJob(job):
+      return
+
+    try:
+      results = _CollectResults(job.calls, runs)
+    except Error as e:
+      self._Finish(job, None, e)
+    else:
+      self._Finish(job, results, None)
+
+  def _JobFailed(self, job, exception):
+    # Parser exceptions are handled in pool processes, so this is e.g. a value
+    # which can't be pickled.
+    if self._PopJob(job):
+      self._Finish(job, None, ParserError("Parser job failed: %s" % exception))
+
+  def _Finish(self, job, results, error):
+    for path in job.temp_paths:
+      os.remove(path)
+
+    try:
+      job.callback(results, error)
+    except Exception:  # pylint: disable=broad-except
+      logging.exception("Parser job callback failed.")
+
+  def _Watch(self):
+    """Restarts the pool when a pool process stops making progress.
+
+    Parsers are interrupted by timers in the pool processes, but a process
+    stuck outside of the Python interpreter (e.g. in a C extension) can only be
+    stopped from the outside.
+    """
+    while not self._stopped.is_set():
+      try:
+        job_id, index = self._progress_queue.get(timeout=_WATCHDOG_INTERVAL)
+      except queue.Empty:
+        job_id = None
+
+      now = time.time()
+      with self._lock:
+        job = self._jobs.get(job_id)
+        if job is not None:
+          job.index = index
+          job.progress_time = now
+
+        # The processes enforce the time budget themselves, so a process which
+        # doesn't return in twice the budget is considered hung.
+        hung_jobs = [
+            job for job in self._jobs.values() if job.progress_time and
+            now - job.progress_time > 2 * self._time_budget
+        ]
+
+      if hung_jobs:
+        self._Restart(hung_jobs)
+
+  def _Restart(self, hung_jobs):
+    """Replaces the pool, failing only the jobs of hung processes."""
+    with self._lock:
+      pool = self._pool
+      self._pool, self._progress_queue = self._StartPool()
+
+      for job in hung_jobs:
+        del self._jobs[job.id]
+
+      # Other jobs are run again in the new pool, so they don't wait for their
+      # own timeouts.
+      for job in self._jobs.values():
+        self._Submit(job)
+
+    # The processes of the old pool have to be reaped, otherwise they are left
+    # as zombies.
+    pool.terminate()
+    pool.join()
+
+    for job in hung_jobs:
+      parser_name = job.calls[job.index][0].__class__.__name__
+      _IncrementBudgetExceeded(parser_name, "time")
+      self._Finish(
+          job, None,
+          ParserBudgetExceededError(
+              "Parser %s exceeded its time budget of %ss." %
+              (parser_name, self._time_budget)))
+
+  def Start(self, job, callback):
+    """Starts running a job in the pool.
+
+    Files are copied to temporary files, so pool processes can read them.
+
+    Args:
+      job: A `ParserJob` to run.
+      callback: A function called with a list of parsed values and None when
+        all parsers of the job are done, or with None and an `Error` when one of
+        them fails. It is called from a thread of the pool.
+    """
+    pending_job = _PendingJob(None, [], callback)
+    try:
+      for parser, method_name, args in job.calls:
+        pending_job.calls.append(
+            (parser, method_name, _CopyFiles(args, pending_job)))
+    except Exception:
+      for path in pending_job.temp_paths:
+        os.remove(path)
+      raise
+
+    with self._lock:
+      pending_job.id = next(self._job_ids)
+      self._jobs[pending_job.id] = pending_job
+      self._Submit(pending_job)
+
+  def Run(self, job):
+    """Runs a job in the pool and returns its results."""
+    done = threading.Event()
+    outcomes = []
+
+    def Callback(results, error):
+      outcomes.append((results, error))
+      done.set()
+
+    self.Start(job, Callback)
+    done.wait()
+
+    results, error = outcomes[0]
+    if error is not None:
+      raise error
+    return results
+
+  def ParseResponse(self, parser, knowledge_base, response, path_type):
+    """Runs `SingleResponseParser.ParseResponse` in the pool."""
+    job = ParserJob()
+    job.AddResponse(parser, knowledge_base, response, path_type)
+    return self.Run(job)
+
+  def ParseResponses(self, parser, knowledge_base, responses):
+    """Runs `MultiResponseParser.ParseResponses` in the pool."""
+    job = ParserJob()
+    job.AddResponses(parser, knowledge_base, responses)
+    return self.Run(job)
+
+
+def _CopyFiles(args, pending_job):
+  """Replaces file-like objects in parser arguments with temporary copies."""
+  copied_args = []
+  for arg in args:
+    if hasattr(arg, "read"):
+      arg = _CopyFile(arg, pending_job)
+    elif isinstance(arg, list) and arg and hasattr(arg[0], "read"):
+      arg = [_CopyFile(filedesc, pending_job) for filedesc in arg]
+    copied_args.append(arg)
+  return tuple(copied_args)
+
+
+def _CopyFile(filedesc, pending_job):
+  """Copies a file once per job, as many parsers can read the same file."""
+  try:
+    return pending_job.copies[id(filedesc)]
+  except KeyError:
+    pass
+
+  filedesc.seek(0)
+  with tempfile.NamedTemporaryFile(prefix="grr_parser_", delete=False) as f:
+    pending_job.temp_paths.append(f.name)
+    shutil.copyfileobj(filedesc, f, _COPY_CHUNK_SIZE)
+
+  copy = _FileContent(f.name)
+  pending_job.copies[id(filedesc)] = copy
+  return copy
+
+
+def _CollectResults(calls, runs):
+  """Records metrics of parser runs and returns their results."""
+  results = []
+  for (parser, _, _), run in zip(calls, runs):
+    outcome, parsed, cpu_time, latency = run
+    parser_name = parser.__class__.__name__
+
+    stats_collector_instance.Get().RecordEvent(
+        "parser_cpu_time", cpu_time, fields=[parser_name])
+
+    if outcome == _CPU_BUDGET_EXCEEDED:
+      _IncrementBudgetExceeded(parser_name, "cpu")
+      raise ParserBudgetExceededError(
+          "Parser %s exceeded its CPU budget." % parser_name)
+
+    if outcome == _TIME_BUDGET_EXCEEDED:
+      _IncrementBudgetExceeded(parser_name, "time")
+      raise ParserBudgetExceededError(
+          "Parser %s exceeded its time budget." % parser_name)
+
+    if outcome == _ERROR:
+      stats_collector_instance.Get().IncrementCounter(
+          "parser_errors", fields=[parser_name])
+      raise ParserError("Parser %s failed:\n%s" % (parser_name, parsed))
+
+    _RecordParserRun(parser_name, latency, parsed)
+    results.extend(parsed)
+
+  return results
+
+
+def _IncrementBudgetExceeded(parser_name, budget):
+  stats_collector_instance.Get().IncrementCounter(
+      "parser_budget_exceeded", fields=[parser_name, budget])
+
+
+def _RecordParserRun(parser_name, latency, results):
+  stats_collector_instance.Get().RecordEvent(
+      "parser_latency", latency, fields=[parser_name])
+  stats_collector_instance.Get().IncrementCounter(
+      "parser_results", delta=len(results), fields=[parser_name])
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def _GetPool():
+  """Returns the parser pool of this process or None if it is disabled."""
+  global _POOL
+
+  size = config.CONFIG["Artifacts.parser_pool_size"]
+  if size <= 0:
+    return None
+
+  with _POOL_LOCK:
+    if _POOL is None:
+      _POOL = ParserPool(
+          size=size,
+          cpu_budget=config.CONFIG["Artifacts.parser_cpu_budget"].seconds,
+          time_budget=config.CONFIG["Artifacts.parser_time_budget"].seconds)
+    return _POOL
+
+
+def Init():
+  """Starts the parser pool of this process if it is enabled."""
+  _GetPool()
+
+
+def IsEnabled():
+  """Returns True if parsers run in the parser pool."""
+  return config.CONFIG["Artifacts.parser_pool_size"] > 0
+
+
+def _ParseInline(parser, method_name, args):
+  parser_name = parser.__class__.__name__
+
+  start_time = time.time()
+  try:
+    results = list(getattr(parser, method_name)(*args))
+  except Exception:
+    stats_collector_instance.Get().IncrementCounter(
+        "parser_errors", fields=[parser_name])
+    raise
+  _RecordParserRun(parser_name, time.time() - start_time, results)
+  return results
+
+
+def RunJob(job):
+  """Runs a job, in the parser pool if it is enabled.
+
+  Args:
+    job: A `ParserJob` to run.
+
+  Returns:
+    A list of values parsed by all parsers of the job.
+  """
+  pool = _GetPool()
+  if pool is not None:
+    return pool.Run(job)
+
+  results = []
+  for parser, method_name, args in job.calls:
+    results.extend(_ParseInline(parser, method_name, args))
+  return results
+
+
+def StartJob(job, callback):
+  """Starts running a job in the parser pool (see `ParserPool.Start`).
+
+  Args:
+    job: A `ParserJob` to run.
+    callback: A function called with the results of the job.
+
+  Raises:
+    ValueError: If the parser pool is disabled.
+  """
+  pool = _GetPool()
+  if pool is None:
+    raise ValueError("Parser pool is disabled.")
+  pool.Start(job, callback)
+
+
+def ParseResponse(parser, knowledge_base, response, path_type):
+  """Parses a single response, using the parser pool if it is enabled.
+
+  Args:
+    parser: A `SingleResponseParser` instance.
+    knowledge_base: A knowledgebase of the client that sent the response.
+    response: An RDF value collected by an artifact source.
+    path_type: A path type of the collected response.
+
+  Returns:
+    A list of parsed values.
+  """
+  job = ParserJob()
+  job.AddResponse(parser, knowledge_base, response, path_type)
+  return RunJob(job)
+
+
+def ParseResponses(parser, knowledge_base, responses):
+  """Parses many responses, using the parser pool if it is enabled.
+
+  Args:
+    parser: A `MultiResponseParser` instance.
+    knowledge_base: A knowledgebase of the client that sent the responses.
+    responses: A list of RDF values collected by an artifact source.
+
+  Returns:
+    A list of parsed values.
+  """
+  job = ParserJob()
+  job.AddResponses(parser, knowledge_base, responses)
+  return RunJob(job)
+
+
+def ParseFile(parser, knowledge_base, pathspec, filedesc):
+  """Parses a single file, using the parser pool if it is enabled.
+
+  Pool processes can't read the datastore, so they get a temporary copy of the
+  file content.
+
+  Args:
+    parser: A `SingleFileParser` instance.
+    knowledge_base: A knowledgebase of the client the file comes from.
+    pathspec: A pathspec of the file.
+    filedesc: A file-like object with the file content.
+
+  Returns:
+    A list of parsed values.
+  """
+  job = ParserJob()
+  job.AddFile(parser, knowledge_base, pathspec, filedesc)
+  return RunJob(job)
+
+
+def ParseFiles(parser, knowledge_base, pathspecs, filedescs):
+  """Parses many files, using the parser pool if it is enabled.
+
+  Args:
+    parser: A `MultiFileParser` instance.
+    knowledge_base: A knowledgebase of the client the files come from.
+    pathspecs: A list of pathspecs of the files.
+    filedescs: A list of file-like objects with the file contents.
+
+  Returns:
+    A list of parsed values.
+  """
+  job = ParserJob()
+  job.AddFiles(parser, knowledge_base, pathspecs, filedescs)
+  return RunJob(job)
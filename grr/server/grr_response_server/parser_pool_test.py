@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import io
+import os
+import signal
+import threading
+import time
+
+from absl import app
+import mock
+
+from grr_response_core.lib import parser
+from grr_response_core.lib.rdfvalues import client as rdf_client
+from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
+from grr_response_server import parser_pool
+from grr.test_lib import stats_test_lib
+from grr.test_lib import test_lib
+
+
+class FooParser(parser.SingleResponseParser):
+
+  def ParseResponse(self, knowledge_base, response, path_type):
+    del path_type  # Unused.
+    yield rdf_protodict.DataBlob(
+        string="%s:%s" % (knowledge_base.os, response.string))
+
+
+class ConcatParser(parser.MultiResponseParser):
+
+  def ParseResponses(self, knowledge_base, responses):
+    del knowledge_base  # Unused.
+    yield rdf_protodict.DataBlob(
+        string="".join(response.string for response in responses))
+
+
+class FailingParser(parser.SingleResponseParser):
+
+  def ParseResponse(self, knowledge_base, response, path_type):
+    raise ValueError("Malformed response: %s" % response.string)
+
+
+class BusyParser(parser.SingleResponseParser):
+
+  def ParseResponse(self, knowledge_base, response, path_type):
+    while True:
+      pass
+
+
+class SleepingParser(parser.SingleResponseParser):
+
+  def ParseResponse(self, knowledge_base, response, path_type):
+    time.sleep(60)
+    return []
+
+
+class HungParser(parser.SingleResponseParser):
+  """A parser which can't be interrupted in its process."""
+
+  def ParseResponse(self, knowledge_base, response, path_type):
+    signal.signal(signal.SIGALRM, signal.SIG_IGN)
+    time.sleep(60)
+    return []
+
+
+class LinesParser(parser.SingleFileParser):
+
+  def ParseFile(self, knowledge_base, pathspec, filedesc):
+    del knowledge_base, pathspec  # Unused.
+    for line in filedesc.read().splitlines():
+      yield rdf_protodict.DataBlob(string=line.decode("utf-8"))
+
+
+class ParserPoolTest(stats_test_lib.StatsTestMixin, test_lib.GRRBaseTest):
+
+  def setUp(self):
+    super(ParserPoolTest, self).setUp()
+    self.pool = parser_pool.ParserPool(size=1, cpu_budget=1, time_budget=10)
+    self.addCleanup(self.pool.Stop)
+
+    self.knowledge_base = rdf_client.KnowledgeBase(os="Linux")
+
+  def testParseResponse(self):
+    with self.assertStatsCounterDelta(
+        1, "parser_results", fields=["FooParser"]):
+      results = self.pool.ParseResponse(FooParser(), self.knowledge_base,
+                                        rdf_protodict.DataBlob(string="foo"),
+                                        None)
+
+    self.assertEqual(results, [rdf_protodict.DataBlob(string="Linux:foo")])
+
+  def testParseResponses(self):
+    responses = [
+        rdf_protodict.DataBlob(string="foo"),
+        rdf_protodict.DataBlob(string="bar")
+    ]
+    results = self.pool.ParseResponses(ConcatParser(), self.knowledge_base,
+                                       responses)
+
+    self.assertEqual(results, [rdf_protodict.DataBlob(string="foobar")])
+
+  def testParserErrorIsRaised(self):
+    with self.assertStatsCounterDelta(
+        1, "parser_errors", fields=["FailingParser"]):
+      with self.assertRaisesRegexp(parser_pool.ParserError, "Malformed"):
+        self.pool.ParseResponse(FailingParser(), self.knowledge_base,
+                                rdf_protodict.DataBlob(string="foo"), None)
+
+  def testCpuBudgetExceeded(self):
+    self.pool = parser_pool.ParserPool(size=1, cpu_budget=0.1, time_budget=10)
+    self.addCleanup(self.pool.Stop)
+
+    with self.assertStatsCounterDelta(
+        1, "parser_budget_exceeded", fields=["BusyParser", "cpu"]):
+      with self.assertRaisesRegexp(parser_pool.ParserBudgetExceededError,
+                                   "CPU budget"):
+        self.pool.ParseResponse(BusyParser(), self.knowledge_base,
+                                rdf_protodict.DataBlob(string="foo"), None)
+
+    # The pool process survives and can be used to run other parsers.
+    results = self.pool.ParseResponse(FooParser(), self.knowledge_base,
+                                      rdf_protodict.DataBlob(string="foo"),
+                                      None)
+    self.assertLen(results, 1)
+
+  def testTimeBudgetExceeded(self):
+    self.pool = parser_pool.ParserPool(size=1, cpu_budget=1, time_budget=0.5)
+    self.addCleanup(self.pool.Stop)
+    processes = list(self.pool._pool._pool)
+
+    with self.assertStatsCounterDelta(
+        1, "parser_budget_exceeded", fields=["SleepingParser", "time"]):
+      with self.assertRaisesRegexp(parser_pool.ParserBudgetExceededError,
+                                   "time budget"):
+        self.pool.ParseResponse(SleepingParser(), self.knowledge_base,
+                                rdf_protodict.DataBlob(string="foo"), None)
+
+    # The parser is interrupted in its process, so the pool is not restarted.
+    results = self.pool.ParseResponse(FooParser(), self.knowledge_base,
+                                      rdf_protodict.DataBlob(string="foo"),
+                                      None)
+    self.assertLen(results, 1)
+    self.assertEqual(list(self.pool._pool._pool), processes)
+
+  def testHungProcessIsReplaced(self):
+    self.pool = parser_pool.ParserPool(size=1, cpu_budget=1, time_budget=0.5)
+    self.addCleanup(self.pool.Stop)
+    processes = list(self.pool._pool._pool)
+
+    hung_job = parser_pool.ParserJob()
+    hung_job.AddResponse(HungParser(), self.knowledge_base,
+                         rdf_protodict.DataBlob(string="foo"), None)
+    hung_outcomes = []
+    hung_done = threading.Event()
+
+    def HungCallback(results, error):
+      hung_outcomes.append((results, error))
+      hung_done.set()
+
+    with self.assertStatsCounterDelta(
+        1, "parser_budget_exceeded", fields=["HungParser", "time"]):
+      with self.assertStatsCounterDelta(
+          0, "parser_budget_exceeded", fields=["FooParser", "time"]):
+        self.pool.Start(hung_job, HungCallback)
+
+        # The job waiting for the hung process is run again in the new pool.
+        results = self.pool.ParseResponse(FooParser(), self.knowledge_base,
+                                          rdf_protodict.DataBlob(string="foo"),
+                                          None)
+        hung_done.wait()
+
+    self.assertEqual(results, [rdf_protodict.DataBlob(string="Linux:foo")])
+    self.assertIsNone(hung_outcomes[0][0])
+    self.assertIsInstance(hung_outcomes[0][1],
+                          parser_pool.ParserBudgetExceededError)
+
+    # Processes of the old pool are reaped.
+    for process in processes:
+      self.assertIsNotNone(process.exitcode)
+
+  def testJobRunsInSingleTask(self):
+    job = parser_pool.ParserJob()
+    job.AddResponse(FooParser(), self.knowledge_base,
+                    rdf_protodict.DataBlob(string="foo"), None)
+    job.AddResponse(FooParser(), self.knowledge_base,
+                    rdf_protodict.DataBlob(string="bar"), None)
+    job.AddResponses(ConcatParser(), self.knowledge_base, [
+        rdf_protodict.DataBlob(string="foo"),
+        rdf_protodict.DataBlob(string="bar")
+    ])
+
+    with mock.patch.object(
+        self.pool._pool, "apply_async",
+        wraps=self.pool._pool.apply_async) as apply_async:
+      with self.assertStatsCounterDelta(
+          2, "parser_results", fields=["FooParser"]):
+        results = self.pool.Run(job)
+
+    self.assertEqual(apply_async.call_count, 1)
+    self.assertEqual(results, [
+        rdf_protodict.DataBlob(string="Linux:foo"),
+        rdf_protodict.DataBlob(string="Linux:bar"),
+        rdf_protodict.DataBlob(string="foobar"),
+    ])
+
+  def testJobStopsAtFirstFailure(self):
+    job = parser_pool.ParserJob()
+    job.AddResponse(FailingParser(), self.knowledge_base,
+                    rdf_protodict.DataBlob(string="foo"), None)
+    job.AddResponse(FooParser(), self.knowledge_base,
+                    rdf_protodict.DataBlob(string="foo"), None)
+
+    with self.assertStatsCounterDelta(0, "parser_results", fields=["FooParser"]):
+      with self.assertRaisesRegexp(parser_pool.ParserError, "Malformed"):
+        self.pool.Run(job)
+
+  def testStartCallsBackWithResults(self):
+    job = parser_pool.ParserJob()
+    job.AddResponse(FooParser(), self.knowledge_base,
+                    rdf_protodict.DataBlob(string="foo"), None)
+    outcomes = []
+    done = threading.Event()
+
+    def Callback(results, error):
+      outcomes.append((results, error))
+      done.set()
+
+    self.pool.Start(job, Callback)
+    done.wait()
+
+    self.assertEqual(outcomes,
+                     [([rdf_protodict.DataBlob(string="Linux:foo")], None)])
+
+  def testParseFilePassesFileContent(self):
+    filedesc = io.BytesIO(b"foo\nbar\n")
+    job = parser_pool.ParserJob()
+    job.AddFile(LinesParser(), self.knowledge_base, None, filedesc)
+
+    with mock.patch.object(os, "remove", wraps=os.remove) as remove:
+      results = self.pool.Run(job)
+
+    self.assertEqual(results, [
+        rdf_protodict.DataBlob(string="foo"),
+        rdf_protodict.DataBlob(string="bar"),
+    ])
+
+    # The temporary copy of the file is removed.
+    self.assertEqual(remove.call_count, 1)
+    self.assertFalse(os.path.exists(remove.call_args[0][0]))
+
+
+class ParseResponseTest(stats_test_lib.StatsTestMixin, test_lib.GRRBaseTest):
+
+  def setUp(self):
+    super(ParseResponseTest, self).setUp()
+    self.knowledge_base = rdf_client.KnowledgeBase(os="Linux")
+
+    patcher = mock.patch.object(parser_pool, "_POOL", None)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+
+  def testParsesInlineIfPoolIsDisabled(self):
+    with mock.patch.object(parser_pool.ParserPool, "Run") as run:
+      with self.assertStatsCounterDelta(
+          1, "parser_results", fields=["FooParser"]):
+        results = parser_pool.ParseResponse(
+            FooParser(), self.knowledge_base,
+            rdf_protodict.DataBlob(string="foo"), None)
+
+    self.assertFalse(run.called)
+    self.assertEqual(results, [rdf_protodict.DataBlob(string="Linux:foo")])
+
+  def testInlineParserErrorIsCounted(self):
+    with self.assertStatsCounterDelta(
+        1, "parser_errors", fields=["FailingParser"]):
+      with self.assertRaises(ValueError):
+        parser_pool.ParseResponse(FailingParser(), self.knowledge_base,
+                                  rdf_protodict.DataBlob(string="foo"), None)
+
+  def testParsesInPoolIfEnabled(self):
+    with test_lib.ConfigOverrider({"Artifacts.parser_pool_size": 1}):
+      try:
+        with mock.patch.object(
+            parser_pool.ParserPool, "Run",
+            wraps=parser_pool._GetPool().Run) as run:
+          results = parser_pool.ParseResponse(
+              FooParser(), self.knowledge_base,
+              rdf_protodict.DataBlob(string="foo"), None)
+      finally:
+        parser_pool._GetPool().Stop()
+
+    self.assertTrue(run.called)
+    self.assertEqual(results, [rdf_protodict.DataBlob(string="Linux:foo")])
+
+
+if __name__ == "__main__":
+  app.run(test_lib.main)
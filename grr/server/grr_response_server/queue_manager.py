@@ -577,6 +577,17 @@ class QueueManager(object):
 
     return self.data_store.QueueQueryTasks(queue, limit=limit)
 
+  def MultiQuery(self, queues):
+    """Retrieves tasks from many queues without leasing them.
+
+    Args:
+       queues: A list of task queues.
+
+    Returns:
+        A dict mapping queues to lists of Task() objects.
+    """
+    return self.data_store.MultiQueueQueryTasks(queues)
+
   def QueryAndOwn(self, queue, lease_seconds=10, limit=1):
     """Returns a list of Tasks leased for a certain time.
 
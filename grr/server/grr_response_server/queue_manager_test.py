@@ -210,6 +210,23 @@ class QueueManagerTest(flow_test_lib.FlowTestsBaseclass):
     tasks = manager.QueryAndOwn(test_queue, lease_seconds=100)
     self.assertEmpty(tasks)
 
+  def testMultiQuery(self):
+    queues = [rdfvalue.RDFURN("fooMultiQuery%d" % i) for i in range(3)]
+    manager = queue_manager.QueueManager(token=self.token)
+    with data_store.DB.GetMutationPool() as pool:
+      manager.Schedule([
+          rdf_flows.GrrMessage(
+              queue=queue, session_id="aff4:/Test", generate_task_id=True)
+          for queue in queues[:2]
+      ], pool)
+
+    tasks = manager.MultiQuery(queues)
+
+    self.assertCountEqual(tasks, queues[:2])
+    for queue in queues[:2]:
+      self.assertLen(tasks[queue], 1)
+      self.assertEqual(tasks[queue][0].queue, queue)
+
   def testTaskRetransmissionsAreCorrectlyAccounted(self):
     test_queue = rdfvalue.RDFURN("fooSchedule")
     task = rdf_flows.GrrMessage(
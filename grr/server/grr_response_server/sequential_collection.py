@@ -11,6 +11,8 @@ import random
 import threading
 import time
 
+from future.moves import queue
+
 from grr_response_core import config
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import registry
@@ -21,6 +23,60 @@ from grr_response_core.lib.util import precondition
 from grr_response_server import data_store
 
 
+def _ReadAhead(batches):
+  """Reads the next item of an iterator on a background thread.
+
+  Args:
+    batches: An iterator, usually yielding batches of records.
+
+  Yields:
+    Items of the iterator. While an item is being processed by the caller, the
+    next one is already being read.
+
+  Raises:
+    Exception: Any exception raised by the iterator is reraised in the caller.
+  """
+  # A single slot is enough to overlap reading with processing while keeping
+  # at most three batches (consumed, queued and being read) in memory.
+  results = queue.Queue(maxsize=1)
+  stop = threading.Event()
+
+  def Put(item):
+    while not stop.is_set():
+      try:
+        results.put(item, timeout=0.1)
+        return True
+      except queue.Full:
+        pass
+    return False
+
+  def Read():
+    try:
+      for batch in batches:
+        if not Put((batch, None)):
+          return
+    except Exception as e:  # pylint: disable=broad-except
+      Put((None, e))
+      return
+    Put((None, None))
+
+  reader = threading.Thread(target=Read, name="SequentialCollectionReadAhead")
+  reader.daemon = True
+  reader.start()
+
+  try:
+    while True:
+      batch, error = results.get()
+      if error is not None:
+        raise error
+      if batch is None:
+        return
+      yield batch
+  finally:
+    # Unblocks the reader if the caller stops iterating early.
+    stop.set()
+
+
 class SequentialCollection(object):
   """A sequential collection of RDFValues.
 
@@ -32,6 +88,9 @@ class SequentialCollection(object):
   # The type which we store, subclasses must set this to a subclass of RDFValue.
   RDF_TYPE = None
 
+  # How many records are read from the data store at once when scanning.
+  SCAN_BATCH_SIZE = 1000
+
   def __init__(self, collection_id):
     precondition.AssertType(collection_id, rdfvalue.RDFURN)
 
@@ -119,18 +178,34 @@ class SequentialCollection(object):
         suffix=suffix,
         mutation_pool=mutation_pool)
 
-  def Scan(self, after_timestamp=None, include_suffix=False, max_records=None):
+  def Scan(self,
+           after_timestamp=None,
+           include_suffix=False,
+           max_records=None,
+           batch_size=None,
+           read_ahead=False):
     """Scans for stored records.
 
     Scans through the collection, returning stored values ordered by timestamp.
+    Records are read from the data store in batches of at most batch_size, so
+    the memory used by a scan does not depend on the size of the collection.
+
+    Long running scans can be resumed: with include_suffix set, the timestamp
+    of every record is a (timestamp, suffix) cursor and passing the last one
+    seen as after_timestamp continues the scan right after that record.
 
     Args:
       after_timestamp: If set, only returns values recorded after timestamp.
+        Either micros_since_epoc or a (micros_since_epoc, suffix) pair.
       include_suffix: If true, the timestamps returned are pairs of the form
         (micros_since_epoc, suffix) where suffix is a 24 bit random refinement
         to avoid collisions. Otherwise only micros_since_epoc is returned.
       max_records: The maximum number of records to return. Defaults to
         unlimited.
+      batch_size: The maximum number of records read from the data store at
+        once. Defaults to SCAN_BATCH_SIZE.
+      read_ahead: If true, the next batch is read on a background thread while
+        the current one is being processed.
 
     Yields:
       Pairs (timestamp, rdf_value), indicating that rdf_value was stored at
@@ -142,16 +217,39 @@ class SequentialCollection(object):
       suffix = after_timestamp[1]
       after_timestamp = after_timestamp[0]
 
-    for item, timestamp, suffix in data_store.DB.CollectionScanItems(
-        self.collection_id,
-        self.RDF_TYPE,
-        after_timestamp=after_timestamp,
-        after_suffix=suffix,
-        limit=max_records):
-      if include_suffix:
-        yield ((timestamp, suffix), item)
-      else:
-        yield (timestamp, item)
+    batches = self._ScanBatches(after_timestamp, suffix, max_records,
+                                batch_size or self.SCAN_BATCH_SIZE)
+    if read_ahead:
+      batches = _ReadAhead(batches)
+
+    for batch in batches:
+      for item, timestamp, suffix in batch:
+        if include_suffix:
+          yield ((timestamp, suffix), item)
+        else:
+          yield (timestamp, item)
+
+  def _ScanBatches(self, after_timestamp, after_suffix, max_records,
+                   batch_size):
+    """Yields lists of (item, timestamp, suffix) read from the data store."""
+    remaining = max_records
+    while remaining is None or remaining > 0:
+      limit = batch_size if remaining is None else min(batch_size, remaining)
+      batch = list(
+          data_store.DB.CollectionScanItems(
+              self.collection_id,
+              self.RDF_TYPE,
+              after_timestamp=after_timestamp,
+              after_suffix=after_suffix,
+              limit=limit))
+      if batch:
+        yield batch
+      if len(batch) < limit:
+        return
+
+      _, after_timestamp, after_suffix = batch[-1]
+      if remaining is not None:
+        remaining -= len(batch)
 
   def MultiResolve(self, records):
     """Lookup multiple values by their record objects."""
@@ -4,6 +4,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import itertools
 import threading
 import time
 
@@ -11,6 +12,7 @@ import time
 from absl import app
 from future.builtins import range
 from future.utils import iterkeys
+import mock
 
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import utils
@@ -99,6 +101,88 @@ class SequentialCollectionTest(aff4_test_lib.AFF4ObjectTest):
     for _ in collection.Scan():
       self.fail("Deleted and recreated SequentialCollection should be empty")
 
+  def _AddRecords(self, collection, count, timestamp=None):
+    with data_store.DB.GetMutationPool() as pool:
+      for i in range(count):
+        collection.Add(
+            rdfvalue.RDFInteger(i), timestamp=timestamp, mutation_pool=pool)
+
+  def testScanReadsInBatches(self):
+    collection = self._TestCollection(
+        "aff4:/sequential_collection/testScanReadsInBatches")
+    # Identical timestamps make sure batches are resumed using the suffix.
+    self._AddRecords(collection, 25, timestamp=rdfvalue.RDFDatetime.Now())
+
+    with mock.patch.object(
+        data_store.DB,
+        "CollectionScanItems",
+        wraps=data_store.DB.CollectionScanItems) as scan_items:
+      values = [v for _, v in collection.Scan(batch_size=10)]
+
+    self.assertCountEqual(values, range(25))
+    self.assertEqual(scan_items.call_count, 3)
+    for call in scan_items.call_args_list:
+      self.assertEqual(call[1]["limit"], 10)
+
+  def testScanMaxRecordsSpanningBatches(self):
+    collection = self._TestCollection(
+        "aff4:/sequential_collection/testScanMaxRecordsSpanningBatches")
+    self._AddRecords(collection, 25)
+
+    values = [v for _, v in collection.Scan(max_records=15, batch_size=10)]
+    self.assertEqual(values, list(range(15)))
+
+  def testScanResumesFromCursor(self):
+    collection = self._TestCollection(
+        "aff4:/sequential_collection/testScanResumesFromCursor")
+    self._AddRecords(collection, 30, timestamp=rdfvalue.RDFDatetime.Now())
+
+    first = list(collection.Scan(include_suffix=True, max_records=12))
+    cursor = first[-1][0]
+    rest = list(
+        collection.Scan(
+            after_timestamp=cursor, include_suffix=True, batch_size=7))
+
+    self.assertLen(first, 12)
+    self.assertLen(rest, 18)
+    self.assertEqual([ts for ts, _ in first + rest],
+                     [ts for ts, _ in collection.Scan(include_suffix=True)])
+
+  def testScanWithReadAhead(self):
+    collection = self._TestCollection(
+        "aff4:/sequential_collection/testScanWithReadAhead")
+    self._AddRecords(collection, 50)
+
+    values = [v for _, v in collection.Scan(batch_size=7, read_ahead=True)]
+    self.assertEqual(values, list(range(50)))
+
+  def testScanWithReadAheadStoppedEarly(self):
+    collection = self._TestCollection(
+        "aff4:/sequential_collection/testScanWithReadAheadStoppedEarly")
+    self._AddRecords(collection, 50)
+
+    scan = collection.Scan(batch_size=5, read_ahead=True)
+    self.assertEqual([v for _, v in itertools.islice(scan, 3)], [0, 1, 2])
+    scan.close()
+
+    for _ in range(50):
+      if not any(t.name == "SequentialCollectionReadAhead"
+                 for t in threading.enumerate()):
+        break
+      time.sleep(0.1)
+    else:
+      self.fail("Read ahead thread did not finish.")
+
+  def testScanWithReadAheadReraisesErrors(self):
+    collection = self._TestCollection(
+        "aff4:/sequential_collection/testScanWithReadAheadReraisesErrors")
+    self._AddRecords(collection, 10)
+
+    with mock.patch.object(
+        data_store.DB, "CollectionScanItems", side_effect=IOError("foo")):
+      with self.assertRaises(IOError):
+        list(collection.Scan(read_ahead=True))
+
 
 class TestIndexedSequentialCollection(
     sequential_collection.IndexedSequentialCollection):
@@ -94,6 +94,18 @@ def GetMetadata():
           "well_known_flow_errors", fields=[("flow", str)]),
       stats_utils.CreateEventMetadata("fleetspeak_last_ping_latency_millis"),
 
+      # Artifact parser metrics.
+      stats_utils.CreateEventMetadata(
+          "parser_latency", fields=[("parser", str)]),
+      stats_utils.CreateEventMetadata(
+          "parser_cpu_time", fields=[("parser", str)]),
+      stats_utils.CreateCounterMetadata(
+          "parser_results", fields=[("parser", str)]),
+      stats_utils.CreateCounterMetadata(
+          "parser_errors", fields=[("parser", str)]),
+      stats_utils.CreateCounterMetadata(
+          "parser_budget_exceeded", fields=[("parser", str), ("budget", str)]),
+
       # Hunt-related metrics.
       stats_utils.CreateCounterMetadata(
           "hunt_output_plugin_verifications", fields=[("status", str)]),
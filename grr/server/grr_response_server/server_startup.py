@@ -18,6 +18,7 @@ from grr_response_core.lib import registry
 from grr_response_core.lib.local import plugins
 # pylint: enable=unused-import
 from grr_response_core.lib.parsers import all as all_parsers
+from grr_response_core.lib.util import cache
 from grr_response_core.stats import stats_collector_instance
 from grr_response_server import prometheus_stats_collector
 from grr_response_server import server_logging
@@ -78,6 +79,7 @@ def Init():
 
   metric_metadata = server_metrics.GetMetadata()
   metric_metadata.extend(communicator.GetMetricMetadata())
+  metric_metadata.extend(cache.GetMetricMetadata())
 
   stats_collector = prometheus_stats_collector.PrometheusStatsCollector(
       metric_metadata, registry=prometheus_client.REGISTRY)
@@ -29,6 +29,7 @@ from grr_response_core.lib.rdfvalues import osquery as rdf_osquery
 from grr_response_core.lib.rdfvalues import paths as rdf_paths
 from grr_response_core.lib.rdfvalues import plist as rdf_plist
 from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
+from grr_response_core.lib.rdfvalues import timeline as rdf_timeline
 
 
 class ClientActionStub(with_metaclass(registry.MetaclassRegistry, object)):
@@ -240,6 +241,13 @@ class ListDirectory(ClientActionStub):
   out_rdfvalues = [rdf_client_fs.StatEntry]
 
 
+class RecursiveListDirectory(ClientActionStub):
+  """Lists all the files in a directory and its subdirectories."""
+
+  in_rdfvalue = rdf_client_action.RecursiveListDirRequest
+  out_rdfvalues = [rdf_client_fs.StatEntry]
+
+
 # DEPRECATED.
 #
 # This action was replaced by newer `GetFileStat` action. This stub is left for
@@ -427,3 +435,10 @@ class Osquery(ClientActionStub):
 
   in_rdfvalue = rdf_osquery.OsqueryArgs
   out_rdfvalues = [rdf_osquery.OsqueryResult]
+
+
+class Timeline(ClientActionStub):
+  """A stub class for the timeline action plugin."""
+
+  in_rdfvalue = rdf_timeline.TimelineArgs
+  out_rdfvalues = [rdf_timeline.TimelineResult]
@@ -17,8 +17,8 @@ from grr_response_core import config
 from grr_response_core.lib import queues as queues_config
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import registry
-from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import flows as rdf_flows
+from grr_response_core.lib.util import cache
 from grr_response_core.lib.util import collection
 from grr_response_core.stats import stats_collector_instance
 from grr_response_server import aff4
@@ -85,7 +85,16 @@ class GRRWorker(object):
     # self.queued_flows is a timed cache of locked flows. If this worker
     # encounters a lock failure on a flow, it will not attempt to grab this flow
     # until the timeout.
-    self.queued_flows = utils.TimeBasedCache(max_size=10, max_age=60)
+    self.queued_flows = cache.LRUCache(max_size=10, max_age=60)
+
+    # Flows recently released by this worker. They are reused if they were not
+    # modified since, which saves reading and deserializing them again when a
+    # flow receives responses in many small batches.
+    self.flow_cache = None
+    flow_cache_size = config.CONFIG["Worker.flow_cache_size"]
+    if flow_cache_size:
+      self.flow_cache = cache.LRUCache(
+          max_size=flow_cache_size, name="worker_flows")
 
     if token is None:
       raise RuntimeError("A valid ACLToken is required.")
@@ -401,9 +410,18 @@ class GRRWorker(object):
 
     data_store.REL_DB.AckFlowProcessingRequests([flow_processing_request])
 
+    # The cached flow is removed while the flow is processed, so it is only
+    # cached again if it is successfully released.
+    cached_flow = None
+    if self.flow_cache is not None:
+      cached_flow = self.flow_cache.Pop((client_id, flow_id))
+
     try:
       rdf_flow = data_store.REL_DB.LeaseFlowForProcessing(
-          client_id, flow_id, processing_time=rdfvalue.Duration("6h"))
+          client_id,
+          flow_id,
+          processing_time=rdfvalue.Duration("6h"),
+          cached_flow=cached_flow)
     except db.ParentHuntIsNotRunningError:
       flow_base.TerminateFlow(client_id, flow_id, "Parent hunt stopped.")
       return
@@ -432,3 +450,6 @@ class GRRWorker(object):
             "%s/%s: ReleaseProcessedFlow returned false but no "
             "request could be processed (next req: %d)." %
             (client_id, flow_id, flow_obj.rdf_flow.next_request_to_process))
+
+    if self.flow_cache is not None and flow_obj.IsRunning():
+      self.flow_cache.Put((client_id, flow_id), flow_obj.rdf_flow)
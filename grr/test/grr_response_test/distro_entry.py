@@ -19,6 +19,11 @@ def ApiRegressionTestsGenerate():
   app.run(api_regression_test_generate.main)
 
 
+def LoadTest():
+  from grr_response_test import load_test_driver
+  app.run(load_test_driver.main)
+
+
 def DumpMySQLSchema():
   from grr_response_test import dump_mysql_schema
   app.run(dump_mysql_schema.main)
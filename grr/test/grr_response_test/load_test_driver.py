@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+"""Helper script for load testing a GRR server with a pool of clients.
+
+The load test is meant to be run against a local test or staging deployment
+(frontend, worker and database) with a number of simulated clients started
+with poolclient, e.g.:
+
+  grr_pool_client --nrclients 1000 --cert_file /tmp/pool_certs --fast_poll
+
+The script replays a workload of flows (started through the API on every
+client) and hunts (started once and picked up by all clients) and reports
+end-to-end latencies, throughput and, if monitoring URLs of server components
+are given, changes of their metrics over the duration of the test.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import collections
+import logging
+import threading
+import time
+
+from absl import app
+from absl import flags
+from future.builtins import range
+from future.moves import queue
+from prometheus_client import parser as prometheus_parser
+import requests
+
+from grr_api_client import api
+from grr_api_client import errors
+from grr_api_client import utils
+from grr_response_core.lib.util import statistics
+from grr_response_proto import flows_pb2
+
+flags.DEFINE_string("api_endpoint", "http://localhost:8000",
+                    "GRR API endpoint.")
+
+flags.DEFINE_string("api_user", "admin", "Username for GRR API.")
+
+flags.DEFINE_string("api_password", "", "Password for GRR API.")
+
+flags.DEFINE_integer(
+    "client_limit", 0,
+    "Maximum number of clients to run the flows on. All the clients known to "
+    "the server are used if 0.")
+
+flags.DEFINE_list("flows", ["ListProcesses"],
+                  "Names of flows to start on every client.")
+
+flags.DEFINE_integer("flows_per_client", 1,
+                     "How many times each of the flows is started per client.")
+
+flags.DEFINE_list(
+    "hunts", [], "Names of flows to run as hunts on all clients. Clients have "
+    "to check for new hunts, e.g. be started with --send_foreman_request.")
+
+flags.DEFINE_integer("threads", 50,
+                     "Number of flows started and waited for in parallel.")
+
+flags.DEFINE_float("poll_interval", 0.5,
+                   "Interval (in seconds) between checks of a flow state.")
+
+flags.DEFINE_integer("flow_timeout", 3600,
+                     "Maximum time (in seconds) to wait for a flow or hunt.")
+
+flags.DEFINE_list(
+    "monitoring_urls", [],
+    "Prometheus metrics URLs of server components (e.g. "
+    "http://localhost:44451/metrics) to report metric changes for.")
+
+flags.DEFINE_list("metrics", [
+    "frontend_request_count",
+    "frontend_request_latency",
+    "grr_frontendserver_handle_time",
+    "grr_messages_sent",
+    "grr_worker_states_run",
+    "grr_flow_completed_count",
+], "Names of metrics to report changes of.")
+
+FlowRun = collections.namedtuple("FlowRun",
+                                 ["client_id", "flow_name", "latency", "error"])
+
+
+def _WaitForFlow(flow, interval, timeout):
+  """Waits for a flow to finish, raising if it fails."""
+  flow = utils.Poll(
+      generator=flow.Get,
+      condition=lambda f: f.data.state != f.data.RUNNING,
+      interval=interval,
+      timeout=timeout)
+  if flow.data.state != flow.data.TERMINATED:
+    raise errors.FlowFailedError("Flow %s (%s) failed: %s" %
+                                 (flow.flow_id, flow.client_id,
+                                  flow.data.context.current_state))
+
+
+def _RunFlow(grr_api, client_id, flow_name, interval, timeout):
+  """Runs a flow on a client and returns its FlowRun."""
+  start_time = time.time()
+  try:
+    flow = grr_api.Client(client_id).CreateFlow(name=flow_name)
+    _WaitForFlow(flow, interval, timeout)
+  except Exception as e:  # pylint: disable=broad-except
+    return FlowRun(client_id, flow_name, time.time() - start_time, e)
+  return FlowRun(client_id, flow_name, time.time() - start_time, None)
+
+
+def RunFlows(grr_api,
+             client_ids,
+             flow_names,
+             flows_per_client=1,
+             num_threads=50,
+             interval=0.5,
+             timeout=3600):
+  """Runs flows on clients in parallel.
+
+  Args:
+    grr_api: A GrrApi object.
+    client_ids: Ids of clients to run the flows on.
+    flow_names: Names of flows to run on every client.
+    flows_per_client: How many times each of the flows is run on every client.
+    num_threads: Number of flows run in parallel.
+    interval: Interval (in seconds) between checks of a flow state.
+    timeout: Maximum time (in seconds) to wait for a single flow.
+
+  Returns:
+    A list of FlowRun tuples, one for every flow started.
+  """
+  work = queue.Queue()
+  for _ in range(flows_per_client):
+    for client_id in client_ids:
+      for flow_name in flow_names:
+        work.put((client_id, flow_name))
+
+  runs = []
+  lock = threading.Lock()
+
+  def Worker():
+    while True:
+      try:
+        client_id, flow_name = work.get_nowait()
+      except queue.Empty:
+        return
+      run = _RunFlow(grr_api, client_id, flow_name, interval, timeout)
+      with lock:
+        runs.append(run)
+
+  threads = [threading.Thread(target=Worker) for _ in range(num_threads)]
+  for t in threads:
+    t.daemon = True
+    t.start()
+  for t in threads:
+    t.join()
+
+  return runs
+
+
+def RunHunt(grr_api, flow_name, num_clients, interval=0.5, timeout=3600):
+  """Runs a hunt and waits for a given number of clients to complete it.
+
+  Args:
+    grr_api: A GrrApi object.
+    flow_name: Name of the flow to run as a hunt.
+    num_clients: Number of clients expected to complete the hunt.
+    interval: Interval (in seconds) between checks of the hunt state.
+    timeout: Maximum time (in seconds) to wait for the hunt.
+
+  Returns:
+    A tuple of the number of clients that completed the hunt and the time (in
+    seconds) it took them.
+  """
+  runner_args = flows_pb2.HuntRunnerArgs(
+      description="Load test: %s" % flow_name,
+      client_rate=0,
+      client_limit=num_clients)
+  hunt = grr_api.CreateHunt(flow_name=flow_name, hunt_runner_args=runner_args)
+
+  start_time = time.time()
+  hunt.Start()
+  try:
+    hunt = utils.Poll(
+        generator=hunt.Get,
+        condition=lambda h: h.data.completed_clients_count >= num_clients,
+        interval=interval,
+        timeout=timeout)
+  except errors.PollTimeoutError:
+    hunt = hunt.Get()
+  finally:
+    elapsed = time.time() - start_time
+    hunt.Stop()
+
+  return hunt.data.completed_clients_count, elapsed
+
+
+def ScrapeMetrics(urls, metric_names):
+  """Reads current values of metrics from Prometheus endpoints.
+
+  Args:
+    urls: URLs of metrics endpoints of server components.
+    metric_names: Names of the metrics to read.
+
+  Returns:
+    A dict mapping (url, sample name, labels) tuples to sample values.
+  """
+  values = {}
+  for url in urls:
+    try:
+      text = requests.get(url).text
+    except requests.exceptions.RequestException as e:
+      logging.warning("Unable to read metrics from %s: %s", url, e)
+      continue
+
+    for family in prometheus_parser.text_string_to_metric_families(text):
+      if family.name not in metric_names:
+        continue
+      for sample in family.samples:
+        name, labels, value = sample[:3]
+        values[(url, name, tuple(sorted(labels.items())))] = value
+  return values
+
+
+def FormatMetricChanges(before, after):
+  """Formats changes of metric values, one line per changed sample."""
+  lines = []
+  for key in sorted(after):
+    delta = after[key] - before.get(key, 0)
+    if not delta:
+      continue
+    url, name, labels = key
+    label_str = ",".join("%s=%s" % label for label in labels)
+    lines.append("%s %s{%s}: %+g" % (url, name, label_str, delta))
+  return lines
+
+
+def FormatLatencies(title, latencies):
+  """Formats a summary of latencies (in seconds) as a single line."""
+  summary = statistics.Summarize(latencies)
+  return ("%s: %d runs, mean %.2fs, p50 %.2fs, p90 %.2fs, p99 %.2fs, "
+          "max %.2fs" % (title, summary.count, summary.mean, summary.p50,
+                         summary.p90, summary.p99, summary.max))
+
+
+def main(argv):
+  del argv  # Unused.
+
+  grr_api = api.InitHttp(
+      api_endpoint=flags.FLAGS.api_endpoint,
+      auth=(flags.FLAGS.api_user, flags.FLAGS.api_password))
+
+  client_ids = [c.client_id for c in grr_api.SearchClients(query=".")]
+  if flags.FLAGS.client_limit:
+    client_ids = client_ids[:flags.FLAGS.client_limit]
+  if not client_ids:
+    raise RuntimeError("No clients to run the load test on.")
+  print("Running the load test on %d clients." % len(client_ids))
+
+  metrics_before = ScrapeMetrics(flags.FLAGS.monitoring_urls,
+                                 flags.FLAGS.metrics)
+  start_time = time.time()
+
+  if flags.FLAGS.flows:
+    runs = RunFlows(
+        grr_api,
+        client_ids,
+        flags.FLAGS.flows,
+        flows_per_client=flags.FLAGS.flows_per_client,
+        num_threads=flags.FLAGS.threads,
+        interval=flags.FLAGS.poll_interval,
+        timeout=flags.FLAGS.flow_timeout)
+    elapsed = time.time() - start_time
+
+    for flow_name in flags.FLAGS.flows:
+      latencies = [
+          r.latency for r in runs if r.flow_name == flow_name and not r.error
+      ]
+      failures = [r for r in runs if r.flow_name == flow_name and r.error]
+      if latencies:
+        print(FormatLatencies(flow_name, latencies))
+      if failures:
+        print("%s: %d runs failed, e.g. on %s: %s" %
+              (flow_name, len(failures), failures[0].client_id,
+               failures[0].error))
+    print("Flows: %d in %.1fs, %.2f per second." %
+          (len(runs), elapsed, len(runs) / elapsed))
+
+  for flow_name in flags.FLAGS.hunts:
+    completed, elapsed = RunHunt(
+        grr_api,
+        flow_name,
+        len(client_ids),
+        interval=flags.FLAGS.poll_interval,
+        timeout=flags.FLAGS.flow_timeout)
+    print("Hunt %s: %d/%d clients in %.1fs, %.2f clients per second." %
+          (flow_name, completed, len(client_ids), elapsed, completed / elapsed))
+
+  metrics_after = ScrapeMetrics(flags.FLAGS.monitoring_urls,
+                                flags.FLAGS.metrics)
+  for line in FormatMetricChanges(metrics_before, metrics_after):
+    print(line)
+
+
+if __name__ == "__main__":
+  app.run(main)
@@ -89,7 +89,8 @@ setup_args = dict(
             "grr_api_regression_generate = "
             "grr_response_test.distro_entry:ApiRegressionTestsGenerate",
             "grr_dump_mysql_schema = "
-            "grr_response_test.distro_entry:DumpMySQLSchema"
+            "grr_response_test.distro_entry:DumpMySQLSchema",
+            "grr_load_test = grr_response_test.distro_entry:LoadTest",
         ]
     })
 
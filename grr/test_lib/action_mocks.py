@@ -265,8 +265,9 @@ class ListDirectoryClientMock(ActionMock):
 
   def __init__(self, *args, **kwargs):
     super(ListDirectoryClientMock,
-          self).__init__(standard.ListDirectory, standard.GetFileStat, *args,
-                         **kwargs)
+          self).__init__(standard.ListDirectory,
+                         standard.RecursiveListDirectory, standard.GetFileStat,
+                         *args, **kwargs)
 
 
 class GlobClientMock(ActionMock):
@@ -448,9 +448,11 @@ class MockClient(object):
                   message, 1, status="GENERIC_ERROR")
           ]
 
-        # Now insert those on the flow state queue
+        # Now insert those on the flow state queue, unpacking batched replies
+        # like the frontend does.
         for response in responses:
-          self.PushToStateQueue(manager, response)
+          for reply in response.UnpackReplies():
+            self.PushToStateQueue(manager, reply)
 
         # Additionally schedule a task for the worker
         manager.QueueNotification(session_id=message.session_id)
@@ -693,6 +695,31 @@ def RunFlow(client_id,
       test_worker.Shutdown()
 
 
+def ProcessDueFlowProcessingRequests(worker):
+  """Makes the worker process flow processing requests that are due.
+
+  The in-memory database only delivers delayed flow processing requests (e.g.
+  ones scheduled by CallState with a start time) from a background thread. This
+  function delivers them synchronously instead.
+
+  Args:
+    worker: A TestWorker instance.
+
+  Returns:
+    The number of processed flow processing requests.
+  """
+  now = rdfvalue.RDFDatetime.Now()
+  requests = [
+      r for r in data_store.REL_DB.ReadFlowProcessingRequests()
+      if r.delivery_time is None or r.delivery_time <= now
+  ]
+  data_store.REL_DB.AckFlowProcessingRequests(requests)
+
+  for request in requests:
+    worker.ProcessFlow(request)
+  return len(requests)
+
+
 def GetFlowResults(client_id, flow_id):
   """Gets flow results for a given flow.
 
@@ -41,6 +41,7 @@ from grr_response_server import artifact
 from grr_response_server import client_index
 from grr_response_server import data_store
 from grr_response_server import email_alerts
+from grr_response_server import file_store
 from grr_response_server import prometheus_stats_collector
 from grr_response_server.aff4_objects import aff4_grr
 from grr_response_server.aff4_objects import filestore
@@ -138,6 +139,12 @@ class GRRBaseTest(absltest.TestCase):
     with_limited_call_frequency_stubber.Start()
     self.addCleanup(with_limited_call_frequency_stubber.Stop)
 
+    # The test database is cleared before every test, so hash caches of the
+    # file store have to be cleared as well.
+    hash_caches_stubber = utils.Stubber(file_store, "_HASH_CACHES", None)
+    hash_caches_stubber.Start()
+    self.addCleanup(hash_caches_stubber.Stop)
+
   def _SetupFakeStatsContext(self):
     """Creates a stats context for running tests based on defined metrics."""
     metrics_metadata = list(
@@ -20,6 +20,7 @@ from grr_response_core.lib import config_lib
 from grr_response_core.lib import package
 from grr_response_core.lib import registry
 from grr_response_core.lib import utils
+from grr_response_core.lib.util import cache
 from grr_response_core.lib.util import compatibility
 from grr_response_core.stats import stats_collector_instance
 from grr_response_server import aff4
@@ -45,6 +46,7 @@ def TestInit():
   metric_metadata = server_metrics.GetMetadata()
   metric_metadata.extend(client_metrics.GetMetadata())
   metric_metadata.extend(communicator.GetMetricMetadata())
+  metric_metadata.extend(cache.GetMetricMetadata())
   stats_collector = prometheus_stats_collector.PrometheusStatsCollector(
       metric_metadata)
   stats_collector_instance.Set(stats_collector)
@@ -98,4 +100,9 @@ def TestInit():
   utils.TimeBasedCache.house_keeper_thread.exit = True
   utils.TimeBasedCache.house_keeper_thread.join()
 
+  if not cache.LRUCache.house_keeper_thread:
+    cache.LRUCache(max_age=600)
+  cache.LRUCache.house_keeper_thread.exit = True
+  cache.LRUCache.house_keeper_thread.join()
+
   INIT_RAN = True